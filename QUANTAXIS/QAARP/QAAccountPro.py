@@ -32,6 +32,7 @@ from pymongo import DESCENDING, ASCENDING
 
 from QUANTAXIS import __version__
 from QUANTAXIS.QAARP.market_preset import MARKET_PRESET
+from QUANTAXIS.QAARP.QAHistory import QA_Column, QA_HistoryStore
 from QUANTAXIS.QAEngine.QAEvent import QA_Worker
 from QUANTAXIS.QAMarket.QAOrder import QA_Order, QA_OrderQueue
 from QUANTAXIS.QAMarket.QAPosition import QA_Position, QA_PMS
@@ -94,7 +95,8 @@ class QA_AccountPRO(QA_Worker):
             auto_reload=False,
             generated='direct',
             start=None,
-            end=None
+            end=None,
+            history_limit=None
     ):
         """
 
@@ -132,6 +134,7 @@ class QA_AccountPRO(QA_Worker):
         :param [QA.PARAM] frequence:     账户级别 默认日线QA.FREQUENCE.DAY
         :param [QA.PARAM] broker:        BROEKR类 默认回测 QA.BROKER_TYPE.BACKTEST
         :param [QA.PARAM] running_environment 当前运行环境 默认Backtest
+        :param [int] history_limit:      最多保留多少条成交记录 默认None不限制, 超出时按块丢弃最早的记录
 
         # 2018/06/11 init_assets 从float变为dict,并且不作为输入,作为只读属性
         #  :param [float] init_assets:       初始资产  默认 1000000 元 （100万）
@@ -321,12 +324,15 @@ class QA_AccountPRO(QA_Worker):
         ) if isinstance(init_hold,
                         dict) else init_hold
         self.init_hold.index.name = 'code'
+        self.history_limit = history_limit
         self.cash = [self.init_cash]
         self.cash_available = self.cash[-1]  # 可用资金
         self.sell_available = copy.deepcopy(self.init_hold)
         self.buy_available = copy.deepcopy(self.init_hold)
         self.history = []
         self.time_index_max = []
+        # 持仓/每日持仓, 由 history 增量累加 见 _sync_positions
+        self._history_ref = None
 
         # 在回测中, 每日结算后更新
         # 真实交易中, 为每日初始化/每次重新登录后的同步信息
@@ -364,7 +370,7 @@ class QA_AccountPRO(QA_Worker):
         """
 
         self.frozen = {}  # 冻结资金(保证金)
-        self.finishedOrderid = []
+        self.finishedOrderid = {}  # 已完成的委托单号, 用dict去重并保持顺序
 
         if auto_reload:
             self.reload()
@@ -416,9 +422,9 @@ class QA_AccountPRO(QA_Worker):
             'tax_coeff':
             self.tax_coeff,
             'cash':
-            self.cash,
+            self.cash.tolist(),
             'history':
-            self.history,
+            self.history.tolist(),
             'trade_index':
             self.time_index_max,
             'running_time':
@@ -435,7 +441,7 @@ class QA_AccountPRO(QA_Worker):
             'frozen':
             self.frozen,
             'finished_id':
-            self.finishedOrderid,
+            list(self.finishedOrderid),
             'position_id':
             list(self.pms.keys())
         }
@@ -479,12 +485,45 @@ class QA_AccountPRO(QA_Worker):
 
         return {'cash': self.init_cash, 'hold': self.init_hold.to_dict()}
 
+    @property
+    def history(self):
+        """成交记录 (QA_HistoryStore), 赋值为 list of list 时自动转换"""
+        return self._history
+
+    @history.setter
+    def history(self, history):
+        if not isinstance(history, QA_HistoryStore):
+            rows = list(history)
+            history = QA_HistoryStore.from_rows(
+                rows,
+                self._history_headers,
+                max_rows=self.history_limit
+            )
+            # history_limit 截断时丢弃的记录先累加到持仓里, _sync_positions 只处理留下来的记录
+            self._history_ref = history
+            self._history_synced = history.dropped
+            self._positions = {}
+            self._daily_changes = {}
+            self._fold_positions(rows[:history.dropped])
+        self._history = history
+
+    @property
+    def cash(self):
+        """现金记录 (QA_Column), 赋值为 list 时自动转换"""
+        return self._cash
+
+    @cash.setter
+    def cash(self, cash):
+        if not isinstance(cash, QA_Column):
+            cash = QA_Column('f8', data=cash, max_rows=self.history_limit)
+        self._cash = cash
+
     @property
     def code(self):
         """
         该账户曾交易代码 用set 去重
         """
-        return list(set([item[1] for item in self.history]))
+        return list(set(self.history.column('code')))
 
     @property
     def date(self):
@@ -578,26 +617,16 @@ class QA_AccountPRO(QA_Worker):
 
     @property
     def history_min(self):
-        if len(self.history):
-            res_ = pd.DataFrame(self.history)
-            res_['date'] = [i[0:10] for i in res_[0]]
-            res_ = res_[res_['date'].isin(self.trade_range)]
-            return np.array(res_.drop(['date'], axis=1)).tolist()
-        else:
-            return self.history
+        return self.history_table_min.values.tolist()
 
     @property
     def history_table_min(self):
         '区间交易历史的table'
-        if len(self.history_min) > 0:
-            lens = len(self.history_min[0])
-        else:
-            lens = len(self._history_headers)
-
-        return pd.DataFrame(
-            data=self.history_min,
-            columns=self._history_headers[:lens]
-        ).sort_index()
+        res_ = self.history_table
+        if len(res_):
+            date = res_.datetime.astype(str).str.slice(0, 10)
+            res_ = res_[date.isin(self.trade_range)]
+        return res_.reset_index(drop=True)
 
     @property
     def trade_day(self):
@@ -609,15 +638,7 @@ class QA_AccountPRO(QA_Worker):
     @property
     def history_table(self):
         '交易历史的table'
-        if len(self.history) > 0:
-            lens = len(self.history[0])
-        else:
-            lens = len(self._history_headers)
-
-        return pd.DataFrame(
-            data=self.history,
-            columns=self._history_headers[:lens]
-        ).sort_index()
+        return self.history.to_dataframe()
 
     @property
     def today_trade_table(self):
@@ -629,12 +650,16 @@ class QA_AccountPRO(QA_Worker):
     @property
     def cash_table(self):
         '现金的table'
+        # cash 比 time_index_max 多一条初始资金, history_limit 丢弃的记录不再对应
+        dropped = max(self.cash.dropped, 1)
         _cash = pd.DataFrame(
-            data=[self.cash[1::],
-                  self.time_index_max],
-            index=['cash',
-                   'datetime']
-        ).T
+            {
+                'cash': pd.Series(self.cash.to_numpy()[dropped - self.cash.dropped:]),
+                'datetime': pd.Series(self.time_index_max[dropped - 1:])
+            },
+            columns=['cash',
+                     'datetime']
+        )
         _cash = _cash.assign(
             date=_cash.datetime.apply(lambda x: pd.to_datetime(str(x)[0:10]))
         ).assign(account_cookie=self.account_cookie)                          # .sort_values('datetime')
@@ -680,24 +705,58 @@ class QA_AccountPRO(QA_Worker):
     def get_position(self, position_id):
         return self.pms.get(position_id, None)
 
+    def _sync_positions(self):
+        """把 history 中新增的成交累加到持仓和每日成交数量上
+
+        receive_simpledeal 每笔成交调用一次, 只处理上次之后追加的记录
+        history 被整体替换的时候重新累加
+        history_limit 丢弃的记录在丢弃之前已经累加过了
+        """
+        history = self.history
+        if history is not self._history_ref or history.total < self._history_synced:
+            self._history_ref = history
+            self._history_synced = 0
+            self._positions = {}      # code: 初始化账户后的成交累计数量
+            self._daily_changes = {}  # date: {code: 当日成交的累计数量}
+
+        self._fold_positions(
+            history[max(self._history_synced - history.dropped, 0):]
+        )
+        self._history_synced = history.total
+
+    def _fold_positions(self, rows):
+        for item in rows:
+            code = item[1]
+            self._positions[code] = self._positions.get(code, 0) + item[3]
+            changes = self._daily_changes.setdefault(str(item[0])[0:10], {})
+            changes[code] = changes.get(code, 0) + item[3]
+
+    @staticmethod
+    def _hold_series(hold):
+        return pd.Series(
+            hold,
+            name='amount',
+            dtype=float
+        ).rename_axis('code').replace(0,
+                                      np.nan).dropna().sort_index()
+
     @property
     def hold(self):
         """真实持仓
         """
-        return pd.concat(
-            [self.init_hold,
-             self.hold_available]
-        ).groupby('code').sum().replace(0,
-                                        np.nan).dropna().sort_index()
+        self._sync_positions()
+        hold = {}
+        for code, amount in list(self.init_hold.items()
+                                ) + list(self._positions.items()):
+            hold[code] = hold.get(code, 0) + amount
+        return self._hold_series(hold)
 
     @property
     def hold_available(self):
         """可用持仓
         """
-        return self.history_table.groupby('code').amount.sum().replace(
-            0,
-            np.nan
-        ).dropna().sort_index()
+        self._sync_positions()
+        return self._hold_series(self._positions)
 
     # @property
     # def order_table(self):
@@ -738,18 +797,24 @@ class QA_AccountPRO(QA_Worker):
     @property
     def daily_hold(self):
         '每日交易结算时的持仓表'
-        data = self.trade.cumsum()
-        if len(data) < 1:
+        self._sync_positions()
+        if len(self.history) < 1:
             return None
         else:
-            # print(data.index.levels[0])
-            data = data.assign(account_cookie=self.account_cookie).assign(
-                date=pd.to_datetime(data.index.levels[0]).date
-            )
-
-            data.date = pd.to_datetime(data.date)
-            data = data.set_index(['date', 'account_cookie'])
-            res = data[~data.index.duplicated(keep='last')].sort_index()
+            # 按日期累加每日的成交数量, history_limit 丢弃的记录也已经累加在里面
+            res = pd.DataFrame(
+                list(self._daily_changes.values()),
+                index=pd.MultiIndex.from_arrays(
+                    [
+                        pd.to_datetime(list(self._daily_changes.keys())),
+                        [self.account_cookie] * len(self._daily_changes)
+                    ],
+                    names=['date',
+                           'account_cookie']
+                ),
+                dtype=float
+            ).sort_index(axis=1).sort_index().fillna(0).cumsum()
+            res.columns.name = 'code'
             # 这里会导致股票停牌时的持仓也被计算 但是计算market_value的时候就没了
             le = pd.DataFrame(pd.Series(data=None, index=pd.to_datetime(
                 self.trade_range_max).set_names('date'), name='predrop'))
@@ -943,7 +1008,7 @@ class QA_AccountPRO(QA_Worker):
         if realorder_id in self.finishedOrderid:
             pass
         else:
-            self.finishedOrderid.append(realorder_id)
+            self.finishedOrderid[realorder_id] = None
 
         market_towards = 1 if trade_towards > 0 else -1
         # value 合约价值 unit 合约乘数
@@ -1140,6 +1205,7 @@ class QA_AccountPRO(QA_Worker):
                     trade_towards
                 ]
             )
+            self._sync_positions()
 
         else:
             print('ALERT MONEY NOT ENOUGH!!!')
@@ -1660,7 +1726,7 @@ class QA_AccountPRO(QA_Worker):
             RUNNING_ENVIRONMENT.BACKETEST
         )
         self.frozen = message.get('frozen', {})
-        self.finishedOrderid = message.get('finished_id', [])
+        self.finishedOrderid = dict.fromkeys(message.get('finished_id', []))
         pos_id = message.get('position_id', [])
         print(pos_id)
         self.pms = dict(zip(pos_id, [QA_Position(position_id=item,
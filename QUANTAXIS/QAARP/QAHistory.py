@@ -0,0 +1,224 @@
+# coding:utf-8
+#
+# The MIT License (MIT)
+#
+# Copyright (c) 2016-2019 yutiansut/QUANTAXIS
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+账户的成交/现金记录
+
+QA_Account.history 原来是一个 list of list, 每笔成交一个 15 个元素的 list,
+QA_Account.cash 是一个 float 的 list. 大量账户/长周期回测时这两个 list 占了大部分内存,
+每次转 DataFrame 也都要重新遍历一遍
+
+这里换成按块追加的 numpy 数组:
+
+1. 每一块是定长的 numpy 数组 (成交记录是 structured array, 每个字段一个类型), 写满了再开新的一块
+2. 只能追加, 不能修改已经写入的记录
+3. to_numpy/column 把所有块合并成一个数组, 各个块换成这个数组上的视图, 在新的块写满之前
+   再次读取直接返回这个数组的视图 (不复制)
+4. max_rows 限制每个账户保留的记录数, 超出的时候按块丢弃最早的记录 (dropped 记录丢弃了多少条)
+
+对外仍然表现得像一个 list: len/下标/切片/遍历/append/extend 都返回 python 对象,
+原来直接操作 account.history/account.cash 的代码不用修改
+"""
+
+import numpy as np
+import pandas as pd
+
+
+"""成交记录各个字段的类型, 没有列出来的字段按 object 保存"""
+QA_HISTORY_DTYPES = {
+    'price': 'f8',
+    'amount': 'f8',
+    'cash': 'f8',
+    'commission': 'f8',
+    'tax': 'f8',
+    'frozen': 'f8',
+    'direction': 'i8',
+    'total_frozen': 'f8'
+}
+
+
+class QA_Column():
+    """按块追加的类型化数组
+
+    Keyword Arguments:
+        dtype {str} -- numpy 类型 (default: {'f8'})
+        data {list} -- 初始数据 (default: {None})
+        chunk_size {int} -- 每一块的长度 (default: {4096})
+        max_rows {int} -- 最多保留多少条记录, None 为不限制 (default: {None})
+    """
+
+    def __init__(self, dtype='f8', data=None, chunk_size=4096, max_rows=None):
+        self.dtype = np.dtype(dtype)
+        self.chunk_size = chunk_size
+        self.max_rows = max_rows
+        self.dropped = 0
+        self._chunks = []  # 写满的块
+        self._length = 0   # 写满的块的总长度
+        self._buffer = np.empty(chunk_size, dtype=self.dtype)
+        self._size = 0     # _buffer 中已经写入的长度
+        self._merged = None  # to_numpy 合并的数组, _chunks/_buffer 都是它上面的视图
+        if data is not None:
+            self.extend(data)
+
+    def __repr__(self):
+        return '< {} {} rows, {} dropped >'.format(
+            type(self).__name__,
+            len(self),
+            self.dropped
+        )
+
+    def __len__(self):
+        return self._length + self._size
+
+    @property
+    def total(self):
+        """一共写入过多少条 (包括已经丢弃的)"""
+        return self.dropped + len(self)
+
+    def _pack(self, value):
+        return value
+
+    def _unpack(self, values):
+        return values.tolist()
+
+    def append(self, value):
+        if self._size == len(self._buffer):
+            self._seal()
+        self._buffer[self._size] = self._pack(value)
+        self._size += 1
+
+    def extend(self, values):
+        for value in values:
+            self.append(value)
+
+    def _seal(self):
+        self._chunks.append(self._buffer)
+        self._length += len(self._buffer)
+        self._buffer = np.empty(self.chunk_size, dtype=self.dtype)
+        self._size = 0
+        self._merged = None
+        if self.max_rows is not None:
+            # 丢弃之后至少还要保留 max_rows 条
+            while self._chunks and self._length - len(self._chunks[0]
+                                                     ) >= self.max_rows:
+                chunk = self._chunks.pop(0)
+                self._length -= len(chunk)
+                self.dropped += len(chunk)
+
+    def _segments(self):
+        return self._chunks + [self._buffer[:self._size]]
+
+    def to_numpy(self):
+        """所有记录合并成一个数组
+
+        分块不变, 每一块 (包括写入缓冲) 换成合并之后的数组上的视图, 所以 max_rows 还是按块丢弃;
+        没有新的块写满之前再次调用直接返回视图
+        """
+        if not self._chunks:
+            return self._buffer[:self._size]
+        length = len(self)
+        if self._merged is None:
+            count = len(self._chunks)
+            size = self.chunk_size
+            data = np.empty(self._length + size, dtype=self.dtype)
+            data[:length] = np.concatenate(self._segments())
+            self._chunks = [data[i * size:(i + 1) * size] for i in range(count)]
+            self._buffer = data[count * size:]
+            self._merged = data
+        return self._merged[:length]
+
+    def tolist(self):
+        res = []
+        for segment in self._segments():
+            res.extend(self._unpack(segment))
+        return res
+
+    def __iter__(self):
+        for segment in self._segments():
+            for item in self._unpack(segment):
+                yield item
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            return self._unpack(self.to_numpy()[key])
+        length = len(self)
+        if key < 0:
+            key += length
+        if key < 0 or key >= length:
+            raise IndexError('{} index out of range'.format(type(self).__name__))
+        if key >= self._length:
+            return self._unpack(self._buffer[key - self._length:key - self._length + 1])[0]
+        for chunk in self._chunks:
+            if key < len(chunk):
+                return self._unpack(chunk[key:key + 1])[0]
+            key -= len(chunk)
+
+    def memory_usage(self):
+        """占用的字节数 (object 字段只计算指针)"""
+        return sum(segment.nbytes for segment in self._chunks) + self._buffer.nbytes
+
+
+class QA_HistoryStore(QA_Column):
+    """账户的成交记录, 每条记录一个 list, 字段见 QA_Account._history_headers
+
+    Arguments:
+        columns {list} -- 字段名
+
+    Keyword Arguments:
+        data {list} -- 初始记录 (default: {None})
+        chunk_size {int} -- 每一块的长度 (default: {4096})
+        max_rows {int} -- 最多保留多少条记录, None 为不限制 (default: {None})
+    """
+
+    def __init__(self, columns, data=None, chunk_size=4096, max_rows=None):
+        self.columns = list(columns)
+        super().__init__(
+            dtype=[(name,
+                    QA_HISTORY_DTYPES.get(name,
+                                          'O')) for name in self.columns],
+            data=data,
+            chunk_size=chunk_size,
+            max_rows=max_rows
+        )
+
+    @classmethod
+    def from_rows(cls, rows, columns, **kwargs):
+        """从 list of list 生成, 老版本保存的记录字段比较少, 按第一条记录的长度截取字段"""
+        rows = list(rows)
+        if len(rows) > 0:
+            columns = columns[:len(rows[0])]
+        return cls(columns, data=rows, **kwargs)
+
+    def _pack(self, value):
+        return tuple(value)
+
+    def _unpack(self, values):
+        return [list(item) for item in values.tolist()]
+
+    def column(self, name):
+        """某个字段的数组 (合并后的视图, 不复制)"""
+        return self.to_numpy()[name]
+
+    def to_dataframe(self):
+        return pd.DataFrame(self.to_numpy(), columns=self.columns)
@@ -0,0 +1,223 @@
+# coding:utf-8
+#
+# The MIT License (MIT)
+#
+# Copyright (c) 2016-2019 yutiansut/QUANTAXIS
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+成交记录的开平仓配对 (QA_Performance.pnl_fifo/pnl_lifo)
+
+成交按 (code, 多头/空头) 分组, 组内按成交顺序排列:
+
+1. 开仓: BUY/BUY_OPEN 开多头, SELL_OPEN 开空头
+2. 平仓: SELL/SELL_CLOSE/SELL_CLOSETODAY 平多头, BUY_CLOSE/BUY_CLOSETODAY 平空头
+
+fifo: 开仓和平仓都看成数量轴上首尾相接的区间, 平仓区间和开仓区间的交集就是配对,
+      全部用 cumsum/searchsorted 计算, 不用逐条遍历
+lifo: 后开先平没法用累计数量表示, 用一个栈逐条计算 (装了 numba 时编译)
+
+平仓的时候没有可以配对的开仓 (例如卖出 init_hold 里的持仓) 时, 这部分平仓数量不参与配对
+"""
+
+import numpy as np
+import pandas as pd
+
+from QUANTAXIS.QAUtil.QAParameter import ORDER_DIRECTION
+
+try:
+    from numba import njit as _njit
+except ImportError:
+    _njit = None
+
+
+"""开多头/开空头/平多头/平空头的成交方向"""
+_LONG_OPEN = [ORDER_DIRECTION.BUY, ORDER_DIRECTION.BUY_OPEN]
+_SHORT_OPEN = [ORDER_DIRECTION.SELL_OPEN]
+_LONG_CLOSE = [
+    ORDER_DIRECTION.SELL,
+    ORDER_DIRECTION.SELL_CLOSE,
+    ORDER_DIRECTION.SELL_CLOSETODAY
+]
+_SHORT_CLOSE = [ORDER_DIRECTION.BUY_CLOSE, ORDER_DIRECTION.BUY_CLOSETODAY]
+
+QA_PNL_COLUMNS = [
+    'code',
+    'sell_date',
+    'buy_date',
+    'amount',
+    'sell_price',
+    'buy_price',
+    'rawdirection'
+]
+
+
+def _group_cumsum(values, start):
+    '组内的累计和, start 为每一组的第一行'
+    res = np.cumsum(values)
+    base = np.zeros(len(values))
+    base[start[1:]] = res[start[1:] - 1]
+    return res - np.maximum.accumulate(base)
+
+
+def _fifo_pairs(group, start, is_open, qty):
+    """先开先平
+
+    平仓能配对的累计数量 M = min(M' + 本次平仓数量, 累计开仓数量),
+    展开之后是 M = C + min(0, cummin(O - C)) (O/C 为组内的累计开仓/平仓数量)
+    """
+    open_qty = np.where(is_open, qty, 0)
+    close_qty = np.where(is_open, 0, qty)
+    O = _group_cumsum(open_qty, start)
+    C = _group_cumsum(close_qty, start)
+    M = C + np.minimum(
+        pd.Series(O - C).groupby(group).cummin().values,
+        0
+    )
+    # 每一组的数量轴首尾相接, 所有组一起 searchsorted
+    total = np.zeros(group[-1] + 1)
+    total[group[start]] = O[np.append(start[1:], len(O)) - 1]
+    offset = (np.cumsum(total) - total)[group]
+
+    M_prev = np.append(0, M[:-1])
+    M_prev[start] = 0
+    close = np.flatnonzero(~is_open & (M > M_prev))
+    opens = np.flatnonzero(is_open & (qty > 0))
+    open_end = (O + offset)[opens]
+    open_start = open_end - qty[opens]
+    a = (M_prev + offset)[close]
+    b = (M + offset)[close]
+
+    first = np.searchsorted(open_end, a, 'right')
+    count = np.searchsorted(open_end, b, 'left') - first + 1
+    close_pos = np.repeat(np.arange(len(close)), count)
+    open_pos = np.repeat(first - np.cumsum(count) + count, count) + np.arange(count.sum())
+    amount = np.minimum(open_end[open_pos], b[close_pos]) - \
+        np.maximum(open_start[open_pos], a[close_pos])
+    return opens[open_pos], close[close_pos], amount
+
+
+def _lifo_loop(group, is_open, qty):
+    n = len(group)
+    open_idx = np.zeros(n, dtype=np.int64)
+    close_idx = np.zeros(n, dtype=np.int64)
+    amount = np.zeros(n)
+    stack = np.zeros(n, dtype=np.int64)
+    left = np.zeros(n)
+    top = 0
+    count = 0
+    for i in range(n):
+        if i > 0 and group[i] != group[i - 1]:
+            top = 0
+        if is_open[i]:
+            if qty[i] > 0:
+                stack[top] = i
+                left[top] = qty[i]
+                top += 1
+            continue
+        need = qty[i]
+        while need > 0 and top > 0:
+            matched = min(need, left[top - 1])
+            open_idx[count] = stack[top - 1]
+            close_idx[count] = i
+            amount[count] = matched
+            count += 1
+            need -= matched
+            left[top - 1] -= matched
+            if left[top - 1] <= 0:
+                top -= 1
+    return open_idx[:count], close_idx[:count], amount[:count]
+
+
+if _njit is not None:
+    _lifo_kernel = _njit(cache=True)(_lifo_loop)
+else:
+    _lifo_kernel = _lifo_loop
+
+
+def _lifo_pairs(group, start, is_open, qty):
+    '后开先平'
+    return _lifo_kernel(group, is_open, qty)
+
+
+def QA_pnl_pairs(history, model='fifo'):
+    """成交记录的开平仓配对
+
+    Arguments:
+        history {pd.DataFrame} -- 成交记录, 需要 datetime/code/price/amount/direction 字段
+            (QA_Account.history_table_min)
+
+    Keyword Arguments:
+        model {str} -- fifo 先开先平 / lifo 后开先平 (default: {'fifo'})
+
+    Returns:
+        pd.DataFrame -- 每一行一组配对, 字段见 QA_PNL_COLUMNS,
+            按平仓成交的顺序排列, 同一笔平仓按配对的先后排列
+    """
+    if model == 'fifo':
+        pairs = _fifo_pairs
+    elif model == 'lifo':
+        pairs = _lifo_pairs
+    else:
+        raise ValueError('QA_pnl_pairs: unknown model {}'.format(model))
+
+    direction = history.direction.values
+    long_side = np.isin(direction, _LONG_OPEN + _LONG_CLOSE)
+    valid = long_side | np.isin(direction, _SHORT_OPEN + _SHORT_CLOSE)
+    if not valid.any():
+        return pd.DataFrame([], columns=QA_PNL_COLUMNS)
+
+    code = history.code.values[valid]
+    code_id = pd.factorize(code)[0]
+    group = code_id * 2 + (~long_side[valid]).astype(np.int64)
+    order = np.argsort(group, kind='mergesort')
+    group = group[order]
+    start = np.flatnonzero(np.append(True, group[1:] != group[:-1]))
+    is_open = np.isin(direction[valid], _LONG_OPEN + _SHORT_OPEN)[order]
+    qty = np.abs(history.amount.values[valid].astype(float))[order]
+
+    open_idx, close_idx, amount = pairs(group, start, is_open, qty)
+    # 排序前的位置就是成交的先后, 按平仓成交的顺序排列 (稳定排序保留同一笔平仓内的配对顺序)
+    open_idx = order[open_idx]
+    close_idx = order[close_idx]
+    seq = np.argsort(close_idx, kind='mergesort')
+    open_idx = open_idx[seq]
+    close_idx = close_idx[seq]
+    amount = amount[seq]
+
+    datetime = pd.to_datetime(history.datetime.values[valid]).values
+    price = history.price.values[valid].astype(float)
+    buy_open = long_side[valid][open_idx]
+    buy_idx = np.where(buy_open, open_idx, close_idx)
+    sell_idx = np.where(buy_open, close_idx, open_idx)
+    return pd.DataFrame(
+        {
+            'code': code[close_idx],
+            'sell_date': datetime[sell_idx],
+            'buy_date': datetime[buy_idx],
+            'amount': amount,
+            'sell_price': price[sell_idx],
+            'buy_price': price[buy_idx],
+            'rawdirection': np.where(buy_open,
+                                     'buy',
+                                     'sell')
+        },
+        columns=QA_PNL_COLUMNS
+    )
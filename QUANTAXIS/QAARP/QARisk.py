@@ -31,9 +31,7 @@ import datetime
 import math
 import os
 import platform
-from collections import deque
-from functools import lru_cache
-from queue import LifoQueue
+from functools import wraps
 
 import matplotlib
 import numpy as np
@@ -41,13 +39,16 @@ import pandas as pd
 from pymongo import ASCENDING, DESCENDING
 
 from QUANTAXIS.QAARP.market_preset import MARKET_PRESET
+from QUANTAXIS.QAARP.QAPnl import QA_pnl_pairs
 from QUANTAXIS.QAFetch.QAQuery_Advance import (QA_fetch_future_day_adv,
                                                QA_fetch_index_day_adv,
                                                QA_fetch_stock_day_adv)
-from QUANTAXIS.QASU.save_account import save_riskanalysis
+from QUANTAXIS.QASU.save_account import (save_riskanalysis,
+                                         save_riskanalysis_many)
 from QUANTAXIS.QAUtil.QADate_trade import (QA_util_get_trade_gap,
                                            QA_util_get_trade_range)
 from QUANTAXIS.QAUtil.QAParameter import MARKET_TYPE
+from QUANTAXIS.QAUtil.QATransform import QA_util_to_json_from_pandas
 from QUANTAXIS.QAUtil.QASetting import DATABASE
 
 # FIXED: no display found
@@ -105,6 +106,50 @@ finally:
     import seaborn as sns
 
 
+def _risk_cache(func):
+    """QA_Risk 的缓存
+
+    行情/持仓/资产/基准这些基础序列和由它们算出来的指标都只计算一次, 结果放在 self._cache;
+    账户有了新的成交/现金记录 (见 _QA_risk_account_version) 之后自动清空,
+    更换了基准之后用 QA_Risk.invalidate 清空
+    """
+    name = func.__name__
+
+    @wraps(func)
+    def wrapper(self):
+        version = _QA_risk_account_version(self.account)
+        if version != self._cache_version:
+            self._cache.clear()
+            self._cache_version = version
+        if name not in self._cache:
+            self._cache[name] = func(self)
+        return self._cache[name]
+
+    return wrapper
+
+
+def _QA_risk_account_version(account):
+    """账户的成交记录和现金记录的条数, 账户每次成交之后都会改变
+
+    QA_PortfolioView (没有自己的 history/cash) 按其中每个账户分别计算
+    """
+    if hasattr(account, 'account_list'):
+        return tuple(
+            _QA_risk_account_version(item) for item in account.accounts
+        )
+    history = account.history
+    return (getattr(history, 'total', len(history)), len(account.cash))
+
+
+def _downside_volatility(assets):
+    """年化下行波动率: 日收益率中小于0的部分的均方根
+
+    assets 为 pd.Series 时返回一个数, pd.DataFrame 时按列计算
+    """
+    returns = assets / assets.shift(1) - 1
+    return np.sqrt((returns.clip(upper=0)**2).mean() * 250)
+
+
 class QA_Risk():
     """QARISK 是一个风险插件
 
@@ -125,7 +170,8 @@ class QA_Risk():
             benchmark_type=MARKET_TYPE.INDEX_CN,
             if_fq=True,
             market_data=None,
-            auto_reload=False
+            auto_reload=False,
+            if_account_data=False
     ):
         """
         account: QA_Account类/QA_PortfolioView类
@@ -133,8 +179,12 @@ class QA_Risk():
         benchmark_type: [QA.PARAM]对照参数的市场
         if_fq: [Bool]原account是否使用复权数据
         if_fq选项是@尧提出的,关于回测的时候成交价格问题(如果按不复权撮合 应该按不复权价格计算assets)
+        market_data: [QA_DataStruct]持仓的行情数据, 不传则从数据库获取
+        if_account_data: [Bool]是否直接使用account在回测中缓存的market_data(不再从数据库获取)
         """
         self.account = account
+        self._cache = {}
+        self._cache_version = None
         self.benchmark_code = benchmark_code  # 默认沪深300
         self.benchmark_type = benchmark_type
         self.client = DATABASE.risk
@@ -157,7 +207,9 @@ class QA_Risk():
                 MARKET_TYPE.STOCK_CN: QA_fetch_stock_day_adv,
                 MARKET_TYPE.INDEX_CN: QA_fetch_index_day_adv
             }
-            if market_data == None:
+            if market_data is None and if_account_data:
+                market_data = getattr(self.account, 'market_data', None)
+            if market_data is None:
                 if self.account.market_type == MARKET_TYPE.STOCK_CN:
                     self.market_data = QA_fetch_stock_day_adv(
                         self.account.code,
@@ -176,25 +228,6 @@ class QA_Risk():
             if self.account.market_type == MARKET_TYPE.FUTURE_CN:
                 self.if_fq = False  # 如果是期货， 默认设为FALSE
 
-            if self.market_value is not None:
-                if self.account.market_type == MARKET_TYPE.FUTURE_CN and self.account.allow_margin == True:
-                    print('margin!')
-                    self._assets = (
-                        self.account.daily_frozen +
-                        # self.market_value.sum(axis=1) +
-                        self.account.daily_cash.set_index('date').cash
-                    ).dropna()
-                else:
-                    self._assets = (
-                        self.market_value.sum(axis=1) +
-                        self.account.daily_cash.set_index('date').cash
-                    ).fillna(method='pad')
-            else:
-                self._assets = self.account.daily_cash.set_index('date'
-                                                                 ).cash.fillna(
-                    method='pad'
-                )
-
             self.time_gap = QA_util_get_trade_gap(
                 self.account.start_date,
                 self.account.end_date
@@ -208,34 +241,36 @@ class QA_Risk():
     def __call__(self):
         return pd.DataFrame([self.message])
 
+    def invalidate(self):
+        """清空缓存的基础序列和指标, 下次访问时重新计算
+        """
+        self._cache.clear()
+
     @property
     def total_timeindex(self):
         return self.account.trade_range
 
     @property
+    @_risk_cache
     def market_value(self):
         """每日每个股票持仓市值表
 
         Returns:
             pd.DataFrame -- 市值表
         """
-        if self.account.daily_hold is not None:
-            if self.if_fq:
-
-                return (
-                    self.market_data.to_qfq().pivot('close').fillna(
-                        method='ffill'
-                    ) * self.account.daily_hold.apply(abs)
-                ).fillna(method='ffill')
-            else:
-                return (
-                    self.market_data.pivot('close').fillna(method='ffill') *
-                    self.account.daily_hold.apply(abs)
-                ).fillna(method='ffill')
+        daily_hold = self.account.daily_hold
+        if daily_hold is not None:
+            market_data = self.market_data.to_qfq(
+            ) if self.if_fq else self.market_data
+            return (
+                market_data.pivot('close').fillna(method='ffill') *
+                daily_hold.abs()
+            ).fillna(method='ffill')
         else:
             return None
 
     @property
+    @_risk_cache
     def daily_market_value(self):
         """每日持仓总市值表
 
@@ -248,28 +283,44 @@ class QA_Risk():
             return None
 
     @property
+    @_risk_cache
+    def _assets(self):
+        daily_cash = self.account.daily_cash.set_index('date').cash
+        if self.market_value is not None:
+            if self.account.market_type == MARKET_TYPE.FUTURE_CN and self.account.allow_margin == True:
+                print('margin!')
+                return (
+                    self.account.daily_frozen +
+                    # self.market_value.sum(axis=1) +
+                    daily_cash
+                ).dropna()
+            else:
+                return (self.daily_market_value +
+                        daily_cash).fillna(method='pad')
+        else:
+            return daily_cash.fillna(method='pad')
+
+    @property
+    @_risk_cache
     def assets(self):
         x1 = self._assets.reset_index()
         return x1.assign(date=pd.to_datetime(x1.date)).set_index('date')[0]
 
     @property
+    @_risk_cache
     def max_dropback(self):
         """最大回撤
+
+        每一天的资产和之后的最低资产比较, 之后的最低资产用倒序的cummin一次算出
         """
+        assets = self.assets
         return round(
-            float(
-                max(
-                    [
-                        (self.assets.iloc[idx] - self.assets.iloc[idx::].min())
-                        / self.assets.iloc[idx]
-                        for idx in range(len(self.assets))
-                    ]
-                )
-            ),
+            float(((assets - assets[::-1].cummin()[::-1]) / assets).max()),
             2
         )
 
     @property
+    @_risk_cache
     def total_commission(self):
         """总手续费
         """
@@ -279,6 +330,7 @@ class QA_Risk():
         )
 
     @property
+    @_risk_cache
     def total_tax(self):
         """总印花税
 
@@ -309,6 +361,7 @@ class QA_Risk():
         }
 
     @property
+    @_risk_cache
     def profit_money(self):
         """盈利额
 
@@ -319,6 +372,7 @@ class QA_Risk():
         return float(round(self.assets.iloc[-1] - self.assets.iloc[0], 2))
 
     @property
+    @_risk_cache
     def profit(self):
         """盈利率(百分比)
 
@@ -329,12 +383,14 @@ class QA_Risk():
         return round(float(self.calc_profit(self.assets)), 2)
 
     @property
+    @_risk_cache
     def profit_pct(self):
         """利润
         """
         return self.calc_profitpctchange(self.assets)
 
     @property
+    @_risk_cache
     def annualize_return(self):
         """年化收益
 
@@ -349,6 +405,7 @@ class QA_Risk():
         )
 
     @property
+    @_risk_cache
     def volatility(self):
         """波动率
 
@@ -358,11 +415,12 @@ class QA_Risk():
         return round(float(self.profit_pct.std() * math.sqrt(250)), 2)
 
     @property
+    @_risk_cache
     def ir(self):
         return round(self.calc_IR(), 2)
 
     @property
-    @lru_cache()
+    @_risk_cache
     def message(self):
         return {
             'account_cookie': self.account.account_cookie,
@@ -397,6 +455,7 @@ class QA_Risk():
         }
 
     @property
+    @_risk_cache
     def benchmark_data(self):
         """
         基准组合的行情数据(一般是组合,可以调整)
@@ -408,6 +467,7 @@ class QA_Risk():
         )
 
     @property
+    @_risk_cache
     def benchmark_assets(self):
         """
         基准组合的账户资产队列
@@ -418,6 +478,7 @@ class QA_Risk():
         )
 
     @property
+    @_risk_cache
     def benchmark_profit(self):
         """
         基准组合的收益
@@ -425,6 +486,7 @@ class QA_Risk():
         return round(float(self.calc_profit(self.benchmark_assets)), 2)
 
     @property
+    @_risk_cache
     def benchmark_annualize_return(self):
         """基准组合的年化收益
 
@@ -443,6 +505,7 @@ class QA_Risk():
         )
 
     @property
+    @_risk_cache
     def benchmark_profitpct(self):
         """
         benchmark 基准组合的收益百分比计算
@@ -450,6 +513,7 @@ class QA_Risk():
         return self.calc_profitpctchange(self.benchmark_assets)
 
     @property
+    @_risk_cache
     def beta(self):
         """
         beta比率 组合的系统性风险
@@ -471,6 +535,7 @@ class QA_Risk():
         return res
 
     @property
+    @_risk_cache
     def alpha(self):
         """
         alpha比率 与市场基准收益无关的超额收益率
@@ -488,6 +553,7 @@ class QA_Risk():
         )
 
     @property
+    @_risk_cache
     def sharpe(self):
         """
         夏普比率
@@ -503,12 +569,22 @@ class QA_Risk():
         )
 
     @property
+    @_risk_cache
     def sortino(self):
         """
         索提诺比率 投资组合收益和下行风险比值
 
         """
-        pass
+        return round(
+            float(
+                self.calc_sortino(
+                    self.annualize_return,
+                    _downside_volatility(self.assets),
+                    0.05
+                )
+            ),
+            2
+        )
 
     @property
     def calmar(self):
@@ -520,6 +596,7 @@ class QA_Risk():
     def set_benchmark(self, code, market_type):
         self.benchmark_code = code
         self.benchmark_type = market_type
+        self.invalidate()
 
     def calc_annualize_return(self, assets, days):
         return round(
@@ -577,6 +654,15 @@ class QA_Risk():
             return 0
         return (annualized_returns - r) / volatility_year
 
+    def calc_sortino(self, annualized_returns, downside_volatility, r=0.05):
+        """
+        计算索提诺比率
+        downside_volatility是年化的下行波动率
+        """
+        if downside_volatility == 0:
+            return 0
+        return (annualized_returns - r) / downside_volatility
+
     @property
     def max_holdmarketvalue(self):
         """最大持仓市值
@@ -736,10 +822,12 @@ class QA_Risk():
         return plt
 
     @property
+    @_risk_cache
     def month_assets(self):
         return self.assets.resample('M').last()
 
     @property
+    @_risk_cache
     def month_assets_profit(self):
 
         res = pd.concat([pd.Series(self.assets.iloc[0]),
@@ -807,6 +895,189 @@ class QA_Risk():
         self.plot_signal()
 
 
+def QA_batch_risk(
+        accounts,
+        benchmark_code='000300',
+        benchmark_type=MARKET_TYPE.INDEX_CN,
+        if_fq=True,
+        market_data=None,
+        if_save=False
+):
+    """多个账户的风险指标一次算完
+
+    和逐个 QA_Risk 相比:
+    1. 所有账户代码的并集和基准只从数据库获取一次, 复权/pivot 也只做一次
+    2. 各账户的每日资产按日期对齐成一个 日期 x 账户 的表, 指标按列一次算出
+       (口径和 QA_Risk 一致, 基准按日期对齐)
+
+    Arguments:
+        accounts {list} -- QA_Account 的列表
+
+    Keyword Arguments:
+        benchmark_code {str} -- 基准代码 (default: {'000300'})
+        benchmark_type {[type]} -- 基准的市场 (default: {MARKET_TYPE.INDEX_CN})
+        if_fq {bool} -- 股票账户是否按前复权价格计算市值 (default: {True})
+        market_data {dict} -- {market_type: QA_DataStruct} 已经有的行情, 不传则从数据库获取 (default: {None})
+        if_save {bool} -- 是否批量写入 risk 表 (default: {False})
+
+    Returns:
+        pd.DataFrame -- index 为 account_cookie, 每个账户一行
+    """
+    accounts = list(accounts)
+    if len(accounts) == 0:
+        return pd.DataFrame()
+    market_data = {} if market_data is None else dict(market_data)
+    fetch = {
+        MARKET_TYPE.STOCK_CN: QA_fetch_stock_day_adv,
+        MARKET_TYPE.FUTURE_CN: QA_fetch_future_day_adv
+    }
+    start = min(account.start_date for account in accounts)
+    end = max(account.end_date for account in accounts)
+
+    # 每个市场的收盘价表只生成一次
+    price = {}
+    for market_type in set(account.market_type for account in accounts):
+        if market_type not in market_data:
+            code = sorted(
+                set(
+                    code for account in accounts
+                    if account.market_type == market_type
+                    for code in account.code
+                )
+            )
+            market_data[market_type] = fetch[market_type](
+                code,
+                start,
+                end
+            ) if len(code) else None
+        data = market_data[market_type]
+        if data is not None:
+            if if_fq and market_type != MARKET_TYPE.FUTURE_CN:
+                data = data.to_qfq()
+            price[market_type] = data.pivot('close')
+
+    assets = []
+    for account in accounts:
+        daily_cash = account.daily_cash.set_index('date').cash
+        daily_hold = account.daily_hold
+        if daily_hold is None or price.get(account.market_type) is None:
+            res = daily_cash.fillna(method='pad')
+        elif account.market_type == MARKET_TYPE.FUTURE_CN and account.allow_margin == True:
+            res = (account.daily_frozen + daily_cash).dropna()
+        else:
+            close = price[account.market_type].reindex(
+                columns=daily_hold.columns
+            ).loc[account.start_date:account.end_date]
+            market_value = (close.fillna(method='ffill') *
+                            daily_hold.abs()).fillna(method='ffill')
+            res = (market_value.sum(axis=1) +
+                   daily_cash).fillna(method='pad')
+        res.index = pd.to_datetime(res.index)
+        assets.append(res)
+    assets = pd.concat(assets, axis=1)
+    assets.columns = range(len(accounts))
+    valid = assets.notnull()
+
+    benchmark = QA_fetch_index_day_adv(
+        benchmark_code,
+        start,
+        end
+    ) if benchmark_type == MARKET_TYPE.INDEX_CN else QA_fetch_stock_day_adv(
+        benchmark_code,
+        start,
+        end
+    )
+    benchmark = benchmark.close.reset_index(level=1, drop=True)
+    benchmark.index = pd.to_datetime(benchmark.index)
+    # 每个账户只用自己区间内的基准
+    benchmark = pd.DataFrame(
+        np.repeat(
+            benchmark.reindex(assets.index).values[:,
+                                                    None],
+            len(accounts),
+            axis=1
+        ),
+        index=assets.index
+    ).where(valid)
+
+    time_gap = pd.Series(
+        [
+            QA_util_get_trade_gap(account.start_date,
+                                  account.end_date)
+            for account in accounts
+        ]
+    )
+
+    def annualize(data):
+        return ((data.ffill().iloc[-1] / data.bfill().iloc[0] - 1) /
+                (time_gap / 250)).round(2)
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        profit = (assets.ffill().iloc[-1] / assets.bfill().iloc[0] -
+                  1).round(2)
+        annualize_return = annualize(assets)
+        bm_annualizereturn = annualize(benchmark)
+        # 和 QA_Risk.calc_profitpctchange 一样是倒序的变化率
+        profit_pct = assets / assets.shift(-1) - 1
+        benchmark_pct = benchmark / benchmark.shift(-1) - 1
+        volatility = (profit_pct.std() * math.sqrt(250)).round(2)
+        sharpe = ((annualize_return - 0.05) /
+                  volatility).round(2).where(volatility != 0, 0)
+        downside = _downside_volatility(assets)
+        sortino = ((annualize_return - 0.05) /
+                   downside).round(2).where(downside != 0, 0)
+        max_dropback = ((assets - assets[::-1].cummin()[::-1]) /
+                        assets).max().round(2)
+
+        both = profit_pct.notnull() & benchmark_pct.notnull()
+        x = profit_pct.where(both)
+        y = benchmark_pct.where(both)
+        x = x - x.mean()
+        y = y - y.mean()
+        beta = ((x * y).sum() / (y * y).sum()).round(2)
+        alpha = ((annualize_return - 0.05) - beta *
+                 (bm_annualizereturn - 0.05)).round(2)
+
+    res = pd.DataFrame(
+        {
+            'account_cookie': [account.account_cookie for account in accounts],
+            'portfolio_cookie':
+            [account.portfolio_cookie for account in accounts],
+            'user_cookie': [account.user_cookie for account in accounts],
+            'benchmark_code': benchmark_code,
+            'time_gap': time_gap,
+            'profit': profit,
+            'annualize_return': annualize_return,
+            'bm_annualizereturn': bm_annualizereturn,
+            'volatility': volatility,
+            'sharpe': sharpe,
+            'sortino': sortino,
+            'max_dropback': max_dropback,
+            'beta': beta,
+            'alpha': alpha
+        },
+        columns=[
+            'account_cookie',
+            'portfolio_cookie',
+            'user_cookie',
+            'benchmark_code',
+            'time_gap',
+            'profit',
+            'annualize_return',
+            'bm_annualizereturn',
+            'volatility',
+            'sharpe',
+            'sortino',
+            'max_dropback',
+            'beta',
+            'alpha'
+        ]
+    )
+    if if_save:
+        save_riskanalysis_many(QA_util_to_json_from_pandas(res))
+    return res.set_index('account_cookie')
+
+
 class QA_Performance():
     """
     QA_Performance是一个绩效分析插件
@@ -1019,139 +1290,24 @@ class QA_Performance():
         """
         使用后进先出法配对成交记录
         """
-        X = dict(
-            zip(
-                self.target.code,
-                [{'buy': LifoQueue(), 'sell': LifoQueue()}
-                 for i in range(len(self.target.code))]
-            )
-        )
-        pair_table = []
-        for _, data in self.target.history_table_min.iterrows():
-            while True:
-
-                if data.direction in[1, 2, -2]:
-                    if data.direction in [1, 2]:
-                        X[data.code]['buy'].append(
-                            (data.datetime,
-                             data.amount,
-                             data.price,
-                             data.direction)
-                        )
-                    elif data.direction in [-2]:
-                        X[data.code]['sell'].append(
-                            (data.datetime,
-                             data.amount,
-                             data.price,
-                             data.direction)
-                        )
-                    break
-                elif data.direction in[-1, 3, -3]:
-
-                    rawoffset = 'buy' if data.direction in [-1, -3] else 'sell'
-
-                    l = X[data.code][rawoffset].get()
-                    if abs(l[1]) > abs(data.amount):
-                        """
-                        if raw> new_close:
-                        """
-                        temp = (l[0], l[1] + data.amount, l[2])
-                        X[data.code][rawoffset].put_nowait(temp)
-                        if data.amount < 0:
-                            pair_table.append(
-                                [
-                                    data.code,
-                                    data.datetime,
-                                    l[0],
-                                    abs(data.amount),
-                                    data.price,
-                                    l[2],
-                                    rawoffset
-                                ]
-                            )
-                            break
-                        else:
-                            pair_table.append(
-                                [
-                                    data.code,
-                                    l[0],
-                                    data.datetime,
-                                    abs(data.amount),
-                                    l[2],
-                                    data.price,
-                                    rawoffset
-                                ]
-                            )
-                            break
-
-                    elif abs(l[1]) < abs(data.amount):
-                        data.amount = data.amount + l[1]
-
-                        if data.amount < 0:
-                            pair_table.append(
-                                [
-                                    data.code,
-                                    data.datetime,
-                                    l[0],
-                                    l[1],
-                                    data.price,
-                                    l[2],
-                                    rawoffset
-                                ]
-                            )
-                        else:
-                            pair_table.append(
-                                [
-                                    data.code,
-                                    l[0],
-                                    data.datetime,
-                                    l[1],
-                                    l[2],
-                                    data.price,
-                                    rawoffset
-                                ]
-                            )
-                    else:
-                        if data.amount < 0:
-                            pair_table.append(
-                                [
-                                    data.code,
-                                    data.datetime,
-                                    l[0],
-                                    abs(data.amount),
-                                    data.price,
-                                    l[2],
-                                    rawoffset
-                                ]
-                            )
-                            break
-                        else:
-                            pair_table.append(
-                                [
-                                    data.code,
-                                    l[0],
-                                    data.datetime,
-                                    abs(data.amount),
-                                    l[2],
-                                    data.price,
-                                    rawoffset
-                                ]
-                            )
-                            break
-
-        pair_title = [
-            'code',
-            'sell_date',
-            'buy_date',
-            'amount',
-            'sell_price',
-            'buy_price',
-            'rawdirection'
-        ]
-        pnl = pd.DataFrame(pair_table, columns=pair_title)
+        return self._pnl_table('lifo')
+
+    def _pnl_table(self, model):
+        """配对 (QA_pnl_pairs) 之后计算每一组配对的盈亏/持仓周期
 
+        Arguments:
+            model {str} -- fifo/lifo
+
+        Returns:
+            pd.DataFrame -- 按 code 索引的配对表
+        """
+        pnl = QA_pnl_pairs(self.target.history_table_min, model)
+        unit = {
+            code: self.market_preset.get_unit(code)
+            for code in pnl.code.unique()
+        }
         pnl = pnl.assign(
-            unit=pnl.code.apply(lambda x: self.market_preset.get_unit(x)),
+            unit=pnl.code.map(unit),
             pnl_ratio=(pnl.sell_price / pnl.buy_price) - 1,
             sell_date=pd.to_datetime(pnl.sell_date),
             buy_date=pd.to_datetime(pnl.buy_date)
@@ -1161,21 +1317,22 @@ class QA_Performance():
             hold_gap=abs(pnl.sell_date - pnl.buy_date),
             if_buyopen=pnl.rawdirection == 'buy'
         )
+        # 同一笔成交会出现在多组配对里, 每个时间只转换一次字符串
+        date, uniques = pd.factorize(
+            pd.concat([pnl.buy_date, pnl.sell_date], ignore_index=True)
+        )
+        date = np.asarray(pd.DatetimeIndex(uniques).astype(str))[date]
+        buy_date = pd.Series(date[:len(pnl)], index=pnl.index)
+        sell_date = pd.Series(date[len(pnl):], index=pnl.index)
         pnl = pnl.assign(
-            openprice=pnl.if_buyopen.apply(lambda pnl: 1 if pnl else 0) *
-            pnl.buy_price +
-            pnl.if_buyopen.apply(lambda pnl: 0 if pnl else 1) * pnl.sell_price,
-            opendate=pnl.if_buyopen.apply(lambda pnl: 1 if pnl else 0) *
-            pnl.buy_date.map(str) +
-            pnl.if_buyopen.apply(lambda pnl: 0 if pnl else 1) *
-            pnl.sell_date.map(str),
-            closeprice=pnl.if_buyopen.apply(lambda pnl: 0 if pnl else 1) *
-            pnl.buy_price +
-            pnl.if_buyopen.apply(lambda pnl: 1 if pnl else 0) * pnl.sell_price,
-            closedate=pnl.if_buyopen.apply(lambda pnl: 0 if pnl else 1) *
-            pnl.buy_date.map(str) +
-            pnl.if_buyopen.apply(lambda pnl: 1 if pnl else 0) *
-            pnl.sell_date.map(str)
+            openprice=pnl.buy_price.where(pnl.if_buyopen,
+                                          pnl.sell_price),
+            opendate=buy_date.where(pnl.if_buyopen,
+                                    sell_date),
+            closeprice=pnl.sell_price.where(pnl.if_buyopen,
+                                            pnl.buy_price),
+            closedate=sell_date.where(pnl.if_buyopen,
+                                      buy_date)
         )
         return pnl.set_index('code')
 
@@ -1189,165 +1346,10 @@ class QA_Performance():
 
     @property
     def pnl_fifo(self):
-        X = dict(
-            zip(
-                self.target.code,
-                [{'buy': deque(), 'sell': deque()}
-                 for i in range(len(self.target.code))]
-            )
-        )
-        pair_table = []
-        for _, data in self.target.history_table_min.iterrows():
-            while True:
-
-                if data.direction in[1, 2, -2]:
-                    if data.direction in [1, 2]:
-                        X[data.code]['buy'].append(
-                            (data.datetime,
-                             data.amount,
-                             data.price,
-                             data.direction)
-                        )
-                    elif data.direction in [-2]:
-                        X[data.code]['sell'].append(
-                            (data.datetime,
-                             data.amount,
-                             data.price,
-                             data.direction)
-                        )
-                    break
-                elif data.direction in[-1, 3, -3]:
-
-                    rawoffset = 'buy' if data.direction in [-1, -3] else 'sell'
-
-                    l = X[data.code][rawoffset].popleft()
-                    if abs(l[1]) > abs(data.amount):
-                        """
-                        if raw> new_close:
-                        """
-                        temp = (l[0], l[1] + data.amount, l[2])
-                        X[data.code][rawoffset].appendleft(temp)
-                        if data.amount < 0:
-                            pair_table.append(
-                                [
-                                    data.code,
-                                    data.datetime,
-                                    l[0],
-                                    abs(data.amount),
-                                    data.price,
-                                    l[2],
-                                    rawoffset
-                                ]
-                            )
-                            break
-                        else:
-                            pair_table.append(
-                                [
-                                    data.code,
-                                    l[0],
-                                    data.datetime,
-                                    abs(data.amount),
-                                    l[2],
-                                    data.price,
-                                    rawoffset
-                                ]
-                            )
-                            break
-
-                    elif abs(l[1]) < abs(data.amount):
-                        data.amount = data.amount + l[1]
-
-                        if data.amount < 0:
-                            pair_table.append(
-                                [
-                                    data.code,
-                                    data.datetime,
-                                    l[0],
-                                    l[1],
-                                    data.price,
-                                    l[2],
-                                    rawoffset
-                                ]
-                            )
-                        else:
-                            pair_table.append(
-                                [
-                                    data.code,
-                                    l[0],
-                                    data.datetime,
-                                    l[1],
-                                    l[2],
-                                    data.price,
-                                    rawoffset
-                                ]
-                            )
-                    else:
-                        if data.amount < 0:
-                            pair_table.append(
-                                [
-                                    data.code,
-                                    data.datetime,
-                                    l[0],
-                                    abs(data.amount),
-                                    data.price,
-                                    l[2],
-                                    rawoffset
-                                ]
-                            )
-                            break
-                        else:
-                            pair_table.append(
-                                [
-                                    data.code,
-                                    l[0],
-                                    data.datetime,
-                                    abs(data.amount),
-                                    l[2],
-                                    data.price,
-                                    rawoffset
-                                ]
-                            )
-                            break
-
-        pair_title = [
-            'code',
-            'sell_date',
-            'buy_date',
-            'amount',
-            'sell_price',
-            'buy_price',
-            'rawdirection'
-        ]
-        pnl = pd.DataFrame(pair_table, columns=pair_title)
-
-        pnl = pnl.assign(
-            unit=pnl.code.apply(lambda x: self.market_preset.get_unit(x)),
-            pnl_ratio=(pnl.sell_price / pnl.buy_price) - 1,
-            sell_date=pd.to_datetime(pnl.sell_date),
-            buy_date=pd.to_datetime(pnl.buy_date)
-        )
-        pnl = pnl.assign(
-            pnl_money=(pnl.sell_price - pnl.buy_price) * pnl.amount * pnl.unit,
-            hold_gap=abs(pnl.sell_date - pnl.buy_date),
-            if_buyopen=pnl.rawdirection == 'buy'
-        )
-        pnl = pnl.assign(
-            openprice=pnl.if_buyopen.apply(lambda pnl: 1 if pnl else 0) *
-            pnl.buy_price +
-            pnl.if_buyopen.apply(lambda pnl: 0 if pnl else 1) * pnl.sell_price,
-            opendate=pnl.if_buyopen.apply(lambda pnl: 1 if pnl else 0) *
-            pnl.buy_date.map(str) +
-            pnl.if_buyopen.apply(lambda pnl: 0 if pnl else 1) *
-            pnl.sell_date.map(str),
-            closeprice=pnl.if_buyopen.apply(lambda pnl: 0 if pnl else 1) *
-            pnl.buy_price +
-            pnl.if_buyopen.apply(lambda pnl: 1 if pnl else 0) * pnl.sell_price,
-            closedate=pnl.if_buyopen.apply(lambda pnl: 0 if pnl else 1) *
-            pnl.buy_date.map(str) +
-            pnl.if_buyopen.apply(lambda pnl: 1 if pnl else 0) *
-            pnl.sell_date.map(str)
-        )
-        return pnl.set_index('code')
+        """
+        使用先进先出法配对成交记录
+        """
+        return self._pnl_table('fifo')
 
     def plot_pnlratio(self):
         """
@@ -1389,10 +1391,9 @@ class QA_Performance():
         盈利次数/总次数
         """
         data = self.pnl
-        try:
-            return round(len(data.query('pnl_money>0')) / len(data), 2)
-        except ZeroDivisionError:
+        if len(data) == 0:
             return 0
+        return round((data.pnl_money.values > 0).mean(), 2)
 
     @property
     def accumulate_return(self):
@@ -1407,25 +1408,31 @@ class QA_Performance():
         pass
 
     def profit_pnl(self, pnl):
-        return pnl.query('pnl_money>0')
+        return pnl[pnl.pnl_money > 0]
 
     def loss_pnl(self, pnl):
-        return pnl.query('pnl_money<0')
+        return pnl[pnl.pnl_money < 0]
 
     def even_pnl(self, pnl):
-        return pnl.query('pnl_money==0')
+        return pnl[pnl.pnl_money == 0]
+
+    @staticmethod
+    def _profit_money(pnl):
+        money = pnl.pnl_money.values
+        return money[money > 0]
+
+    @staticmethod
+    def _loss_money(pnl):
+        money = pnl.pnl_money.values
+        return money[money < 0]
 
     def total_profit(self, pnl):
-        if len(self.profit_pnl(pnl)) > 0:
-            return self.profit_pnl(pnl).pnl_money.sum()
-        else:
-            return 0
+        money = self._profit_money(pnl)
+        return money.sum() if len(money) > 0 else 0
 
     def total_loss(self, pnl):
-        if len(self.loss_pnl(pnl)) > 0:
-            return self.loss_pnl(pnl).pnl_money.sum()
-        else:
-            return 0
+        money = self._loss_money(pnl)
+        return money.sum() if len(money) > 0 else 0
 
     def total_pnl(self, pnl):
         try:
@@ -1437,13 +1444,13 @@ class QA_Performance():
         return len(pnl)
 
     def profit_amounts(self, pnl):
-        return len(self.profit_pnl(pnl))
+        return len(self._profit_money(pnl))
 
     def loss_amounts(self, pnl):
-        return len(self.loss_pnl(pnl))
+        return len(self._loss_money(pnl))
 
     def even_amounts(self, pnl):
-        return len(self.even_pnl(pnl))
+        return int((pnl.pnl_money.values == 0).sum())
 
     def profit_precentage(self, pnl):
         try:
@@ -1464,19 +1471,15 @@ class QA_Performance():
             return 0
 
     def average_loss(self, pnl):
-        if len(self.loss_pnl(pnl)) > 0:
-            return self.loss_pnl(pnl).pnl_money.mean()
-        else:
-            return 0
+        money = self._loss_money(pnl)
+        return money.mean() if len(money) > 0 else 0
 
     def average_profit(self, pnl):
-        if len(self.profit_pnl(pnl)) > 0:
-            return self.profit_pnl(pnl).pnl_money.mean()
-        else:
-            return 0
+        money = self._profit_money(pnl)
+        return money.mean() if len(money) > 0 else 0
 
     def average_pnl(self, pnl):
-        if len(self.loss_pnl(pnl)) > 0 and len(self.profit_pnl(pnl)) > 0:
+        if self.loss_amounts(pnl) > 0 and self.profit_amounts(pnl) > 0:
             try:
                 return abs(self.average_profit(pnl) / self.average_loss(pnl))
             except ZeroDivisionError:
@@ -1485,16 +1488,12 @@ class QA_Performance():
             return 0
 
     def max_profit(self, pnl):
-        if len(self.profit_pnl(pnl)) > 0:
-            return self.profit_pnl(pnl).pnl_money.max()
-        else:
-            return 0
+        money = self._profit_money(pnl)
+        return money.max() if len(money) > 0 else 0
 
     def max_loss(self, pnl):
-        if len(self.loss_pnl(pnl)) > 0:
-            return self.loss_pnl(pnl).pnl_money.min()
-        else:
-            return 0
+        money = self._loss_money(pnl)
+        return money.min() if len(money) > 0 else 0
 
     def max_pnl(self, pnl):
         try:
@@ -1503,7 +1502,7 @@ class QA_Performance():
             return 0
 
     def netprofio_maxloss_ratio(self, pnl):
-        if len(self.loss_pnl(pnl)) > 0:
+        if self.loss_amounts(pnl) > 0:
             try:
                 return abs(pnl.pnl_money.sum() / self.max_loss(pnl))
             except ZeroDivisionError:
@@ -1511,33 +1510,24 @@ class QA_Performance():
         else:
             return 0
 
-    def continue_profit_amount(self, pnl):
-        w = []
-        w1 = 0
-        for _, item in pnl.pnl_money.iteritems():
-            if item > 0:
-                w1 += 1
-            elif item < 0:
-                w.append(w1)
-                w1 = 0
-        if len(w) == 0:
+    @staticmethod
+    def _continue_amount(money):
+        """最多连续几笔 money>0
+
+        持平的不计数也不中断, 只统计被 money<0 中断的连续段
+        """
+        money = money[money != 0]
+        count = np.cumsum(money > 0)
+        end = count[money < 0]
+        if len(end) == 0:
             return 0
-        else:
-            return max(w)
+        return int(np.diff(np.append(0, end)).max())
+
+    def continue_profit_amount(self, pnl):
+        return self._continue_amount(pnl.pnl_money.values)
 
     def continue_loss_amount(self, pnl):
-        l = []
-        l1 = 0
-        for _, item in pnl.pnl_money.iteritems():
-            if item > 0:
-                l1 += 1
-            elif item < 0:
-                l.append(l1)
-                l1 = 0
-        if len(l) == 0:
-            return 0
-        else:
-            return max(l)
+        return self._continue_amount(-pnl.pnl_money.values)
 
     def average_holdgap(self, pnl):
         if len(pnl.hold_gap) > 0:
@@ -1546,20 +1536,15 @@ class QA_Performance():
             return 'no trade'
 
     def average_profitholdgap(self, pnl):
-        if len(self.profit_pnl(pnl).hold_gap) > 0:
-            return str(self.profit_pnl(pnl).hold_gap.mean())
-        else:
-            return 'no trade'
+        return self.average_holdgap(pnl[['hold_gap']][pnl.pnl_money > 0])
 
     def average_losssholdgap(self, pnl):
-        if len(self.loss_pnl(pnl).hold_gap) > 0:
-            return str(self.loss_pnl(pnl).hold_gap.mean())
-        else:
-            return 'no trade'
+        return self.average_holdgap(pnl[['hold_gap']][pnl.pnl_money < 0])
 
     def average_evenholdgap(self, pnl):
-        if len(self.even_pnl(pnl).hold_gap) > 0:
-            return self.even_pnl(pnl).hold_gap.mean()
+        hold_gap = pnl.hold_gap[pnl.pnl_money == 0]
+        if len(hold_gap) > 0:
+            return hold_gap.mean()
         else:
             return 'no trade'
 
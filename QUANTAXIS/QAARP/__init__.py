@@ -23,7 +23,9 @@
 # SOFTWARE.
 
 from QUANTAXIS.QAARP.QAAccount import QA_Account
-from QUANTAXIS.QAARP.QARisk import QA_Risk, QA_Performance
+from QUANTAXIS.QAARP.QAHistory import QA_Column, QA_HistoryStore
+from QUANTAXIS.QAARP.QAPnl import QA_pnl_pairs
+from QUANTAXIS.QAARP.QARisk import QA_Risk, QA_Performance, QA_batch_risk
 from QUANTAXIS.QAARP.QAPortfolio import QA_Portfolio, QA_PortfolioView
 from QUANTAXIS.QAARP.QAUser import QA_User
 from QUANTAXIS.QAARP.QAStrategy import QA_Strategy
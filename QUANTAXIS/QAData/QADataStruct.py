@@ -48,7 +48,7 @@ except:
     from pyecharts.charts import Kline
 
 from QUANTAXIS.QAData.base_datastruct import _quotation_base
-from QUANTAXIS.QAData.data_fq import QA_data_stock_to_fq
+from QUANTAXIS.QAData.data_fq import QA_data_stock_to_fq, QA_data_stock_to_fq_panel
 from QUANTAXIS.QAData.data_resample import (QA_data_tick_resample, QA_data_day_resample,
                                             QA_data_min_resample, QA_data_futuremin_resample)
 from QUANTAXIS.QAIndicator import EMA, HHV, LLV, SMA
@@ -98,7 +98,7 @@ class QA_DataStruct_Stock_day(_quotation_base):
             #         lambda x: QA_data_stock_to_fq(self.data[self.data['code'] == x]), self.code))), self.type, 'qfq')
             else:
                 return self.new(
-                    self.groupby(level=1).apply(QA_data_stock_to_fq, 'qfq'), self.type, 'qfq')
+                    QA_data_stock_to_fq_panel(self.data, 'qfq'), self.type, 'qfq')
         else:
             QA_util_log_info(
                 'none support type for qfq Current type is: %s' % self.if_fq)
@@ -112,7 +112,7 @@ class QA_DataStruct_Stock_day(_quotation_base):
                 return self
             else:
                 return self.new(
-                    self.groupby(level=1).apply(QA_data_stock_to_fq, 'hfq'), self.type, 'hfq')
+                    QA_data_stock_to_fq_panel(self.data, 'hfq'), self.type, 'hfq')
                 # return self.new(pd.concat(list(map(lambda x: QA_data_stock_to_fq(
                 #     self.data[self.data['code'] == x], 'hfq'), self.code))), self.type, 'hfq')
         else:
@@ -232,7 +232,7 @@ class QA_DataStruct_Stock_min(_quotation_base):
             #     return data
             else:
                 return self.new(
-                    self.groupby(level=1).apply(QA_data_stock_to_fq, 'qfq'), self.type, 'qfq')
+                    QA_data_stock_to_fq_panel(self.data, 'qfq'), self.type, 'qfq')
 
         else:
             QA_util_log_info(
@@ -246,7 +246,7 @@ class QA_DataStruct_Stock_min(_quotation_base):
                 return self
             else:
                 return self.new(
-                    self.groupby(level=1).apply(QA_data_stock_to_fq, 'hfq'), self.type, 'hfq')
+                    QA_data_stock_to_fq_panel(self.data, 'hfq'), self.type, 'hfq')
                 # data = QA_DataStruct_Stock_min(pd.concat(list(map(lambda x: QA_data_stock_to_fq(
                 #     self.data[self.data['code'] == x], 'hfq'), self.code))).set_index(['datetime', 'code'], drop=False))
                 # data.if_fq = 'hfq'
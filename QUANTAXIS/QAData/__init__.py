@@ -22,10 +22,12 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-from QUANTAXIS.QAData.data_fq import QA_data_stock_to_fq
+from QUANTAXIS.QAData.data_fq import (QA_data_calc_adj_factor, QA_data_stock_to_fq,
+                                      QA_data_stock_to_fq_panel)
 from QUANTAXIS.QAData.data_marketvalue import (QA_data_calc_marketvalue,
                                                QA_data_marketvalue)
 from QUANTAXIS.QAData.data_resample import (QA_data_min_resample,
+                                            QA_data_min_resample_batch,
                                             QA_data_ctptick_resample, QA_data_day_resample,
                                             QA_data_futuremin_resample_series,
                                             QA_data_futuremin_resample, QA_data_tick_resample,
@@ -0,0 +1,350 @@
+# coding:utf-8
+#
+# The MIT License (MIT)
+#
+# Copyright (c) 2016-2019 yutiansut/QUANTAXIS
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+_quotation_base 的列式存储
+
+行情按 code 分块(code-major)连续存放:
+
+    datetime   datetime64[ns] 数组, 每个 code 块内部按时间升序
+    offsets    int64 数组, 第 i 个 code 的数据位于 [offsets[i], offsets[i+1])
+    codes      排好序的 code 数组
+    columns    {字段名: ndarray}, open/high/low/close/volume/amount 为连续的 float64
+
+只有在需要 DataFrame 的时候(.data / __call__) 才会去拼 MultiIndex,
+select_code 是一个切片(共享内存), select_time/get_bar 走 searchsorted
+"""
+
+import numpy as np
+import pandas as pd
+
+# 行情字段统一用 float64 存储, 其余字段保持原来的 dtype
+_FLOAT_FIELDS = ('open', 'high', 'low', 'close', 'volume', 'amount')
+
+
+class _quotation_columns():
+    """code-major 的列式行情块
+
+    一般不直接初始化, 用 from_frame / from_arrays 构建
+    """
+
+    def __init__(self, datetime, codes, offsets, columns, fields, index_names):
+        self.datetime = datetime
+        self.codes = codes
+        self.offsets = offsets
+        self.columns = columns
+        self.fields = list(fields)
+        self.index_names = list(index_names)
+        self._code_pos = None
+        self._code_idx = None
+        self._time_major = None
+        self._time_key = None
+
+    @classmethod
+    def from_frame(cls, data):
+        """从一个已经去重排序好的 MultiIndex(datetime, code) DataFrame 构建
+        """
+        index = data.index
+        return cls.from_arrays(
+            index.get_level_values(0),
+            index.get_level_values(1),
+            {col: data[col].values for col in data.columns},
+            fields=data.columns,
+            index_names=index.names,
+            dedup=False
+        )
+
+    @classmethod
+    def from_arrays(
+            cls,
+            datetime,
+            code,
+            columns,
+            fields=None,
+            index_names=('datetime',
+                         'code'),
+            dedup=True
+    ):
+        """从逐行的 datetime/code/字段数组 构建
+
+        Arguments:
+            datetime {array-like} -- 每一行的时间
+            code {array-like} -- 每一行的代码
+            columns {dict} -- 字段名: 数组
+
+        Keyword Arguments:
+            fields {list} -- 字段顺序 (default: {columns 的 key 顺序})
+            index_names {tuple} -- 还原 DataFrame 时的索引名
+            dedup {bool} -- 是否对 (datetime, code) 去重, 保留最后一条
+        """
+        fields = list(columns.keys()) if fields is None else list(fields)
+        datetime = np.asarray(datetime, dtype='datetime64[ns]')
+        codes, code_idx = np.unique(
+            np.asarray(code).astype(str),
+            return_inverse=True
+        )
+        code_idx = code_idx.astype(np.int64)
+        order = np.lexsort((datetime, code_idx))
+        datetime = datetime[order]
+        code_idx = code_idx[order]
+        if dedup and len(order) > 1:
+            # lexsort 是稳定排序, 同一个 (code, datetime) 保留最后一条
+            keep = np.ones(len(order), dtype=bool)
+            keep[:-1] = (datetime[1:] != datetime[:-1]) | (
+                code_idx[1:] != code_idx[:-1]
+            )
+            order = order[keep]
+            datetime = datetime[keep]
+            code_idx = code_idx[keep]
+        data = {}
+        for field in fields:
+            col = np.asarray(columns[field])
+            if field in _FLOAT_FIELDS:
+                col = col.astype(np.float64, copy=False)
+            data[field] = np.ascontiguousarray(col[order])
+        offsets = np.zeros(len(codes) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(np.bincount(code_idx, minlength=len(codes)))
+        return cls(datetime, codes.astype(object), offsets, data, fields, index_names)
+
+    def __len__(self):
+        return len(self.datetime)
+
+    def __repr__(self):
+        return '< QA_DataStruct columns with {} rows {} securities >'.format(
+            len(self),
+            len(self.codes)
+        )
+
+    @property
+    def code_pos(self):
+        'code: 在 codes 中的序号'
+        if self._code_pos is None:
+            self._code_pos = {code: i for i, code in enumerate(self.codes)}
+        return self._code_pos
+
+    @property
+    def code_idx(self):
+        '每一行对应的 code 序号'
+        if self._code_idx is None:
+            self._code_idx = np.repeat(
+                np.arange(len(self.codes),
+                          dtype=np.int64),
+                np.diff(self.offsets)
+            )
+        return self._code_idx
+
+    @property
+    def code_index(self):
+        return pd.Index(self.codes, name=self.index_names[1])
+
+    @property
+    def datetime_index(self):
+        '去重排序后的时间轴'
+        return pd.DatetimeIndex(np.unique(self.datetime), name=self.index_names[0])
+
+    @property
+    def time_major(self):
+        """按 (datetime, code) 排序的行号, 以及每个时间点的分段位置
+
+        DataFrame 的行顺序和 panel_gen 都需要它, 第一次用到时计算
+        """
+        if self._time_major is None:
+            perm = np.lexsort((self.code_idx, self.datetime))
+            dt = self.datetime[perm]
+            if len(dt) == 0:
+                bounds = np.zeros(1, dtype=np.int64)
+            else:
+                bounds = np.flatnonzero(dt[1:] != dt[:-1]) + 1
+                bounds = np.concatenate([[0], bounds, [len(dt)]]).astype(np.int64)
+            self._time_major = (perm, bounds)
+        return self._time_major
+
+    def _new(self, datetime, codes, offsets, columns):
+        return _quotation_columns(
+            datetime,
+            codes,
+            offsets,
+            columns,
+            self.fields,
+            self.index_names
+        )
+
+    def slice_rows(self, start, end):
+        'code-major 的连续行切片, 所有数组都是 view'
+        code_start = np.searchsorted(self.offsets, start, side='right') - 1
+        code_end = np.searchsorted(self.offsets, end, side='left')
+        offsets = np.clip(self.offsets[code_start:code_end + 1], start, end) - start
+        return self._new(
+            self.datetime[start:end],
+            self.codes[code_start:code_end],
+            offsets,
+            {k: v[start:end] for k,
+             v in self.columns.items()}
+        )
+
+    def take(self, rows):
+        """按行号取数据, rows 必须是 code-major 顺序(同一 code 连续且时间升序)
+        """
+        rows = np.asarray(rows, dtype=np.int64)
+        code_idx = self.code_idx[rows]
+        used, counts = np.unique(code_idx, return_counts=True)
+        offsets = np.zeros(len(used) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(counts)
+        return self._new(
+            self.datetime[rows],
+            self.codes[used],
+            offsets,
+            {k: v[rows] for k,
+             v in self.columns.items()}
+        )
+
+    def select_code(self, code):
+        """选择代码, 单个代码返回 view, 多个代码返回拷贝
+
+        代码不存在 raise KeyError
+        """
+        if isinstance(code, str):
+            pos = self.code_pos[code]
+            return self.slice_rows(self.offsets[pos], self.offsets[pos + 1])
+        pos = sorted(self.code_pos[item] for item in code if item in self.code_pos)
+        if len(pos) == 0:
+            raise KeyError(code)
+        if pos == list(range(pos[0], pos[-1] + 1)):
+            return self.slice_rows(self.offsets[pos[0]], self.offsets[pos[-1] + 1])
+        return self.take(
+            np.concatenate(
+                [np.arange(self.offsets[i],
+                           self.offsets[i + 1]) for i in pos]
+            )
+        )
+
+    def take_ranges(self, lo, hi):
+        """每个 code 取 [lo[i], hi[i]) 这一段, 空的 code 会被去掉
+        """
+        lengths = hi - lo
+        keep = lengths > 0
+        lo, lengths = lo[keep], lengths[keep]
+        offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        offsets[1:] = np.cumsum(lengths)
+        rows = np.repeat(lo - offsets[:-1], lengths) + np.arange(offsets[-1])
+        return self._new(
+            self.datetime[rows],
+            self.codes[keep],
+            offsets,
+            {k: v[rows] for k,
+             v in self.columns.items()}
+        )
+
+    @property
+    def time_key(self):
+        """(时间轴, 全局有序的 code/时间 组合键)
+
+        key = code 序号 * (时间点个数 + 1) + 时间序号, 在 code-major 的排列下整体单调递增,
+        这样所有 code 的时间区间可以用一次 searchsorted 找出来
+        """
+        if self._time_key is None:
+            times, rank = np.unique(self.datetime, return_inverse=True)
+            key = self.code_idx * (len(times) + 1) + rank
+            self._time_key = (times, key)
+        return self._time_key
+
+    def select_time(self, start=None, end=None):
+        '选择 [start, end] 的数据, start/end 为 None 表示不限制'
+        times, key = self.time_key
+        base = np.arange(len(self.codes), dtype=np.int64) * (len(times) + 1)
+        lo = self.offsets[:-1] if start is None else np.searchsorted(
+            key,
+            base + np.searchsorted(times,
+                                   np.datetime64(pd.Timestamp(start),
+                                                 'ns'),
+                                   side='left')
+        )
+        hi = self.offsets[1:] if end is None else np.searchsorted(
+            key,
+            base + np.searchsorted(times,
+                                   np.datetime64(pd.Timestamp(end),
+                                                 'ns'),
+                                   side='right')
+        )
+        return self.take_ranges(lo, hi)
+
+    def locate(self, code, time):
+        '返回 (code, time) 所在的行号, 不存在返回 -1'
+        pos = self.code_pos.get(code)
+        if pos is None:
+            return -1
+        start, end = self.offsets[pos], self.offsets[pos + 1]
+        time = np.datetime64(pd.Timestamp(time), 'ns')
+        row = start + np.searchsorted(self.datetime[start:end], time)
+        if row < end and self.datetime[row] == time:
+            return int(row)
+        return -1
+
+    def row(self, row):
+        '返回某一行, 和 DataFrame.loc[(datetime, code)] 的格式一致'
+        return pd.Series(
+            [self.columns[field][row] for field in self.fields],
+            index=self.fields,
+            name=(pd.Timestamp(self.datetime[row]),
+                  self.codes[np.searchsorted(self.offsets,
+                                             row,
+                                             side='right') - 1])
+        )
+
+    def panels(self):
+        '按时间点分组的迭代器'
+        perm, bounds = self.time_major
+        for i in range(len(bounds) - 1):
+            yield self.take(perm[bounds[i]:bounds[i + 1]])
+
+    def securities(self):
+        '按代码分组的迭代器'
+        for i in range(len(self.codes)):
+            yield self.slice_rows(self.offsets[i], self.offsets[i + 1])
+
+    def to_frame(self):
+        """还原成 MultiIndex(datetime, code) 的 DataFrame, 行顺序和 sort_index 一致
+        """
+        perm, bounds = self.time_major
+        dt = self.datetime[perm]
+        dt_codes = np.repeat(
+            np.arange(len(bounds) - 1,
+                      dtype=np.int64),
+            np.diff(bounds)
+        )
+        index = pd.MultiIndex(
+            levels=[
+                pd.DatetimeIndex(dt[bounds[:-1]]),
+                pd.Index(self.codes)
+            ],
+            codes=[dt_codes,
+                   self.code_idx[perm]],
+            names=self.index_names,
+            verify_integrity=False
+        )
+        return pd.DataFrame(
+            {field: self.columns[field][perm] for field in self.fields},
+            index=index,
+            columns=self.fields
+        )
@@ -45,6 +45,10 @@ from QUANTAXIS.QAUtil import (
     QA_util_to_json_from_pandas
 )
 from QUANTAXIS.QAUtil.QADate import QA_util_to_datetime
+from QUANTAXIS.QAData.base_columnar import _quotation_columns
+from QUANTAXIS.QAData.base_index import _quotation_index
+from QUANTAXIS.QAIndicator.base import (QA_indicator_panel,
+                                        QA_indicator_panel_support)
 
 # todo 🛠基类名字 _quotation_base 小写是因为 不直接初始化， 建议改成抽象类
 
@@ -104,6 +108,70 @@ class _quotation_base():
     def choose_db(self):
         pass
 
+    '''
+    ########################################################################################################
+    存储模式
+
+    frame    : 默认, 数据保存在 MultiIndex DataFrame 中
+    columnar : 数据按 code 分块保存在 numpy 数组中(_quotation_columns),
+               只有访问 .data / __call__ 时才会生成 DataFrame
+    '''
+
+    @property
+    def data(self):
+        if self._data is None and self._columns is not None:
+            self._data = self._columns.to_frame()
+        return self._data
+
+    @data.setter
+    def data(self, value):
+        self._data = value
+        self._columns = None
+
+    @property
+    def storage(self):
+        return 'frame' if self.__dict__.get('_columns') is None else 'columnar'
+
+    @classmethod
+    def from_columns(cls, columns, dtype, if_fq='bfq', frequence=None):
+        """直接用 _quotation_columns 构建 DataStruct, 不经过 DataFrame
+
+        Arguments:
+            columns {_quotation_columns} -- 列式数据
+            dtype {str} -- stock_day/stock_min/...
+        """
+        temp = cls.__new__(cls)
+        temp._data = None
+        temp._columns = columns
+        temp.type = dtype
+        temp.data_id = QA_util_random_with_topic('DATA', lens=3)
+        temp.frequence = frequence
+        temp.if_fq = if_fq
+        temp.choose_db()
+        return temp
+
+    def to_columnar(self):
+        """转换成列式存储的 DataStruct
+
+        select_code/select_time/selects/get_bar/panel_gen/security_gen 都直接在数组上完成
+        """
+        if self.storage == 'columnar':
+            return self
+        return self._new_columnar(_quotation_columns.from_frame(self.data))
+
+    def to_frame_storage(self):
+        '转换回 DataFrame 存储'
+        if self.storage == 'frame':
+            return self
+        return self.new(self.data, self.type, self.if_fq)
+
+    def _new_columnar(self, columns):
+        temp = copy(self)
+        temp._data = None
+        temp._columns = columns
+        temp.data_id = QA_util_random_with_topic('DATA', lens=3)
+        return temp
+
     def __repr__(self):
         return '< QA_Base_DataStruct with %d securities >' % len(self.code)
 
@@ -129,6 +197,8 @@ class _quotation_base():
         返回记录的数目
         :return: dataframe 的index 的数量
         '''
+        if self.storage == 'columnar':
+            return len(self._columns)
         return len(self.index)
 
     # def __getitem__(self,index):
@@ -383,6 +453,10 @@ class _quotation_base():
     @property
     @lru_cache()
     def date(self):
+        if self.storage == 'columnar':
+            if 'date' in self._columns.index_names:
+                return self._columns.datetime_index
+            return list(set(self.datetime.date))
         index = self.data.index.remove_unused_levels()
         try:
             return index.levels[0] if 'date' in self.data.index.names else list(
@@ -395,6 +469,8 @@ class _quotation_base():
     @lru_cache()
     def datetime(self):
         '分钟线结构返回datetime 日线结构返回date'
+        if self.storage == 'columnar':
+            return self._columns.datetime_index
         index = self.data.index.remove_unused_levels()
         return pd.to_datetime(index.levels[0])
 
@@ -604,13 +680,18 @@ class _quotation_base():
     @property
     def panel_gen(self):
         '返回一个基于bar的面板迭代器'
+        if self.storage == 'columnar':
+            for columns in self._columns.panels():
+                yield self._new_columnar(columns)
+            return
         for item in self.index.levels[0]:
             yield self.new(
                 self.data.xs(item,
                              level=0,
                              drop_level=False),
                 dtype=self.type,
-                if_fq=self.if_fq
+                if_fq=self.if_fq,
+                view=True
             )
 
     @property
@@ -623,13 +704,18 @@ class _quotation_base():
     @property
     def security_gen(self):
         '返回一个基于代码的迭代器'
+        if self.storage == 'columnar':
+            for columns in self._columns.securities():
+                yield self._new_columnar(columns)
+            return
         for item in self.index.levels[1]:
             yield self.new(
                 self.data.xs(item,
                              level=1,
                              drop_level=False),
                 dtype=self.type,
-                if_fq=self.if_fq
+                if_fq=self.if_fq,
+                view=True
             )
 
     @property
@@ -642,6 +728,8 @@ class _quotation_base():
     @lru_cache()
     def code(self):
         '返回结构体中的代码'
+        if self.storage == 'columnar':
+            return self._columns.code_index
         return self.index.levels[1]
 
     @property
@@ -654,7 +742,7 @@ class _quotation_base():
     @lru_cache()
     def len(self):
         '返回结构的长度'
-        return len(self.data)
+        return len(self)
 
     @property
     @lru_cache()
@@ -665,6 +753,23 @@ class _quotation_base():
         """
         return dict(zip(list(self.code), self.splits()))
 
+    @property
+    @lru_cache()
+    def bar_index(self):
+        '''
+        code/(datetime, code) 到行号的索引, 每个结构只建一次
+        get_bar/find_bar/get_dict/select_time_with_gap 共用
+        '''
+        if self.storage == 'columnar':
+            return _quotation_index.from_columns(self._columns)
+        return _quotation_index.from_frame(self.data)
+
+    def _take_rows(self, rows):
+        '按 bar_index 的行号(已排序)取出一个新的DataStruct'
+        if self.storage == 'columnar':
+            return self._new_columnar(self._columns.take(rows))
+        return self.new(self.data.iloc[rows], self.type, self.if_fq, view=True)
+
     def get_dict(self, time, code):
         '''
         'give the time,code tuple and turn the dict'
@@ -672,10 +777,10 @@ class _quotation_base():
         :param code:
         :return:  字典dict 类型
         '''
-        try:
-            return self.dicts[(QA_util_to_datetime(time), str(code))]
-        except Exception as e:
-            raise e
+        row = self.bar_index.get_row(str(code), QA_util_to_datetime(time))
+        if row is None:
+            raise KeyError((QA_util_to_datetime(time), str(code)))
+        return self.bar_index.get_dict(row)
 
     def reset_index(self):
         return self.data.reset_index()
@@ -848,11 +953,16 @@ class _quotation_base():
             squeeze=squeeze
         )
 
-    def new(self, data=None, dtype=None, if_fq=None):
+    def new(self, data=None, dtype=None, if_fq=None, view=False):
         """
         创建一个新的DataStruct
         data 默认是self.data
         🛠todo 没有这个？？ inplace 是否是对于原类的修改 ？？
+
+        view=True 是内部使用的快速通道:
+        data 必须是从 self.data 中按行切出来的(已经去重/排序, 字段也已经筛选过),
+        此时不再执行 __init__ 中的 drop_duplicates/sort_index/remove_unused_levels,
+        直接和父结构共享数据
         """
         data = self.data if data is None else data
 
@@ -860,7 +970,13 @@ class _quotation_base():
         if_fq = self.if_fq if if_fq is None else if_fq
 
         temp = copy(self)
-        temp.__init__(data, dtype, if_fq)
+        if view:
+            temp.data = data
+            temp.type = dtype
+            temp.if_fq = if_fq
+            temp.data_id = QA_util_random_with_topic('DATA', lens=3)
+        else:
+            temp.__init__(data, dtype, if_fq)
         return temp
 
     def reverse(self):
@@ -930,7 +1046,7 @@ class _quotation_base():
             [type] -- [description]
         """
 
-        return self.new(self.data.tail(lens))
+        return self.new(self.data.tail(lens), view=True)
 
     def head(self, lens):
         """返回最前lens个值的DataStruct
@@ -942,7 +1058,7 @@ class _quotation_base():
             [type] -- [description]
         """
 
-        return self.new(self.data.head(lens))
+        return self.new(self.data.head(lens), view=True)
 
     def show(self):
         """
@@ -1035,6 +1151,10 @@ class _quotation_base():
     def add_func(self, func, *arg, **kwargs):
         """QADATASTRUCT的指标/函数apply入口
 
+        只用到 QAIndicator.base 里 MA/EMA/SMA/HHV/LLV/REF/STD/CROSS/COUNT/SUM 等基础函数的指标
+        (QA_indicator_panel_support) 在所有代码上一次算完, 结果和按 code 分组逐个计算一样;
+        其他的函数仍然按 code groupby.apply
+
         Arguments:
             func {[type]} -- [description]
 
@@ -1042,6 +1162,20 @@ class _quotation_base():
             [type] -- [description]
         """
 
+        if QA_indicator_panel_support(func):
+            try:
+                res = QA_indicator_panel(self.data, func, *arg, **kwargs)
+            except Exception as e:
+                # 名字检查通过但是在面板上算不了的指标, 记下原因再按 code 分组计算
+                QA_util_log_info(
+                    'QA Error add_func {} 不能在面板上计算, 按 code 分组计算: {!r}'.format(
+                        getattr(func, '__name__', func),
+                        e
+                    )
+                )
+                res = None
+            if isinstance(res, (pd.DataFrame, pd.Series)):
+                return res
         return self.groupby(level=1, sort=False).apply(func, *arg, **kwargs)
 
     def add_funcx(self, func, *arg, **kwargs):
@@ -1144,13 +1278,32 @@ class _quotation_base():
         """
 
         def _selects(code, start, end):
-            if end is not None:
-                return self.data.loc[(slice(pd.Timestamp(start), pd.Timestamp(end)), code), :]
-            else:
-                return self.data.loc[(slice(pd.Timestamp(start), None), code), :]
+            return self._loc_code(self._select_time(start, end), code)
+
+        if self.storage == 'columnar':
+            try:
+                return self._new_columnar(
+                    self._columns.select_code(code).select_time(start,
+                                                                end)
+                )
+            except KeyError:
+                raise ValueError(
+                    'QA CANNOT GET THIS CODE {}/START {}/END{} '.format(
+                        code,
+                        start,
+                        end
+                    )
+                )
 
         try:
-            return self.new(_selects(code, start, end), self.type, self.if_fq)
+            return self.new(
+                _selects(code,
+                         start,
+                         end),
+                self.type,
+                self.if_fq,
+                view=True
+            )
         except:
             raise ValueError(
                 'QA CANNOT GET THIS CODE {}/START {}/END{} '.format(
@@ -1160,6 +1313,27 @@ class _quotation_base():
                 )
             )
 
+    @staticmethod
+    def _loc_code(data, code):
+        """按代码筛选行, 保持原来 (datetime, code) 的排序
+
+        .loc 传入代码列表时会按列表顺序重排, 所以列表用 isin 做 mask
+        """
+        if isinstance(code, str):
+            return data.loc[(slice(None), code), :]
+        return data[data.index.isin(list(code), level=1)]
+
+    def _select_time(self, start, end=None):
+        """按时间切片, 返回 self.data 的连续行(iloc 切片, 和父结构共享数据)
+
+        self.data 已经按 (datetime, code) 排好序, 只需要在第一层索引上二分查找
+        """
+        start, stop = self.data.index.slice_locs(
+            pd.Timestamp(start),
+            None if end is None else pd.Timestamp(end)
+        )
+        return self.data.iloc[start:stop]
+
     def select_time(self, start, end=None):
         """
         选择起始时间
@@ -1178,14 +1352,17 @@ class _quotation_base():
         全部恢复
         """
 
-        def _select_time(start, end):
-            if end is not None:
-                return self.data.loc[(slice(pd.Timestamp(start), pd.Timestamp(end)), slice(None)), :]
-            else:
-                return self.data.loc[(slice(pd.Timestamp(start), None), slice(None)), :]
+        if self.storage == 'columnar':
+            return self._new_columnar(self._columns.select_time(start, end))
 
         try:
-            return self.new(_select_time(start, end), self.type, self.if_fq)
+            return self.new(
+                self._select_time(start,
+                                  end),
+                self.type,
+                self.if_fq,
+                view=True
+            )
         except:
             raise ValueError(
                 'QA CANNOT GET THIS START {}/END{} '.format(start,
@@ -1209,7 +1386,7 @@ class _quotation_base():
             return self.data.loc[day, slice(None)]
 
         try:
-            return self.new(_select_day(day), self.type, self.if_fq)
+            return self.new(_select_day(day), self.type, self.if_fq, view=True)
         except:
             raise ValueError('QA CANNOT GET THIS Day {} '.format(day))
 
@@ -1234,7 +1411,12 @@ class _quotation_base():
             return self.data.loc[month, slice(None)]
 
         try:
-            return self.new(_select_month(month), self.type, self.if_fq)
+            return self.new(
+                _select_month(month),
+                self.type,
+                self.if_fq,
+                view=True
+            )
         except:
             raise ValueError('QA CANNOT GET THIS Month {} '.format(month))
 
@@ -1256,10 +1438,25 @@ class _quotation_base():
         """
 
         def _select_code(code):
-            return self.data.loc[(slice(None), code), :]
+            res = self._loc_code(self.data, code)
+            # view 切出来的结构保留了未使用的 level, 这里补上代码不存在的判断
+            if len(res) == 0:
+                raise KeyError(code)
+            return res
+
+        if self.storage == 'columnar':
+            try:
+                return self._new_columnar(self._columns.select_code(code))
+            except KeyError:
+                raise ValueError('QA CANNOT FIND THIS CODE {}'.format(code))
 
         try:
-            return self.new(_select_code(code), self.type, self.if_fq)
+            return self.new(
+                _select_code(code),
+                self.type,
+                self.if_fq,
+                view=True
+            )
         except:
             raise ValueError('QA CANNOT FIND THIS CODE {}'.format(code))
 
@@ -1283,48 +1480,34 @@ class _quotation_base():
         如果不存在,raise ValueError
         """
         try:
-            return self.data.loc[(pd.Timestamp(time), code)]
+            row = self.bar_index.get_row(code, time)
         except:
+            row = None
+        if row is None:
             raise ValueError(
                 'DATASTRUCT CURRENTLY CANNOT FIND THIS BAR WITH {} {}'.format(
                     code,
                     time
                 )
             )
+        if self.storage == 'columnar':
+            return self._columns.row(row)
+        return self.data.iloc[row]
 
     def select_time_with_gap(self, time, gap, method):
+        """以 time 为界, 每个代码取 gap 根 bar
 
-        if method in ['gt', '>']:
-
-            def gt(data):
-                return data.loc[(slice(pd.Timestamp(time), None), slice(None)), :].groupby(level=1, axis=0, as_index=False, sort=False, group_keys=False).apply(lambda x: x.iloc[1:gap+1])
-
-            return self.new(gt(self.data), self.type, self.if_fq)
-
-        elif method in ['gte', '>=']:
-
-            def gte(data):
-                return data.loc[(slice(pd.Timestamp(time), None), slice(None)), :].groupby(level=1, axis=0, as_index=False, sort=False, group_keys=False).apply(lambda x: x.iloc[0:gap])
-
-            return self.new(gte(self.data), self.type, self.if_fq)
-        elif method in ['lt', '<']:
-
-            def lt(data):
-                return data.loc[(slice(None, pd.Timestamp(time)), slice(None)), :].groupby(level=1, axis=0, as_index=False, sort=False, group_keys=False).apply(lambda x: x.iloc[-gap-1:-1])
-
-            return self.new(lt(self.data), self.type, self.if_fq)
-        elif method in ['lte', '<=']:
-
-            def lte(data):
-                return data.loc[(slice(None, pd.Timestamp(time)), slice(None)), :].groupby(level=1, axis=0, as_index=False, sort=False, group_keys=False).apply(lambda x: x.tail(gap))
-
-            return self.new(lte(self.data), self.type, self.if_fq)
-        elif method in ['eq', '==', '=', 'equal', 'e']:
-
-            def eq(data):
-                return data.loc[(pd.Timestamp(time), slice(None)), :]
+        method: gt/gte/lt/lte/eq, 行号由 bar_index 查出, 不再 groupby.apply
+        """
 
-            return self.new(eq(self.data), self.type, self.if_fq)
+        if method in ['eq', '==', '=', 'equal', 'e']:
+            return self.select_time(time, time)
+        elif method in ['gt', '>', 'gte', '>=', 'lt', '<', 'lte', '<=']:
+            return self._take_rows(
+                self.bar_index.gap_rows(pd.Timestamp(time),
+                                        gap,
+                                        method)
+            )
         else:
             raise ValueError(
                 'QA CURRENTLY DONOT HAVE THIS METHODS {}'.format(method)
@@ -1332,15 +1515,17 @@ class _quotation_base():
 
     def find_bar(self, code, time):
         if len(time) == 10:
-            return self.dicts[
-                (datetime.datetime.strptime(time,
-                                            '%Y-%m-%d'),
-                 code)]
+            return self.get_dict(
+                datetime.datetime.strptime(time,
+                                           '%Y-%m-%d'),
+                code
+            )
         elif len(time) == 19:
-            return self.dicts[
-                (datetime.datetime.strptime(time,
-                                            '%Y-%m-%d %H:%M:%S'),
-                 code)]
+            return self.get_dict(
+                datetime.datetime.strptime(time,
+                                           '%Y-%m-%d %H:%M:%S'),
+                code
+            )
 
     def fast_moving(self, pct):
         """bar快速上涨的股票(输入pct 百分比)
@@ -0,0 +1,162 @@
+# coding:utf-8
+#
+# The MIT License (MIT)
+#
+# Copyright (c) 2016-2019 yutiansut/QUANTAXIS
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+_quotation_base 的 bar 索引
+
+每个 DataStruct 只建一次, get_bar/find_bar/get_dict/select_time_with_gap 共用
+
+    code      -> 该代码的行号区间(按时间排好序)
+    (datetime, code) -> 行号 (在该代码的时间数组上二分查找, 不为每根 bar 建 python 对象)
+
+行号指的是 DataStruct 底层存储的位置: DataFrame 存储时是 iloc 的位置,
+列式存储时是 _quotation_columns 的行号
+"""
+
+import numpy as np
+import pandas as pd
+
+
+class _quotation_index():
+
+    def __init__(self, datetime, code_idx, codes, columns, fields):
+        """
+        Arguments:
+            datetime {np.ndarray} -- 每行的时间 (int64 纳秒)
+            code_idx {np.ndarray} -- 每行的代码在 codes 中的序号
+            codes {array-like} -- 代码表
+            columns {dict} -- 字段名: 数组(按行号排列)
+            fields {list} -- 字段顺序
+        """
+        self.datetime = datetime
+        self.codes = codes
+        self.columns = columns
+        self.fields = list(fields)
+        self.code_pos = {code: i for i, code in enumerate(codes)}
+        # 稳定排序, 同一个代码内部保持原来的时间顺序
+        self.code_rows = np.argsort(code_idx, kind='mergesort')
+        self.code_offsets = np.zeros(len(codes) + 1, dtype=np.int64)
+        self.code_offsets[1:] = np.cumsum(
+            np.bincount(code_idx,
+                        minlength=len(codes))
+        )
+        # 按 code_rows 排列的时间, 每个代码一段
+        self.code_datetime = datetime[self.code_rows]
+
+    @classmethod
+    def from_frame(cls, data):
+        index = data.index
+        return cls(
+            pd.DatetimeIndex(index.get_level_values(0)).asi8,
+            np.asarray(index.codes[1],
+                       dtype=np.int64),
+            index.levels[1],
+            {col: data[col].values for col in data.columns},
+            data.columns
+        )
+
+    @classmethod
+    def from_columns(cls, columns):
+        return cls(
+            columns.datetime.view(np.int64),
+            columns.code_idx,
+            columns.codes,
+            columns.columns,
+            columns.fields
+        )
+
+    @staticmethod
+    def timestamp(time):
+        return pd.Timestamp(time).value
+
+    def code_range(self, code):
+        '代码对应的行号, 按时间排序, 代码不存在返回空数组'
+        pos = self.code_pos.get(code)
+        if pos is None:
+            return self.code_rows[:0]
+        return self.code_rows[self.code_offsets[pos]:self.code_offsets[pos + 1]]
+
+    def get_row(self, code, time):
+        '单点查询, 不存在返回 None; 同一时间有重复的 bar 时取最后一根'
+        pos = self.code_pos.get(code)
+        if pos is None:
+            return None
+        start, end = self.code_offsets[pos], self.code_offsets[pos + 1]
+        time = self.timestamp(time)
+        i = start + np.searchsorted(
+            self.code_datetime[start:end],
+            time,
+            side='right'
+        )
+        if i == start or self.code_datetime[i - 1] != time:
+            return None
+        return int(self.code_rows[i - 1])
+
+    @staticmethod
+    def _scalar(value):
+        'numpy 标量转成 python 对象, 和 DataFrame.to_dict 的返回一致'
+        if isinstance(value, np.datetime64):
+            return pd.Timestamp(value)
+        if isinstance(value, np.generic):
+            return value.item()
+        return value
+
+    def get_dict(self, row):
+        return {
+            field: self._scalar(self.columns[field][row])
+            for field in self.fields
+        }
+
+    def gap_rows(self, time, gap, method):
+        """每个代码以 time 为界取 gap 根 bar, 返回行号(按行号排序)
+
+        和原来 groupby().apply(lambda x: x.iloc[...]) 的取法保持一致
+        """
+        time = self.timestamp(time)
+        res = []
+        for pos in range(len(self.codes)):
+            start, end = self.code_offsets[pos], self.code_offsets[pos + 1]
+            if start == end:
+                continue
+            rows = self.code_rows[start:end]
+            datetime = self.code_datetime[start:end]
+            if method in ['gt', '>']:
+                left = np.searchsorted(datetime, time, side='left')
+                res.append(rows[left + 1:left + gap + 1])
+            elif method in ['gte', '>=']:
+                left = np.searchsorted(datetime, time, side='left')
+                res.append(rows[left:left + gap])
+            elif method in ['lt', '<']:
+                right = np.searchsorted(datetime, time, side='right')
+                res.append(rows[max(right - gap - 1, 0):max(right - 1, 0)])
+            elif method in ['lte', '<=']:
+                right = np.searchsorted(datetime, time, side='right')
+                res.append(rows[max(right - gap, 0):right])
+            else:
+                raise ValueError(
+                    'QA CURRENTLY DONOT HAVE THIS METHODS {}'.format(method)
+                )
+        if len(res) == 0:
+            return self.code_rows[:0]
+        return np.sort(np.concatenate(res))
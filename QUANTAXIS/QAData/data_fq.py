@@ -24,6 +24,7 @@
 
 import datetime
 
+import numpy as np
 import pandas as pd
 
 from QUANTAXIS.QAUtil import DATABASE, QA_util_log_info
@@ -99,12 +100,53 @@ from QUANTAXIS.QAUtil import DATABASE, QA_util_log_info
 #     return data.query('if_trade==1 and open != 0').drop(['fenhong', 'peigu', 'peigujia', 'songzhuangu'], axis=1)
 
 
+def _QA_data_xdxr_on_bar(xdxr_date, xdxr_code, bfq_data):
+    """除权日换成当天第一根bar的时间
+
+    分钟线的除权日(当天0点)对不上任何一根bar, 换成当天第一根bar之后, 这根bar的 preclose
+    是除权后的理论价格; 日线和当天没有bar的除权日不变
+
+    Returns:
+        np.ndarray -- datetime64
+    """
+    bars = pd.DataFrame(
+        {
+            'code': bfq_data.index.get_level_values(1).astype(str),
+            'time': pd.to_datetime(bfq_data.index.get_level_values(0))
+        }
+    )
+    first = bars.assign(day=bars['time'].dt.normalize()
+                       ).groupby(['code', 'day'])['time'].min()
+    xdxr_date = pd.to_datetime(pd.Series(xdxr_date)).values
+    snapped = first.reindex(
+        pd.MultiIndex.from_arrays(
+            [pd.Series(xdxr_code).astype(str).values, xdxr_date]
+        )
+    ).values
+    return np.where(pd.isnull(snapped), xdxr_date, snapped).astype('datetime64[ns]')
+
+
 def _QA_data_stock_to_fq(bfq_data, xdxr_data, fqtype):
     '使用数据库数据进行复权'
     info = xdxr_data.query('category==1')
+    if len(info) > 0:
+        info = info.set_index(
+            pd.MultiIndex.from_arrays(
+                [
+                    _QA_data_xdxr_on_bar(
+                        info.index.get_level_values(0),
+                        info.index.get_level_values(1),
+                        bfq_data
+                    ),
+                    info.index.get_level_values(1)
+                ],
+                names=info.index.names
+            )
+        ).sort_index()
     bfq_data = bfq_data.assign(if_trade=1)
 
     if len(info) > 0:
+        # pandas 0.25 之后 concat(axis=1) 不再对合并的索引排序, 非交易日的除权日会排在最后
         data = pd.concat(
             [
                 bfq_data,
@@ -112,7 +154,7 @@ def _QA_data_stock_to_fq(bfq_data, xdxr_data, fqtype):
                          ['category']]
             ],
             axis=1
-        )
+        ).sort_index()
 
         data['if_trade'].fillna(value=0, inplace=True)
         data = data.fillna(method='ffill')
@@ -127,7 +169,7 @@ def _QA_data_stock_to_fq(bfq_data, xdxr_data, fqtype):
                           'songzhuangu']]
             ],
             axis=1
-        )
+        ).sort_index()
     else:
         data = pd.concat(
             [
@@ -221,6 +263,10 @@ def QA_data_stock_to_fq(__data, type_='01'):
         pd.core.indexes.multi.MultiIndex
     ) else __data['code'][0]
 
+    res = _QA_data_stock_to_fq_adj(__data, [code], type_)
+    if res is not None:
+        return res
+
     return _QA_data_stock_to_fq(
         bfq_data=__data,
         xdxr_data=__QA_fetch_stock_xdxr(code),
@@ -234,3 +280,328 @@ def QA_data_stock_to_fq(__data, type_='01'):
     # else:
     #     QA_util_log_info('wrong fq type! Using qfq')
     #     return QA_data_make_qfq(__data, __QA_fetch_stock_xdxr(code))
+
+
+def _QA_data_stock_to_fq_panel(bfq_data, xdxr_data, fqtype):
+    """多只股票一次性复权, 结果和逐个代码调用 _QA_data_stock_to_fq 一致
+
+    bfq_data: MultiIndex(date/datetime, code) 的不复权数据
+    xdxr_data: 所有代码的除权除息数据(包含 date/code/category/fenhong/peigu/peigujia/songzhuangu 列)
+
+    先换成 (code, date) 排序, 复权因子用分组的 shift/cumprod 一次算出
+    """
+    time_level, code_level = bfq_data.index.names
+    bfq = bfq_data.assign(if_trade=1).swaplevel().sort_index()
+    codes = bfq.index.get_level_values(0)
+    dates = pd.Series(bfq.index.get_level_values(1), index=codes)
+
+    # 除权信息只取每个代码 [第一根bar, 最后一根bar] 区间内的
+    info = xdxr_data.query('category==1')
+    info = pd.DataFrame(
+        {
+            code_level: info['code'].values,
+            time_level: pd.to_datetime(info['date']).values,
+            'fenhong': info['fenhong'].values,
+            'peigu': info['peigu'].values,
+            'peigujia': info['peigujia'].values,
+            'songzhuangu': info['songzhuangu'].values
+        }
+    )
+    info[time_level] = _QA_data_xdxr_on_bar(
+        info[time_level],
+        info[code_level],
+        bfq_data
+    )
+    first = info[code_level].map(dates.groupby(level=0).first())
+    last = info[code_level].map(dates.groupby(level=0).last())
+    info = info[(info[time_level] >= first) & (info[time_level] <= last)]
+    info = info.set_index([code_level, time_level])
+
+    # 非交易日的除权日作为额外的行插入, 并沿用前一根bar的数据
+    data = bfq.reindex(bfq.index.union(info.index))
+    data['if_trade'] = data['if_trade'].fillna(value=0)
+    # pandas 0.24 的 groupby(level=...).ffill 会把分组的索引也加成一列, 这里只取原有的列
+    data = data.groupby(level=0).ffill()[bfq.columns]
+    data = pd.concat([data, info], axis=1)
+    data = data.fillna(0)
+
+    group = data.groupby(level=0)
+    data['preclose'] = (
+        group['close'].shift(1) * 10 - data['fenhong'] +
+        data['peigu'] * data['peigujia']
+    ) / (10 + data['peigu'] + data['songzhuangu'])
+
+    group = data.groupby(level=0)
+    if fqtype in ['01', 'qfq']:
+        ratio = (group['preclose'].shift(-1) / data['close']).fillna(1)
+        data['adj'] = ratio[::-1].groupby(level=0).cumprod()
+    else:
+        ratio = data['close'] / group['preclose'].shift(-1)
+        data['adj'] = ratio.groupby(level=0).cumprod().groupby(level=0).shift(1).fillna(1)
+
+    for col in ['open', 'high', 'low', 'close', 'preclose']:
+        data[col] = data[col] * data['adj']
+    data['volume'] = data['volume'] / \
+        data['adj'] if 'volume' in data.columns else data['vol']/data['adj']
+    try:
+        data['high_limit'] = data['high_limit'] * data['adj']
+        data['low_limit'] = data['high_limit'] * data['adj']
+    except:
+        pass
+    return data.query('if_trade==1 and open != 0').drop(
+        ['fenhong',
+         'peigu',
+         'peigujia',
+         'songzhuangu',
+         'if_trade',
+         'category'],
+        axis=1,
+        errors='ignore'
+    ).swaplevel().sort_index()
+
+
+def _QA_fetch_stock_xdxr_panel(code, collections=DATABASE.stock_xdxr):
+    '一次查询取出多个股票的除权信息(只需要 category==1 的数据)'
+    data = pd.DataFrame(
+        [
+            item for item in collections.find(
+                {'code': {'$in': list(code)}, 'category': 1},
+                {'_id': 0, 'code': 1, 'date': 1, 'category': 1,
+                 'fenhong': 1, 'peigu': 1, 'peigujia': 1, 'songzhuangu': 1},
+                batch_size=10000
+            )
+        ],
+        columns=['category',
+                 'code',
+                 'date',
+                 'fenhong',
+                 'peigu',
+                 'peigujia',
+                 'songzhuangu']
+    )
+    data['date'] = pd.to_datetime(data['date'])
+    return data
+
+
+def QA_data_stock_to_fq_panel(__data, type_='01'):
+    """股票 日线/分钟线 多代码复权接口
+
+    和 groupby(level=1).apply(QA_data_stock_to_fq, type_) 结果一致,
+    但是除权数据只查询一次, 复权因子对所有代码一起计算
+
+    已经用 QA_SU_save_stock_adj 建好复权因子表(stock_adj)时直接用表里的因子,
+    否则从 stock_xdxr 现算; stock_adj 还没有跟上 stock_xdxr 的代码也从 stock_xdxr 现算
+
+    Arguments:
+        __data {pd.DataFrame} -- MultiIndex(date/datetime, code) 的不复权数据
+
+    Keyword Arguments:
+        type_ {str} -- '01'/'qfq' 前复权, '02'/'hfq' 后复权 (default: {'01'})
+    """
+    code = __data.index.remove_unused_levels().levels[1]
+    res = _QA_data_stock_to_fq_adj(__data, code, type_)
+    if res is not None:
+        return res
+    return _QA_data_stock_to_fq_panel(
+        bfq_data=__data,
+        xdxr_data=_QA_fetch_stock_xdxr_panel(code),
+        fqtype=type_
+    )
+
+
+def _QA_data_stock_adj_stale(bfq_data, adj_factor, xdxr_data):
+    """stock_adj 里缺少除权事件的代码
+
+    QA_SU_save_stock_adj 跳过除权日还没有日线的事件, 只存了一部分事件的代码用因子表复权会漏掉
+    这些除权; 只检查行情区间 (第一根bar, 最后一根bar] 内的事件, 区间外的事件不影响复权结果
+
+    Returns:
+        list -- 代码
+    """
+    span = pd.DataFrame(
+        {
+            'code': bfq_data.index.get_level_values(1).astype(str),
+            'date': pd.to_datetime(bfq_data.index.get_level_values(0))
+        }
+    ).groupby('code')['date'].agg(['min', 'max'])
+    info = xdxr_data.query('category==1')
+    info = pd.DataFrame(
+        {
+            'code': info['code'].astype(str).values,
+            'date': pd.to_datetime(info['date']).values
+        }
+    )
+    info = info[info['code'].isin(span.index)]
+    info = info[(info['date'] > info['code'].map(span['min'])) &
+                (info['date'] <= info['code'].map(span['max']))]
+    saved = adj_factor['code'].astype(str) + \
+        pd.to_datetime(adj_factor['date']).dt.strftime('%Y-%m-%d')
+    missing = ~(info['code'] + info['date'].dt.strftime('%Y-%m-%d')).isin(saved)
+    return sorted(info.loc[missing, 'code'].unique())
+
+
+def _QA_data_stock_to_fq_adj(bfq_data, code, fqtype):
+    """用复权因子表(stock_adj)复权, 因子表还没有建立时返回 None
+
+    因子表没有跟上 stock_xdxr 的代码 (见 _QA_data_stock_adj_stale) 按 stock_xdxr 现算
+    """
+    adj_factor = _QA_fetch_stock_adj(code)
+    if adj_factor is None:
+        return None
+    xdxr_data = _QA_fetch_stock_xdxr_panel(code)
+    stale = _QA_data_stock_adj_stale(bfq_data, adj_factor, xdxr_data)
+    if len(stale) == 0:
+        return _QA_data_stock_to_fq_factor(bfq_data, adj_factor, fqtype)
+    in_stale = bfq_data.index.get_level_values(1).astype(str).isin(stale)
+    res = [
+        _QA_data_stock_to_fq_panel(
+            bfq_data[in_stale],
+            xdxr_data[xdxr_data['code'].astype(str).isin(stale)],
+            fqtype
+        )
+    ]
+    if not in_stale.all():
+        res.append(
+            _QA_data_stock_to_fq_factor(bfq_data[~in_stale], adj_factor, fqtype)
+        )
+    return pd.concat(res, sort=False).sort_index()
+
+
+def QA_data_calc_adj_factor(bfq_data, xdxr_data):
+    """计算每个除权除息日的复权因子
+
+    factor = 除权后的理论前收盘 / 除权日之前最后一根bar的收盘价
+           = ((close * 10 - fenhong + peigu * peigujia) / (10 + peigu + songzhuangu)) / close
+
+    只计算除权日(含)之后已经有行情的事件, 除权日之后还没有行情的事件(比如公告了还没除权的)
+    等行情更新了再算; 除权日之前没有行情的事件, 因子记为1
+
+    Arguments:
+        bfq_data {pd.DataFrame} -- MultiIndex(date, code) 的不复权数据, 只用到 close
+        xdxr_data {pd.DataFrame} -- 除权除息数据(包含 date/code/category/fenhong/peigu/peigujia/songzhuangu 列)
+
+    Returns:
+        pd.DataFrame -- [code, date, factor], 按 code/date 排序
+    """
+    close = pd.DataFrame(
+        {
+            'code': bfq_data.index.get_level_values(1).astype(str),
+            'date': pd.to_datetime(bfq_data.index.get_level_values(0)),
+            'close': bfq_data['close'].values
+        }
+    ).sort_values('date')
+    info = xdxr_data.query('category==1')
+    info = pd.DataFrame(
+        {
+            'code': info['code'].astype(str).values,
+            'date': pd.to_datetime(info['date']).values,
+            'fenhong': info['fenhong'].values,
+            'peigu': info['peigu'].values,
+            'peigujia': info['peigujia'].values,
+            'songzhuangu': info['songzhuangu'].values
+        }
+    ).fillna(0)
+    info = info[info['date'] <= info['code'].map(
+        close.groupby('code')['date'].max()
+    )].sort_values('date')
+
+    # 除权日之前(不含当天)最后一根bar的收盘价
+    info = pd.merge_asof(
+        info,
+        close.rename(columns={'close': 'close_prev'}),
+        on='date',
+        by='code',
+        allow_exact_matches=False
+    )
+    preclose = (
+        info['close_prev'] * 10 - info['fenhong'] +
+        info['peigu'] * info['peigujia']
+    ) / (10 + info['peigu'] + info['songzhuangu'])
+    info['factor'] = (preclose / info['close_prev']).fillna(1)
+    return info.loc[:, ['code', 'date', 'factor']].sort_values(
+        ['code', 'date']
+    ).reset_index(drop=True)
+
+
+def _QA_data_stock_to_fq_factor(bfq_data, adj_factor, fqtype):
+    """用复权因子表复权, 结果和 _QA_data_stock_to_fq_panel 一致(浮点误差以内)
+
+    C(t) 为 t 之前(含)所有除权因子的累乘, 则
+        前复权 adj(t) = C(最后一根bar) / C(t)
+        后复权 adj(t) = C(第一根bar) / C(t)
+    每根bar只需要一次 merge_asof 找到对应的 C(t), 不用再插入除权日重算 preclose
+
+    adj_factor: QA_data_calc_adj_factor 的结果 [code, date, factor]
+    """
+    data = bfq_data.sort_index()
+    rows = pd.DataFrame(
+        {
+            'code': data.index.get_level_values(1).astype(str),
+            'date': pd.to_datetime(data.index.get_level_values(0))
+        }
+    )
+    factor = adj_factor.sort_values(['code', 'date'])
+    factor = factor.assign(
+        cum=factor.groupby('code')['factor'].cumprod().values,
+        ex_date=factor['date'].values
+    ).sort_values('date')
+    rows = pd.merge_asof(
+        rows,
+        factor.loc[:,
+                   ['code',
+                    'date',
+                    'ex_date',
+                    'factor',
+                    'cum']],
+        on='date',
+        by='code'
+    )
+
+    cum = rows['cum'].fillna(1)
+    group = cum.groupby(rows['code'].values)
+    if fqtype in ['01', 'qfq']:
+        adj = group.transform('last') / cum
+    else:
+        adj = group.transform('first') / cum
+    adj = adj.values
+    # 除权日当天第一根bar的 preclose 是除权后的理论价格, 分钟线按日期部分对应
+    day = rows['date'].dt.normalize()
+    first = day.ne(day.groupby(rows['code'].values).shift(1))
+    event = np.where(
+        ((rows['ex_date'] == day) & first).values,
+        rows['factor'].values,
+        1
+    )
+    preclose = data['close'].groupby(level=1).shift(1).values * event
+
+    data = data.assign(preclose=preclose, adj=adj)
+    for col in ['open', 'high', 'low', 'close', 'preclose']:
+        data[col] = data[col] * data['adj']
+    data['volume'] = data['volume'] / \
+        data['adj'] if 'volume' in data.columns else data['vol']/data['adj']
+    try:
+        data['high_limit'] = data['high_limit'] * data['adj']
+        data['low_limit'] = data['high_limit'] * data['adj']
+    except:
+        pass
+    return data.query('open != 0')
+
+
+def _QA_fetch_stock_adj(code, collections=DATABASE.stock_adj):
+    '一次查询取出多个股票的复权因子, 复权因子表还没有建立时返回 None'
+    if collections.find_one() is None:
+        return None
+    data = pd.DataFrame(
+        [
+            item for item in collections.find(
+                {'code': {'$in': list(code)}},
+                {'_id': 0, 'code': 1, 'date': 1, 'factor': 1},
+                batch_size=10000
+            )
+        ],
+        columns=['code',
+                 'date',
+                 'factor']
+    )
+    data['date'] = pd.to_datetime(data['date'])
+    return data
@@ -24,6 +24,7 @@
 
 from datetime import time
 from QUANTAXIS.QAUtil.QAParameter import EXCHANGE_ID
+from QUANTAXIS.QAUtil.QADate import QA_util_datetime_str_array, QA_util_time_stamp_array
 import pandas as pd
 import numpy as np
 
@@ -748,6 +749,108 @@ def QA_data_day_resample(day_data, type_='w'):
     return data.assign(date=pd.to_datetime(data.date)).set_index(['date', 'code'])
 
 
+# 1min 合成高周期时各列的取法, 没有列出的列取最后一个值
+_MIN_BATCH_CONVERSION = {
+    'open': 'first',
+    'high': 'max',
+    'low': 'min',
+    'vol': 'sum',
+    'volume': 'sum',
+    'trade': 'sum',
+    'amount': 'sum'
+}
+# 中金所的品种和股票一样在 9:30/13:00 开盘
+_CFFEX_PRODUCT = ['IF', 'IH', 'IC', 'IM', 'TS', 'TF', 'T']
+_MINUTE = np.int64(60 * 10**9)
+_DAY = np.int64(86400 * 10**9)
+
+
+def _QA_data_min_label(minute, period, stock_session):
+    """1min bar 的结束时间(当天第几分钟) -> 所属 period 分钟 bar 的结束时间
+
+    股票时段从 9:30/13:00 起按 period 切分;
+    期货按整点对齐, 日盘上午/下午的最后一根不超过 11:30/15:00
+    """
+    anchor = np.where(minute > 780, 780, 570)
+    stock = anchor + np.maximum(np.ceil((minute - anchor) / period), 1) * period
+    future = np.ceil(minute / period) * period
+    cap = np.where(minute <= 690, 690, 900)
+    future = np.where((minute > 480) & (minute <= 900), np.minimum(future, cap), future)
+    return np.where(stock_session, stock, future).astype(np.int64)
+
+
+def QA_data_min_resample_batch(min_data, type_list=('5min', '15min', '30min', '60min'),
+                               market='stock'):
+    """1min 分钟线一次合成多个周期, 多个代码一起计算 (不按代码循环)
+
+    和通达信一样, bar 的时间是结束时间, 比如 9:31-9:35 合成 9:35 的 5min bar
+
+    Arguments:
+        min_data {pd.DataFrame} -- QA_fetch_get_*_min 返回的 1min 数据, 可以有多个代码
+
+    Keyword Arguments:
+        type_list {list} -- 目标周期 (default: {('5min', '15min', '30min', '60min')})
+        market {str} -- stock/index/etf/future (default: {'stock'})
+
+    Returns:
+        dict -- {type: pd.DataFrame}, 列和 QA_fetch_get_*_min 返回的一致
+    """
+    if 'datetime' in min_data.columns:
+        data = min_data.reset_index(drop=True)
+    else:
+        data = min_data.reset_index()
+    stamp = pd.to_datetime(data['datetime'].values).values.view(np.int64)
+    code = data['code'].values.astype(str)
+    order = np.lexsort((stamp, code))
+    data, stamp, code = data.iloc[order], stamp[order], code[order]
+
+    day = stamp - stamp % _DAY
+    minute = (stamp - day) // _MINUTE
+    if market == 'future':
+        # IF1909/IFL8 -> IF
+        product = pd.Series(code).str.extract(
+            '^([A-Za-z]+?)(?:L[0-9])?[0-9]*$', expand=False).str.upper()
+        stock_session = product.isin(_CFFEX_PRODUCT).values
+    else:
+        stock_session = np.ones(len(data), dtype=bool)
+
+    res = {}
+    for type_ in type_list:
+        period = int(str(type_).replace('min', ''))
+        if len(data) == 0:
+            res[type_] = data.assign(type=type_)
+            continue
+        label = day + _QA_data_min_label(minute, period, stock_session) * _MINUTE
+        starts = np.flatnonzero(
+            np.r_[True, (code[1:] != code[:-1]) | (label[1:] != label[:-1])]
+        )
+        ends = np.r_[starts[1:], len(data)]
+        label = label[starts].view('datetime64[ns]')
+        columns = {}
+        for col in data.columns:
+            how = _MIN_BATCH_CONVERSION.get(col, 'last')
+            values = data[col].values
+            if col == 'datetime':
+                columns[col] = QA_util_datetime_str_array(label)
+            elif col == 'time_stamp':
+                columns[col] = QA_util_time_stamp_array(label)
+            elif col == 'type':
+                columns[col] = type_
+            elif how == 'first':
+                columns[col] = values[starts]
+            elif how == 'max':
+                columns[col] = np.maximum.reduceat(values, starts)
+            elif how == 'min':
+                columns[col] = np.minimum.reduceat(values, starts)
+            elif how == 'sum':
+                columns[col] = np.add.reduceat(values, starts)
+            else:
+                columns[col] = values[ends - 1]
+        res[type_] = pd.DataFrame(columns, columns=data.columns) \
+            .set_index('datetime', drop=False, inplace=False)
+    return res
+
+
 if __name__ == '__main__':
     import QUANTAXIS as QA
     tick = QA.QA_fetch_get_stock_transaction(
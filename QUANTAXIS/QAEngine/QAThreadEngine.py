@@ -21,11 +21,10 @@
 # LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
-
 import datetime
 import threading
 import time
-from queue import Queue
+from queue import Empty, Queue
 
 from QUANTAXIS.QAEngine.QATask import QA_Task
 from QUANTAXIS.QAUtil import QA_util_log_info, QA_util_random_with_topic
@@ -42,13 +41,25 @@ class QA_Thread(threading.Thread):
     自带一个Queue
     有 self.put/ self.put_nowait/ self.get/ self.get_nowait 4个关于queue的方法        
 
+    线程阻塞在 queue.get(timeout=queue_timeout) 上等待任务, 不再空转;
+    每次唤醒最多连续取 batch_size 个任务执行, stop 之后最多 queue_timeout 秒线程退出
+
     如果你重写了run方法:
     则你需要自行处理queue中的事情/简单的做你自己的逻辑
+    循环条件用 self.running, 等待用 self.sleep(seconds), stop 的时候可以马上退出
+    也可以用 self.get_batch() 取任务, self.handle(task) 执行
 
 
     '''
 
-    def __init__(self, queue=None, name=None, daemon=False):
+    def __init__(
+            self,
+            queue=None,
+            name=None,
+            daemon=False,
+            queue_timeout=0.5,
+            batch_size=16
+    ):
         threading.Thread.__init__(self)
         self.queue = Queue() if queue is None else queue
         self.thread_stop = False
@@ -56,12 +67,28 @@ class QA_Thread(threading.Thread):
         self.__flag.set()                      # 设置为True
         self.__running = threading.Event()     # 用于停止线程的标识
         self.__running.set()                   # 将running设置为True
+        self.__stopped = threading.Event()     # stop 时 set, 用于打断 sleep
         self.name = QA_util_random_with_topic(
             topic='QA_Thread',
             lens=3
         ) if name is None else name
         self.idle = False
         self.daemon = daemon
+        self.queue_timeout = queue_timeout
+        self.batch_size = max(int(batch_size), 1)
+        self.__stats_lock = threading.Lock()
+        self.__stats = {
+            'put': 0,
+            'processed': 0,
+            'errors': 0,
+            'batches': 0,
+            'max_batch': 0,
+            'max_depth': 0,
+            'wait_time': 0.0,
+            'max_wait_time': 0.0,
+            'run_time': 0.0,
+            'max_run_time': 0.0
+        }
 
     def __repr__(self):
         return '<QA_Thread: {}  id={} ident {}>'.format(
@@ -70,33 +97,91 @@ class QA_Thread(threading.Thread):
             self.ident
         )
 
+    @property
+    def running(self):
+        return self.__running.is_set() and not self.thread_stop
+
+    def sleep(self, seconds):
+        '可以被 stop 打断的 time.sleep, 返回是否还在运行'
+        self.__stopped.wait(seconds)
+        return self.running
+
+    def get_batch(self, timeout=None):
+        """阻塞等待第一个任务, 然后不等待地再取, 一共最多 batch_size 个
+
+        Keyword Arguments:
+            timeout {float} -- 等待的秒数, None 为 queue_timeout (default: {None})
+
+        Returns:
+            list -- 超时的时候为 []
+        """
+        timeout = self.queue_timeout if timeout is None else timeout
+        try:
+            tasks = [self.queue.get(timeout=timeout)]
+        except Empty:
+            return []
+        self.idle = False
+        depth = self.queue.qsize() + 1
+        while len(tasks) < self.batch_size:
+            try:
+                tasks.append(self.queue.get_nowait())
+            except Empty:
+                break
+        with self.__stats_lock:
+            self.__stats['batches'] += 1
+            self.__stats['max_batch'] = max(self.__stats['max_batch'], len(tasks))
+            self.__stats['max_depth'] = max(self.__stats['max_depth'], depth)
+        return tasks
+
+    def handle(self, task):
+        '执行一个任务, QA_Engine 重写这个方法来分派任务'
+        assert isinstance(task, QA_Task)
+        if task.worker != None:
+            task.do()
+
+    def _execute(self, task):
+        '执行一个任务并记录排队/执行的耗时, 返回任务抛出的异常'
+        _time = time.time()
+        error = None
+        try:
+            self.handle(task)
+        except Exception as e:
+            if not isinstance(e, ValueError):
+                error = e
+        finally:
+            run_time = time.time() - _time
+            self.queue.task_done() # 完成一个任务
+        wait_time = _time - getattr(task, '_put_time', _time)
+        with self.__stats_lock:
+            stats = self.__stats
+            stats['processed'] += 1
+            stats['errors'] += error is not None
+            stats['wait_time'] += wait_time
+            stats['max_wait_time'] = max(stats['max_wait_time'], wait_time)
+            stats['run_time'] += run_time
+            stats['max_run_time'] = max(stats['max_run_time'], run_time)
+        return error
+
     def run(self):
-        while self.__running.isSet():
+        while self.running:
+            if not self.__flag.wait(self.queue_timeout):
+                continue
+            tasks = self.get_batch()
+            if len(tasks) == 0:
+                self.idle = True
+                continue
+            # 等待任务的时候被暂停, 取到的这一批等 resume (或者 stop) 之后再执行
             self.__flag.wait()
-            while not self.thread_stop:
-                '这是一个阻塞的队列,避免出现消息的遗漏'
-                try:
-                    if self.queue.empty() is False:
-                        _task = self.queue.get() # 接收消息
-                                                 #print(_task.worker, self.name)
-                        assert isinstance(_task, QA_Task)
-                        if _task.worker != None:
-
-                            _task.do()
-
-                            self.queue.task_done() # 完成一个任务
-                        else:
-                            pass
-                    else:
-                        self.idle = True
-
-                        # Mac book下风扇狂转，如果sleep cpu 占用率回下降
-                        # time.sleep(0.01)
-                except Exception as e:
-                    if isinstance(e, ValueError):
-                        pass
-                    else:
-                        raise e
+            error = None
+            for _task in tasks:
+                # 同一批里的任务都执行完 (task_done) 再把第一个异常抛出去
+                _error = self._execute(_task)
+                if error is None:
+                    error = _error
+            if self.queue.empty():
+                self.idle = True
+            if error is not None:
+                raise error
 
     def pause(self):
         self.__flag.clear()
@@ -105,17 +190,32 @@ class QA_Thread(threading.Thread):
         self.__flag.set() # 设置为True, 让线程停止阻塞
 
     def stop(self):
-        # self.__flag.set()       # 将线程从暂停状态恢复, 如何已经暂停的话
         self.__running.clear()
         self.thread_stop = True # 设置为False
+        self.__stopped.set()
+        self.__flag.set()       # 将线程从暂停状态恢复, 让线程可以退出
 
     def __start(self):
         self.queue.start()
 
+    def _mark(self, task):
+        try:
+            task._put_time = time.time()
+        except AttributeError:
+            pass
+        with self.__stats_lock:
+            self.__stats['put'] += 1
+            self.__stats['max_depth'] = max(
+                self.__stats['max_depth'],
+                self.queue.qsize() + 1
+            )
+
     def put(self, task):
+        self._mark(task)
         self.queue.put(task)
 
     def put_nowait(self, task):
+        self._mark(task)
         self.queue.put_nowait(task)
 
     def get(self):
@@ -127,6 +227,24 @@ class QA_Thread(threading.Thread):
     def qsize(self):
         return self.queue.qsize()
 
+    def stats(self):
+        """队列深度和延迟的统计
+
+        wait_time 为任务从 put 到开始执行的时间, 直接放进 self.queue 的任务不计;
+        run_time 为执行时间, avg_* 按 processed 平均
+
+        Returns:
+            dict -- [description]
+        """
+        with self.__stats_lock:
+            res = dict(self.__stats)
+        processed = max(res['processed'], 1)
+        res['qsize'] = self.queue.qsize()
+        res['avg_wait_time'] = res['wait_time'] / processed
+        res['avg_run_time'] = res['run_time'] / processed
+        res['avg_batch'] = res['processed'] / max(res['batches'], 1)
+        return res
+
 
 class QA_Engine(QA_Thread):
     '''
@@ -140,12 +258,8 @@ class QA_Engine(QA_Thread):
     '''
 
     def __init__(self, queue=None, *args, **kwargs):
-        super().__init__(queue=queue, name='QA_Engine')
+        super().__init__(queue=queue, name='QA_Engine', **kwargs)
         self.kernels_dict = {}
-        self.__flag = threading.Event()    # 用于暂停线程的标识
-        self.__flag.set()                  # 设置为True
-        self.__running = threading.Event() # 用于停止线程的标识
-        self.__running.set()               # 将running设置为True
 
     def __repr__(self):
         return ' <QA_ENGINE with {} kernels ident {}>'.format(
@@ -157,9 +271,9 @@ class QA_Engine(QA_Thread):
     def kernel_num(self):
         return len(self.kernels_dict.keys())
 
-    def create_kernel(self, name, daemon=False):
+    def create_kernel(self, name, daemon=False, **kwargs):
         # ENGINE线程创建一个事件线程
-        self.kernels_dict[name] = QA_Thread(name=name, daemon=daemon)
+        self.kernels_dict[name] = QA_Thread(name=name, daemon=daemon, **kwargs)
 
     def register_kernel(self, name, kernel):
         if name not in self.kernels_dict.keys():
@@ -188,51 +302,25 @@ class QA_Engine(QA_Thread):
             item.stop()
         self.kernels_dict = {}
 
-    def stop(self):
-        # self.__flag.set()       # 将线程从暂停状态恢复, 如何已经暂停的话
-        self.__running.clear()
-        self.thread_stop = True
-
-    def pause(self):
-        self.__flag.clear()
-
-    def resume(self):
-        self.__flag.set() # 设置为True, 让线程停止阻塞
-
-    def run(self):
-        while self.__running.isSet():
-            self.__flag.wait()
-            while not self.thread_stop:
-                '这是一个阻塞的队列,避免出现消息的遗漏'
-                try:
-                    if self.queue.empty() is False:
-                        _task = self.queue.get() # 接收消息
-                                                 #print("queue left %d"%self.queue.qsize())
-                        assert isinstance(_task, QA_Task)
-                                                 # print(_task)
-
-                        # 🛠todo 建议把 engine 变量名字 改成  engine_in_kernels_dict_name, 便于理解
-                        if _task.engine is None: # _task.engine 是字符串，对于的是 kernels_dict 中的 线程对象
-
-                            # 如果不指定线程 就在ENGINE线程中运行
-                            _task.do()
-                            self.queue.task_done()
-                        else:
-                            # 把当前任务，用_task.engin名字对应的  kernels_dict 线程去执行
-                            self.run_job(_task)
-                            self.queue.task_done()
-                    else:
-                        self.idle = True
-
-                    # Mac book下风扇狂转，如果sleep cpu 占用率回下降
-                    # time.sleep(0.01)
-
-                except Exception as e:
-                    if isinstance(e, ValueError):
-                        pass
-                    else:
-                        raise e
-                    # self.run()
+    def handle(self, task):
+        assert isinstance(task, QA_Task)
+        # 🛠todo 建议把 engine 变量名字 改成  engine_in_kernels_dict_name, 便于理解
+        if task.engine is None: # _task.engine 是字符串，对于的是 kernels_dict 中的 线程对象
+
+            # 如果不指定线程 就在ENGINE线程中运行
+            task.do()
+        else:
+            # 把当前任务，用_task.engin名字对应的  kernels_dict 线程去执行
+            self.run_job(task)
+
+    def stats(self):
+        res = super().stats()
+        res['kernels'] = {
+            name: item.stats()
+            for name, item in self.kernels_dict.items()
+            if isinstance(item, QA_Thread)
+        }
+        return res
 
     def clear(self):
         res = True
@@ -241,10 +329,15 @@ class QA_Engine(QA_Thread):
                 res = False
             if not item.idle:
                 res = False
+            # 取出来还没有执行完的任务
+            if getattr(item.queue, 'unfinished_tasks', 0) > 0:
+                res = False
 
             #item.queue.join()
         if not self.queue.empty():
             res = False
+        if getattr(self.queue, 'unfinished_tasks', 0) > 0:
+            res = False
 
         return res
 
@@ -0,0 +1,318 @@
+# coding:utf-8
+#
+# The MIT License (MIT)
+#
+# Copyright (c) 2016-2019 yutiansut/QUANTAXIS
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+QA_fetch_*_adv 的进程内缓存
+
+按 (数据类型, 表, 频率, 代码) 保存已经取过的时间段 (segment):
+
+    segment = [start, end] 闭区间 + 这段时间内该代码的全部行(按时间排序, 没有数据时为 None)
+
+一次请求 [start, end]:
+    1. 每个代码算出还没有被 segment 覆盖的空档
+    2. 空档相同的代码合在一起, 每个空档只查一次数据库
+    3. 新的 segment 和相邻/重叠的 segment 合并, 之后从覆盖它的 segment 里切片返回
+
+所以子区间直接命中, 区间向前/向后扩展时只查差的那一段
+
+只缓存今天之前的数据 (end 在今天或之后的请求直接查数据库);
+没有查到数据的空档(停牌/节假日)也记录为已覆盖, 之后补存的历史数据要通过 invalidate 丢掉缓存;
+collections 没有 full_name (不是 pymongo 的表) 时也不缓存;
+按字节数做 LRU 淘汰, stats() 返回命中率和占用
+
+QA_fetch_*_adv 默认不用缓存 (use_cache=False); 重新保存历史数据之后要调用
+QA_fetch_cache.invalidate, QASU 里通过 QA_BulkWriter 写入的表会自动调用
+"""
+
+import datetime
+import threading
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+from QUANTAXIS.QAUtil import QA_util_code_tolist
+
+_DAY = np.int64(86400 * 10**9)
+_SECOND = np.int64(10**9)
+# 每个 segment 的固定开销
+_SEGMENT_BYTES = 256
+
+
+class _cache_segment():
+
+    __slots__ = ['start', 'end', 'time', 'data', 'nbytes']
+
+    def __init__(self, start, end, time, data, nbytes):
+        self.start = start
+        self.end = end
+        self.time = time
+        self.data = data
+        self.nbytes = nbytes
+
+    def slice(self, start, end):
+        lo = np.searchsorted(self.time, start, side='left')
+        hi = np.searchsorted(self.time, end, side='right')
+        if hi <= lo:
+            return None
+        return self.data.iloc[lo:hi]
+
+
+class QA_DataCache():
+    """按字节数淘汰的 LRU 行情缓存, 线程安全
+
+    Keyword Arguments:
+        max_bytes {int} -- 最大占用, 0 表示关闭缓存 (default: {512MB})
+    """
+
+    def __init__(self, max_bytes=512 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self._lock = threading.RLock()
+        self._segments = {}
+        self._lru = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.bytes = 0
+
+    def __repr__(self):
+        return '< QA_DataCache {} segments {}/{} bytes >'.format(
+            len(self._lru),
+            self.bytes,
+            self.max_bytes
+        )
+
+    def stats(self):
+        """命中/未命中按 (请求, 代码) 计数, 部分命中算未命中
+        """
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'evictions': self.evictions,
+                'bytes': self.bytes,
+                'max_bytes': self.max_bytes,
+                'segments': len(self._lru),
+                'keys': len(self._segments)
+            }
+
+    def clear(self):
+        with self._lock:
+            self._segments = {}
+            self._lru = OrderedDict()
+            self.bytes = 0
+
+    def invalidate(self, collections=None, code=None):
+        """丢掉某张表(和某些代码)的缓存, 数据库里的历史数据被改写之后调用
+
+        Keyword Arguments:
+            collections {pymongo.collection.Collection} -- 表, None 表示全部 (default: {None})
+            code {str/list} -- 代码, None 表示这张表的全部代码 (default: {None})
+        """
+        coll = getattr(collections, 'full_name', collections)
+        code = None if code is None else set(QA_util_code_tolist(code, auto_fill=False))
+        with self._lock:
+            for key in list(self._segments.keys()):
+                if (coll is None or key[1] == coll) and (code is None or key[3] in code):
+                    for seg in self._segments.pop(key):
+                        del self._lru[(key, id(seg))]
+                        self.bytes -= seg.nbytes
+
+    def resize(self, max_bytes):
+        with self._lock:
+            self.max_bytes = max_bytes
+            self._evict()
+
+    def _evict(self):
+        while self.bytes > self.max_bytes and len(self._lru) > 0:
+            (key, _), seg = self._lru.popitem(last=False)
+            self._segments[key].remove(seg)
+            if len(self._segments[key]) == 0:
+                del self._segments[key]
+            self.bytes -= seg.nbytes
+            self.evictions += 1
+
+    def _gaps(self, key, start, end, step):
+        '[start, end] 中没有被覆盖的空档'
+        res = []
+        cursor = start
+        for seg in self._segments.get(key, []):
+            if seg.end < cursor or seg.start > end:
+                continue
+            if seg.start > cursor:
+                res.append((cursor, seg.start - step))
+            cursor = max(cursor, seg.end + step)
+            if cursor > end:
+                break
+        if cursor <= end:
+            res.append((cursor, end))
+        return tuple(res)
+
+    def _insert(self, key, seg, step):
+        """插入 segment, 并和相邻/重叠的 segment 合并
+
+        两个线程同时查了重叠的时间段时, 重叠部分的行只保留已经在缓存里的那一份
+        """
+        segments = self._segments.setdefault(key, [])
+        merge = [
+            item for item in segments
+            if item.start <= seg.end + step and item.end >= seg.start - step
+        ]
+        if len(merge) > 0:
+            merge = merge + [seg]
+            time = np.concatenate([item.time for item in merge])
+            time, rows = np.unique(time, return_index=True)
+            nbytes = sum(item.nbytes - _SEGMENT_BYTES for item in merge)
+            data = [item.data for item in merge if item.data is not None]
+            seg = _cache_segment(
+                min(item.start for item in merge),
+                max(item.end for item in merge),
+                time,
+                pd.concat(data, sort=False).iloc[rows] if len(data) > 0 else None,
+                int(nbytes * len(rows) / max(sum(len(item.time) for item in merge), 1)) + _SEGMENT_BYTES
+            )
+            for item in merge:
+                if item in segments:
+                    segments.remove(item)
+                    del self._lru[(key, id(item))]
+                    self.bytes -= item.nbytes
+        segments.append(seg)
+        segments.sort(key=lambda item: item.start)
+        self._lru[(key, id(seg))] = seg
+        self.bytes += seg.nbytes
+        return seg
+
+    def _split(self, data, code, time_field, start, end):
+        '按代码拆分一次查询的结果, 返回 {code: segment}, 没有数据的代码不在结果里'
+        res = {}
+        if data is not None and len(data) > 0:
+            nbytes = data.memory_usage(index=True, deep=True).sum() / len(data)
+            time = pd.to_datetime(data[time_field].values).values.view(np.int64)
+            for item, rows in data.groupby(data['code'].values).indices.items():
+                rows = rows[np.argsort(time[rows], kind='mergesort')]
+                res[item] = _cache_segment(
+                    start,
+                    end,
+                    time[rows],
+                    data.iloc[rows],
+                    int(nbytes * len(rows)) + 8 * len(rows) + _SEGMENT_BYTES
+                )
+        return res
+
+    def fetch(
+            self,
+            name,
+            collections,
+            frequence,
+            code,
+            start,
+            end,
+            func,
+            time_field='date',
+            auto_fill=True
+    ):
+        """带缓存的取数
+
+        Arguments:
+            name {str} -- 数据类型, stock_day/stock_min/...
+            collections {pymongo.collection.Collection} -- 表
+            frequence {str} -- 频率, day/1min/...
+            code {str/list} -- 代码
+            start {str} -- 开始时间 (已经按 _adv 的规则补全)
+            end {str} -- 结束时间 (已经按 _adv 的规则补全)
+            func {function} -- func(code, start, end) 查询数据库, 返回 DataFrame 或 None
+
+        Keyword Arguments:
+            time_field {str} -- 时间列 (default: {'date'})
+            auto_fill {bool} -- 代码是否补全成 6 位, 期货为 False (default: {True})
+
+        Returns:
+            pd.DataFrame -- 没有数据返回 None
+        """
+        coll = getattr(collections, 'full_name', None)
+        if self.max_bytes <= 0 or coll is None or str(end)[0:10] >= str(datetime.date.today()):
+            return func(code, start, end)
+
+        daily = len(str(start)) == 10
+        step = _DAY if daily else _SECOND
+        fmt = '%Y-%m-%d' if daily else '%Y-%m-%d %H:%M:%S'
+        code = QA_util_code_tolist(code, auto_fill=auto_fill) or list(code)
+        keys = {item: (name, coll, frequence, item) for item in code}
+        start_ts, end_ts = pd.Timestamp(start).value, pd.Timestamp(end).value
+
+        todo = {}
+        with self._lock:
+            for item in code:
+                gap = self._gaps(keys[item], start_ts, end_ts, step)
+                if len(gap) == 0:
+                    self.hits += 1
+                else:
+                    self.misses += 1
+                    todo.setdefault(gap, []).append(item)
+
+        for gap, codes in todo.items():
+            for gap_start, gap_end in gap:
+                try:
+                    data = func(
+                        codes,
+                        pd.Timestamp(gap_start).strftime(fmt),
+                        pd.Timestamp(gap_end).strftime(fmt)
+                    )
+                except KeyError:
+                    data = None
+                parts = self._split(data, codes, time_field, gap_start, gap_end)
+                with self._lock:
+                    for item in codes:
+                        # 没有数据的空档也记下来, 下次不用再查数据库
+                        seg = parts.get(item)
+                        if seg is None:
+                            seg = _cache_segment(
+                                gap_start,
+                                gap_end,
+                                np.empty(0, dtype=np.int64),
+                                None,
+                                _SEGMENT_BYTES
+                            )
+                        self._insert(keys[item], seg, step)
+
+        res = []
+        with self._lock:
+            for item in code:
+                # 被淘汰过的时间段会重新查, 所以可能是几段拼起来的
+                for seg in self._segments.get(keys[item], []):
+                    if seg.end >= start_ts and seg.start <= end_ts:
+                        self._lru.move_to_end((keys[item], id(seg)))
+                        part = seg.slice(start_ts, end_ts)
+                        if part is not None:
+                            res.append(part)
+            self._evict()
+        if len(res) == 0:
+            return None
+        return pd.concat(res, sort=False)
+
+
+# 全局缓存, QA_fetch_*_adv 共用; QA_fetch_cache.resize(0) 关闭
+QA_fetch_cache = QA_DataCache()
@@ -0,0 +1,267 @@
+# coding:utf-8
+#
+# The MIT License (MIT)
+#
+# Copyright (c) 2016-2019 yutiansut/QUANTAXIS
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+本地列式行情库 (不经过 MongoDB)
+
+目录结构:
+
+    {datastore_path}/{market}/{frequence}/{code}/
+        meta.json       {"fields": [...], "index_names": [...]}
+        datetime.npy    datetime64[ns], 升序
+        {field}.npy     每个字段一个文件, 和 datetime 逐行对应
+
+每个字段都是单独的 .npy, 读取时用 np.load(mmap_mode='r') 直接映射,
+单个代码的查询只做一次 searchsorted, 返回的 DataStruct 底层是文件的 view (不拷贝)
+
+写入见 QUANTAXIS.QASU.save_local
+"""
+
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from QUANTAXIS.QAData import (QA_DataStruct_Future_day,
+                              QA_DataStruct_Future_min,
+                              QA_DataStruct_Index_day,
+                              QA_DataStruct_Index_min,
+                              QA_DataStruct_Stock_day,
+                              QA_DataStruct_Stock_min)
+from QUANTAXIS.QAData.base_columnar import _quotation_columns
+from QUANTAXIS.QASetting.QALocalize import datastore_path
+from QUANTAXIS.QAUtil import QA_util_code_tolist
+
+# (market, day/min) -> (DataStruct, dtype, if_fq)
+_LOCAL_DATASTRUCT = {
+    ('stock', 'day'): (QA_DataStruct_Stock_day, 'stock_day', 'bfq'),
+    ('stock', 'min'): (QA_DataStruct_Stock_min, 'stock_min', 'bfq'),
+    ('index', 'day'): (QA_DataStruct_Index_day, 'index_day', ''),
+    ('index', 'min'): (QA_DataStruct_Index_min, 'index_min', ''),
+    ('future', 'day'): (QA_DataStruct_Future_day, 'future_day', ''),
+    ('future', 'min'): (QA_DataStruct_Future_min, 'future_min', ''),
+}
+
+
+def _QA_local_path(market, frequence, code=None, path=None):
+    root = os.path.join(path or datastore_path, market, frequence)
+    return root if code is None else os.path.join(root, code)
+
+
+def _QA_local_meta(code_path):
+    with open(os.path.join(code_path, 'meta.json'), 'r') as f:
+        return json.load(f)
+
+
+def _QA_local_load(code_path, mmap_mode='r'):
+    """读取一个代码目录
+
+    Returns:
+        (datetime, {field: ndarray}, meta), 目录不存在返回 None
+    """
+    if not os.path.exists(os.path.join(code_path, 'meta.json')):
+        return None
+    meta = _QA_local_meta(code_path)
+    datetime = np.load(
+        os.path.join(code_path,
+                     'datetime.npy'),
+        mmap_mode=mmap_mode
+    )
+    columns = {
+        field: np.load(
+            os.path.join(code_path,
+                         '{}.npy'.format(field)),
+            mmap_mode=mmap_mode
+        ) for field in meta['fields']
+    }
+    return datetime, columns, meta
+
+
+def QA_fetch_local_last_datetime(code, market='stock', frequence='day', path=None):
+    '本地库中某个代码最后一根 bar 的时间, 没有数据返回 None'
+    res = _QA_local_load(_QA_local_path(market, frequence, code, path))
+    if res is None or len(res[0]) == 0:
+        return None
+    return pd.Timestamp(res[0][-1])
+
+
+def QA_fetch_local_codes(market='stock', frequence='day', path=None):
+    '本地库中已经保存的代码'
+    root = _QA_local_path(market, frequence, path=path)
+    if not os.path.isdir(root):
+        return []
+    return sorted(
+        item for item in os.listdir(root)
+        if os.path.exists(os.path.join(root,
+                                       item,
+                                       'meta.json'))
+    )
+
+
+def QA_fetch_local(code, start=None, end=None, market='stock', frequence='day', path=None):
+    """从本地列式库读取 [start, end] 的行情
+
+    Arguments:
+        code {str/list} -- 代码
+
+    Keyword Arguments:
+        start {str} -- 开始时间, None 表示不限制 (default: {None})
+        end {str} -- 结束时间, None 表示不限制, 分钟线只给日期时取到当天收盘 (default: {None})
+        market {str} -- stock/index/future (default: {'stock'})
+        frequence {str} -- day/1min/5min/15min/30min/60min (default: {'day'})
+        path {str} -- 本地库的根目录 (default: {datastore_path})
+
+    Returns:
+        _quotation_columns -- 没有数据返回 None
+    """
+    start = None if start in [None, 'all'] else np.datetime64(pd.Timestamp(start), 'ns')
+    if end is not None:
+        if frequence != 'day' and len(str(end)) == 10:
+            end = '{} 23:59:59'.format(end)
+        end = np.datetime64(pd.Timestamp(end), 'ns')
+
+    blocks = []
+    for item in sorted(set(QA_util_code_tolist(code))):
+        res = _QA_local_load(_QA_local_path(market, frequence, item, path))
+        if res is None:
+            continue
+        datetime, columns, meta = res
+        lo = 0 if start is None else np.searchsorted(datetime, start, side='left')
+        hi = len(datetime) if end is None else np.searchsorted(
+            datetime,
+            end,
+            side='right'
+        )
+        if hi > lo:
+            blocks.append(
+                (item,
+                 datetime[lo:hi],
+                 {field: col[lo:hi] for field,
+                  col in columns.items()},
+                 meta)
+            )
+    if len(blocks) == 0:
+        return None
+
+    offsets = np.zeros(len(blocks) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(block[1]) for block in blocks])
+    if len(blocks) == 1:
+        # 单个代码: 直接用 mmap 的切片
+        datetime, columns, fields = blocks[0][1], blocks[0][2], blocks[0][3]['fields']
+    else:
+        datetime, columns, fields = _QA_local_concat(blocks, offsets)
+    return _quotation_columns(
+        datetime,
+        np.array([block[0] for block in blocks],
+                 dtype=object),
+        offsets,
+        columns,
+        fields,
+        blocks[0][3]['index_names']
+    )
+
+
+def _QA_local_concat(blocks, offsets):
+    """多个代码的切片合并成连续的列
+
+    每个代码按自己的 meta 读取, 字段取并集(按出现的先后), 某个代码没有的字段填 NaN,
+    dtype 按所有代码提升 (比如不同长度的定长字符串); 每一列只分配一次, 从 mmap 直接拷贝进去
+    """
+    fields = []
+    dtypes = {}
+    for block in blocks:
+        for field in block[3]['fields']:
+            dtype = block[2][field].dtype
+            if field not in dtypes:
+                fields.append(field)
+                dtypes[field] = dtype
+            elif dtypes[field].kind == dtype.kind or \
+                    (dtypes[field].kind in 'biuf' and dtype.kind in 'biuf'):
+                dtypes[field] = np.promote_types(dtypes[field], dtype)
+            else:
+                dtypes[field] = np.dtype(object)
+    for field in fields:
+        if any(field not in block[2] for block in blocks):
+            dtypes[field] = np.result_type(dtypes[field], np.float64) \
+                if dtypes[field].kind in 'biuf' else np.dtype(object)
+
+    datetime = np.empty(offsets[-1], dtype='datetime64[ns]')
+    columns = {
+        field: np.empty(offsets[-1],
+                        dtype=dtypes[field])
+        for field in fields
+    }
+    for i, block in enumerate(blocks):
+        lo, hi = offsets[i], offsets[i + 1]
+        datetime[lo:hi] = block[1]
+        for field in fields:
+            columns[field][lo:hi] = block[2][field] if field in block[2] else np.nan
+    return datetime, columns, fields
+
+
+def QA_fetch_local_adv(code, start=None, end=None, market='stock', frequence='day', path=None):
+    """从本地列式库读取行情, 返回列式存储的 QA_DataStruct
+
+    参数同 QA_fetch_local, 没有数据返回 None
+    """
+    try:
+        Struct, dtype, if_fq = _LOCAL_DATASTRUCT[
+            (market, 'day' if frequence == 'day' else 'min')
+        ]
+    except KeyError:
+        raise ValueError('QA LOCAL DONOT SUPPORT MARKET {}'.format(market))
+    columns = QA_fetch_local(code, start, end, market, frequence, path)
+    if columns is None:
+        return None
+    return Struct.from_columns(
+        columns,
+        dtype,
+        if_fq=if_fq,
+        frequence=frequence
+    )
+
+
+def QA_fetch_stock_day_local_adv(code, start=None, end=None, path=None):
+    return QA_fetch_local_adv(code, start, end, 'stock', 'day', path)
+
+
+def QA_fetch_stock_min_local_adv(code, start=None, end=None, frequence='1min', path=None):
+    return QA_fetch_local_adv(code, start, end, 'stock', frequence, path)
+
+
+def QA_fetch_index_day_local_adv(code, start=None, end=None, path=None):
+    return QA_fetch_local_adv(code, start, end, 'index', 'day', path)
+
+
+def QA_fetch_index_min_local_adv(code, start=None, end=None, frequence='1min', path=None):
+    return QA_fetch_local_adv(code, start, end, 'index', frequence, path)
+
+
+def QA_fetch_future_day_local_adv(code, start=None, end=None, path=None):
+    return QA_fetch_local_adv(code, start, end, 'future', 'day', path)
+
+
+def QA_fetch_future_min_local_adv(code, start=None, end=None, frequence='1min', path=None):
+    return QA_fetch_local_adv(code, start, end, 'future', frequence, path)
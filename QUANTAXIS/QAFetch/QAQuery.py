@@ -29,7 +29,8 @@ import numpy
 import pandas as pd
 from pandas import DataFrame
 
-from QUANTAXIS.QAUtil import (DATABASE, QA_Setting, QA_util_date_stamp,
+from QUANTAXIS.QAUtil import (DATABASE, QA_Setting, QA_util_cursor_to_columns,
+                              QA_util_date_stamp,
                               QA_util_date_valid, QA_util_dict_remove_key,
                               QA_util_log_info, QA_util_code_tolist, QA_util_date_str2int, QA_util_date_int2str,
                               QA_util_sql_mongo_sort_DESCENDING,
@@ -42,12 +43,47 @@ from QUANTAXIS.QAData.financial_mean import financial_dict
 
 2018-07-30 修改 增加batch_size  可以做到8MB/S-30mb/s的传输速度
 
+QA_fetch_stock_day/QA_fetch_stock_min 增加 streaming 参数, 只取需要的字段,
+cursor 分批直接解码成 numpy 列(QA_util_cursor_to_columns), 大量分钟线的时候内存和速度都好很多
+
 """
 
+_QUOTATION_DTYPES = {
+    'open': 'float64',
+    'high': 'float64',
+    'low': 'float64',
+    'close': 'float64',
+    'vol': 'float64',
+    'amount': 'float64',
+    'date': 'datetime64[ns]',
+    'datetime': 'datetime64[ns]'
+}
+
+
+def _QA_fetch_quotation_columns(cursor, fields):
+    """按字段分批解码行情 cursor, vol 改名为 volume
+
+    没有数据返回 None
+    """
+    res = QA_util_cursor_to_columns(cursor, fields, _QUOTATION_DTYPES)
+    if len(res[fields[0]]) == 0:
+        return None
+    res['volume'] = res.pop('vol')
+    return pd.DataFrame(
+        res,
+        columns=[
+            'volume' if field == 'vol' else field for field in fields
+        ]
+    )
+
 
-def QA_fetch_stock_day(code, start, end, format='numpy', frequence='day', collections=DATABASE.stock_day):
+def QA_fetch_stock_day(code, start, end, format='numpy', frequence='day', collections=DATABASE.stock_day, streaming=False):
     """'获取股票日线'
 
+    Keyword Arguments:
+        streaming {bool} -- 只取 code/open/high/low/close/vol/amount/date 字段,
+                            cursor 分批解码成 numpy 列再一次生成 DataFrame, 结果一致 (default: {False})
+
     Returns:
         [type] -- [description]
 
@@ -65,20 +101,28 @@ def QA_fetch_stock_day(code, start, end, format='numpy', frequence='day', collec
 
     if QA_util_date_valid(end):
 
+        fields = ['code', 'open', 'high', 'low', 'close', 'vol', 'amount', 'date']
+        projection = dict({field: 1 for field in fields}, _id=0) if streaming else {"_id": 0}
         cursor = collections.find({
             'code': {'$in': code}, "date_stamp": {
                 "$lte": QA_util_date_stamp(end),
-                "$gte": QA_util_date_stamp(start)}}, {"_id": 0}, batch_size=10000)
+                "$gte": QA_util_date_stamp(start)}}, projection, batch_size=10000)
         #res=[QA_util_dict_remove_key(data, '_id') for data in cursor]
 
-        res = pd.DataFrame([item for item in cursor])
-        try:
-            res = res.assign(volume=res.vol, date=pd.to_datetime(
-                res.date)).drop_duplicates((['date', 'code'])).query('volume>1').set_index('date', drop=False)
-            res = res.loc[:, ['code', 'open', 'high', 'low',
-                             'close', 'volume', 'amount', 'date']]
-        except:
-            res = None
+        if streaming:
+            res = _QA_fetch_quotation_columns(cursor, fields)
+            if res is not None:
+                res = res.drop_duplicates((['date', 'code'])).query(
+                    'volume>1').set_index('date', drop=False)
+        else:
+            res = pd.DataFrame([item for item in cursor])
+            try:
+                res = res.assign(volume=res.vol, date=pd.to_datetime(
+                    res.date)).drop_duplicates((['date', 'code'])).query('volume>1').set_index('date', drop=False)
+                res = res.loc[:, ['code', 'open', 'high', 'low',
+                                 'close', 'volume', 'amount', 'date']]
+            except:
+                res = None
         if format in ['P', 'p', 'pandas', 'pd']:
             return res
         elif format in ['json', 'dict']:
@@ -96,8 +140,13 @@ def QA_fetch_stock_day(code, start, end, format='numpy', frequence='day', collec
             'QA Error QA_fetch_stock_day data parameter start=%s end=%s is not right' % (start, end))
 
 
-def QA_fetch_stock_min(code, start, end, format='numpy', frequence='1min', collections=DATABASE.stock_min):
-    '获取股票分钟线'
+def QA_fetch_stock_min(code, start, end, format='numpy', frequence='1min', collections=DATABASE.stock_min, streaming=False):
+    """'获取股票分钟线'
+
+    Keyword Arguments:
+        streaming {bool} -- 只取 code/open/high/low/close/vol/amount/datetime/type 字段,
+                            cursor 分批解码成 numpy 列再一次生成 DataFrame (default: {False})
+    """
     if frequence in ['1min', '1m']:
         frequence = '1min'
     elif frequence in ['5min', '5m']:
@@ -115,20 +164,28 @@ def QA_fetch_stock_min(code, start, end, format='numpy', frequence='1min', colle
     # code checking
     code = QA_util_code_tolist(code)
 
+    fields = ['code', 'open', 'high', 'low', 'close', 'vol', 'amount', 'datetime', 'type']
+    projection = dict({field: 1 for field in fields}, _id=0) if streaming else {"_id": 0}
     cursor = collections.find({
         'code': {'$in': code}, "time_stamp": {
             "$gte": QA_util_time_stamp(start),
             "$lte": QA_util_time_stamp(end)
         }, 'type': frequence
-    }, {"_id": 0}, batch_size=10000)
+    }, projection, batch_size=10000)
 
-    res = pd.DataFrame([item for item in cursor])
-    try:
-        res = res.assign(volume=res.vol, datetime=pd.to_datetime(
-            res.datetime)).query('volume>1').drop_duplicates(['datetime', 'code']).set_index('datetime', drop=False)
-        # return res
-    except:
-        res = None
+    if streaming:
+        res = _QA_fetch_quotation_columns(cursor, fields)
+        if res is not None:
+            res = res.query('volume>1').drop_duplicates(
+                ['datetime', 'code']).set_index('datetime', drop=False)
+    else:
+        res = pd.DataFrame([item for item in cursor])
+        try:
+            res = res.assign(volume=res.vol, datetime=pd.to_datetime(
+                res.datetime)).query('volume>1').drop_duplicates(['datetime', 'code']).set_index('datetime', drop=False)
+            # return res
+        except:
+            res = None
     if format in ['P', 'p', 'pandas', 'pd']:
         return res
     elif format in ['json', 'dict']:
@@ -181,8 +238,13 @@ def QA_fetch_stock_transaction(code, start, end, format='numpy', frequence='tick
         print("QA Error QA_fetch_stock_transaction format parameter %s is none of  \"P, p, pandas, pd , json, dict , n, N, numpy, list, l, L, !\" " % format)
         return None
 
-def QA_fetch_index_transaction(code, start, end, format='numpy', frequence='tick', collections=DATABASE.index_transaction):
-    '获取股票分钟线'
+def QA_fetch_index_transaction(code, start, end, format='numpy', frequence='tick', collections=DATABASE.index_transaction, streaming=False):
+    """'获取指数分笔'
+
+    Keyword Arguments:
+        streaming {bool} -- 只取 code/open/high/low/close/vol/amount/datetime/type 字段,
+                            cursor 分批解码成 numpy 列再一次生成 DataFrame (default: {False})
+    """
     if frequence in ['tick', 'TICK', 'transaction']:
         frequence = 'tick'
     else:
@@ -192,20 +254,28 @@ def QA_fetch_index_transaction(code, start, end, format='numpy', frequence='tick
     # code checking
     code = QA_util_code_tolist(code)
 
+    fields = ['code', 'open', 'high', 'low', 'close', 'vol', 'amount', 'datetime', 'type']
+    projection = dict({field: 1 for field in fields}, _id=0) if streaming else {"_id": 0}
     cursor = collections.find({
         'code': {'$in': code}, "time_stamp": {
             "$gte": QA_util_time_stamp(start),
             "$lte": QA_util_time_stamp(end)
         }, 'type': frequence
-    }, {"_id": 0}, batch_size=10000)
+    }, projection, batch_size=10000)
 
-    res = pd.DataFrame([item for item in cursor])
-    try:
-        res = res.assign(volume=res.vol, datetime=pd.to_datetime(
-            res.datetime)).query('volume>1').drop_duplicates(['datetime', 'code']).set_index('datetime', drop=False)
-        # return res
-    except:
-        res = None
+    if streaming:
+        res = _QA_fetch_quotation_columns(cursor, fields)
+        if res is not None:
+            res = res.query('volume>1').drop_duplicates(
+                ['datetime', 'code']).set_index('datetime', drop=False)
+    else:
+        res = pd.DataFrame([item for item in cursor])
+        try:
+            res = res.assign(volume=res.vol, datetime=pd.to_datetime(
+                res.datetime)).query('volume>1').drop_duplicates(['datetime', 'code']).set_index('datetime', drop=False)
+            # return res
+        except:
+            res = None
     if format in ['P', 'p', 'pandas', 'pd']:
         return res
     elif format in ['json', 'dict']:
@@ -23,7 +23,9 @@
 # SOFTWARE.
 
 import datetime
+import os
 import re
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import pymongo
 import pandas as pd
 from pandas import DataFrame
@@ -35,6 +37,7 @@ from QUANTAXIS.QAData import (QA_DataStruct_Index_day, QA_DataStruct_Index_min,
                               QA_DataStruct_Stock_transaction,
                               QA_DataStruct_Index_min, QA_DataStruct_Index_transaction
                               )
+from QUANTAXIS.QAFetch.QACache import QA_fetch_cache
 from QUANTAXIS.QAFetch.QAQuery import (QA_fetch_index_day,
                                        QA_fetch_index_min,
                                        QA_fetch_index_transaction,
@@ -52,8 +55,9 @@ from QUANTAXIS.QAFetch.QAQuery import (QA_fetch_index_day,
                                        QA_fetch_stock_divyield
                                        )
 from QUANTAXIS.QAUtil.QADate import month_data
-from QUANTAXIS.QAUtil import (DATABASE, QA_Setting, QA_util_date_stamp,
+from QUANTAXIS.QAUtil import (DATABASE, QASETTING, QA_Setting, QA_util_date_stamp,
                               QA_util_date_valid, QA_util_log_info,
+                              QA_util_code_tolist, QA_util_sql_mongo_setting,
                               QA_util_time_stamp, QA_util_getBetweenQuarter,
                               QA_util_datetime_to_strdate, QA_util_add_months)
 
@@ -72,12 +76,110 @@ _Index_day
 _Index_min
 """
 
+# 进程池里每个进程自己的 MongoClient (pymongo 的 client 不能跨 fork 使用)
+_SHARD_CLIENT = {}
+
+
+def _QA_fetch_shard_client():
+    client = _SHARD_CLIENT.get(os.getpid())
+    if client is None:
+        client = QA_util_sql_mongo_setting(QASETTING.mongo_uri)
+        _SHARD_CLIENT.clear()
+        _SHARD_CLIENT[os.getpid()] = client
+    return client
+
+
+def _QA_fetch_shard(func, collections, code, start, end, kwargs):
+    """取一块数据, collections 为 (数据库名, 表名) 时在当前进程的 client 上取表
+    """
+    if isinstance(collections, tuple):
+        collections = _QA_fetch_shard_client()[collections[0]][collections[1]]
+    try:
+        return func(code, start, end, format='pd', collections=collections, **kwargs)
+    except KeyError:
+        # QA_fetch_index_min 之类的函数在没有数据时会 KeyError, 切块之后空块很常见
+        return None
+
+
+def _QA_split_date_range(start, end, date_shards):
+    """把 [start, end] 按天切成 date_shards 段, 段与段之间不重叠
+
+    start/end 是日期时返回日期, 是时间时中间的分段为 'YYYY-MM-DD 00:00:00' ~ 'YYYY-MM-DD 23:59:59'
+    """
+    days = pd.date_range(str(start)[0:10], str(end)[0:10]).strftime('%Y-%m-%d').tolist()
+    date_shards = max(min(date_shards, len(days)), 1)
+    step = -(-len(days) // date_shards)
+    res = []
+    for i in range(0, len(days), step):
+        first, last = days[i], days[min(i + step, len(days)) - 1]
+        if len(str(start)) > 10:
+            first = str(start) if i == 0 else '{} 00:00:00'.format(first)
+            last = str(end) if i + step >= len(days) else '{} 23:59:59'.format(last)
+        res.append((first, last))
+    return res
+
+
+def _QA_fetch_sharded(
+        func,
+        code,
+        start,
+        end,
+        collections,
+        max_workers=4,
+        shard_size=100,
+        date_shards=1,
+        use_process=False,
+        **kwargs
+):
+    """按代码(和日期)切块, 用有界的线程池/进程池并行取数, 拼成一个 DataFrame
+
+    线程池共用 collections 所在的 MongoClient (pymongo 自带连接池, 线程安全);
+    进程池每个进程按 QASETTING.mongo_uri 建一个 client, 在进程内复用
+
+    Arguments:
+        func {function} -- QA_fetch_stock_day/QA_fetch_stock_min 等, 需要支持 format='pd' 和 collections 参数
+        code {str/list} -- 代码
+        collections {pymongo.collection.Collection} -- 表
+
+    Keyword Arguments:
+        max_workers {int} -- 线程/进程数 (default: {4})
+        shard_size {int} -- 每块的代码个数 (default: {100})
+        date_shards {int} -- 日期切成几段 (default: {1})
+        use_process {bool} -- 用进程池, 解码 DataFrame 的部分也能并行 (default: {False})
+
+    Returns:
+        pd.DataFrame -- 没有数据返回 None
+    """
+    code = QA_util_code_tolist(code, auto_fill=False) or list(code)
+    shard_size = max(int(shard_size), 1)
+    dates = _QA_split_date_range(start, end, date_shards)
+    shards = [(code[i:i + shard_size], first, last)
+              for i in range(0, len(code), shard_size)
+              for first, last in dates]
+    if len(shards) == 0:
+        return None
+
+    if use_process:
+        executor = ProcessPoolExecutor(max_workers=max_workers)
+        collections = (collections.database.name, collections.name)
+    else:
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+    with executor:
+        jobs = [
+            executor.submit(_QA_fetch_shard, func, collections, item, first, last, kwargs)
+            for item, first, last in shards
+        ]
+        res = [job.result() for job in jobs]
+    res = [item for item in res if item is not None and len(item) > 0]
+    if len(res) == 0:
+        return None
+    return pd.concat(res, sort=False)
+
 
 def QA_fetch_option_day_adv(
         code,
         start='all', end=None,
         if_drop_index=True,
-        # 🛠 todo collections 参数没有用到， 且数据库是固定的， 这个变量后期去掉
         collections=DATABASE.option_day):
     '''
 
@@ -89,8 +191,12 @@ def QA_fetch_stock_day_adv(
         code,
         start='all', end=None,
         if_drop_index=True,
-        # 🛠 todo collections 参数没有用到， 且数据库是固定的， 这个变量后期去掉
-        collections=DATABASE.stock_day):
+        collections=DATABASE.stock_day,
+        max_workers=None,
+        shard_size=100,
+        date_shards=1,
+        use_process=False,
+        use_cache=False):
     '''
 
     :param code:  股票代码
@@ -98,6 +204,11 @@ def QA_fetch_stock_day_adv(
     :param end:   结束日期
     :param if_drop_index:
     :param collections: 默认数据库
+    :param max_workers: 并行取数的线程/进程数, None 为不切块直接查询
+    :param shard_size: 每块的代码个数
+    :param date_shards: 日期切成几段
+    :param use_process: 用进程池代替线程池
+    :param use_cache: 使用进程内缓存 QA_fetch_cache (只缓存今天之前的数据, 默认关闭)
     :return: 如果股票代码不存 或者开始结束日期不存在 在返回 None ，合法返回 QA_DataStruct_Stock_day 数据
     '''
     '获取股票日线'
@@ -109,7 +220,19 @@ def QA_fetch_stock_day_adv(
         start = '1990-01-01'
         end = str(datetime.date.today())
 
-    res = QA_fetch_stock_day(code, start, end, format='pd')
+    def fetch(code, start, end):
+        if max_workers is None:
+            return QA_fetch_stock_day(code, start, end, format='pd',
+                                      collections=collections, streaming=True)
+        return _QA_fetch_sharded(
+            QA_fetch_stock_day, code, start, end, collections, max_workers,
+            shard_size, date_shards, use_process, streaming=True)
+
+    if use_cache:
+        res = QA_fetch_cache.fetch(
+            'stock_day', collections, 'day', code, start, end, fetch, 'date')
+    else:
+        res = fetch(code, start, end)
     if res is None:
         # 🛠 todo 报告是代码不合法，还是日期不合法
         print(
@@ -129,8 +252,12 @@ def QA_fetch_stock_min_adv(
         start, end=None,
         frequence='1min',
         if_drop_index=True,
-        # 🛠 todo collections 参数没有用到， 且数据库是固定的， 这个变量后期去掉
-        collections=DATABASE.stock_min):
+        collections=DATABASE.stock_min,
+        max_workers=None,
+        shard_size=100,
+        date_shards=1,
+        use_process=False,
+        use_cache=False):
     '''
     '获取股票分钟线'
     :param code:  字符串str eg 600085
@@ -139,6 +266,11 @@ def QA_fetch_stock_min_adv(
     :param frequence: 字符串str 分钟线的类型 支持 1min 1m 5min 5m 15min 15m 30min 30m 60min 60m 类型
     :param if_drop_index: Ture False ， dataframe drop index or not
     :param collections: mongodb 数据库
+    :param max_workers: 并行取数的线程/进程数, None 为不切块直接查询
+    :param shard_size: 每块的代码个数
+    :param date_shards: 日期切成几段
+    :param use_process: 用进程池代替线程池
+    :param use_cache: 使用进程内缓存 QA_fetch_cache (只缓存今天之前的数据, 默认关闭)
     :return: QA_DataStruct_Stock_min 类型
     '''
     if frequence in ['1min', '1m']:
@@ -174,8 +306,20 @@ def QA_fetch_stock_min_adv(
 
     # 🛠 todo 报告错误 如果开始时间 在 结束时间之后
 
-    res = QA_fetch_stock_min(
-        code, start, end, format='pd', frequence=frequence)
+    def fetch(code, start, end):
+        if max_workers is None:
+            return QA_fetch_stock_min(
+                code, start, end, format='pd', frequence=frequence,
+                collections=collections, streaming=True)
+        return _QA_fetch_sharded(
+            QA_fetch_stock_min, code, start, end, collections, max_workers,
+            shard_size, date_shards, use_process, frequence=frequence, streaming=True)
+
+    if use_cache:
+        res = QA_fetch_cache.fetch(
+            'stock_min', collections, frequence, code, start, end, fetch, 'datetime')
+    else:
+        res = fetch(code, start, end)
     if res is None:
         print(
             "QA Error QA_fetch_stock_min_adv parameter code=%s , start=%s, end=%s frequence=%s call QA_fetch_stock_min return None" % (
@@ -211,14 +355,15 @@ def QA_fetch_index_day_adv(
         code,
         start, end=None,
         if_drop_index=True,
-        # 🛠 todo collections 参数没有用到， 且数据库是固定的， 这个变量后期去掉
-        collections=DATABASE.index_day):
+        collections=DATABASE.index_day,
+        use_cache=False):
     '''
     :param code: code:  字符串str eg 600085
     :param start:  字符串str 开始日期 eg 2011-01-01
     :param end:  字符串str 结束日期 eg 2011-05-01
     :param if_drop_index: Ture False ， dataframe drop index or not
     :param collections:  mongodb 数据库
+    :param use_cache: 使用进程内缓存 QA_fetch_cache (只缓存今天之前的数据, 默认关闭)
     :return:
     '''
     '获取指数日线'
@@ -229,7 +374,14 @@ def QA_fetch_index_day_adv(
     # 🛠 todo 报告错误 如果开始时间 在 结束时间之后
     # 🛠 todo 如果相等
 
-    res = QA_fetch_index_day(code, start, end, format='pd')
+    def fetch(code, start, end):
+        return QA_fetch_index_day(code, start, end, format='pd', collections=collections)
+
+    if use_cache:
+        res = QA_fetch_cache.fetch(
+            'index_day', collections, 'day', code, start, end, fetch, 'date')
+    else:
+        res = fetch(code, start, end)
     if res is None:
         print(
             "QA Error QA_fetch_index_day_adv parameter code=%s start=%s end=%s call QA_fetch_index_day return None" % (
@@ -248,7 +400,12 @@ def QA_fetch_index_min_adv(
         start, end=None,
         frequence='1min',
         if_drop_index=True,
-        collections=DATABASE.index_min):
+        collections=DATABASE.index_min,
+        max_workers=None,
+        shard_size=100,
+        date_shards=1,
+        use_process=False,
+        use_cache=False):
     '''
     '获取股票分钟线'
     :param code:
@@ -257,6 +414,11 @@ def QA_fetch_index_min_adv(
     :param frequence:
     :param if_drop_index:
     :param collections:
+    :param max_workers: 并行取数的线程/进程数, None 为不切块直接查询
+    :param shard_size: 每块的代码个数
+    :param date_shards: 日期切成几段
+    :param use_process: 用进程池代替线程池
+    :param use_cache: 使用进程内缓存 QA_fetch_cache (只缓存今天之前的数据, 默认关闭)
     :return:
     '''
     if frequence in ['1min', '1m']:
@@ -285,8 +447,20 @@ def QA_fetch_index_min_adv(
     # print("QA Error QA_fetch_index_min_adv parameter code=%s , start=%s, end=%s is equal, should have time span! " % (code, start, end))
     # return None
 
-    res = QA_fetch_index_min(
-        code, start, end, format='pd', frequence=frequence)
+    def fetch(code, start, end):
+        if max_workers is None:
+            return QA_fetch_index_min(
+                code, start, end, format='pd', frequence=frequence,
+                collections=collections)
+        return _QA_fetch_sharded(
+            QA_fetch_index_min, code, start, end, collections, max_workers,
+            shard_size, date_shards, use_process, frequence=frequence)
+
+    if use_cache:
+        res = QA_fetch_cache.fetch(
+            'index_min', collections, frequence, code, start, end, fetch, 'datetime')
+    else:
+        res = fetch(code, start, end)
     if res is None:
         print(
             "QA Error QA_fetch_index_min_adv parameter code=%s start=%s end=%s frequence=%s call QA_fetch_index_min return None" % (
@@ -325,7 +499,8 @@ def QA_fetch_stock_transaction_adv(code, start, end=None, frequence='tick', if_d
     # 🛠 todo 报告错误 如果开始时间 在 结束时间之后
 
     res = QA_fetch_stock_transaction(
-        code, start, end, format='pd', frequence=frequence)
+        code, start, end, format='pd', frequence=frequence,
+        collections=collections)
     if res is None:
         print("QA Error QA_fetch_stock_transaction_adv parameter code=%s , start=%s, end=%s frequence=%s call QA_fetch_stock_transaction return None" % (
             code, start, end, frequence))
@@ -369,7 +544,8 @@ def QA_fetch_index_transaction_adv(code, start, end=None, frequence='tick', if_d
     # 🛠 todo 报告错误 如果开始时间 在 结束时间之后
 
     res = QA_fetch_index_transaction(
-        code, start, end, format='pd', frequence=frequence)
+        code, start, end, format='pd', frequence=frequence,
+        collections=collections)
     if res is None:
         print("QA Error QA_fetch_index_transaction_adv parameter code=%s , start=%s, end=%s frequence=%s call QA_fetch_index_transaction return None" % (
             code, start, end, frequence))
@@ -420,14 +596,15 @@ def QA_fetch_future_day_adv(
         code,
         start, end=None,
         if_drop_index=True,
-        # 🛠 todo collections 参数没有用到， 且数据库是固定的， 这个变量后期去掉
-        collections=DATABASE.index_day):
+        collections=DATABASE.future_day,
+        use_cache=False):
     '''
     :param code: code:  字符串str eg 600085
     :param start:  字符串str 开始日期 eg 2011-01-01
     :param end:  字符串str 结束日期 eg 2011-05-01
     :param if_drop_index: Ture False ， dataframe drop index or not
     :param collections:  mongodb 数据库
+    :param use_cache: 使用进程内缓存 QA_fetch_cache (只缓存今天之前的数据, 默认关闭)
     :return:
     '''
     '获取期货日线'
@@ -438,7 +615,15 @@ def QA_fetch_future_day_adv(
     # 🛠 todo 报告错误 如果开始时间 在 结束时间之后
     # 🛠 todo 如果相等
 
-    res = QA_fetch_future_day(code, start, end, format='pd')
+    def fetch(code, start, end):
+        return QA_fetch_future_day(code, start, end, format='pd', collections=collections)
+
+    if use_cache:
+        res = QA_fetch_cache.fetch(
+            'future_day', collections, 'day', code, start, end, fetch, 'date',
+            auto_fill=False)
+    else:
+        res = fetch(code, start, end)
     if res is None:
         print(
             "QA Error QA_fetch_future_day_adv parameter code=%s start=%s end=%s call QA_fetch_future_day return None" % (
@@ -456,7 +641,12 @@ def QA_fetch_future_min_adv(
         start, end=None,
         frequence='1min',
         if_drop_index=True,
-        collections=DATABASE.future_min):
+        collections=DATABASE.future_min,
+        max_workers=None,
+        shard_size=100,
+        date_shards=1,
+        use_process=False,
+        use_cache=False):
     '''
     '获取股票分钟线'
     :param code:
@@ -465,6 +655,11 @@ def QA_fetch_future_min_adv(
     :param frequence:
     :param if_drop_index:
     :param collections:
+    :param max_workers: 并行取数的线程/进程数, None 为不切块直接查询
+    :param shard_size: 每块的代码个数
+    :param date_shards: 日期切成几段
+    :param use_process: 用进程池代替线程池
+    :param use_cache: 使用进程内缓存 QA_fetch_cache (只缓存今天之前的数据, 默认关闭)
     :return:
     '''
     if frequence in ['1min', '1m']:
@@ -493,8 +688,21 @@ def QA_fetch_future_min_adv(
     # print("QA Error QA_fetch_index_min_adv parameter code=%s , start=%s, end=%s is equal, should have time span! " % (code, start, end))
     # return None
 
-    res = QA_fetch_future_min(
-        code, start, end, format='pd', frequence=frequence)
+    def fetch(code, start, end):
+        if max_workers is None:
+            return QA_fetch_future_min(
+                code, start, end, format='pd', frequence=frequence,
+                collections=collections)
+        return _QA_fetch_sharded(
+            QA_fetch_future_min, code, start, end, collections, max_workers,
+            shard_size, date_shards, use_process, frequence=frequence)
+
+    if use_cache:
+        res = QA_fetch_cache.fetch(
+            'future_min', collections, frequence, code, start, end, fetch, 'datetime',
+            auto_fill=False)
+    else:
+        res = fetch(code, start, end)
     if res is None:
         print(
             "QA Error QA_fetch_future_min_adv parameter code=%s start=%s end=%s frequence=%s call QA_fetch_future_min return None" % (
@@ -513,7 +721,7 @@ def QA_fetch_future_list_adv(collections=DATABASE.future_list):
     :param collections: mongodb 数据库
     :return: DataFrame
     '''
-    future_list_items = QA_fetch_future_list()
+    future_list_items = QA_fetch_future_list(collections)
     if len(future_list_items) == 0:
         print(
             "QA Error QA_fetch_future_list_adv call item for item in collections.find() return 0 item, maybe the DATABASE.future_list is empty!")
@@ -531,7 +739,7 @@ def QA_fetch_stock_block_adv(code=None, blockname=None, collections=DATABASE.sto
     '''
     if isinstance(blockname, (list,)) and len(blockname) > 0:
         reg_join = "|".join(blockname)
-        df = DataFrame([i for i in DATABASE.stock_block.aggregate([ \
+        df = DataFrame([i for i in collections.aggregate([ \
             {"$match": {"blockname": {"$regex": reg_join}}}, \
             {"$group": {"_id": "$code", "count": {"$sum": 1}, "blockname": {"$push": "$blockname"}}}, \
             {"$match": {"count": {"$gte": len(blockname)}}}, \
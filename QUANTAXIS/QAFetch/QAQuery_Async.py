@@ -23,119 +23,303 @@
 # SOFTWARE.
 
 
+"""
+QAQuery / QAQuery_Advance 的异步版本 (motor)
+
+每个异步函数都对应一个同名的同步函数, 参数和返回值完全一样, 只是 collections 换成了 motor 的表:
+
+    1. 先用一个记录查询的假表跑一遍同步函数, 拿到它要执行的 find/find_one/aggregate
+    2. 在 motor 上 await 这个查询
+    3. 把查到的文档交给同步函数原来的逻辑处理
+
+这样数据处理只有同步版本一份, 两边的结果不会不一致
+
+多个代码并发查询用 QA_fetch_async_gather / QA_fetch_async_multi, 同时进行的查询数有上限
+"""
+
 import asyncio
+import functools
 
-import numpy
 import pandas as pd
 from motor.motor_asyncio import (AsyncIOMotorClient, AsyncIOMotorCollection,
                                  AsyncIOMotorCursor)
 
-from QUANTAXIS.QAUtil import (QA_Setting, QA_util_code_tolist,
-                              QA_util_date_stamp, QA_util_date_str2int,
-                              QA_util_date_valid, QA_util_dict_remove_key,
-                              QA_util_log_info,
-                              QA_util_sql_mongo_sort_DESCENDING,
-                              QA_util_time_stamp, QA_util_to_json_from_pandas,
-                              trade_date_sse)
-from QUANTAXIS.QAUtil.QASetting import DATABASE, DATABASE_ASYNC
+from QUANTAXIS.QAFetch import QAQuery, QAQuery_Advance
+from QUANTAXIS.QAUtil.QASetting import DATABASE_ASYNC
 
 
+class _QA_query_captured(BaseException):
+    """同步函数发出了一个还没有结果的查询
 
+    继承 BaseException, 不会被同步函数里的 except Exception 吃掉
+    """
 
-async def QA_fetch_stock_day(code, start, end, format='numpy', frequence='day', collections=DATABASE_ASYNC.stock_day):
 
-    '获取股票日线'
-    start = str(start)[0:10]
-    end = str(end)[0:10]
+class _QA_query_recorder():
+    """记录同步函数对 collections 的调用
+
+    前 len(results) 次调用直接返回已经查好的结果, 下一次调用记下参数后中断同步函数
+    """
+
+    def __init__(self, results):
+        self.results = results
+        self.calls = 0
+        self.query = None
+
+    def _call(self, method, args, kwargs):
+        if self.calls < len(self.results):
+            self.calls += 1
+            return self.results[self.calls - 1]
+        self.query = (method, args, kwargs)
+        raise _QA_query_captured()
+
+    def find(self, *args, **kwargs):
+        return self._call('find', args, kwargs)
+
+    def find_one(self, *args, **kwargs):
+        return self._call('find_one', args, kwargs)
+
+    def aggregate(self, *args, **kwargs):
+        return self._call('aggregate', args, kwargs)
+
+    def count_documents(self, *args, **kwargs):
+        return self._call('count_documents', args, kwargs)
 
-    # code checking
-    code = QA_util_code_tolist(code)
 
-    if QA_util_date_valid(end):
+async def _QA_fetch_async(func, *args, collections, **kwargs):
+    """在 motor 的 collections 上执行同步函数 func
 
-        __data = []
-        cursor = collections.find({
-            'code': {'$in': code}, "date_stamp": {
-                "$lte": QA_util_date_stamp(end),
-                "$gte": QA_util_date_stamp(start)}})
+    func 的每一次查询都换成 await, 查询之间的逻辑(包括最后的数据处理)还是 func 自己的
+    有查询结果之后的重放要处理查到的文档, 放到线程池里执行, 不阻塞事件循环上的其他查询
+    """
+    loop = asyncio.get_event_loop()
+    results = []
+    while True:
+        recorder = _QA_query_recorder(results)
+        replay = functools.partial(func, *args, collections=recorder, **kwargs)
         try:
-            res = pd.DataFrame([item async for item in cursor])
-        except SyntaxError:
-            print('THIS PYTHON VERSION NOT SUPPORT "async for" function')
+            if len(results) == 0:
+                return replay()
+            return await loop.run_in_executor(None, replay)
+        except _QA_query_captured:
             pass
-        try:
-            res = res.drop('_id', axis=1).assign(volume=res.vol).query('volume>1').assign(date=pd.to_datetime(
-                res.date)).drop_duplicates((['date', 'code'])).set_index('date', drop=False)
-            res = res.ix[:, ['code', 'open', 'high', 'low',
-                             'close', 'volume', 'amount', 'date']]
-        except:
-            res = None
-        if format in ['P', 'p', 'pandas', 'pd']:
-            return res
-        elif format in ['json', 'dict']:
-            return QA_util_to_json_from_pandas(res)
-        # 多种数据格式
-        elif format in ['n', 'N', 'numpy']:
-            return numpy.asarray(res)
-        elif format in ['list', 'l', 'L']:
-            return numpy.asarray(res).tolist()
+        method, query_args, query_kwargs = recorder.query
+        if method in ['find', 'aggregate']:
+            res = await getattr(collections, method)(*query_args, **query_kwargs).to_list(length=None)
         else:
-            print("QA Error QA_fetch_stock_day format parameter %s is none of  \"P, p, pandas, pd , json, dict , n, N, numpy, list, l, L, !\" " % format)
+            res = await getattr(collections, method)(*query_args, **query_kwargs)
+        results.append(res)
+
+
+async def QA_fetch_async_gather(coroutines, concurrency=8):
+    """并发执行多个查询, 同时最多 concurrency 个, 返回的顺序和 coroutines 一致
+
+    Arguments:
+        coroutines {list} -- 还没有 await 的查询, 比如 [QA_fetch_stock_day(code, ...) for code in codes]
+
+    Keyword Arguments:
+        concurrency {int} -- 同时进行的查询数 (default: {8})
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def __run(coroutine):
+        async with semaphore:
+            return await coroutine
+
+    return await asyncio.gather(*[__run(coroutine) for coroutine in coroutines])
+
+
+async def QA_fetch_async_multi(func, code, *args, concurrency=8, **kwargs):
+    """每个代码单独查询, 最多 concurrency 个查询同时进行
+
+    func 是 _adv 函数时把结果合并成一个 QA_DataStruct, 否则返回和 code 对应的结果列表
+
+    Arguments:
+        func {coroutine function} -- 本模块里的异步查询函数
+        code {list} -- 代码列表
+    """
+    res = await QA_fetch_async_gather(
+        [func(item, *args, **kwargs) for item in code],
+        concurrency
+    )
+    if func.__name__.endswith('_adv'):
+        res = [item for item in res if item is not None]
+        if len(res) == 0:
             return None
-    else:
-        QA_util_log_info(
-            'QA Error QA_fetch_stock_day data parameter start=%s end=%s is not right' % (start, end))
+        return res[0].new(pd.concat([item.data for item in res], sort=False))
+    return res
 
 
-async def QA_fetch_stock_min(code, start, end, format='numpy', frequence='1min', collections=DATABASE_ASYNC.stock_min):
+# QAQuery
+
+
+async def QA_fetch_stock_day(code, start, end, format='numpy', frequence='day', collections=DATABASE_ASYNC.stock_day, streaming=False):
+    '获取股票日线'
+    return await _QA_fetch_async(QAQuery.QA_fetch_stock_day, code, start, end, format, frequence, collections=collections, streaming=streaming)
+
+
+async def QA_fetch_stock_min(code, start, end, format='numpy', frequence='1min', collections=DATABASE_ASYNC.stock_min, streaming=False):
     '获取股票分钟线'
-    if frequence in ['1min', '1m']:
-        frequence = '1min'
-    elif frequence in ['5min', '5m']:
-        frequence = '5min'
-    elif frequence in ['15min', '15m']:
-        frequence = '15min'
-    elif frequence in ['30min', '30m']:
-        frequence = '30min'
-    elif frequence in ['60min', '60m']:
-        frequence = '60min'
-    else:
-        print("QA Error QA_fetch_stock_min parameter frequence=%s is none of 1min 1m 5min 5m 15min 15m 30min 30m 60min 60m" % frequence)
-
-    __data = []
-    # code checking
-    code = QA_util_code_tolist(code)
-
-    cursor = collections.find({
-        'code': {'$in': code}, "time_stamp": {
-            "$gte": QA_util_time_stamp(start),
-            "$lte": QA_util_time_stamp(end)
-        }, 'type': frequence
-    })
-
-    try:
-        res = pd.DataFrame([item async for item in cursor])
-    except SyntaxError:
-        print('THIS PYTHON VERSION NOT SUPPORT "async for" function')
-        pass
-    try:
-        res = res.drop('_id', axis=1).assign(volume=res.vol).query('volume>1').assign(datetime=pd.to_datetime(
-            res.datetime)).drop_duplicates(['datetime', 'code']).set_index('datetime', drop=False)
-        # return res
-    except:
-        res = None
-    if format in ['P', 'p', 'pandas', 'pd']:
-        return res
-    elif format in ['json', 'dict']:
-        return QA_util_to_json_from_pandas(res)
-    # 多种数据格式
-    elif format in ['n', 'N', 'numpy']:
-        return numpy.asarray(res)
-    elif format in ['list', 'l', 'L']:
-        return numpy.asarray(res).tolist()
-    else:
-        print("QA Error QA_fetch_stock_min format parameter %s is none of  \"P, p, pandas, pd , json, dict , n, N, numpy, list, l, L, !\" " % format)
-        return None
+    return await _QA_fetch_async(QAQuery.QA_fetch_stock_min, code, start, end, format, frequence, collections=collections, streaming=streaming)
+
+
+async def QA_fetch_stock_transaction(code, start, end, format='numpy', frequence='tick', collections=DATABASE_ASYNC.stock_transaction):
+    '获取股票分笔'
+    return await _QA_fetch_async(QAQuery.QA_fetch_stock_transaction, code, start, end, format, frequence, collections=collections)
+
+
+async def QA_fetch_index_transaction(code, start, end, format='numpy', frequence='tick', collections=DATABASE_ASYNC.index_transaction, streaming=False):
+    '获取指数分笔'
+    return await _QA_fetch_async(QAQuery.QA_fetch_index_transaction, code, start, end, format, frequence, collections=collections, streaming=streaming)
+
+
+async def QA_fetch_stock_list(collections=DATABASE_ASYNC.stock_list):
+    '获取股票列表'
+    return await _QA_fetch_async(QAQuery.QA_fetch_stock_list, collections=collections)
+
+
+async def QA_fetch_etf_list(collections=DATABASE_ASYNC.etf_list):
+    '获取ETF列表'
+    return await _QA_fetch_async(QAQuery.QA_fetch_etf_list, collections=collections)
+
+
+async def QA_fetch_index_list(collections=DATABASE_ASYNC.index_list):
+    '获取指数列表'
+    return await _QA_fetch_async(QAQuery.QA_fetch_index_list, collections=collections)
+
+
+async def QA_fetch_stock_terminated(collections=DATABASE_ASYNC.stock_terminated):
+    '获取退市股票列表'
+    return await _QA_fetch_async(QAQuery.QA_fetch_stock_terminated, collections=collections)
+
+
+async def QA_fetch_stock_full(date, format='numpy', collections=DATABASE_ASYNC.stock_day):
+    '获取全市场的某一日的数据'
+    return await _QA_fetch_async(QAQuery.QA_fetch_stock_full, date, format, collections=collections)
+
+
+async def QA_fetch_index_day(code, start, end, format='numpy', collections=DATABASE_ASYNC.index_day):
+    '获取指数日线'
+    return await _QA_fetch_async(QAQuery.QA_fetch_index_day, code, start, end, format, collections=collections)
+
+
+async def QA_fetch_index_min(code, start, end, format='numpy', frequence='1min', collections=DATABASE_ASYNC.index_min):
+    '获取指数分钟线'
+    return await _QA_fetch_async(QAQuery.QA_fetch_index_min, code, start, end, format, frequence, collections=collections)
+
+
+async def QA_fetch_future_day(code, start, end, format='numpy', collections=DATABASE_ASYNC.future_day):
+    '获取期货日线'
+    return await _QA_fetch_async(QAQuery.QA_fetch_future_day, code, start, end, format, collections=collections)
+
+
+async def QA_fetch_future_min(code, start, end, format='numpy', frequence='1min', collections=DATABASE_ASYNC.future_min):
+    '获取期货分钟线'
+    return await _QA_fetch_async(QAQuery.QA_fetch_future_min, code, start, end, format, frequence, collections=collections)
+
+
+async def QA_fetch_future_list(collections=DATABASE_ASYNC.future_list):
+    '获取期货列表'
+    return await _QA_fetch_async(QAQuery.QA_fetch_future_list, collections=collections)
+
+
+async def QA_fetch_ctp_tick(code, start, end, frequence, format='pd', collections=DATABASE_ASYNC.ctp_tick):
+    '获取ctp tick'
+    return await _QA_fetch_async(QAQuery.QA_fetch_ctp_tick, code, start, end, frequence, format, collections=collections)
+
+
+async def QA_fetch_stock_xdxr(code, format='pd', collections=DATABASE_ASYNC.stock_xdxr):
+    '获取股票除权信息/数据库'
+    return await _QA_fetch_async(QAQuery.QA_fetch_stock_xdxr, code, format, collections=collections)
+
+
+async def QA_fetch_stock_block(code=None, format='pd', collections=DATABASE_ASYNC.stock_block):
+    '获取股票板块'
+    return await _QA_fetch_async(QAQuery.QA_fetch_stock_block, code, format, collections=collections)
+
+
+async def QA_fetch_stock_info(code, format='pd', collections=DATABASE_ASYNC.stock_info):
+    '获取股票基本信息'
+    return await _QA_fetch_async(QAQuery.QA_fetch_stock_info, code, format, collections=collections)
+
+
+async def QA_fetch_stock_name(code, collections=DATABASE_ASYNC.stock_list):
+    '获取股票名称'
+    return await _QA_fetch_async(QAQuery.QA_fetch_stock_name, code, collections=collections)
+
+
+async def QA_fetch_stock_financial_calendar(code, start, end=None, format='pd', collections=DATABASE_ASYNC.report_calendar):
+    '获取股票财报日历'
+    return await _QA_fetch_async(QAQuery.QA_fetch_stock_financial_calendar, code, start, end, format, collections=collections)
+
+
+async def QA_fetch_stock_divyield(code, start, end=None, format='pd', collections=DATABASE_ASYNC.stock_divyield):
+    '获取股票分红派息'
+    return await _QA_fetch_async(QAQuery.QA_fetch_stock_divyield, code, start, end, format, collections=collections)
+
+
+# QAQuery_Advance
+# 重放时 collections 是一次性的记录对象, 不经过 QA_fetch_cache
+
+
+async def QA_fetch_stock_day_adv(code, start='all', end=None, if_drop_index=True, collections=DATABASE_ASYNC.stock_day):
+    '获取股票日线, 返回 QA_DataStruct_Stock_day'
+    return await _QA_fetch_async(QAQuery_Advance.QA_fetch_stock_day_adv, code, start, end, if_drop_index, collections=collections, use_cache=False)
+
+
+async def QA_fetch_stock_min_adv(code, start, end=None, frequence='1min', if_drop_index=True, collections=DATABASE_ASYNC.stock_min):
+    '获取股票分钟线, 返回 QA_DataStruct_Stock_min'
+    return await _QA_fetch_async(QAQuery_Advance.QA_fetch_stock_min_adv, code, start, end, frequence, if_drop_index, collections=collections, use_cache=False)
+
+
+async def QA_fetch_index_day_adv(code, start, end=None, if_drop_index=True, collections=DATABASE_ASYNC.index_day):
+    '获取指数日线, 返回 QA_DataStruct_Index_day'
+    return await _QA_fetch_async(QAQuery_Advance.QA_fetch_index_day_adv, code, start, end, if_drop_index, collections=collections, use_cache=False)
+
+
+async def QA_fetch_index_min_adv(code, start, end=None, frequence='1min', if_drop_index=True, collections=DATABASE_ASYNC.index_min):
+    '获取指数分钟线, 返回 QA_DataStruct_Index_min'
+    return await _QA_fetch_async(QAQuery_Advance.QA_fetch_index_min_adv, code, start, end, frequence, if_drop_index, collections=collections, use_cache=False)
+
+
+async def QA_fetch_future_day_adv(code, start, end=None, if_drop_index=True, collections=DATABASE_ASYNC.future_day):
+    '获取期货日线, 返回 QA_DataStruct_Future_day'
+    return await _QA_fetch_async(QAQuery_Advance.QA_fetch_future_day_adv, code, start, end, if_drop_index, collections=collections, use_cache=False)
+
+
+async def QA_fetch_future_min_adv(code, start, end=None, frequence='1min', if_drop_index=True, collections=DATABASE_ASYNC.future_min):
+    '获取期货分钟线, 返回 QA_DataStruct_Future_min'
+    return await _QA_fetch_async(QAQuery_Advance.QA_fetch_future_min_adv, code, start, end, frequence, if_drop_index, collections=collections, use_cache=False)
+
+
+async def QA_fetch_stock_transaction_adv(code, start, end=None, frequence='tick', if_drop_index=True, collections=DATABASE_ASYNC.stock_transaction):
+    '获取股票分笔, 返回 QA_DataStruct_Stock_transaction'
+    return await _QA_fetch_async(QAQuery_Advance.QA_fetch_stock_transaction_adv, code, start, end, frequence, if_drop_index, collections=collections)
+
+
+async def QA_fetch_index_transaction_adv(code, start, end=None, frequence='tick', if_drop_index=True, collections=DATABASE_ASYNC.index_transaction):
+    '获取指数分笔, 返回 QA_DataStruct_Index_transaction'
+    return await _QA_fetch_async(QAQuery_Advance.QA_fetch_index_transaction_adv, code, start, end, frequence, if_drop_index, collections=collections)
+
+
+async def QA_fetch_stock_list_adv(collections=DATABASE_ASYNC.stock_list):
+    '获取股票列表'
+    return await _QA_fetch_async(QAQuery_Advance.QA_fetch_stock_list_adv, collections=collections)
+
+
+async def QA_fetch_index_list_adv(collections=DATABASE_ASYNC.index_list):
+    '获取指数列表'
+    return await _QA_fetch_async(QAQuery_Advance.QA_fetch_index_list_adv, collections=collections)
+
+
+async def QA_fetch_future_list_adv(collections=DATABASE_ASYNC.future_list):
+    '获取期货列表'
+    return await _QA_fetch_async(QAQuery_Advance.QA_fetch_future_list_adv, collections=collections)
+
+
+async def QA_fetch_stock_block_adv(code=None, blockname=None, collections=DATABASE_ASYNC.stock_block):
+    '获取股票板块, 返回 QA_DataStruct_Stock_block'
+    return await _QA_fetch_async(QAQuery_Advance.QA_fetch_stock_block_adv, code, blockname, collections=collections)
 
 
 if __name__ == "__main__":
@@ -148,3 +332,13 @@ if __name__ == "__main__":
     ))
 
     print(res)
+
+    # 30 只股票的分钟线, 同时最多 8 个查询
+    res = loop.run_until_complete(QA_fetch_async_multi(
+        QA_fetch_stock_min_adv,
+        ['{:06d}'.format(i) for i in range(1, 31)],
+        '2018-07-01', '2018-07-15',
+        concurrency=8
+    ))
+
+    print(res)
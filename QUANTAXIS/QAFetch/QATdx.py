@@ -38,6 +38,7 @@ from pytdx.hq import TdxHq_API
 from retrying import retry
 
 from QUANTAXIS.QAFetch.base import _select_market_code, _select_index_code, _select_type
+from QUANTAXIS.QAFetch.QATdxPool import QA_TdxPool
 from QUANTAXIS.QAUtil import (QA_Setting, QA_util_date_stamp,
                               QA_util_date_str2int, QA_util_date_valid,
                               QA_util_get_real_date, QA_util_get_real_datelist,
@@ -45,6 +46,8 @@ from QUANTAXIS.QAUtil import (QA_Setting, QA_util_date_stamp,
                               QA_util_future_to_tradedatetime,
                               QA_util_get_trade_gap, QA_util_log_info,
                               QA_util_time_stamp, QA_util_web_ping,
+                              QA_util_date_stamp_array, QA_util_time_stamp_array,
+                              QA_util_date_str_array, QA_util_datetime_str_array,
                               exclude_from_stock_ip_list, future_ip_list,
                               stock_ip_list, trade_date_sse)
 from QUANTAXIS.QAUtil.QASetting import QASETTING
@@ -261,6 +264,27 @@ def get_mainmarket_ip(ip, port):
     return ip, port
 
 
+def _QA_tdx_pool_servers(get_ip, ip_list):
+    '连接池第一次使用时才选择服务器: 最快的(select_best_ip)排第一, 其他服务器作为备选'
+    def servers():
+        ip, port = get_ip(None, None)
+        return [{'ip': ip, 'port': port}] + list(ip_list)
+    return servers
+
+
+# 全部 QA_fetch_get_* 共用的长连接池, ip=None 时按服务器分数选择
+QA_tdx_stock_pool = QA_TdxPool(
+    TdxHq_API,
+    servers=_QA_tdx_pool_servers(get_mainmarket_ip,
+                                 stock_ip_list)
+)
+QA_tdx_future_pool = QA_TdxPool(
+    TdxExHq_API,
+    servers=_QA_tdx_pool_servers(get_extensionmarket_ip,
+                                 future_ip_list)
+)
+
+
 @retry(stop_max_attempt_number=3, wait_random_min=50, wait_random_max=100)
 def QA_fetch_get_security_bars(code, _type, lens, ip=None, port=None):
     """按bar长度推算数据
@@ -274,9 +298,7 @@ def QA_fetch_get_security_bars(code, _type, lens, ip=None, port=None):
     Returns:
         [type] -- [description]
     """
-    ip, port = get_mainmarket_ip(ip, port)
-    api = TdxHq_API()
-    with api.connect(ip, port):
+    with QA_tdx_stock_pool.connect(ip, port) as api:
         data = pd.concat([api.to_df(
             api.get_security_bars(_select_type(_type), _select_market_code(
                 code), code, (i - 1) * 800, 800)) for i in
@@ -285,11 +307,9 @@ def QA_fetch_get_security_bars(code, _type, lens, ip=None, port=None):
             .drop(['year', 'month', 'day', 'hour', 'minute'], axis=1,
                   inplace=False) \
             .assign(datetime=pd.to_datetime(data['datetime']),
-                    date=data['datetime'].apply(lambda x: str(x)[0:10]),
-                    date_stamp=data['datetime'].apply(
-                        lambda x: QA_util_date_stamp(x)),
-                    time_stamp=data['datetime'].apply(
-                        lambda x: QA_util_time_stamp(x)),
+                    date=QA_util_date_str_array(data['datetime']),
+                    date_stamp=QA_util_date_stamp_array(data['datetime']),
+                    time_stamp=QA_util_time_stamp_array(data['datetime']),
                     type=_type, code=str(code)) \
             .set_index('datetime', drop=False, inplace=False).tail(lens)
         if data is not None:
@@ -316,10 +336,8 @@ def QA_fetch_get_stock_day(code, start_date, end_date, if_fq='00',
     Exception:
         如果出现网络问题/服务器拒绝, 会出现socket:time out 尝试再次获取/更换ip即可, 本函数不做处理
     """
-    ip, port = get_mainmarket_ip(ip, port)
-    api = TdxHq_API()
     try:
-        with api.connect(ip, port, time_out=0.7):
+        with QA_tdx_stock_pool.connect(ip, port) as api:
 
             if frequence in ['day', 'd', 'D', 'DAY', 'Day']:
                 frequence = 9
@@ -346,10 +364,9 @@ def QA_fetch_get_stock_day(code, start_date, end_date, if_fq='00',
             data = data[data['open'] != 0]
 
             data = data.assign(
-                date=data['datetime'].apply(lambda x: str(x[0:10])),
+                date=QA_util_date_str_array(data['datetime']),
                 code=str(code),
-                date_stamp=data['datetime'].apply(
-                    lambda x: QA_util_date_stamp(str(x)[0:10]))) \
+                date_stamp=QA_util_date_stamp_array(data['datetime'])) \
                 .set_index('date', drop=False, inplace=False)
 
             end_date = str(end_date)[0:10]
@@ -379,8 +396,6 @@ def QA_fetch_get_stock_day(code, start_date, end_date, if_fq='00',
 @retry(stop_max_attempt_number=3, wait_random_min=50, wait_random_max=100)
 def QA_fetch_get_stock_min(code, start, end, frequence='1min', ip=None,
                            port=None):
-    ip, port = get_mainmarket_ip(ip, port)
-    api = TdxHq_API()
     type_ = ''
     start_date = str(start)[0:10]
     today_ = datetime.date.today()
@@ -402,7 +417,7 @@ def QA_fetch_get_stock_min(code, start, end, frequence='1min', ip=None,
         lens = 4 * lens
     if lens > 20800:
         lens = 20800
-    with api.connect(ip, port):
+    with QA_tdx_stock_pool.connect(ip, port) as api:
 
         data = pd.concat(
             [api.to_df(
@@ -417,21 +432,17 @@ def QA_fetch_get_stock_min(code, start, end, frequence='1min', ip=None,
                   inplace=False) \
             .assign(datetime=pd.to_datetime(data['datetime']),
                     code=str(code),
-                    date=data['datetime'].apply(lambda x: str(x)[0:10]),
-                    date_stamp=data['datetime'].apply(
-                lambda x: QA_util_date_stamp(x)),
-                time_stamp=data['datetime'].apply(
-                lambda x: QA_util_time_stamp(x)),
+                    date=QA_util_date_str_array(data['datetime']),
+                    date_stamp=QA_util_date_stamp_array(data['datetime']),
+                time_stamp=QA_util_time_stamp_array(data['datetime']),
                 type=type_).set_index('datetime', drop=False,
                                       inplace=False)[start:end]
-        return data.assign(datetime=data['datetime'].apply(lambda x: str(x)))
+        return data.assign(datetime=QA_util_datetime_str_array(data['datetime']))
 
 
 @retry(stop_max_attempt_number=3, wait_random_min=50, wait_random_max=100)
 def QA_fetch_get_stock_latest(code, frequence='day', ip=None, port=None):
-    ip, port = get_mainmarket_ip(ip, port)
     code = [code] if isinstance(code, str) else code
-    api = TdxHq_API(multithread=True)
 
     if frequence in ['w', 'W', 'Week', 'week']:
         frequence = 5
@@ -454,15 +465,13 @@ def QA_fetch_get_stock_latest(code, frequence='day', ip=None, port=None):
     else:
         frequence = 9
 
-    with api.connect(ip, port):
+    with QA_tdx_stock_pool.connect(ip, port) as api:
         data = pd.concat([api.to_df(api.get_security_bars(
             frequence, _select_market_code(item), item, 0, 1)).assign(
             code=item) for item in code], axis=0, sort=False)
         return data \
-            .assign(date=pd.to_datetime(data['datetime']
-                                        .apply(lambda x: x[0:10])),
-                    date_stamp=data['datetime']
-                    .apply(lambda x: QA_util_date_stamp(str(x[0:10])))) \
+            .assign(date=pd.to_datetime(QA_util_date_str_array(data['datetime'])),
+                    date_stamp=QA_util_date_stamp_array(data['datetime'])) \
             .set_index('date', drop=False) \
             .drop(['year', 'month', 'day', 'hour', 'minute', 'datetime'],
                   axis=1)
@@ -470,7 +479,6 @@ def QA_fetch_get_stock_latest(code, frequence='day', ip=None, port=None):
 
 @retry(stop_max_attempt_number=3, wait_random_min=50, wait_random_max=100)
 def QA_fetch_get_stock_realtime(code=['000001', '000002'], ip=None, port=None):
-    ip, port = get_mainmarket_ip(ip, port)
     # reversed_bytes9 --> 涨速
     # active1,active2 --> 活跃度
     # reversed_bytes1 --> -价格*100
@@ -480,9 +488,8 @@ def QA_fetch_get_stock_realtime(code=['000001', '000002'], ip=None, port=None):
     # reversed_bytes2 市场
     # # reversed_bytes0 时间
 
-    api = TdxHq_API()
     __data = pd.DataFrame()
-    with api.connect(ip, port):
+    with QA_tdx_stock_pool.connect(ip, port) as api:
         code = [code] if isinstance(code, str) else code
         for id_ in range(int(len(code) / 80) + 1):
             __data = __data.append(api.to_df(api.get_security_quotes(
@@ -505,10 +512,8 @@ def QA_fetch_get_stock_realtime(code=['000001', '000002'], ip=None, port=None):
 
 @retry(stop_max_attempt_number=3, wait_random_min=50, wait_random_max=100)
 def QA_fetch_depth_market_data(code=['000001', '000002'], ip=None, port=None):
-    ip, port = get_mainmarket_ip(ip, port)
-    api = TdxHq_API()
     __data = pd.DataFrame()
-    with api.connect(ip, port):
+    with QA_tdx_stock_pool.connect(ip, port) as api:
         code = [code] if isinstance(code, str) else code
         for id_ in range(int(len(code) / 80) + 1):
             __data = __data.append(api.to_df(api.get_security_quotes(
@@ -615,9 +620,7 @@ def for_sh(code):
 
 @retry(stop_max_attempt_number=3, wait_random_min=50, wait_random_max=100)
 def QA_fetch_get_stock_list(type_='stock', ip=None, port=None):
-    ip, port = get_mainmarket_ip(ip, port)
-    api = TdxHq_API()
-    with api.connect(ip, port):
+    with QA_tdx_stock_pool.connect(ip, port) as api:
         data = pd.concat(
             [pd.concat([api.to_df(api.get_security_list(j, i * 1000)).assign(
                 sse='sz' if j == 0 else 'sh').set_index(
@@ -668,9 +671,7 @@ def QA_fetch_get_index_list(ip=None, port=None):
         [type] -- [description]
     """
 
-    ip, port = get_mainmarket_ip(ip, port)
-    api = TdxHq_API()
-    with api.connect(ip, port):
+    with QA_tdx_stock_pool.connect(ip, port) as api:
         data = pd.concat(
             [pd.concat([api.to_df(api.get_security_list(j, i * 1000)).assign(
                 sse='sz' if j == 0 else 'sh').set_index(
@@ -696,9 +697,7 @@ def QA_fetch_get_bond_list(ip=None, port=None):
         ip {[type]} -- [description] (default: {None})
         port {[type]} -- [description] (default: {None})
     """
-    ip, port = get_mainmarket_ip(ip, port)
-    api = TdxHq_API()
-    with api.connect(ip, port):
+    with QA_tdx_stock_pool.connect(ip, port) as api:
         data = pd.concat(
             [pd.concat([api.to_df(api.get_security_list(j, i * 1000)).assign(
                 sse='sz' if j == 0 else 'sh').set_index(
@@ -718,8 +717,6 @@ def QA_fetch_get_bond_list(ip=None, port=None):
 @retry(stop_max_attempt_number=3, wait_random_min=50, wait_random_max=100)
 def QA_fetch_get_bond_day(code, start_date, end_date, frequence='day', ip=None,
                           port=None):
-    ip, port = get_mainmarket_ip(ip, port)
-    api = TdxHq_API()
     if frequence in ['day', 'd', 'D', 'DAY', 'Day']:
         frequence = 9
     elif frequence in ['w', 'W', 'Week', 'week']:
@@ -731,7 +728,7 @@ def QA_fetch_get_bond_day(code, start_date, end_date, frequence='day', ip=None,
     elif frequence in ['y', 'Y', 'year', 'Year']:
         frequence = 11
 
-    with api.connect(ip, port):
+    with QA_tdx_stock_pool.connect(ip, port) as api:
 
         start_date = str(start_date)[0:10]
         today_ = datetime.date.today()
@@ -760,15 +757,14 @@ def QA_fetch_get_bond_day(code, start_date, end_date, frequence='day', ip=None,
                 code, (int(lens / 800) - i) * 800, 800))
                 for i in range(int(lens / 800) + 1)], axis=0, sort=False)
         data = data.assign(
-            date=data['datetime'].apply(lambda x: str(x[0:10]))).assign(
+            date=QA_util_date_str_array(data['datetime'])).assign(
             code=str(code)) \
-            .assign(date_stamp=data['datetime'].apply(
-                lambda x: QA_util_date_stamp(str(x)[0:10]))) \
+            .assign(date_stamp=QA_util_date_stamp_array(data['datetime'])) \
             .set_index('date', drop=False, inplace=False) \
             .assign(code=code) \
             .drop(['year', 'month', 'day', 'hour',
                    'minute', 'datetime'], axis=1)[start_date:end_date]
-        return data.assign(date=data['date'].apply(lambda x: str(x)[0:10]))
+        return data.assign(date=QA_util_date_str_array(data['date']))
 
 
 @retry(stop_max_attempt_number=3, wait_random_min=50, wait_random_max=100)
@@ -789,8 +785,6 @@ def QA_fetch_get_index_day(code, start_date, end_date, frequence='day',
         [type] -- [description]
     """
 
-    ip, port = get_mainmarket_ip(ip, port)
-    api = TdxHq_API()
     if frequence in ['day', 'd', 'D', 'DAY', 'Day']:
         frequence = 9
     elif frequence in ['w', 'W', 'Week', 'week']:
@@ -802,7 +796,7 @@ def QA_fetch_get_index_day(code, start_date, end_date, frequence='day',
     elif frequence in ['y', 'Y', 'year', 'Year']:
         frequence = 11
 
-    with api.connect(ip, port):
+    with QA_tdx_stock_pool.connect(ip, port) as api:
 
         start_date = str(start_date)[0:10]
         today_ = datetime.date.today()
@@ -819,23 +813,20 @@ def QA_fetch_get_index_day(code, start_date, end_date, frequence='day',
                 code, (int(lens / 800) - i) * 800, 800))
                 for i in range(int(lens / 800) + 1)], axis=0, sort=False)
         data = data.assign(
-            date=data['datetime'].apply(lambda x: str(x[0:10]))).assign(
+            date=QA_util_date_str_array(data['datetime'])).assign(
             code=str(code)) \
-            .assign(date_stamp=data['datetime'].apply(
-                lambda x: QA_util_date_stamp(str(x)[0:10]))) \
+            .assign(date_stamp=QA_util_date_stamp_array(data['datetime'])) \
             .set_index('date', drop=False, inplace=False) \
             .assign(code=code) \
             .drop(['year', 'month', 'day', 'hour',
                    'minute', 'datetime'], axis=1)[start_date:end_date]
-        return data.assign(date=data['date'].apply(lambda x: str(x)[0:10]))
+        return data.assign(date=QA_util_date_str_array(data['date']))
 
 
 @retry(stop_max_attempt_number=3, wait_random_min=50, wait_random_max=100)
 def QA_fetch_get_index_min(code, start, end, frequence='1min', ip=None,
                            port=None):
     '指数分钟线'
-    ip, port = get_mainmarket_ip(ip, port)
-    api = TdxHq_API()
     type_ = ''
 
     start_date = str(start)[0:10]
@@ -859,7 +850,7 @@ def QA_fetch_get_index_min(code, start, end, frequence='1min', ip=None,
 
     if lens > 20800:
         lens = 20800
-    with api.connect(ip, port):
+    with QA_tdx_stock_pool.connect(ip, port) as api:
 
         if str(code)[0] in ['5', '1']:  # ETF
             data = pd.concat([api.to_df(api.get_security_bars(
@@ -877,22 +868,18 @@ def QA_fetch_get_index_min(code, start, end, frequence='1min', ip=None,
             .drop(['year', 'month', 'day', 'hour', 'minute'], axis=1,
                   inplace=False) \
             .assign(code=code,
-                    date=data['datetime'].apply(lambda x: str(x)[0:10]),
-                    date_stamp=data['datetime'].apply(
-                        lambda x: QA_util_date_stamp(x)),
-                    time_stamp=data['datetime'].apply(
-                        lambda x: QA_util_time_stamp(x)),
+                    date=QA_util_date_str_array(data['datetime']),
+                    date_stamp=QA_util_date_stamp_array(data['datetime']),
+                    time_stamp=QA_util_time_stamp_array(data['datetime']),
                     type=type_).set_index('datetime', drop=False,
                                           inplace=False)[start:end]
         # data
-        return data.assign(datetime=data['datetime'].apply(lambda x: str(x)))
+        return data.assign(datetime=QA_util_datetime_str_array(data['datetime']))
 
 
 @retry(stop_max_attempt_number=3, wait_random_min=50, wait_random_max=100)
 def QA_fetch_get_index_latest(code, frequence='day', ip=None, port=None):
-    ip, port = get_mainmarket_ip(ip, port)
     code = [code] if isinstance(code, str) else code
-    api = TdxHq_API(multithread=True)
 
     if frequence in ['w', 'W', 'Week', 'week']:
         frequence = 5
@@ -915,7 +902,7 @@ def QA_fetch_get_index_latest(code, frequence='day', ip=None, port=None):
     else:
         frequence = 9
 
-    with api.connect(ip, port):
+    with QA_tdx_stock_pool.connect(ip, port) as api:
         data = []
         for item in code:
             if str(item)[0] in ['5', '1']:  # ETF
@@ -937,10 +924,8 @@ def QA_fetch_get_index_latest(code, frequence='day', ip=None, port=None):
                     code=item))
         data = pd.concat(data, axis=0, sort=False)
         return data \
-            .assign(date=pd.to_datetime(data['datetime']
-                                        .apply(lambda x: x[0:10])),
-                    date_stamp=data['datetime']
-                    .apply(lambda x: QA_util_date_stamp(str(x[0:10])))) \
+            .assign(date=pd.to_datetime(QA_util_date_str_array(data['datetime'])),
+                    date_stamp=QA_util_date_stamp_array(data['datetime'])) \
             .set_index('date', drop=False) \
             .drop(['year', 'month', 'day', 'hour', 'minute', 'datetime'],
                   axis=1)
@@ -971,12 +956,11 @@ def __QA_fetch_get_stock_transaction(code, day, retry, api):
                 datetime=pd.to_datetime(data_['time'].apply(
                     lambda x: str(day) + ' ' + x)),
                 code=str(code))
-            data_ = data_.assign(date_stamp=data_['datetime'].apply(lambda x: QA_util_date_stamp(x)),
-                                 time_stamp=data_['datetime'].apply(
-                                     lambda x: QA_util_time_stamp(x)),
+            data_ = data_.assign(date_stamp=QA_util_date_stamp_array(data_['datetime']),
+                                 time_stamp=QA_util_time_stamp_array(data_['datetime']),
                                  type=type_,
                                  order=range(len(data_.index))).set_index('datetime', drop=False)
-            data_['datetime'] = data_['datetime'].apply(lambda x: str(x)[0:19])
+            data_['datetime'] = QA_util_datetime_str_array(data_['datetime'])
             return data_
 
 
@@ -1005,12 +989,11 @@ def __QA_fetch_get_index_transaction(code, day, retry, api):
                 datetime=pd.to_datetime(data_['time'].apply(
                     lambda x: str(day) + ' ' + x)),
                 code=str(code))
-            data_ = data_.assign(date_stamp=data_['datetime'].apply(lambda x: QA_util_date_stamp(x)),
-                                 time_stamp=data_['datetime'].apply(
-                                     lambda x: QA_util_time_stamp(x)),
+            data_ = data_.assign(date_stamp=QA_util_date_stamp_array(data_['datetime']),
+                                 time_stamp=QA_util_time_stamp_array(data_['datetime']),
                                  type=type_,
                                  order=range(len(data_.index))).set_index('datetime', drop=False)
-            data_['datetime'] = data_['datetime'].apply(lambda x: str(x)[0:19])
+            data_['datetime'] = QA_util_datetime_str_array(data_['datetime'])
             return data_
 
 
@@ -1027,14 +1010,12 @@ def QA_fetch_get_stock_transaction(code, start, end, retry=2, ip=None,
     :return:
     '''
     '历史分笔成交 buyorsell 1--sell 0--buy 2--盘前'
-    ip, port = get_mainmarket_ip(ip, port)
-    api = TdxHq_API()
 
     real_start, real_end = QA_util_get_real_datelist(start, end)
     if real_start is None:
         return None
     real_id_range = []
-    with api.connect(ip, port):
+    with QA_tdx_stock_pool.connect(ip, port) as api:
         data = pd.DataFrame()
         for index_ in range(trade_date_sse.index(real_start),
                             trade_date_sse.index(real_end) + 1):
@@ -1056,7 +1037,7 @@ def QA_fetch_get_stock_transaction(code, start, end, retry=2, ip=None,
         if len(data) > 0:
 
             return data.assign(
-                datetime=data['datetime'].apply(lambda x: str(x)[0:19]))
+                datetime=QA_util_datetime_str_array(data['datetime']))
         else:
             return None
 
@@ -1074,14 +1055,12 @@ def QA_fetch_get_index_transaction(code, start, end, retry=2, ip=None,
     :return:
     '''
     '历史分笔成交 buyorsell 1--sell 0--buy 2--盘前'
-    ip, port = get_mainmarket_ip(ip, port)
-    api = TdxHq_API()
 
     real_start, real_end = QA_util_get_real_datelist(start, end)
     if real_start is None:
         return None
     real_id_range = []
-    with api.connect(ip, port):
+    with QA_tdx_stock_pool.connect(ip, port) as api:
         data = pd.DataFrame()
         for index_ in range(trade_date_sse.index(real_start),
                             trade_date_sse.index(real_end) + 1):
@@ -1103,7 +1082,7 @@ def QA_fetch_get_index_transaction(code, start, end, retry=2, ip=None,
         if len(data) > 0:
 
             return data.assign(
-                datetime=data['datetime'].apply(lambda x: str(x)[0:19]))
+                datetime=QA_util_datetime_str_array(data['datetime']))
         else:
             return None
 
@@ -1111,10 +1090,8 @@ def QA_fetch_get_index_transaction(code, start, end, retry=2, ip=None,
 @retry(stop_max_attempt_number=3, wait_random_min=50, wait_random_max=100)
 def QA_fetch_get_stock_transaction_realtime(code, ip=None, port=None):
     '实时分笔成交 包含集合竞价 buyorsell 1--sell 0--buy 2--盘前'
-    ip, port = get_mainmarket_ip(ip, port)
-    api = TdxHq_API()
     try:
-        with api.connect(ip, port):
+        with QA_tdx_stock_pool.connect(ip, port) as api:
             data = pd.DataFrame()
             data = pd.concat([api.to_df(api.get_transaction_data(
                 _select_market_code(str(code)), code, (2 - i) * 2000, 2000))
@@ -1137,10 +1114,8 @@ def QA_fetch_get_stock_transaction_realtime(code, ip=None, port=None):
 @retry(stop_max_attempt_number=3, wait_random_min=50, wait_random_max=100)
 def QA_fetch_get_stock_xdxr(code, ip=None, port=None):
     '除权除息'
-    ip, port = get_mainmarket_ip(ip, port)
-    api = TdxHq_API()
     market_code = _select_market_code(code)
-    with api.connect(ip, port):
+    with QA_tdx_stock_pool.connect(ip, port) as api:
         category = {
             '1': '除权除息', '2': '送配股上市', '3': '非流通股上市', '4': '未知股本变动',
             '5': '股本变化',
@@ -1160,7 +1135,7 @@ def QA_fetch_get_stock_xdxr(code, ip=None, port=None):
                                             'houzongguben': 'shares_after',
                                             'qianzongguben': 'shares_before'}) \
                 .set_index('date', drop=False, inplace=False)
-            return data.assign(date=data['date'].apply(lambda x: str(x)[0:10]))
+            return data.assign(date=QA_util_date_str_array(data['date']))
         else:
             return None
 
@@ -1168,19 +1143,15 @@ def QA_fetch_get_stock_xdxr(code, ip=None, port=None):
 @retry(stop_max_attempt_number=3, wait_random_min=50, wait_random_max=100)
 def QA_fetch_get_stock_info(code, ip=None, port=None):
     '股票基本信息'
-    ip, port = get_mainmarket_ip(ip, port)
-    api = TdxHq_API()
     market_code = _select_market_code(code)
-    with api.connect(ip, port):
+    with QA_tdx_stock_pool.connect(ip, port) as api:
         return api.to_df(api.get_finance_info(market_code, code))
 
 
 @retry(stop_max_attempt_number=3, wait_random_min=50, wait_random_max=100)
 def QA_fetch_get_stock_block(ip=None, port=None):
     '板块数据'
-    ip, port = get_mainmarket_ip(ip, port)
-    api = TdxHq_API()
-    with api.connect(ip, port):
+    with QA_tdx_stock_pool.connect(ip, port) as api:
 
         data = pd.concat([api.to_df(
             api.get_and_parse_block_info("block_gn.dat")).assign(type='gn'),
@@ -1279,18 +1250,14 @@ extension_market_list = None
 
 
 def QA_fetch_get_extensionmarket_count(ip=None, port=None):
-    ip, port = get_extensionmarket_ip(ip, port)
-    apix = TdxExHq_API()
-    with apix.connect(ip, port):
+    with QA_tdx_future_pool.connect(ip, port) as apix:
         global extension_market_info
         extension_market_info = apix.to_df(apix.get_markets())
         return extension_market_info
 
 
 def QA_fetch_get_extensionmarket_info(ip=None, port=None):
-    ip, port = get_extensionmarket_ip(ip, port)
-    apix = TdxExHq_API()
-    with apix.connect(ip, port):
+    with QA_tdx_future_pool.connect(ip, port) as apix:
         global extension_market_info
         extension_market_info = apix.to_df(apix.get_markets())
         return extension_market_info
@@ -1298,9 +1265,7 @@ def QA_fetch_get_extensionmarket_info(ip=None, port=None):
 
 def QA_fetch_get_extensionmarket_list(ip=None, port=None):
     '期货代码list'
-    ip, port = get_extensionmarket_ip(ip, port)
-    apix = TdxExHq_API()
-    with apix.connect(ip, port):
+    with QA_tdx_future_pool.connect(ip, port) as apix:
         num = apix.get_instrument_count()
         return pd.concat([apix.to_df(
             apix.get_instrument_info((int(num / 500) - i) * 500, 500))
@@ -2090,8 +2055,6 @@ def QA_fetch_get_exchangerate_list(ip=None, port=None):
 def QA_fetch_get_future_day(code, start_date, end_date, frequence='day',
                             ip=None, port=None):
     '期货数据 日线'
-    ip, port = get_extensionmarket_ip(ip, port)
-    apix = TdxExHq_API()
     start_date = str(start_date)[0:10]
     today_ = datetime.date.today()
     lens = QA_util_get_trade_gap(start_date, today_)
@@ -2099,7 +2062,7 @@ def QA_fetch_get_future_day(code, start_date, end_date, frequence='day',
     extension_market_list = QA_fetch_get_extensionmarket_list(
     ) if extension_market_list is None else extension_market_list
 
-    with apix.connect(ip, port):
+    with QA_tdx_future_pool.connect(ip, port) as apix:
         code_market = extension_market_list.query(
             'code=="{}"'.format(code)).iloc[0]
 
@@ -2116,9 +2079,8 @@ def QA_fetch_get_future_day(code, start_date, end_date, frequence='day',
 
             # 获取商品期货会报None
             data = data.assign(
-                date=data['datetime'].apply(lambda x: str(x[0:10]))).assign(
-                code=str(code), date_stamp=data['datetime'].apply(
-                    lambda x: QA_util_date_stamp(str(x)[0:10]))).set_index('date',
+                date=QA_util_date_str_array(data['datetime'])).assign(
+                code=str(code), date_stamp=QA_util_date_stamp_array(data['datetime'])).set_index('date',
                                                                            drop=False,
                                                                            inplace=False)
 
@@ -2127,17 +2089,15 @@ def QA_fetch_get_future_day(code, start_date, end_date, frequence='day',
             print(exp.__str__)
             return None
 
-        return data.drop(
+        data = data.drop(
             ['year', 'month', 'day', 'hour', 'minute', 'datetime'], axis=1)[
-            start_date:end_date].assign(
-            date=data['date'].apply(lambda x: str(x)[0:10]))
+            start_date:end_date]
+        return data.assign(date=QA_util_date_str_array(data['date']))
 
 
 def QA_fetch_get_future_min(code, start, end, frequence='1min', ip=None,
                             port=None):
     '期货数据 分钟线'
-    ip, port = get_extensionmarket_ip(ip, port)
-    apix = TdxExHq_API()
     type_ = ''
     start_date = str(start)[0:10]
     today_ = datetime.date.today()
@@ -2165,7 +2125,7 @@ def QA_fetch_get_future_min(code, start, end, frequence='1min', ip=None,
         lens = 20800
 
     # print(lens)
-    with apix.connect(ip, port):
+    with QA_tdx_future_pool.connect(ip, port) as apix:
 
         code_market = extension_market_list.query(
             'code=="{}"'.format(code)).iloc[0]
@@ -2181,14 +2141,12 @@ def QA_fetch_get_future_min(code, start, end, frequence='1min', ip=None,
                 data['datetime'].apply(QA_util_future_to_realdatetime, 1))) \
             .drop(['year', 'month', 'day', 'hour', 'minute'], axis=1,
                   inplace=False) \
-            .assign(date=data['datetime'].apply(lambda x: str(x)[0:10]),
-                    date_stamp=data['datetime'].apply(
-                        lambda x: QA_util_date_stamp(x)),
-                    time_stamp=data['datetime'].apply(
-                        lambda x: QA_util_time_stamp(x)),
+            .assign(date=QA_util_date_str_array(data['datetime']),
+                    date_stamp=QA_util_date_stamp_array(data['datetime']),
+                    time_stamp=QA_util_time_stamp_array(data['datetime']),
                     type=type_).set_index('datetime', drop=False,
                                           inplace=False)
-        return data.assign(datetime=data['datetime'].apply(lambda x: str(x)))[
+        return data.assign(datetime=QA_util_datetime_str_array(data['datetime']))[
             start:end].sort_index()
 
 
@@ -2226,8 +2184,6 @@ def __QA_fetch_get_future_transaction(code, day, retry, code_market, apix):
 def QA_fetch_get_future_transaction(code, start, end, retry=4, ip=None,
                                     port=None):
     '期货历史成交分笔'
-    ip, port = get_extensionmarket_ip(ip, port)
-    apix = TdxExHq_API()
     global extension_market_list
     extension_market_list = QA_fetch_get_extensionmarket_list(
     ) if extension_market_list is None else extension_market_list
@@ -2235,7 +2191,7 @@ def QA_fetch_get_future_transaction(code, start, end, retry=4, ip=None,
     if real_start is None:
         return None
     real_id_range = []
-    with apix.connect(ip, port):
+    with QA_tdx_future_pool.connect(ip, port) as apix:
         code_market = extension_market_list.query(
             'code=="{}"'.format(code)).iloc[0]
         data = pd.DataFrame()
@@ -2261,22 +2217,20 @@ def QA_fetch_get_future_transaction(code, start, end, retry=4, ip=None,
         if len(data) > 0:
 
             return data.assign(
-                datetime=data['datetime'].apply(lambda x: str(x)[0:19]))
+                datetime=QA_util_datetime_str_array(data['datetime']))
         else:
             return None
 
 
 def QA_fetch_get_future_transaction_realtime(code, ip=None, port=None):
     '期货历史成交分笔'
-    ip, port = get_extensionmarket_ip(ip, port)
-    apix = TdxExHq_API()
     global extension_market_list
     extension_market_list = QA_fetch_get_extensionmarket_list(
     ) if extension_market_list is None else extension_market_list
 
     code_market = extension_market_list.query(
         'code=="{}"'.format(code)).iloc[0]
-    with apix.connect(ip, port):
+    with QA_tdx_future_pool.connect(ip, port) as apix:
         data = pd.DataFrame()
         data = pd.concat([apix.to_df(apix.get_transaction_data(
             int(code_market.market), code, (30 - i) * 1800), sort=True) for i in
@@ -2290,15 +2244,13 @@ def QA_fetch_get_future_transaction_realtime(code, ip=None, port=None):
 
 def QA_fetch_get_future_realtime(code, ip=None, port=None):
     '期货实时价格'
-    ip, port = get_extensionmarket_ip(ip, port)
-    apix = TdxExHq_API()
     global extension_market_list
     extension_market_list = QA_fetch_get_extensionmarket_list(
     ) if extension_market_list is None else extension_market_list
     __data = pd.DataFrame()
     code_market = extension_market_list.query(
         'code=="{}"'.format(code)).iloc[0]
-    with apix.connect(ip, port):
+    with QA_tdx_future_pool.connect(ip, port) as apix:
         __data = apix.to_df(apix.get_instrument_quote(
             int(code_market.market), code))
         __data['datetime'] = datetime.datetime.now()
@@ -0,0 +1,337 @@
+# coding:utf-8
+#
+# The MIT License (MIT)
+#
+# Copyright (c) 2016-2019 yutiansut/QUANTAXIS
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+通达信长连接池
+
+每个服务器最多保持 size 个连接, 用完放回池中给下一次请求复用, 不再每取一个代码就重新连一次
+
+服务器按最近 window 次请求打分:
+
+    score = 平均耗时 * (1 + 10 * 出错比例)      还没有请求过的服务器按 time_out 计
+
+不指定 ip 时从分数最低(最快)且还有空闲连接的服务器取; 出错比例超过 max_error_rate 的服务器
+被剔除 cooldown 秒, 期间不再分配, 到期后清空记录重新参与
+
+线程安全, QASU 的多线程下载和 QA_Tdx_Executor 可以共用一个池
+"""
+
+import contextlib
+import threading
+import time
+from collections import deque
+
+
+class _tdx_server():
+
+    def __init__(self, ip, port, window):
+        self.ip = ip
+        self.port = port
+        self.latency = deque(maxlen=window)
+        self.error = deque(maxlen=window)
+        self.idle = []
+        self.active = 0
+        self.disabled_until = 0
+
+    @property
+    def error_rate(self):
+        return sum(self.error) / len(self.error) if len(self.error) else 0.0
+
+    def score(self, time_out):
+        latency = sum(self.latency) / len(self.latency) if len(self.latency) else time_out
+        return latency * (1 + 10 * self.error_rate)
+
+    def reset(self):
+        self.latency.clear()
+        self.error.clear()
+        self.disabled_until = 0
+
+
+class _tdx_session():
+    """池中的一个连接
+
+    转发 api 的方法, get_* 请求记录耗时和是否出错, 用来给服务器打分
+    """
+
+    def __init__(self, pool, server, api):
+        self.pool = pool
+        self.server = server
+        self.api = api
+        self.last_used = time.time()
+        self.broken = False
+
+    def __getattr__(self, item):
+        attr = getattr(self.api, item)
+        if not item.startswith('get_') or not callable(attr):
+            return attr
+
+        def wrapper(*args, **kwargs):
+            _time = time.time()
+            try:
+                res = attr(*args, **kwargs)
+            except Exception:
+                self.broken = True
+                self.pool._record(self.server, None)
+                raise
+            self.pool._record(self.server, time.time() - _time)
+            return res
+
+        return wrapper
+
+
+class QA_TdxPool():
+    """通达信长连接池
+
+    Arguments:
+        api_class {class} -- TdxHq_API/TdxExHq_API, 或者测试用的假服务器
+
+    Keyword Arguments:
+        servers {list/function} -- [{'ip':..., 'port':...}], 或者第一次使用时才调用的函数 (default: {None})
+        size {int} -- 每个服务器最多保持的连接数 (default: {2})
+        time_out {float} -- 连接超时 (default: {0.7})
+        window {int} -- 打分用的最近请求数 (default: {20})
+        max_error_rate {float} -- 出错比例超过这个值时剔除服务器 (default: {0.5})
+        min_samples {int} -- 至少有这么多次请求才会被剔除 (default: {5})
+        cooldown {int} -- 剔除的秒数 (default: {60})
+        max_idle {int} -- 空闲超过这么多秒的连接重新连接, 服务器会断开空闲连接 (default: {20})
+        wait_timeout {int} -- 所有连接都被占用时最多等待的秒数 (default: {30})
+    """
+
+    def __init__(
+            self,
+            api_class,
+            servers=None,
+            size=2,
+            time_out=0.7,
+            window=20,
+            max_error_rate=0.5,
+            min_samples=5,
+            cooldown=60,
+            max_idle=20,
+            wait_timeout=30
+    ):
+        self.api_class = api_class
+        self._seed = servers
+        self.size = size
+        self.time_out = time_out
+        self.window = window
+        self.max_error_rate = max_error_rate
+        self.min_samples = min_samples
+        self.cooldown = cooldown
+        self.max_idle = max_idle
+        self.wait_timeout = wait_timeout
+        self._cond = threading.Condition(threading.RLock())
+        self._servers = {}
+        self._order = []
+        self.connects = 0
+        self.reuses = 0
+        self.evictions = 0
+
+    def __repr__(self):
+        return '< QA_TdxPool {} servers {} idle >'.format(
+            len(self._servers),
+            self.idle_count
+        )
+
+    @property
+    def idle_count(self):
+        with self._cond:
+            return sum(len(server.idle) for server in self._servers.values())
+
+    def add_server(self, ip, port=7709):
+        with self._cond:
+            key = (ip, port)
+            if key not in self._servers:
+                self._servers[key] = _tdx_server(ip, port, self.window)
+                self._order.append(key)
+            return self._servers[key]
+
+    def _init_servers(self):
+        if self._seed is None:
+            return
+        seed, self._seed = self._seed, None
+        for item in (seed() if callable(seed) else seed):
+            if item.get('ip') is not None:
+                self.add_server(item['ip'], item.get('port') or 7709)
+
+    def _check(self, server):
+        '剔除到期的服务器清空记录, 返回是否可用'
+        if server.disabled_until > time.time():
+            return False
+        if server.disabled_until:
+            server.reset()
+        return True
+
+    def _ranked(self):
+        res = []
+        for i, key in enumerate(self._order):
+            server = self._servers[key]
+            if not self._check(server):
+                continue
+            res.append((server.score(self.time_out), i, server))
+        return [item[2] for item in sorted(res, key=lambda x: x[:2])]
+
+    def _record(self, server, latency, request=True):
+        '记录一次请求, latency 为 None 表示出错, 出错按 time_out 计耗时; 建立连接成功只记耗时'
+        with self._cond:
+            server.latency.append(self.time_out if latency is None else latency)
+            if request:
+                server.error.append(latency is None)
+            if len(server.error) >= self.min_samples and \
+                    server.error_rate > self.max_error_rate and \
+                    self._check(server):
+                server.disabled_until = time.time() + self.cooldown
+                self.evictions += 1
+                idle, server.idle = server.idle, []
+                for session in idle:
+                    self._close(session)
+
+    def _close(self, session):
+        try:
+            session.api.disconnect()
+        except Exception:
+            pass
+
+    def _connect(self, server):
+        api = self.api_class(raise_exception=True)
+        _time = time.time()
+        try:
+            api.connect(server.ip, server.port, time_out=self.time_out)
+        except Exception:
+            self._record(server, None)
+            raise
+        self._record(server, time.time() - _time, request=False)
+        with self._cond:
+            self.connects += 1
+        return _tdx_session(self, server, api)
+
+    def acquire(self, ip=None, port=None):
+        """取一个连接, 用完必须 release
+
+        Keyword Arguments:
+            ip {str} -- 指定服务器, None 时按分数选择 (default: {None})
+            port {int} -- [description] (default: {None})
+
+        Raises:
+            ValueError -- 池中没有可用的服务器
+        """
+        deadline = time.time() + self.wait_timeout
+        error = None
+        with self._cond:
+            self._init_servers()
+            if ip is not None:
+                candidates = [self.add_server(ip, port or 7709)]
+                self._check(candidates[0])
+            else:
+                candidates = self._ranked()
+            if len(candidates) == 0:
+                raise ValueError('QA_TdxPool: no available server')
+            while True:
+                server = None
+                for item in candidates:
+                    if ip is None and not self._check(item):
+                        continue
+                    if len(item.idle) > 0 or item.active < self.size:
+                        server = item
+                        break
+                if server is None:
+                    remain = deadline - time.time()
+                    if remain <= 0:
+                        raise ValueError('QA_TdxPool: wait for connection timeout')
+                    self._cond.wait(remain)
+                    continue
+                server.active += 1
+                if len(server.idle) > 0:
+                    session = server.idle.pop()
+                    if time.time() - session.last_used <= self.max_idle:
+                        self.reuses += 1
+                        return session
+                    self._close(session)
+                # 连接在锁外建立, 连不上时换下一个服务器
+                self._cond.release()
+                try:
+                    return self._connect(server)
+                except Exception as e:
+                    error = e
+                finally:
+                    self._cond.acquire()
+                server.active -= 1
+                self._cond.notify()
+                candidates = [item for item in candidates if item is not server]
+                if len(candidates) == 0:
+                    raise error
+
+    def release(self, session):
+        with self._cond:
+            server = session.server
+            server.active -= 1
+            if session.broken or not self._check(server) or \
+                    self._servers.get((server.ip, server.port)) is not server:
+                self._close(session)
+            else:
+                session.last_used = time.time()
+                server.idle.append(session)
+            self._cond.notify()
+
+    @contextlib.contextmanager
+    def connect(self, ip=None, port=None):
+        """with pool.connect() as api: 代替 with api.connect(ip, port):
+
+        with 里抛出异常时这个连接不再放回池中
+        """
+        session = self.acquire(ip, port)
+        try:
+            yield session
+        except Exception:
+            session.broken = True
+            raise
+        finally:
+            self.release(session)
+
+    def stats(self):
+        with self._cond:
+            return {
+                'connects': self.connects,
+                'reuses': self.reuses,
+                'evictions': self.evictions,
+                'servers': [
+                    {
+                        'ip': server.ip,
+                        'port': server.port,
+                        'score': server.score(self.time_out),
+                        'error_rate': server.error_rate,
+                        'active': server.active,
+                        'idle': len(server.idle),
+                        'disabled': not self._check(server)
+                    } for server in self._servers.values()
+                ]
+            }
+
+    def close(self):
+        '断开所有空闲连接'
+        with self._cond:
+            for server in self._servers.values():
+                idle, server.idle = server.idle, []
+                for session in idle:
+                    self._close(session)
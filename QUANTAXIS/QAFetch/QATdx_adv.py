@@ -24,56 +24,52 @@
 
 
 import datetime
-import queue
 import time
 import click
 from concurrent.futures import ThreadPoolExecutor
-from threading import Thread, Timer
 
 import pandas as pd
 from pytdx.hq import TdxHq_API
+from retrying import retry
 
 from QUANTAXIS.QAEngine.QAThreadEngine import QA_Thread
+from QUANTAXIS.QAFetch.QATdx import QA_tdx_stock_pool
 from QUANTAXIS.QAUtil.QADate_trade import QA_util_if_tradetime
-from QUANTAXIS.QAUtil.QASetting import DATABASE, stock_ip_list
+from QUANTAXIS.QAUtil.QASetting import DATABASE
 from QUANTAXIS.QAUtil.QASql import QA_util_sql_mongo_sort_ASCENDING
 from QUANTAXIS.QAUtil.QATransform import QA_util_to_json_from_pandas
 
 
 """
-准备做一个多连接的连接池执行器Executor
+多连接的执行器Executor
 当持续获取数据/批量数据的时候,可以减小服务器的压力,并且可以更快的进行并行处理
+
+连接来自 QATdx 的长连接池 (QA_tdx_stock_pool), 和 QA_fetch_get_* 共用
 """
 
 
 class QA_Tdx_Executor(QA_Thread):
-    def __init__(self, thread_num=2, timeout=1, sleep_time=1, *args, **kwargs):
+    def __init__(self, thread_num=2, timeout=1, sleep_time=1, pool=None, *args, **kwargs):
         super().__init__(name='QATdxExecutor')
         self.thread_num = thread_num
-        self._queue = queue.Queue(maxsize=200)
+        self.pool = QA_tdx_stock_pool if pool is None else pool
         self.api_no_connection = TdxHq_API()
-        self._api_worker = Thread(
-            target=self.api_worker, args=(), name='API Worker')
-        self._api_worker.start()
         self.timeout = timeout
         self.executor = ThreadPoolExecutor(self.thread_num)
         self.sleep_time = sleep_time
 
     def __getattr__(self, item):
-        try:
-            api = self.get_available()
-            func = api.__getattribute__(item)
-
-            def wrapper(*args, **kwargs):
-                res = self.executor.submit(func, *args, **kwargs)
-                self._queue.put(api)
-                return res
-            return wrapper
-        except:
-            return self.__getattr__(item)
+        # 只转发 pytdx 的接口, 每次调用在线程池里从连接池取一个连接
+        if item.startswith('_') or not callable(getattr(TdxHq_API, item, None)):
+            raise AttributeError(item)
+
+        def wrapper(*args, **kwargs):
+            return self.executor.submit(self._call, item, *args, **kwargs)
+        return wrapper
 
-    def _queue_clean(self):
-        self._queue = queue.Queue(maxsize=200)
+    def _call(self, item, *args, **kwargs):
+        with self.pool.connect() as api:
+            return getattr(api, item)(*args, **kwargs)
 
     def _test_speed(self, ip, port=7709):
 
@@ -124,49 +120,16 @@ class QA_Tdx_Executor(QA_Thread):
 
     @property
     def ipsize(self):
-        return len(self._queue.qsize())
-
-    @property
-    def api(self):
-        return self.get_available()
-
-    def get_available(self):
-
-        if self._queue.empty() is False:
-            return self._queue.get_nowait()
-        else:
-            Timer(0, self.api_worker).start()
-            return self._queue.get()
-
-    def api_worker(self):
-        data = []
-        if self._queue.qsize() < 80:
-            for item in stock_ip_list:
-                if self._queue.full():
-                    break
-                _sec = self._test_speed(ip=item['ip'], port=item['port'])
-                if _sec < self.timeout*3:
-                    try:
-                        self._queue.put(TdxHq_API(heartbeat=False).connect(
-                            ip=item['ip'], port=item['port'], time_out=self.timeout*2))
-                    except:
-                        pass
-        else:
-            self._queue_clean()
-            Timer(0, self.api_worker).start()
-        Timer(300, self.api_worker).start()
-
-    def _singal_job(self, context, id_, time_out=0.7):
-        try:
-            _api = self.get_available()
+        '连接池中空闲的连接数'
+        return self.pool.idle_count
 
+    @retry(stop_max_attempt_number=3, wait_random_min=50, wait_random_max=100)
+    def _singal_job(self, context, code, id_):
+        with self.pool.connect() as _api:
             __data = context.append(self.api_no_connection.to_df(_api.get_security_quotes(
-                [(self._select_market_code(x), x) for x in code[80 * id_:80 * (id_ + 1)]])))
-            __data['datetime'] = datetime.datetime.now()
-            self._queue.put(_api)  # 加入注销
-            return __data
-        except:
-            return self.singal_job(context, id_)
+                [(self.get_market(x), x) for x in code[80 * id_:80 * (id_ + 1)]])))
+        __data['datetime'] = datetime.datetime.now()
+        return __data
 
     def get_realtime(self, code):
         context = pd.DataFrame()
@@ -174,7 +137,7 @@ class QA_Tdx_Executor(QA_Thread):
         code = [code] if isinstance(code, str) is str else code
         try:
             for id_ in range(int(len(code) / 80) + 1):
-                context = self._singal_job(context, id_)
+                context = self._singal_job(context, code, id_)
 
             data = context[['datetime', 'last_close', 'code', 'open', 'high', 'low', 'price', 'cur_vol',
                             's_vol', 'b_vol', 'vol', 'ask1', 'ask_vol1', 'bid1', 'bid_vol1', 'ask2', 'ask_vol2',
@@ -206,17 +169,15 @@ class QA_Tdx_Executor(QA_Thread):
         except:
             raise Exception
 
+    @retry(stop_max_attempt_number=3, wait_random_min=50, wait_random_max=100)
     def _get_security_bars(self, context, code, _type, lens):
-        try:
-            _api = self.get_available()
+        res = []
+        with self.pool.connect() as _api:
             for i in range(1, int(lens / 800) + 2):
-                context.extend(_api.get_security_bars(self.get_frequence(
+                res.extend(_api.get_security_bars(self.get_frequence(
                     _type), self.get_market(str(code)), str(code), (i - 1) * 800, 800))
-                print(context)
-            self._queue.put(_api)
-            return context
-        except Exception as e:
-            return self._get_security_bars(context, code, _type, lens)
+        context.extend(res)
+        return context
 
     def get_security_bar(self, code, _type, lens):
         code = [code] if isinstance(code, str) is str else code
@@ -246,7 +207,8 @@ class QA_Tdx_Executor(QA_Thread):
         from QUANTAXIS.QAFetch.QAQuery_Advance import QA_fetch_stock_block_adv
         code = QA_fetch_stock_block_adv().code
 
-        while True:
+        # stop 之后不再等完整个 sleep_time, 马上退出
+        while self.running:
             _time = datetime.datetime.now()
             if QA_util_if_tradetime(_time):  # 如果在交易时间
                 data = self.get_realtime_concurrent(code)
@@ -256,14 +218,14 @@ class QA_Tdx_Executor(QA_Thread):
 
                 print('Time {}'.format(
                     (datetime.datetime.now() - _time).total_seconds()))
-                time.sleep(sleep)
+                self.sleep(sleep)
                 print('Connection Pool NOW LEFT {} Available IP'.format(
-                    self._queue.qsize()))
+                    self.ipsize))
                 print('Program Last Time {}'.format(
                     (datetime.datetime.now() - _time1).total_seconds()))
             else:
                 print('Not Trading time {}'.format(_time))
-                time.sleep(sleep)
+                self.sleep(sleep)
 
 
 def get_bar(timeout=1, sleep=1):
@@ -273,8 +235,7 @@ def get_bar(timeout=1, sleep=1):
     code = QA_fetch_stock_block_adv().code
     print(len(code))
     x = QA_Tdx_Executor(timeout=float(timeout))
-    print(x._queue.qsize())
-    print(x.get_available())
+    print(x.pool)
 
     while True:
         _time = datetime.datetime.now()
@@ -285,7 +246,7 @@ def get_bar(timeout=1, sleep=1):
                 (datetime.datetime.now() - _time).total_seconds()))
             time.sleep(sleep)
             print('Connection Pool NOW LEFT {} Available IP'.format(
-                x._queue.qsize()))
+                x.ipsize))
             print('Program Last Time {}'.format(
                 (datetime.datetime.now() - _time1).total_seconds()))
 
@@ -25,8 +25,285 @@
 
 from functools import reduce
 import math
+import threading
 import numpy as np
 import pandas as pd
+from numpy.lib.stride_tricks import as_strided
+
+try:
+    from numba import njit as _njit
+except ImportError:
+    _njit = None
+
+
+"""
+递推/滑动窗口的计算核
+
+装了 numba 时 SMA/AVEDEV 用编译后的循环 (和原来的算法逐步一致);
+没有 numba 时用 numpy/pandas 的向量化实现, 结果只有浮点舍入上的差别
+"""
+
+
+def _sma_loop(values, start, N, M):
+    res = np.full(len(values), np.nan)
+    preY = values[start]
+    res[start - 1] = preY
+    for i in range(start, len(values)):
+        preY = (M * values[i] + (N - M) * preY) / N
+        res[i] = preY
+    return res
+
+
+def _sma_ewm(values, start, N, M):
+    # Y = M/N*X + (1-M/N)*Y' 就是 alpha=M/N, adjust=False 的 ewm;
+    # ewm 会跳过中间的 nan, 原来的递推遇到 nan 之后全是 nan
+    res = np.full(len(values), np.nan)
+    seg = values[start:]
+    res[start:] = pd.Series(seg).ewm(alpha=M / N, adjust=False).mean().values
+    nan = np.isnan(seg)
+    if nan.any():
+        res[start + nan.argmax():] = np.nan
+    res[start - 1] = values[start]
+    return res
+
+
+def _avedev_loop(values, N):
+    res = np.full(len(values), np.nan)
+    for i in range(N - 1, len(values)):
+        mean = 0.0
+        for j in range(i - N + 1, i + 1):
+            mean += values[j]
+        mean /= N
+        dev = 0.0
+        for j in range(i - N + 1, i + 1):
+            dev += abs(values[j] - mean)
+        res[i] = dev / N
+    return res
+
+
+def _avedev_strided(values, N):
+    res = np.full(len(values), np.nan)
+    if N > len(values):
+        return res
+    size = values.strides[0]
+    window = as_strided(
+        values,
+        shape=(len(values) - N + 1,
+               N),
+        strides=(size,
+                 size),
+        writeable=False
+    )
+    res[N - 1:] = np.abs(window - window.mean(axis=1)[:, None]).mean(axis=1)
+    return res
+
+
+def _sma_first(values):
+    '跳过X中前面几个 nan 值 (从第二个开始), 第一个有效值在结果里出现两次; 全是 nan 时为 None'
+    nan = np.isnan(values[1:])
+    if nan.all():
+        return None
+    return int(nan.argmin()) + 1
+
+
+def _sma_values(values, start, N, M):
+    if _njit is None and not 0 < M <= N:
+        return _sma_loop(values, start, float(N), M)
+    return _sma_kernel(values, start, float(N), M)
+
+
+def _sma_panel(values, counts, N, M):
+    '二维的 SMA, 返回 (结果, 每列结果开始的行)'
+    res = np.full(values.shape, np.nan)
+    first = np.zeros(values.shape[1], dtype=np.int64)
+    if _njit is not None or not 0 < M <= N:
+        for i, count in enumerate(counts):
+            col = np.ascontiguousarray(values[:count, i])
+            start = _sma_first(col)
+            if start is not None:
+                res[:count, i] = _sma_values(col, start, N, M)
+                first[i] = start - 1
+        return res, first
+    # 和 _sma_ewm 一样, 所有列一起算; 第 0 行不参与递推
+    nan = np.isnan(values)
+    nan[0] = True
+    valid = ~nan.all(axis=0)
+    start = nan.argmin(axis=0)
+    x = values.copy()
+    x[0] = np.nan
+    res = pd.DataFrame(x).ewm(alpha=M / N, adjust=False).mean().values
+    after = np.arange(len(values))[:, None] >= start[None, :]
+    res[np.cumsum(nan & after, axis=0) > 0] = np.nan
+    cols = np.flatnonzero(valid)
+    res[start[cols] - 1, cols] = values[start[cols], cols]
+    res[:, ~valid] = np.nan
+    first[cols] = start[cols] - 1
+    return res, first
+
+
+if _njit is not None:
+    _sma_kernel = _njit(cache=True)(_sma_loop)
+    _avedev_kernel = _njit(cache=True)(_avedev_loop)
+else:
+    _sma_kernel = _sma_ewm
+    _avedev_kernel = _avedev_strided
+
+
+def _float_values(Series):
+    return np.ascontiguousarray(np.asarray(Series, dtype=float))
+
+
+"""
+面板模式
+
+QA_indicator_panel 运行指标的时候, MA/EMA/SMA/HHV/LLV/REF/STD/CROSS/COUNT/SUM/AVEDEV/DIFF
+遇到 (datetime, code) 索引的 Series, 把长表按 code 排成 (bar 序号 × code) 的二维数组一次算完,
+再按原来的索引放回去
+
+每一列的第 0 行是这个 code 在输入里的第一个 bar, 上市之前和停牌的日期不占行,
+所以结果和按 code groupby 之后逐个计算完全一样
+"""
+
+_panel = threading.local()
+
+# 只用到这些名字的指标可以直接在面板上算, 其余的名字 (rolling/shift/iloc/mean 等) 按 code 分组算
+_PANEL_FUNCS = (
+    'EMA', 'MA', 'SMA', 'HHV', 'LLV', 'REF', 'STD', 'CROSS', 'COUNT', 'SUM',
+    'AVEDEV', 'DIFF', 'ABS', 'MAX', 'MIN', 'IF', 'IFAND', 'IFOR'
+)
+_PANEL_NAMES = {
+    'pd', 'DataFrame', 'Series', 'np', 'abs', 'where', 'sqrt', 'log', 'nan',
+    'maximum', 'minimum', 'logical_and', 'logical_or', 'range', 'len', 'str',
+    'float', 'int', 'dict', 'list', 'zip', 'items', 'format', 'open', 'high',
+    'low', 'close',
+    'volume', 'vol', 'amount'
+}
+
+
+class _panel_layout():
+    """长表和 (bar 序号 × code) 二维数组之间的位置对应
+
+    Arguments:
+        index {pd.MultiIndex} -- 有 code 这一层的索引, 每个 code 内部按时间排好
+    """
+
+    def __init__(self, index):
+        level = 'code' if 'code' in index.names else 1
+        col, self.columns = pd.factorize(index.get_level_values(level))
+        counts = np.bincount(col, minlength=len(self.columns))
+        order = np.argsort(col, kind='mergesort')
+        starts = np.cumsum(counts) - counts
+        row = np.empty(len(col), dtype=np.int64)
+        row[order] = np.arange(len(col)) - starts[col[order]]
+        self.row = row
+        self.col = col
+        self.counts = counts
+        self.shape = (int(counts.max()) if len(counts) else 0, len(counts))
+
+    def to_2d(self, values):
+        res = np.full(self.shape, np.nan)
+        res[self.row, self.col] = values
+        return res
+
+    def to_long(self, values):
+        return values[self.row, self.col]
+
+
+def _panel_of(Series):
+    '面板模式下返回 Series 的 _panel_layout, 其他情况为 None'
+    layouts = getattr(_panel, 'layouts', None)
+    if layouts is None or not isinstance(Series, pd.Series) or \
+            not isinstance(Series.index, pd.MultiIndex):
+        return None
+    index = Series.index
+    item = layouts.get(id(index))
+    if item is None or item[0] is not index:
+        item = (index, _panel_layout(index))
+        layouts[id(index)] = item
+    return item[1]
+
+
+def _panel_apply(Series, layout, func):
+    '在二维数组上按列计算 func(pd.DataFrame), 结果放回长表'
+    res = func(pd.DataFrame(layout.to_2d(_float_values(Series))))
+    return pd.Series(
+        layout.to_long(np.asarray(res, dtype=float)),
+        index=Series.index,
+        name=Series.name
+    )
+
+
+def _panel_columns(values, func):
+    '二维数组逐列调用一维的计算核; 每列后面补的 nan 不影响前面的结果'
+    res = np.full(values.shape, np.nan)
+    for i in range(values.shape[1]):
+        res[:, i] = func(np.ascontiguousarray(values[:, i]))
+    return res
+
+
+def _panel_names(code):
+    names = set(code.co_names)
+    for item in code.co_consts:
+        if hasattr(item, 'co_names'):
+            names |= _panel_names(item)
+    return names
+
+
+def QA_indicator_panel_support(func):
+    """指标是否只用到了支持面板模式的基础函数
+
+    按函数引用的全局名字/属性名判断, 基础函数必须就是本模块的函数 (没有被同名函数覆盖)
+
+    Arguments:
+        func {function} -- QA_indicator_*
+
+    Returns:
+        bool -- [description]
+    """
+    code = getattr(func, '__code__', None)
+    if code is None:
+        return False
+    glb = getattr(func, '__globals__', {})
+    primitives = globals()
+    for name in _panel_names(code):
+        if name in _PANEL_FUNCS:
+            if glb.get(name) is not primitives[name]:
+                return False
+        elif name not in _PANEL_NAMES:
+            return False
+    return True
+
+
+def QA_indicator_panel(data, func, *args, **kwargs):
+    """在 (datetime, code) 索引的多个代码的 DataFrame 上一次算完指标
+
+    和 data.groupby(level=1).apply(func) 的结果一样, 但基础函数在二维数组上计算,
+    不再每个代码调用一次 func; func 只能用到 QA_indicator_panel_support 支持的函数
+
+    Arguments:
+        data {pd.DataFrame} -- 每个 code 内部按时间排好
+        func {function} -- QA_indicator_*
+
+    Returns:
+        pd.DataFrame -- func 的结果, 行的顺序也和 groupby.apply 一样
+    """
+    layouts = getattr(_panel, 'layouts', None)
+    _panel.layouts = {}
+    try:
+        res = func(data, *args, **kwargs)
+    finally:
+        _panel.layouts = layouts
+    if not isinstance(res, (pd.DataFrame, pd.Series)) or res.index.equals(data.index) or \
+            not isinstance(res.index, pd.MultiIndex):
+        return res
+    if len(res) == len(data) and res.index.isin(data.index).all():
+        # 和 groupby.apply 一样, 每个 code 的结果索引不变时按 data 的顺序
+        return res.reindex(data.index)
+    # 否则和 groupby(sort=False).apply 一样按 code 第一次出现的顺序拼接
+    level = 'code' if 'code' in data.index.names else 1
+    codes = pd.factorize(data.index.get_level_values(level))[1]
+    rank = pd.Index(codes).get_indexer(res.index.get_level_values(level))
+    return res.iloc[np.argsort(rank, kind='mergesort')]
 
 
 """
@@ -38,10 +315,16 @@ return pd.Series format
 
 
 def EMA(Series, N):
+    layout = _panel_of(Series)
+    if layout is not None:
+        return _panel_apply(Series, layout, lambda x: x.ewm(span=N, min_periods=N - 1, adjust=True).mean())
     return pd.Series.ewm(Series, span=N, min_periods=N - 1, adjust=True).mean()
 
 
 def MA(Series, N):
+    layout = _panel_of(Series)
+    if layout is not None:
+        return _panel_apply(Series, layout, lambda x: x.rolling(N).mean())
     return pd.Series.rolling(Series, N).mean()
 
 # 威廉SMA  参考https://www.joinquant.com/post/867
@@ -54,39 +337,48 @@ def SMA(Series, N, M=1):
     本次修正主要是对于返回值的优化,现在的返回值会带上原先输入的索引index
     2018/5/3
     @yutiansut
+
+    递推放到 _sma_kernel 里算 (numba 或者 ewm), 不再逐个 iloc
     """
-    ret = []
-    i = 1
-    length = len(Series)
-    # 跳过X中前面几个 nan 值
-    while i < length:
-        if np.isnan(Series.iloc[i]):
-            i += 1
-        else:
-            break
-    preY = Series.iloc[i]  # Y'
-    ret.append(preY)
-    while i < length:
-        Y = (M * Series.iloc[i] + (N - M) * preY) / float(N)
-        ret.append(Y)
-        preY = Y
-        i += 1
-    return pd.Series(ret, index=Series.tail(len(ret)).index)
+    layout = _panel_of(Series)
+    if layout is not None:
+        # 每个 code 的结果从各自的 start - 1 开始, 前面的行不在结果里
+        res, first = _sma_panel(layout.to_2d(_float_values(Series)), layout.counts, N, M)
+        keep = layout.row >= first[layout.col]
+        return pd.Series(layout.to_long(res)[keep], index=Series.index[keep])
+    values = _float_values(Series)
+    start = _sma_first(values)
+    if start is None:
+        return pd.Series(np.nan, index=Series.index)
+    res = _sma_values(values, start, N, M)
+    return pd.Series(res[start - 1:], index=Series.index[start - 1:])
 
 
 def DIFF(Series, N=1):
+    layout = _panel_of(Series)
+    if layout is not None:
+        return _panel_apply(Series, layout, lambda x: x.diff(N))
     return pd.Series(Series).diff(N)
 
 
 def HHV(Series, N):
+    layout = _panel_of(Series)
+    if layout is not None:
+        return _panel_apply(Series, layout, lambda x: x.rolling(N).max())
     return pd.Series(Series).rolling(N).max()
 
 
 def LLV(Series, N):
+    layout = _panel_of(Series)
+    if layout is not None:
+        return _panel_apply(Series, layout, lambda x: x.rolling(N).min())
     return pd.Series(Series).rolling(N).min()
 
 
 def SUM(Series, N):
+    layout = _panel_of(Series)
+    if layout is not None:
+        return _panel_apply(Series, layout, lambda x: x.rolling(N).sum())
     return pd.Series.rolling(Series, N).sum()
 
 
@@ -122,8 +414,11 @@ def CROSS(A, B):
         [type] -- [description]
     """
 
-    var = np.where(A < B, 1, 0)
-    return (pd.Series(var, index=A.index).diff() < 0).apply(int)
+    var = pd.Series(np.where(A < B, 1, 0), index=A.index)
+    layout = _panel_of(var)
+    if layout is not None:
+        return (_panel_apply(var, layout, lambda x: x.diff()) < 0).astype(int)
+    return (var.diff() < 0).astype(int)
 
 
 def COUNT(COND, N):
@@ -134,7 +429,11 @@ def COUNT(COND, N):
 
     现在返回的是series
     """
-    return pd.Series(np.where(COND, 1, 0), index=COND.index).rolling(N).sum()
+    var = pd.Series(np.where(COND, 1, 0), index=COND.index)
+    layout = _panel_of(var)
+    if layout is not None:
+        return _panel_apply(var, layout, lambda x: x.rolling(N).sum())
+    return var.rolling(N).sum()
 
 
 def IF(COND, V1, V2):
@@ -152,6 +451,9 @@ def IFOR(COND1, COND2, V1, V2):
 
 
 def REF(Series, N):
+    layout = _panel_of(Series)
+    if layout is not None:
+        return Series - _panel_apply(Series, layout, lambda x: x.diff(N))
     var = Series.diff(N)
     var = Series - var
     return var
@@ -173,6 +475,9 @@ def LAST(COND, N1, N2):
 
 
 def STD(Series, N):
+    layout = _panel_of(Series)
+    if layout is not None:
+        return _panel_apply(Series, layout, lambda x: x.rolling(N).std())
     return pd.Series.rolling(Series, N).std()
 
 
@@ -183,7 +488,10 @@ def AVEDEV(Series, N):
 
     之前用mad的计算模式依然返回的是单值
     """
-    return Series.rolling(N).apply(lambda x: (np.abs(x - x.mean())).mean(), raw=True)
+    layout = _panel_of(Series)
+    if layout is not None:
+        return _panel_apply(Series, layout, lambda x: _panel_columns(x.values, lambda col: _avedev_kernel(col, int(N))))
+    return pd.Series(_avedev_kernel(_float_values(Series), int(N)), index=Series.index)
 
 
 def MACD(Series, FAST, SLOW, MID):
@@ -227,10 +535,8 @@ def BARLAST(cond, yes=True):
     Arguments:
         cond {[type]} -- [description]
     """
-    if isinstance(cond.index, pd.MultiIndex):
-        return len(cond)-cond.index.levels[0].tolist().index(cond[cond != yes].index[-1][0])-1
-    elif isinstance(cond.index, pd.DatetimeIndex):
-        return len(cond)-cond.index.tolist().index(cond[cond != yes].index[-1])-1
+    # 最后一次条件不成立之后的 bar 数
+    return len(cond) - int(np.flatnonzero(np.asarray(cond) != yes)[-1]) - 1
 
 
 XARROUND =  lambda x,y:np.round(y*(round(x/y-math.floor(x/y)+0.00000000001)+ math.floor(x/y)),2)
@@ -398,21 +398,27 @@ def QA_indicator_ASI(DataFrame, M1=26, M2=10):
     ASI:SUM(SI,M1);
     ASIT:MA(ASI,M2);
     """
-    CLOSE = DataFrame['close']
-    HIGH = DataFrame['high']
-    LOW = DataFrame['low']
-    OPEN = DataFrame['open']
-    LC = REF(CLOSE, 1)
-    AA = ABS(HIGH - LC)
-    BB = ABS(LOW-LC)
-    CC = ABS(HIGH - REF(LOW, 1))
-    DD = ABS(LC - REF(OPEN, 1))
-
-    R = IFAND(AA > BB, AA > CC, AA+BB/2+DD/4,
-           IFAND(BB > CC, BB > AA, BB+AA/2+DD/4, CC+DD/4))
-    X = (CLOSE - LC + (CLOSE - OPEN) / 2 + LC - REF(OPEN, 1))
-    SI = 16*X/R*MAX(AA, BB)
-    ASI = SUM(SI, M1)
+    # 逐元素的部分直接在 numpy 数组上算, 不再生成一串带索引的 Series
+    CLOSE = DataFrame['close'].values.astype(float)
+    HIGH = DataFrame['high'].values.astype(float)
+    LOW = DataFrame['low'].values.astype(float)
+    OPEN = DataFrame['open'].values.astype(float)
+
+    def REF1(X):
+        return np.concatenate([[np.nan], X[:-1]]) if len(X) else X
+
+    LC = REF1(CLOSE)
+    AA = np.abs(HIGH - LC)
+    BB = np.abs(LOW - LC)
+    CC = np.abs(HIGH - REF1(LOW))
+    DD = np.abs(LC - REF1(OPEN))
+
+    with np.errstate(divide='ignore', invalid='ignore'):
+        R = np.where((AA > BB) & (AA > CC), AA + BB / 2 + DD / 4,
+                     np.where((BB > CC) & (BB > AA), BB + AA / 2 + DD / 4, CC + DD / 4))
+        X = (CLOSE - LC + (CLOSE - OPEN) / 2 + LC - REF1(OPEN))
+        SI = 16 * X / R * np.where(AA > BB, AA, BB)
+    ASI = SUM(pd.Series(SI, index=DataFrame.index), M1)
     ASIT = MA(ASI, M2)
     return pd.DataFrame({
         'ASI': ASI, 'ASIT': ASIT
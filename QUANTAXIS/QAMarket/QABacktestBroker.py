@@ -162,6 +162,7 @@ class QA_BacktestBroker(QA_Broker):
         self.if_nondatabase = if_nondatabase
         self.name = BROKER_TYPE.BACKETEST
         self._quotation = {} # 一个可以缓存数据的dict
+        self._quotation_data = {} # datetime: {id: DataStruct}, 用 DataStruct 的 bar_index 查询
         self.broker_data = None
         self.deal_message = {}
 
@@ -188,10 +189,13 @@ class QA_BacktestBroker(QA_Broker):
         elif event.event_type is ENGINE_EVENT.UPCOMING_DATA:
             # QABacktest 回测发出的事件
 
-            new_marketdata_dict = event.market_data.dicts
-            for item in new_marketdata_dict.keys():
-                if item not in self._quotation.keys():
-                    self._quotation[item] = new_marketdata_dict[item]
+            # 只记录 DataStruct, 下单时再通过 bar_index 查这一根 bar, 不再整体转成 dict
+            # 同一个 DataStruct 在每个 datetime 下只记一次
+            for item in event.market_data.datetime:
+                self._quotation_data.setdefault(
+                    pd.Timestamp(item),
+                    {}
+                )[id(event.market_data)] = event.market_data
 
         elif event.event_type is BROKER_EVENT.RECEIVE_ORDER:
             self.order_handler.run(event)
@@ -203,9 +207,27 @@ class QA_BacktestBroker(QA_Broker):
                 event.callback(event)
         elif event.event_type is BROKER_EVENT.SETTLE:
             self.dealer.settle() ## 清空交易队列
+            self._drop_quotation()
             if event.callback:
                 event.callback('settle')
 
+    def _drop_quotation(self):
+        """结算后丢掉当前bar之前的行情缓存
+
+        当前bar之前的订单都已经撮合完了, 不丢掉的话整个回测的 DataStruct 都留在内存里
+        """
+        if len(self._quotation_data) == 0:
+            return
+        current = max(self._quotation_data.keys())
+        self._quotation_data = {
+            key: value
+            for key, value in self._quotation_data.items() if key >= current
+        }
+        self._quotation = {
+            key: value
+            for key, value in self._quotation.items() if key[0] >= current
+        }
+
     def query_data(self, code, start, end, frequence, market_type=None):
         """
         标准格式是numpy
@@ -429,24 +451,31 @@ class QA_BacktestBroker(QA_Broker):
         """
 
         # 首先判断是否在_quotation里面
-        if (pd.Timestamp(order.datetime), order.code) in self._quotation.keys():
-            return self._quotation[(pd.Timestamp(order.datetime), order.code)]
+        key = (pd.Timestamp(order.datetime), order.code)
+        if key in self._quotation.keys():
+            return self._quotation[key]
 
-        else:
+        for market_data in self._quotation_data.get(key[0], {}).values():
             try:
-                data = self.fetcher[(order.market_type,
-                                     order.frequence)](
-                                         code=order.code,
-                                         start=order.datetime,
-                                         end=order.datetime,
-                                         format='json',
-                                         frequence=order.frequence
-                                     )[0]
-                if 'vol' in data.keys() and 'volume' not in data.keys():
-                    data['volume'] = data['vol']
-                elif 'vol' not in data.keys() and 'volume' in data.keys():
-                    data['vol'] = data['volume']
-                return data
-            except Exception as e:
-                QA_util_log_info('MARKET_ENGING ERROR: {}'.format(e))
-                return None
+                self._quotation[key] = market_data.get_dict(key[0], order.code)
+                return self._quotation[key]
+            except KeyError:
+                pass
+
+        try:
+            data = self.fetcher[(order.market_type,
+                                 order.frequence)](
+                                     code=order.code,
+                                     start=order.datetime,
+                                     end=order.datetime,
+                                     format='json',
+                                     frequence=order.frequence
+                                 )[0]
+            if 'vol' in data.keys() and 'volume' not in data.keys():
+                data['volume'] = data['vol']
+            elif 'vol' not in data.keys() and 'volume' in data.keys():
+                data['vol'] = data['volume']
+            return data
+        except Exception as e:
+            QA_util_log_info('MARKET_ENGING ERROR: {}'.format(e))
+            return None
@@ -30,6 +30,7 @@ from QUANTAXIS.QASU import save_gm as sgm
 from QUANTAXIS.QASU import save_jq as sjq
 from QUANTAXIS.QASU import save_tushare as sts
 from QUANTAXIS.QASU import save_financialfiles
+from QUANTAXIS.QASU import save_local
 from QUANTAXIS.QAUtil import DATABASE, print_used_time
 import time
 
@@ -151,17 +152,21 @@ def QA_SU_save_future_day_all(engine, client=DATABASE):
     engine.QA_SU_save_future_day_all(client=client)
 
 
-def QA_SU_save_future_min(engine, client=DATABASE):
+def QA_SU_save_future_min(engine, client=DATABASE, derive=False):
     """save future_min
     Arguments:
         engine {[type]} -- [description]
 
     Keyword Arguments:
         client {[type]} -- [description] (default: {DATABASE})
+        derive {bool} -- 只下载 1min, 其他周期由 1min 合成, 仅 tdx (default: {False})
     """
 
     engine = select_save_engine(engine)
-    engine.QA_SU_save_future_min(client=client)
+    if derive:
+        engine.QA_SU_save_future_min(client=client, derive=True)
+    else:
+        engine.QA_SU_save_future_min(client=client)
 
 
 def QA_SU_save_future_min_all(engine, client=DATABASE):
@@ -287,7 +292,7 @@ def QA_SU_save_option_commodity_day(engine, client=DATABASE):
     engine.QA_SU_save_option_commodity_day(client=client)
 
 
-def QA_SU_save_stock_min(engine, client=DATABASE):
+def QA_SU_save_stock_min(engine, client=DATABASE, derive=False):
     """save stock_min
 
     Arguments:
@@ -295,10 +300,14 @@ def QA_SU_save_stock_min(engine, client=DATABASE):
 
     Keyword Arguments:
         client {[type]} -- [description] (default: {DATABASE})
+        derive {bool} -- 只下载 1min, 其他周期由 1min 合成, 仅 tdx (default: {False})
     """
 
     engine = select_save_engine(engine)
-    engine.QA_SU_save_stock_min(client=client)
+    if derive:
+        engine.QA_SU_save_stock_min(client=client, derive=True)
+    else:
+        engine.QA_SU_save_stock_min(client=client)
 
 
 def QA_SU_save_stock_transaction(engine, client=DATABASE):
@@ -378,7 +387,7 @@ def QA_SU_save_single_index_day(code, engine, client=DATABASE, paralleled=False)
     engine.QA_SU_save_single_index_day(code=code, client=client)
 
 
-def QA_SU_save_index_min(engine, client=DATABASE):
+def QA_SU_save_index_min(engine, client=DATABASE, derive=False):
     """save index_min
 
     Arguments:
@@ -386,10 +395,14 @@ def QA_SU_save_index_min(engine, client=DATABASE):
 
     Keyword Arguments:
         client {[type]} -- [description] (default: {DATABASE})
+        derive {bool} -- 只下载 1min, 其他周期由 1min 合成, 仅 tdx (default: {False})
     """
 
     engine = select_save_engine(engine)
-    engine.QA_SU_save_index_min(client=client)
+    if derive:
+        engine.QA_SU_save_index_min(client=client, derive=True)
+    else:
+        engine.QA_SU_save_index_min(client=client)
 
 
 def QA_SU_save_single_index_min(code, engine, client=DATABASE):
@@ -436,7 +449,7 @@ def QA_SU_save_single_etf_day(code, engine, client=DATABASE, paralleled=False):
     engine.QA_SU_save_single_etf_day(code=code, client=client)
 
 
-def QA_SU_save_etf_min(engine, client=DATABASE):
+def QA_SU_save_etf_min(engine, client=DATABASE, derive=False):
     """save etf_min
 
     Arguments:
@@ -444,10 +457,14 @@ def QA_SU_save_etf_min(engine, client=DATABASE):
 
     Keyword Arguments:
         client {[type]} -- [description] (default: {DATABASE})
+        derive {bool} -- 只下载 1min, 其他周期由 1min 合成, 仅 tdx (default: {False})
     """
 
     engine = select_save_engine(engine)
-    engine.QA_SU_save_etf_min(client=client)
+    if derive:
+        engine.QA_SU_save_etf_min(client=client, derive=True)
+    else:
+        engine.QA_SU_save_etf_min(client=client)
 
 
 def QA_SU_save_single_etf_min(code, engine, client=DATABASE):
@@ -478,6 +495,20 @@ def QA_SU_save_stock_xdxr(engine, client=DATABASE):
     engine.QA_SU_save_stock_xdxr(client=client)
 
 
+def QA_SU_save_stock_adj(engine, client=DATABASE):
+    """save stock_adj (复权因子表, 由 stock_xdxr 和 stock_day 增量计算)
+
+    Arguments:
+        engine {[type]} -- [description]
+
+    Keyword Arguments:
+        client {[type]} -- [description] (default: {DATABASE})
+    """
+
+    engine = select_save_engine(engine)
+    engine.QA_SU_save_stock_adj(client=client)
+
+
 def QA_SU_save_stock_block(engine, client=DATABASE):
     """save stock_block
 
@@ -569,6 +600,18 @@ def QA_SU_save_financialfiles():
     return save_financialfiles.QA_SU_save_financial_files()
 
 
+def QA_SU_save_local(market='stock', frequence='day', code=None, client=DATABASE):
+    """从 MongoDB 增量导出到本地列式库, 读取用 QA_fetch_local_adv
+
+    Keyword Arguments:
+        market {str} -- stock/index/future (default: {'stock'})
+        frequence {str} -- day/1min/5min/15min/30min/60min (default: {'day'})
+        code {str/list} -- 代码, None 表示全部 (default: {None})
+        client {[type]} -- [description] (default: {DATABASE})
+    """
+    save_local.QA_SU_save_local(market, frequence, code, client=client)
+
+
 def QA_SU_save_report_calendar_day():
     return save_financial_calendar.QA_SU_save_report_calendar_day()
 
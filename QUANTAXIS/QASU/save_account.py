@@ -23,8 +23,9 @@
 # SOFTWARE.
 
 
-from pymongo import DESCENDING, ASCENDING
-from QUANTAXIS.QAUtil import DATABASE
+from pymongo import DESCENDING, ASCENDING, UpdateOne
+from pymongo.errors import OperationFailure
+from QUANTAXIS.QAUtil import DATABASE, QA_util_log_info
 """对于账户的增删改查(QAACCOUNT/QAUSER/QAPORTFOLIO)
 """
 
@@ -80,3 +81,34 @@ def save_riskanalysis(message, collection=DATABASE.risk):
         upsert=True
     )
 
+
+def save_riskanalysis_many(messages, collection=DATABASE.risk):
+    """批量保存风险分析, 和 save_riskanalysis 一样按 account/portfolio/user_cookie upsert,
+    只用一次 bulk_write
+
+    Arguments:
+        messages {list} -- [dict]
+    """
+    if len(messages) == 0:
+        return
+    try:
+        collection.create_index(
+            [("account_cookie", ASCENDING), ("user_cookie", ASCENDING), ("portfolio_cookie", ASCENDING)], unique=True)
+    except OperationFailure as e:
+        # 已经有同样字段的索引 (选项不同), 或者表里已经有重复记录; upsert 不依赖唯一索引
+        QA_util_log_info(
+            'save_riskanalysis_many: unique index on {} failed, {}'.format(
+                getattr(collection, 'full_name', collection), e)
+        )
+
+    collection.bulk_write(
+        [
+            UpdateOne(
+                {'account_cookie': message['account_cookie'], 'portfolio_cookie':
+                    message['portfolio_cookie'], 'user_cookie': message['user_cookie']},
+                {'$set': message},
+                upsert=True
+            ) for message in messages
+        ],
+        ordered=False
+    )
@@ -0,0 +1,501 @@
+# coding:utf-8
+#
+# The MIT License (MIT)
+#
+# Copyright (c) 2016-2019 yutiansut/QUANTAXIS
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+QASU 的流水线保存
+
+一个保存任务 = (代码, 周期), 分三个阶段, 阶段之间用有界队列连接:
+
+    download    download_workers 个线程: 查库里的保存位置 (plan), 从通达信下载 (fetcher)
+    transform   transform(data, context), transform_workers > 0 时在进程池里做; 再转成 dict
+                transform_batch > 1 时多个代码的数据 concat 在一起转换一次
+    write       QA_BulkWriter 跨代码攒批 upsert, 每写完一批记一次进度; 这一批里写入出错的代码
+                不记进度, 算作出错的代码
+
+下游慢的时候队列满了, 上游的 put 会阻塞 (背压), 内存里最多只有 queue_size 个代码的数据
+
+进度记在 save_job/save_progress 两张表里: 当天的一次运行中途退出或者有代码出错时, resume=True 的
+下一次运行跳过上次已经写入的任务; 正常结束的运行不影响下一次
+"""
+
+import datetime
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from QUANTAXIS.QASU.save_writer import QA_BulkWriter
+from QUANTAXIS.QAUtil import (
+    QA_util_get_next_day,
+    QA_util_get_real_date,
+    QA_util_log_info,
+    QA_util_sql_mongo_last,
+    QA_util_to_records_from_pandas,
+    trade_date_sse
+)
+
+_DAILY = ('day', 'week', 'month', 'quarter', 'year')
+_DONE = None
+
+
+def now_time():
+    return str(QA_util_get_real_date(str(datetime.date.today() - datetime.timedelta(days=1)), trade_date_sse, -1)) + \
+           ' 17:00:00' if datetime.datetime.now().hour < 15 else str(QA_util_get_real_date(
+        str(datetime.date.today()), trade_date_sse, -1)) + ' 15:00:00'
+
+
+class _save_stage():
+    '一个阶段的计数, busy 为所有 worker 在这个阶段实际花的时间'
+
+    def __init__(self, name, workers):
+        self.name = name
+        self.workers = workers
+        self.items = 0
+        self.rows = 0
+        self.errors = 0
+        self.busy = 0.0
+        self._lock = threading.Lock()
+
+    def add(self, rows, busy, error=False, items=1):
+        with self._lock:
+            self.items += items
+            self.rows += rows
+            self.busy += busy
+            self.errors += error
+
+    def stats(self, elapsed):
+        with self._lock:
+            return {
+                'workers': self.workers,
+                'items': self.items,
+                'rows': self.rows,
+                'errors': self.errors,
+                'busy': self.busy,
+                'rows_per_second': self.rows / elapsed if elapsed > 0 else 0.0,
+                'utilization': self.busy / (elapsed * self.workers) if elapsed > 0 else 0.0
+            }
+
+
+class QA_SaveEngine():
+    """下载 -> 转换 -> 写入 的流水线
+
+    Arguments:
+        name {str} -- 任务名, 进度按这个名字记录, 如 stock_day/index_min
+        coll {pymongo.collection.Collection} -- 表
+        fetcher {function} -- fetcher(code, start, end, frequence) 返回 DataFrame
+
+    Keyword Arguments:
+        frequence {str/list} -- 周期, 分钟线为 ['1min', '5min', ...] (default: {'day'})
+        start {str/list} -- 库里没有数据时的开始时间, list 时前一个下载失败再用后一个 (default: {'1990-01-01'})
+        code_length {int} -- 查保存位置时代码取前几位, 期货 4/6, 期权 8 (default: {6})
+        plan {function} -- plan(engine, code, frequence) 返回 (start, end, context), None 为不需要下载,
+                           默认按库里最后一条记录增量更新 (default: {None})
+        transform {function} -- transform(data, context) 返回 DataFrame, 进程池里执行时必须是模块级的函数 (default: {None})
+        job {str} -- 日志里的编号 (default: {'JOB'})
+        download_workers {int} -- 下载线程数 (default: {4})
+        transform_workers {int} -- 转换进程数, 0 为在一个线程里做 (default: {0})
+        transform_batch {int} -- 攒够这么多个代码的数据一起转换, 大于 1 时 transform 收到的 data 是这些代码
+                                 concat 之后的数据, context 是 {code: context} (default: {1})
+        batch_size {int} -- 攒够这么多条写一次 (default: {20000})
+        queue_size {int} -- 阶段之间的队列长度 (default: {16})
+        resume {bool} -- 记录进度, 跳过上一次中途退出的运行里已经写入的任务; 单个代码的保存用 False (default: {True})
+        ensure_index {bool} -- 开始前在 (code, date) / (code, datetime, type) 上建 upsert 用的唯一索引,
+                               已有数据的大表第一次建立要扫一遍全表 (default: {True})
+        progress {pymongo.database.Database} -- 记进度的库, None 为 coll 所在的库 (default: {None})
+        ui_log {[type]} -- 给GUI qt 界面使用 (default: {None})
+        ui_progress {[type]} -- 给GUI qt 界面使用 (default: {None})
+    """
+
+    def __init__(
+            self,
+            name,
+            coll,
+            fetcher,
+            frequence='day',
+            start='1990-01-01',
+            code_length=6,
+            plan=None,
+            transform=None,
+            job='JOB',
+            download_workers=4,
+            transform_workers=0,
+            transform_batch=1,
+            batch_size=20000,
+            queue_size=16,
+            resume=True,
+            ensure_index=True,
+            progress=None,
+            ui_log=None,
+            ui_progress=None
+    ):
+        self.name = name
+        self.coll = coll
+        self.fetcher = fetcher
+        self.frequence = [frequence] if isinstance(frequence, str) else list(frequence)
+        self.start = [start] if isinstance(start, str) else list(start)
+        self.code_length = code_length
+        self.plan = plan if plan is not None else QA_SaveEngine.plan_incremental
+        self.transform = transform
+        self.job = job
+        self.download_workers = max(1, download_workers)
+        self.transform_workers = transform_workers
+        self.transform_batch = max(1, transform_batch)
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.resume = resume
+        self.ensure_index = ensure_index
+        self.progress = None if not resume else progress if progress is not None else getattr(
+            coll,
+            'database',
+            None
+        )
+        self.ui_log = ui_log
+        self.ui_progress = ui_progress
+        self.daily = self.frequence[0] in _DAILY
+        self.keys = ('code', 'date') if self.daily else ('code', 'datetime', 'type')
+        self.err = []
+        self.skipped = 0
+        self.elapsed = 0.0
+        self.stages = {}
+
+    def __repr__(self):
+        return '< QA_SaveEngine {} {} >'.format(self.name, self.frequence)
+
+    @staticmethod
+    def plan_incremental(engine, code, frequence):
+        '从库里最后一条记录接着下载, 日线从下一天开始, 分钟线重叠的那一根由 upsert 覆盖'
+        query = {'code': str(code)[0:engine.code_length]}
+        if engine.daily:
+            ref = QA_util_sql_mongo_last(engine.coll, query, 'date_stamp')
+            end = str(now_time())[0:10]
+            if ref is None:
+                return engine.start[0], end, None
+            if ref['date'] == end:
+                return None
+            return QA_util_get_next_day(ref['date']), end, None
+        query['type'] = frequence
+        ref = QA_util_sql_mongo_last(engine.coll, query, 'time_stamp')
+        end = str(now_time())[0:19]
+        start = engine.start[0] if ref is None else ref['datetime']
+        return None if start == end else (start, end, None)
+
+    def _load_progress(self):
+        '返回这次运行的开始时间和已经完成的任务'
+        now = str(datetime.datetime.now())[0:19]
+        if self.progress is None:
+            return now, set()
+        job = self.progress.save_job.find_one({'job': self.name})
+        # 只接着今天中途退出的那一次, 更早的运行之后的数据还是要重新下载
+        if job is not None and job.get('status') == 'running' \
+                and job['started'][0:10] == now[0:10]:
+            done = {
+                (item['code'],
+                 item['frequence'])
+                for item in self.progress.save_progress.find(
+                    {'job': self.name, 'started': job['started']},
+                    {'_id': 0, 'code': 1, 'frequence': 1}
+                )
+            }
+            QA_util_log_info(
+                '##{} {} resume from {}, {} tasks done'.format(
+                    self.job,
+                    self.name,
+                    job['started'],
+                    len(done)
+                ),
+                self.ui_log
+            )
+            return job['started'], done
+        self.progress.save_job.replace_one(
+            {'job': self.name},
+            {'job': self.name, 'status': 'running', 'started': now},
+            upsert=True
+        )
+        self.progress.save_progress.delete_many({'job': self.name})
+        return now, set()
+
+    def _finish_progress(self, started):
+        if self.progress is not None:
+            self.progress.save_job.update_one(
+                {'job': self.name},
+                {'$set': {'status': 'done', 'finished': str(datetime.datetime.now())[0:19],
+                          'errors': len(self.err)}}
+            )
+
+    def _download(self, tasks, out, stage):
+        while True:
+            try:
+                code, frequence = tasks.get_nowait()
+            except queue.Empty:
+                out.put(_DONE)
+                return
+            _time = time.time()
+            data, context, error = None, None, None
+            try:
+                plan = self.plan(self, code, frequence)
+                if plan is not None:
+                    start, end, context = plan
+                    starts = [start] if start not in self.start else \
+                        self.start[self.start.index(start):]
+                    for i, start in enumerate(starts):
+                        QA_util_log_info(
+                            '##{} Now Saving {} {} ==== {} from {} to {}'.format(
+                                self.job,
+                                self.name.upper(),
+                                frequence,
+                                code,
+                                start,
+                                end
+                            ),
+                            self.ui_log
+                        )
+                        try:
+                            data = self.fetcher(str(code), start, end, frequence)
+                            break
+                        except Exception:
+                            if i == len(starts) - 1:
+                                raise
+            except Exception as e:
+                error = e
+            rows = 0 if data is None else len(data)
+            stage.add(rows, time.time() - _time, error is not None)
+            out.put((code, frequence, data, context, error))
+
+    def _transform_args(self, items):
+        if self.transform_batch == 1:
+            return items[0][2], items[0][3]
+        return pd.concat([item[2] for item in items], sort=False), \
+            {str(item[0]): item[3] for item in items}
+
+    def _transform(self, inp, out, stage):
+        pool = ProcessPoolExecutor(self.transform_workers) \
+            if self.transform is not None and self.transform_workers > 0 else None
+        running = deque()
+        batch = []
+
+        def submit(items):
+            'items 是一起转换的几个下载结果, 下载出错或者没有数据的单独成组'
+            if pool is not None and items[0][2] is not None and items[0][4] is None:
+                running.append((items, pool.submit(self.transform, *self._transform_args(items))))
+            else:
+                running.append((items, None))
+
+        def finish(items, res):
+            data, error = items[0][2], items[0][4]
+            _time = time.time()
+            docs = []
+            try:
+                if res is not None:
+                    data = res.result()
+                elif data is not None and error is None and self.transform is not None:
+                    data = self.transform(*self._transform_args(items))
+                if error is None:
+                    docs = QA_util_to_records_from_pandas(data)
+            except Exception as e:
+                error = e
+            stage.add(len(docs), time.time() - _time, error is not None, items=len(items))
+            if len(items) == 1:
+                out.put((items[0][0], items[0][1], docs, error))
+                return
+            # 按代码拆开, 每个代码单独记进度; 对不上代码的记录放在第一个代码里, 不会丢
+            parts = {str(item[0]): [] for item in items}
+            first = parts[str(items[0][0])]
+            for doc in docs:
+                parts.get(str(doc.get('code')), first).append(doc)
+            for item in items:
+                out.put((item[0], item[1], parts[str(item[0])], error))
+
+        done = 0
+        try:
+            while done < self.download_workers:
+                item = inp.get()
+                if item is _DONE:
+                    done += 1
+                elif self.transform_batch > 1 and item[2] is not None and item[4] is None:
+                    batch.append(item)
+                    if len(batch) >= self.transform_batch:
+                        submit(batch)
+                        batch = []
+                else:
+                    submit([item])
+                # 进程池里最多 2 倍进程数的任务, 按提交的顺序取结果
+                while len(running) > max(0, 2 * self.transform_workers) or \
+                        (len(running) > 0 and running[0][1] is None):
+                    finish(*running.popleft())
+            if len(batch) > 0:
+                submit(batch)
+            while len(running) > 0:
+                finish(*running.popleft())
+        finally:
+            if pool is not None:
+                pool.shutdown()
+            out.put(_DONE)
+
+    def run(self, code_list):
+        """保存 code_list 中所有代码的所有周期
+
+        Arguments:
+            code_list {list} -- 代码
+
+        Returns:
+            list -- 出错的代码
+        """
+        _start = time.time()
+        started, done = self._load_progress()
+        tasks = queue.Queue()
+        total = 0
+        for code in code_list:
+            for frequence in self.frequence:
+                total += 1
+                if (str(code), frequence) in done:
+                    self.skipped += 1
+                else:
+                    tasks.put((code, frequence))
+
+        self.err = []
+        self.stages = {
+            'download': _save_stage('download', self.download_workers),
+            'transform': _save_stage('transform', max(1, self.transform_workers)),
+            'write': _save_stage('write', 1)
+        }
+        downloaded = queue.Queue(maxsize=self.queue_size)
+        transformed = queue.Queue(maxsize=self.queue_size)
+        threads = [
+            threading.Thread(
+                target=self._download,
+                args=(tasks, downloaded, self.stages['download']),
+                daemon=True
+            ) for _ in range(self.download_workers)
+        ]
+        threads.append(
+            threading.Thread(
+                target=self._transform,
+                args=(downloaded, transformed, self.stages['transform']),
+                daemon=True
+            )
+        )
+        for item in threads:
+            item.start()
+
+        writer = QA_BulkWriter(
+            self.coll,
+            self.keys,
+            batch_size=self.batch_size,
+            ensure_index=self.ensure_index,
+            ui_log=self.ui_log
+        )
+        progress = QA_BulkWriter(
+            self.progress.save_progress,
+            ('job', 'code', 'frequence'),
+            batch_size=10**9,
+            ui_log=self.ui_log
+        ) if self.progress is not None else None
+        pending = []
+        buffered = 0
+        count = self.skipped
+
+        def flush():
+            _time = time.time()
+            writer.flush()
+            failed = writer.take_failed()
+            for code in sorted(failed):
+                QA_util_log_info(
+                    '##{} {} write failed {}'.format(self.job, self.name, code),
+                    self.ui_log
+                )
+            if len(failed - {item['code'] for item in pending}) > 0:
+                # 出错的记录对不上这一批的代码, 这一批都不记进度
+                failed = {item['code'] for item in pending}
+            for item in pending:
+                if item['code'] in failed and item['code'] not in self.err:
+                    self.err.append(item['code'])
+            done = [item for item in pending if item['code'] not in failed]
+            if progress is not None and len(done) > 0:
+                progress.write(done)
+                progress.flush()
+            self.stages['write'].add(0, time.time() - _time, items=0)
+            del pending[:]
+
+        while True:
+            item = transformed.get()
+            if item is _DONE:
+                break
+            code, frequence, docs, error = item
+            count += 1
+            if error is not None:
+                QA_util_log_info(error, self.ui_log)
+                if code not in self.err:
+                    self.err.append(code)
+            else:
+                _time = time.time()
+                writer.write(docs)
+                self.stages['write'].add(len(docs), time.time() - _time)
+                buffered += len(docs)
+                pending.append({
+                    'job': self.name,
+                    'code': str(code),
+                    'frequence': frequence,
+                    'started': started,
+                    'rows': len(docs)
+                })
+                if buffered >= self.batch_size:
+                    flush()
+                    buffered = 0
+            QA_util_log_info(
+                'DOWNLOAD PROGRESS {} '.format(str(float(count / total * 100))[0:4] + '%'),
+                self.ui_log,
+                ui_progress=self.ui_progress,
+                ui_progress_int_value=int(count / total * 10000.0)
+            )
+        flush()
+        for item in threads:
+            item.join()
+        if len(self.err) == 0:
+            self._finish_progress(started)
+        self.elapsed = time.time() - _start
+
+        if len(self.err) < 1:
+            QA_util_log_info('SUCCESS', ui_log=self.ui_log)
+        else:
+            QA_util_log_info(' ERROR CODE \n ', ui_log=self.ui_log)
+            QA_util_log_info(self.err, ui_log=self.ui_log)
+        return self.err
+
+    def stats(self):
+        """每个阶段的条数, 耗时和吞吐量
+
+        utilization 接近 1 的阶段是瓶颈: download 低而 write 高说明库写不过来
+        """
+        res = {
+            'name': self.name,
+            'elapsed': self.elapsed,
+            'skipped': self.skipped,
+            'errors': len(self.err)
+        }
+        for name, stage in self.stages.items():
+            res[name] = stage.stats(self.elapsed)
+        return res
@@ -9,8 +9,10 @@ import pymongo
 import QUANTAXIS as QA
 from QUANTAXIS.QAFetch.QATdx import QA_fetch_get_stock_list
 from QUANTAXIS.QAUtil import (DATABASE, QA_util_date_stamp,
+                              QA_util_date_stamp_array,
                               QA_util_get_real_date, QA_util_log_info,
-                              QA_util_time_stamp, QA_util_to_json_from_pandas,
+                              QA_util_time_stamp, QA_util_time_stamp_array,
+                              QA_util_to_json_from_pandas,
                               trade_date_sse)
 
 TRADE_HOUR_END = 17
@@ -79,9 +81,9 @@ def QA_SU_save_stock_min(client=DATABASE, ui_log=None, ui_progress=None):
             0, 19))
         df["date"] = df.datetime.map(str).str.slice(0, 10)
         df = df.set_index("datetime", drop=False)
-        df["date_stamp"] = df["date"].apply(lambda x: QA_util_date_stamp(x))
+        df["date_stamp"] = QA_util_date_stamp_array(df["date"])
         df["time_stamp"] = (
-            df["datetime"].map(str).apply(lambda x: QA_util_time_stamp(x)))
+            QA_util_time_stamp_array(df["datetime"].map(str)))
         df["type"] = type_
 
         return df[[
@@ -0,0 +1,197 @@
+# coding:utf-8
+#
+# The MIT License (MIT)
+#
+# Copyright (c) 2016-2019 yutiansut/QUANTAXIS
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+把行情写入本地列式库 (目录结构见 QUANTAXIS.QAFetch.QALocal)
+
+QA_SU_save_local_data 可以直接保存任意 QA_DataStruct_*,
+QA_SU_save_local 从 MongoDB 增量导出 (只取本地最后一根 bar 之后的数据)
+"""
+
+import datetime
+import json
+import os
+import shutil
+
+import numpy as np
+
+from QUANTAXIS.QAData.base_columnar import _quotation_columns
+from QUANTAXIS.QAFetch.QALocal import (QA_fetch_local_last_datetime,
+                                       _QA_local_load, _QA_local_path)
+from QUANTAXIS.QAFetch.QAQuery_Advance import (QA_fetch_future_day_adv,
+                                               QA_fetch_future_min_adv,
+                                               QA_fetch_index_day_adv,
+                                               QA_fetch_index_min_adv,
+                                               QA_fetch_stock_day_adv,
+                                               QA_fetch_stock_min_adv)
+from QUANTAXIS.QAUtil import DATABASE, QA_util_code_tolist, QA_util_log_info
+
+
+def _QA_local_array(col):
+    'object 列(type 等字符串)转成定长字符串, 这样 .npy 不需要 pickle 也能 mmap'
+    col = np.asarray(col)
+    if col.dtype == object:
+        col = col.astype(str)
+    return col
+
+
+def _QA_local_write(code_path, columns):
+    """把一个代码的 _quotation_columns 写入目录
+
+    先写到临时目录再整体替换, 读的一方不会看到写了一半的文件
+    """
+    tmp_path = code_path + '.tmp'
+    old_path = code_path + '.old'
+    for item in [tmp_path, old_path]:
+        if os.path.exists(item):
+            shutil.rmtree(item)
+    os.makedirs(tmp_path)
+    np.save(os.path.join(tmp_path, 'datetime.npy'), columns.datetime)
+    for field in columns.fields:
+        np.save(
+            os.path.join(tmp_path,
+                         '{}.npy'.format(field)),
+            _QA_local_array(columns.columns[field])
+        )
+    with open(os.path.join(tmp_path, 'meta.json'), 'w') as f:
+        json.dump(
+            {
+                'fields': columns.fields,
+                'index_names': columns.index_names
+            },
+            f
+        )
+    if os.path.exists(code_path):
+        os.rename(code_path, old_path)
+    os.rename(tmp_path, code_path)
+    if os.path.exists(old_path):
+        shutil.rmtree(old_path)
+
+
+def QA_SU_save_local_data(data, market='stock', frequence='day', path=None):
+    """保存行情到本地列式库, 和已有数据合并, (datetime, code) 重复时以新数据为准
+
+    Arguments:
+        data {QA_DataStruct/pd.DataFrame} -- MultiIndex(date/datetime, code) 的行情
+
+    Keyword Arguments:
+        market {str} -- stock/index/future (default: {'stock'})
+        frequence {str} -- day/1min/5min/15min/30min/60min (default: {'day'})
+        path {str} -- 本地库的根目录 (default: {datastore_path})
+
+    Returns:
+        int -- 写入的代码个数
+    """
+    data = getattr(data, 'data', data)
+    if data is None or len(data) == 0:
+        return 0
+    new = _quotation_columns.from_frame(data.sort_index())
+    for i, code in enumerate(new.codes):
+        code_path = _QA_local_path(market, frequence, code, path)
+        part = new.slice_rows(new.offsets[i], new.offsets[i + 1])
+        old = _QA_local_load(code_path, mmap_mode=None)
+        if old is not None and set(part.fields) <= set(old[2]['fields']):
+            datetime, columns, _ = old
+            part = _quotation_columns.from_arrays(
+                np.concatenate([datetime,
+                                part.datetime]),
+                np.repeat(code,
+                          len(datetime) + len(part)),
+                {
+                    field: np.concatenate(
+                        [columns[field].astype(part.columns[field].dtype),
+                         part.columns[field]]
+                    ) for field in part.fields
+                },
+                fields=part.fields,
+                index_names=part.index_names
+            )
+        # 字段和已有数据不一致时以新数据为准重写
+        _QA_local_write(code_path, part)
+    return len(new.codes)
+
+
+def QA_SU_save_local(
+        market='stock',
+        frequence='day',
+        code=None,
+        client=DATABASE,
+        path=None,
+        ui_log=None,
+        ui_progress=None
+):
+    """从 MongoDB 增量导出行情到本地列式库
+
+    Keyword Arguments:
+        market {str} -- stock/index/future (default: {'stock'})
+        frequence {str} -- day/1min/5min/15min/30min/60min (default: {'day'})
+        code {str/list} -- 代码, None 表示数据库中的全部代码 (default: {None})
+        client {[type]} -- [description] (default: {DATABASE})
+        path {str} -- 本地库的根目录 (default: {datastore_path})
+    """
+    if frequence == 'day':
+        fetcher, coll = {
+            'stock': (QA_fetch_stock_day_adv, client.stock_day),
+            'index': (QA_fetch_index_day_adv, client.index_day),
+            'future': (QA_fetch_future_day_adv, client.future_day)
+        }[market]
+        kwargs = {}
+    else:
+        fetcher, coll = {
+            'stock': (QA_fetch_stock_min_adv, client.stock_min),
+            'index': (QA_fetch_index_min_adv, client.index_min),
+            'future': (QA_fetch_future_min_adv, client.future_min)
+        }[market]
+        kwargs = {'frequence': frequence}
+
+    code_list = coll.distinct('code') if code is None else QA_util_code_tolist(code)
+    end = str(datetime.date.today())
+    err = []
+    for i_, item in enumerate(code_list):
+        QA_util_log_info(
+            '##JOB Now Saving LOCAL {}_{} ==== {}'.format(market,
+                                                         frequence,
+                                                         item),
+            ui_log=ui_log
+        )
+        last = QA_fetch_local_last_datetime(item, market, frequence, path)
+        start = '1990-01-01' if last is None else str(last)[0:10]
+        try:
+            res = fetcher(item, start, end, collections=coll, **kwargs)
+            if res is not None:
+                QA_SU_save_local_data(res, market, frequence, path)
+        except Exception:
+            err.append(str(item))
+        QA_util_log_info(
+            'DOWNLOAD PROGRESS {}%'.format(str(float((i_ + 1) / len(code_list) * 100))[0:4]),
+            ui_log=ui_log,
+            ui_progress=ui_progress,
+            ui_progress_int_value=int((i_ + 1) / len(code_list) * 100)
+        )
+
+    if len(err) < 1:
+        QA_util_log_info('SUCCESS save local data ^_^', ui_log=ui_log)
+    else:
+        QA_util_log_info('ERROR CODE \n ', ui_log=ui_log)
+        QA_util_log_info(err, ui_log=ui_log)
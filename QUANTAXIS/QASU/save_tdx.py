@@ -22,13 +22,14 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
-import concurrent
 import datetime
-from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+import functools
 import json
 import pandas as pd
 import pymongo
 
+from QUANTAXIS.QAData.data_fq import QA_data_calc_adj_factor
+from QUANTAXIS.QAData.data_resample import QA_data_min_resample_batch
 from QUANTAXIS.QAFetch import QA_fetch_get_stock_block
 from QUANTAXIS.QAFetch.QATdx import (
     QA_fetch_get_option_day,
@@ -58,11 +59,16 @@ from QUANTAXIS.QAFetch.QATdx import (
     QA_fetch_get_option_50etf_contract_time_to_market,
     QA_fetch_get_option_all_contract_time_to_market,
 )
+from QUANTAXIS.QASU.save_engine import QA_SaveEngine, now_time
+from QUANTAXIS.QASU.save_writer import QA_BulkWriter
 from QUANTAXIS.QAUtil import (
     DATABASE,
+    QA_util_date_stamp,
+    QA_util_date_stamp_array,
     QA_util_get_next_day,
     QA_util_get_real_date,
     QA_util_log_info,
+    QA_util_sql_mongo_last,
     QA_util_to_json_from_pandas,
     trade_date_sse
 )
@@ -74,11 +80,6 @@ from multiprocessing import cpu_count
 # ip=select_best_ip()
 
 
-def now_time():
-    return str(QA_util_get_real_date(str(datetime.date.today() - datetime.timedelta(days=1)), trade_date_sse, -1)) + \
-           ' 17:00:00' if datetime.datetime.now().hour < 15 else str(QA_util_get_real_date(
-        str(datetime.date.today()), trade_date_sse, -1)) + ' 15:00:00'
-
 def QA_SU_save_single_stock_day(code : str, client= DATABASE, ui_log=None):
     '''
      save single stock_day
@@ -96,80 +97,19 @@ def QA_SU_save_single_stock_day(code : str, client= DATABASE, ui_log=None):
          ("date_stamp",
           pymongo.ASCENDING)]
     )
-    err = []
-
-    def __saving_work(code, coll_stock_day):
-        try:
-            QA_util_log_info(
-                '##JOB01 Now Saving STOCK_DAY==== {}'.format(str(code)),
-                ui_log
-            )
-
-            # 首选查找数据库 是否 有 这个代码的数据
-            ref = coll_stock_day.find({'code': str(code)[0:6]})
-            end_date = str(now_time())[0:10]
-
-            # 当前数据库已经包含了这个代码的数据， 继续增量更新
-            # 加入这个判断的原因是因为如果股票是刚上市的 数据库会没有数据 所以会有负索引问题出现
-            if ref.count() > 0:
-
-                # 接着上次获取的日期继续更新
-                start_date = ref[ref.count() - 1]['date']
-
-                QA_util_log_info(
-                    'UPDATE_STOCK_DAY \n Trying updating {} from {} to {}'
-                    .format(code,
-                            start_date,
-                            end_date),
-                    ui_log
-                )
-                if start_date != end_date:
-                    coll_stock_day.insert_many(
-                        QA_util_to_json_from_pandas(
-                            QA_fetch_get_stock_day(
-                                str(code),
-                                QA_util_get_next_day(start_date),
-                                end_date,
-                                '00'
-                            )
-                        )
-                    )
-
-            # 当前数据库中没有这个代码的股票数据， 从1990-01-01 开始下载所有的数据
-            else:
-                start_date = '1990-01-01'
-                QA_util_log_info(
-                    'UPDATE_STOCK_DAY \n Trying updating {} from {} to {}'
-                    .format(code,
-                            start_date,
-                            end_date),
-                    ui_log
-                )
-                if start_date != end_date:
-                    coll_stock_day.insert_many(
-                        QA_util_to_json_from_pandas(
-                            QA_fetch_get_stock_day(
-                                str(code),
-                                start_date,
-                                end_date,
-                                '00'
-                            )
-                        )
-                    )
-        except Exception as error0:
-            print(error0)
-            err.append(str(code))
-
-    __saving_work(code, coll_stock_day)
-
-    if len(err) < 1:
-        QA_util_log_info('SUCCESS save stock day ^_^', ui_log)
-    else:
-        QA_util_log_info('ERROR CODE \n ', ui_log)
-        QA_util_log_info(err, ui_log)
-
-
-def QA_SU_save_stock_day(client=DATABASE, ui_log=None, ui_progress=None):
+    QA_SaveEngine(
+        'stock_day',
+        coll_stock_day,
+        _fetch_stock_day,
+        frequence='day',
+        start='1990-01-01',
+        job='JOB01',
+        resume=False,
+        ui_log=ui_log
+    ).run([code])
+
+
+def QA_SU_save_stock_day(client=DATABASE, ui_log=None, ui_progress=None, download_workers=4):
     '''
      save stock_day
     保存日线数据
@@ -177,6 +117,7 @@ def QA_SU_save_stock_day(client=DATABASE, ui_log=None, ui_progress=None):
     :param ui_log:  给GUI qt 界面使用
     :param ui_progress: 给GUI qt 界面使用
     :param ui_progress_int_value: 给GUI qt 界面使用
+    :param download_workers: 下载线程数
     '''
     stock_list = QA_fetch_get_stock_list().code.unique().tolist()
     coll_stock_day = client.stock_day
@@ -186,92 +127,17 @@ def QA_SU_save_stock_day(client=DATABASE, ui_log=None, ui_progress=None):
          ("date_stamp",
           pymongo.ASCENDING)]
     )
-    err = []
-
-    def __saving_work(code, coll_stock_day):
-        try:
-            QA_util_log_info(
-                '##JOB01 Now Saving STOCK_DAY==== {}'.format(str(code)),
-                ui_log
-            )
-
-            # 首选查找数据库 是否 有 这个代码的数据
-            ref = coll_stock_day.find({'code': str(code)[0:6]})
-            end_date = str(now_time())[0:10]
-
-            # 当前数据库已经包含了这个代码的数据， 继续增量更新
-            # 加入这个判断的原因是因为如果股票是刚上市的 数据库会没有数据 所以会有负索引问题出现
-            if ref.count() > 0:
-
-                # 接着上次获取的日期继续更新
-                start_date = ref[ref.count() - 1]['date']
-
-                QA_util_log_info(
-                    'UPDATE_STOCK_DAY \n Trying updating {} from {} to {}'
-                    .format(code,
-                            start_date,
-                            end_date),
-                    ui_log
-                )
-                if start_date != end_date:
-                    coll_stock_day.insert_many(
-                        QA_util_to_json_from_pandas(
-                            QA_fetch_get_stock_day(
-                                str(code),
-                                QA_util_get_next_day(start_date),
-                                end_date,
-                                '00'
-                            )
-                        )
-                    )
-
-            # 当前数据库中没有这个代码的股票数据， 从1990-01-01 开始下载所有的数据
-            else:
-                start_date = '1990-01-01'
-                QA_util_log_info(
-                    'UPDATE_STOCK_DAY \n Trying updating {} from {} to {}'
-                    .format(code,
-                            start_date,
-                            end_date),
-                    ui_log
-                )
-                if start_date != end_date:
-                    coll_stock_day.insert_many(
-                        QA_util_to_json_from_pandas(
-                            QA_fetch_get_stock_day(
-                                str(code),
-                                start_date,
-                                end_date,
-                                '00'
-                            )
-                        )
-                    )
-        except Exception as error0:
-            print(error0)
-            err.append(str(code))
-
-    for item in range(len(stock_list)):
-        QA_util_log_info('The {} of Total {}'.format(item, len(stock_list)))
-
-        strProgressToLog = 'DOWNLOAD PROGRESS {} {}'.format(
-            str(float(item / len(stock_list) * 100))[0:4] + '%',
-            ui_log
-        )
-        intProgressToLog = int(float(item / len(stock_list) * 100))
-        QA_util_log_info(
-            strProgressToLog,
-            ui_log=ui_log,
-            ui_progress=ui_progress,
-            ui_progress_int_value=intProgressToLog
-        )
-
-        __saving_work(stock_list[item], coll_stock_day)
-
-    if len(err) < 1:
-        QA_util_log_info('SUCCESS save stock day ^_^', ui_log)
-    else:
-        QA_util_log_info('ERROR CODE \n ', ui_log)
-        QA_util_log_info(err, ui_log)
+    QA_SaveEngine(
+        'stock_day',
+        coll_stock_day,
+        _fetch_stock_day,
+        frequence='day',
+        start='1990-01-01',
+        job='JOB01',
+        download_workers=download_workers,
+        ui_log=ui_log,
+        ui_progress=ui_progress
+    ).run(stock_list)
 
 
 def gen_param(codelist, start_date=None, end_date=None, if_fq='00', frequence='day', IPList=[]):
@@ -299,88 +165,16 @@ def QA_SU_save_stock_week(client=DATABASE, ui_log=None, ui_progress=None):
          ("date_stamp",
           pymongo.ASCENDING)]
     )
-    err = []
-
-    def __saving_work(code, coll_stock_week):
-        try:
-            QA_util_log_info(
-                '##JOB01 Now Saving STOCK_WEEK==== {}'.format(str(code)),
-                ui_log=ui_log
-            )
-
-            ref = coll_stock_week.find({'code': str(code)[0:6]})
-            end_date = str(now_time())[0:10]
-            if ref.count() > 0:
-                # 加入这个判断的原因是因为如果股票是刚上市的 数据库会没有数据 所以会有负索引问题出现
-
-                start_date = ref[ref.count() - 1]['date']
-
-                QA_util_log_info(
-                    'UPDATE_STOCK_WEEK \n Trying updating {} from {} to {}'
-                        .format(code,
-                                start_date,
-                                end_date),
-                    ui_log=ui_log
-                )
-                if start_date != end_date:
-                    coll_stock_week.insert_many(
-                        QA_util_to_json_from_pandas(
-                            QA_fetch_get_stock_day(
-                                str(code),
-                                QA_util_get_next_day(start_date),
-                                end_date,
-                                '00',
-                                frequence='week'
-                            )
-                        )
-                    )
-            else:
-                start_date = '1990-01-01'
-                QA_util_log_info(
-                    'UPDATE_STOCK_WEEK \n Trying updating {} from {} to {}'
-                        .format(code,
-                                start_date,
-                                end_date),
-                    ui_log=ui_log
-                )
-                if start_date != end_date:
-                    coll_stock_week.insert_many(
-                        QA_util_to_json_from_pandas(
-                            QA_fetch_get_stock_day(
-                                str(code),
-                                start_date,
-                                end_date,
-                                '00',
-                                frequence='week'
-                            )
-                        )
-                    )
-        except:
-            err.append(str(code))
-
-    for item in range(len(stock_list)):
-        QA_util_log_info(
-            'The {} of Total {}'.format(item,
-                                        len(stock_list)),
-            ui_log=ui_log
-        )
-        strProgress = 'DOWNLOAD PROGRESS {} '.format(
-            str(float(item / len(stock_list) * 100))[0:4] + '%'
-        )
-        intProgress = int(float(item / len(stock_list) * 100))
-        QA_util_log_info(
-            strProgress,
-            ui_log=ui_log,
-            ui_progress=ui_progress,
-            ui_progress_int_value=intProgress
-        )
-
-        __saving_work(stock_list[item], coll_stock_week)
-    if len(err) < 1:
-        QA_util_log_info('SUCCESS', ui_log=ui_log)
-    else:
-        QA_util_log_info(' ERROR CODE \n ', ui_log=ui_log)
-        QA_util_log_info(err, ui_log=ui_log)
+    QA_SaveEngine(
+        'stock_week',
+        coll_stock_week,
+        _fetch_stock_day,
+        frequence='week',
+        start='1990-01-01',
+        job='JOB01',
+        ui_log=ui_log,
+        ui_progress=ui_progress
+    ).run(stock_list)
 
 
 def QA_SU_save_stock_month(client=DATABASE, ui_log=None, ui_progress=None):
@@ -398,88 +192,16 @@ def QA_SU_save_stock_month(client=DATABASE, ui_log=None, ui_progress=None):
          ("date_stamp",
           pymongo.ASCENDING)]
     )
-    err = []
-
-    def __saving_work(code, coll_stock_month):
-        try:
-            QA_util_log_info(
-                '##JOB01 Now Saving STOCK_MONTH==== {}'.format(str(code)),
-                ui_log=ui_log
-            )
-
-            ref = coll_stock_month.find({'code': str(code)[0:6]})
-            end_date = str(now_time())[0:10]
-            if ref.count() > 0:
-                # 加入这个判断的原因是因为如果股票是刚上市的 数据库会没有数据 所以会有负索引问题出现
-
-                start_date = ref[ref.count() - 1]['date']
-
-                QA_util_log_info(
-                    'UPDATE_STOCK_MONTH \n Trying updating {} from {} to {}'
-                        .format(code,
-                                start_date,
-                                end_date),
-                    ui_log=ui_log
-                )
-                if start_date != end_date:
-                    coll_stock_month.insert_many(
-                        QA_util_to_json_from_pandas(
-                            QA_fetch_get_stock_day(
-                                str(code),
-                                QA_util_get_next_day(start_date),
-                                end_date,
-                                '00',
-                                frequence='month'
-                            )
-                        )
-                    )
-            else:
-                start_date = '1990-01-01'
-                QA_util_log_info(
-                    'UPDATE_STOCK_MONTH \n Trying updating {} from {} to {}'
-                        .format(code,
-                                start_date,
-                                end_date),
-                    ui_log=ui_log
-                )
-                if start_date != end_date:
-                    coll_stock_month.insert_many(
-                        QA_util_to_json_from_pandas(
-                            QA_fetch_get_stock_day(
-                                str(code),
-                                start_date,
-                                end_date,
-                                '00',
-                                frequence='month'
-                            )
-                        )
-                    )
-        except:
-            err.append(str(code))
-
-    for item in range(len(stock_list)):
-        QA_util_log_info(
-            'The {} of Total {}'.format(item,
-                                        len(stock_list)),
-            ui_log=ui_log
-        )
-        strProgress = 'DOWNLOAD PROGRESS {} '.format(
-            str(float(item / len(stock_list) * 100))[0:4] + '%'
-        )
-        intProgress = int(float(item / len(stock_list) * 100))
-        QA_util_log_info(
-            strProgress,
-            ui_log=ui_log,
-            ui_progress=ui_progress,
-            ui_progress_int_value=intProgress
-        )
-
-        __saving_work(stock_list[item], coll_stock_month)
-    if len(err) < 1:
-        QA_util_log_info('SUCCESS', ui_log=ui_log)
-    else:
-        QA_util_log_info('ERROR CODE \n ', ui_log=ui_log)
-        QA_util_log_info(err, ui_log=ui_log)
+    QA_SaveEngine(
+        'stock_month',
+        coll_stock_month,
+        _fetch_stock_day,
+        frequence='month',
+        start='1990-01-01',
+        job='JOB01',
+        ui_log=ui_log,
+        ui_progress=ui_progress
+    ).run(stock_list)
 
 
 def QA_SU_save_stock_year(client=DATABASE, ui_log=None, ui_progress=None):
@@ -497,89 +219,16 @@ def QA_SU_save_stock_year(client=DATABASE, ui_log=None, ui_progress=None):
          ("date_stamp",
           pymongo.ASCENDING)]
     )
-    err = []
-
-    def __saving_work(code, coll_stock_year):
-        try:
-            QA_util_log_info(
-                '##JOB01 Now Saving STOCK_YEAR==== {}'.format(str(code)),
-                ui_log=ui_log
-            )
-
-            ref = coll_stock_year.find({'code': str(code)[0:6]})
-            end_date = str(now_time())[0:10]
-            if ref.count() > 0:
-                # 加入这个判断的原因是因为如果股票是刚上市的 数据库会没有数据 所以会有负索引问题出现
-
-                start_date = ref[ref.count() - 1]['date']
-
-                QA_util_log_info(
-                    'UPDATE_STOCK_YEAR \n Trying updating {} from {} to {}'
-                        .format(code,
-                                start_date,
-                                end_date),
-                    ui_log=ui_log
-                )
-                if start_date != end_date:
-                    coll_stock_year.insert_many(
-                        QA_util_to_json_from_pandas(
-                            QA_fetch_get_stock_day(
-                                str(code),
-                                QA_util_get_next_day(start_date),
-                                end_date,
-                                '00',
-                                frequence='year'
-                            )
-                        )
-                    )
-            else:
-                start_date = '1990-01-01'
-                QA_util_log_info(
-                    'UPDATE_STOCK_YEAR \n Trying updating {} from {} to {}'
-                        .format(code,
-                                start_date,
-                                end_date),
-                    ui_log=ui_log
-                )
-                if start_date != end_date:
-                    coll_stock_year.insert_many(
-                        QA_util_to_json_from_pandas(
-                            QA_fetch_get_stock_day(
-                                str(code),
-                                start_date,
-                                end_date,
-                                '00',
-                                frequence='year'
-                            )
-                        )
-                    )
-        except:
-            err.append(str(code))
-
-    for item in range(len(stock_list)):
-        QA_util_log_info(
-            'The {} of Total {}'.format(item,
-                                        len(stock_list)),
-            ui_log=ui_log
-        )
-
-        strProgress = 'DOWNLOAD PROGRESS {} '.format(
-            str(float(item / len(stock_list) * 100))[0:4] + '%'
-        )
-        intProgress = int(float(item / len(stock_list) * 100))
-        QA_util_log_info(
-            strProgress,
-            ui_log=ui_log,
-            ui_progress=ui_progress,
-            ui_progress_int_value=intProgress
-        )
-
-        __saving_work(stock_list[item], coll_stock_year)
-    if len(err) < 1:
-        QA_util_log_info('SUCCESS', ui_log=ui_log)
-    else:
-        QA_util_log_info(' ERROR CODE \n ', ui_log=ui_log)
-        QA_util_log_info(err, ui_log=ui_log)
+    QA_SaveEngine(
+        'stock_year',
+        coll_stock_year,
+        _fetch_stock_day,
+        frequence='year',
+        start='1990-01-01',
+        job='JOB01',
+        ui_log=ui_log,
+        ui_progress=ui_progress
+    ).run(stock_list)
 
 
 def QA_SU_save_stock_xdxr(client=DATABASE, ui_log=None, ui_progress=None):
@@ -645,129 +294,211 @@ def QA_SU_save_stock_xdxr(client=DATABASE, ui_log=None, ui_progress=None):
         )
         __saving_work(stock_list[i_], coll)
 
+    # 新的除权除息事件保存之后, 增量更新复权因子表
+    QA_SU_save_stock_adj(client=client, ui_log=ui_log, ui_progress=ui_progress)
 
-def QA_SU_save_stock_min(client=DATABASE, ui_log=None, ui_progress=None):
-    """save stock_min
+
+def QA_SU_save_stock_adj(client=DATABASE, ui_log=None, ui_progress=None):
+    """save stock_adj
+    增量更新复权因子表, 每个除权除息日(category==1)一条 {code, date, date_stamp, factor}
+
+    只计算 stock_xdxr 中还没有进入 stock_adj 的事件, 用 stock_day 的收盘价计算
+    (依赖 stock_day 已经更新), 除权日还没有行情的事件留到下次更新
 
     Keyword Arguments:
         client {[type]} -- [description] (default: {DATABASE})
     """
-
-    stock_list = QA_fetch_get_stock_list().code.unique().tolist()
-    coll = client.stock_min
+    coll = client.stock_adj
     coll.create_index(
+        [('code',
+          pymongo.ASCENDING),
+         ('date',
+          pymongo.ASCENDING)],
+        unique=True
+    )
+    columns = ['category', 'code', 'date', 'fenhong', 'peigu', 'peigujia', 'songzhuangu']
+    xdxr = pd.DataFrame(
         [
-            ('code',
-             pymongo.ASCENDING),
-            ('time_stamp',
-             pymongo.ASCENDING),
-            ('date_stamp',
-             pymongo.ASCENDING)
-        ]
+            item for item in client.stock_xdxr.find(
+                {'category': 1},
+                {key: 1 for key in columns},
+                batch_size=10000
+            )
+        ],
+        columns=columns
     )
+    saved = pd.DataFrame(
+        [
+            item for item in
+            coll.find({},
+                      {'_id': 0, 'code': 1, 'date': 1},
+                      batch_size=10000)
+        ],
+        columns=['code', 'date']
+    )
+    pending = xdxr[~(xdxr['code'] + xdxr['date']).isin(saved['code'] + saved['date'])]
+    stock_list = pending['code'].unique().tolist()
     err = []
 
     def __saving_work(code, coll):
         QA_util_log_info(
-            '##JOB03 Now Saving STOCK_MIN ==== {}'.format(str(code)),
+            '##JOB02 Now Saving ADJ FACTOR ==== {}'.format(str(code)),
             ui_log=ui_log
         )
         try:
-            for type in ['1min', '5min', '15min', '30min', '60min']:
-                ref_ = coll.find({'code': str(code)[0:6], 'type': type})
-                end_time = str(now_time())[0:19]
-                if ref_.count() > 0:
-                    start_time = ref_[ref_.count() - 1]['datetime']
-
-                    QA_util_log_info(
-                        '##JOB03.{} Now Saving {} from {} to {} =={} '.format(
-                            ['1min',
-                             '5min',
-                             '15min',
-                             '30min',
-                             '60min'].index(type),
-                            str(code),
-                            start_time,
-                            end_time,
-                            type
-                        ),
-                        ui_log=ui_log
-                    )
-                    if start_time != end_time:
-                        __data = QA_fetch_get_stock_min(
-                            str(code),
-                            start_time,
-                            end_time,
-                            type
-                        )
-                        if len(__data) > 1:
-                            coll.insert_many(
-                                QA_util_to_json_from_pandas(__data)[1::]
-                            )
-                else:
-                    start_time = '2015-01-01'
-                    QA_util_log_info(
-                        '##JOB03.{} Now Saving {} from {} to {} =={} '.format(
-                            ['1min',
-                             '5min',
-                             '15min',
-                             '30min',
-                             '60min'].index(type),
-                            str(code),
-                            start_time,
-                            end_time,
-                            type
-                        ),
-                        ui_log=ui_log
-                    )
-                    if start_time != end_time:
-                        __data = QA_fetch_get_stock_min(
-                            str(code),
-                            start_time,
-                            end_time,
-                            type
-                        )
-                        if len(__data) > 1:
-                            coll.insert_many(
-                                QA_util_to_json_from_pandas(__data)
-                            )
-        except Exception as e:
-            QA_util_log_info(e, ui_log=ui_log)
-            err.append(code)
-            QA_util_log_info(err, ui_log=ui_log)
-
-    executor = ThreadPoolExecutor(max_workers=4)
-    # executor.map((__saving_work,  stock_list[i_], coll),URLS)
-    res = {
-        executor.submit(__saving_work,
-                        stock_list[i_],
-                        coll)
-        for i_ in range(len(stock_list))
-    }
-    count = 0
-    for i_ in concurrent.futures.as_completed(res):
+            data = pd.DataFrame(
+                [
+                    item for item in client.stock_day.find(
+                        {'code': code},
+                        {'_id': 0, 'code': 1, 'date': 1, 'close': 1},
+                        batch_size=10000
+                    )
+                ],
+                columns=['code', 'date', 'close']
+            )
+            if len(data) == 0:
+                return
+            data['date'] = pd.to_datetime(data['date'])
+            factor = QA_data_calc_adj_factor(
+                data.set_index(['date', 'code']),
+                pending[pending['code'] == code]
+            )
+            if len(factor) > 0:
+                factor = factor.assign(date=factor['date'].apply(lambda x: str(x)[0:10]))
+                factor = factor.assign(date_stamp=QA_util_date_stamp_array(factor['date']))
+                coll.insert_many(QA_util_to_json_from_pandas(factor), ordered=False)
+        except:
+            err.append(str(code))
+
+    for i_ in range(len(stock_list)):
         QA_util_log_info(
-            'The {} of Total {}'.format(count,
+            'The {} of Total {}'.format(i_,
                                         len(stock_list)),
             ui_log=ui_log
         )
-
-        strProgress = 'DOWNLOAD PROGRESS {} '.format(
-            str(float(count / len(stock_list) * 100))[0:4] + '%'
+        strLogInfo = 'DOWNLOAD PROGRESS {} '.format(
+            str(float(i_ / len(stock_list) * 100))[0:4] + '%'
         )
-        intProgress = int(count / len(stock_list) * 10000.0)
+        intLogProgress = int(float(i_ / len(stock_list) * 100))
         QA_util_log_info(
-            strProgress,
-            ui_log,
+            strLogInfo,
+            ui_log=ui_log,
             ui_progress=ui_progress,
-            ui_progress_int_value=intProgress
+            ui_progress_int_value=intLogProgress
         )
-        count = count + 1
+        __saving_work(stock_list[i_], coll)
+
     if len(err) < 1:
-        QA_util_log_info('SUCCESS', ui_log=ui_log)
+        QA_util_log_info('SUCCESS save stock adj factor ^_^', ui_log)
     else:
-        QA_util_log_info(' ERROR CODE \n ', ui_log=ui_log)
-        QA_util_log_info(err, ui_log=ui_log)
+        QA_util_log_info(' ERROR CODE \n ', ui_log)
+        QA_util_log_info(err, ui_log)
+
+
+_MIN_TYPES = ['1min', '5min', '15min', '30min', '60min']
+
+
+def _fetch_stock_day(code, start, end, frequence='day'):
+    return QA_fetch_get_stock_day(code, start, end, '00', frequence=frequence)
+
+
+def _QA_SU_plan_min_derived(engine, code, frequence, market='stock'):
+    '从 5 个周期里最早的保存位置开始下 1min'
+    last = {}
+    for type_ in _MIN_TYPES:
+        ref_ = QA_util_sql_mongo_last(
+            engine.coll,
+            {'code': str(code)[0:engine.code_length], 'type': type_},
+            'time_stamp'
+        )
+        last[type_] = '' if ref_ is None else ref_['datetime']
+    start_time = engine.start[0] if '' in last.values() else min(last.values())
+    end_time = str(now_time())[0:19]
+    if start_time == end_time:
+        return None
+    return start_time, end_time, {'market': market, 'last': last}
+
+
+def _QA_SU_transform_min_derived(data, context):
+    """多个代码一起合成高周期, 每个代码的每个周期只保留各自保存位置之后的 bar
+
+    context 为 {code: _QA_SU_plan_min_derived 返回的 context}
+    """
+    market = next(iter(context.values()))['market']
+    bars = QA_data_min_resample_batch(data, _MIN_TYPES[1:], market)
+    bars['1min'] = data
+    res = []
+    for type_ in _MIN_TYPES:
+        frame = bars[type_]
+        last = frame['code'].astype(str).map(
+            {code: item['last'][type_] for code, item in context.items()}
+        ).fillna('')
+        keep = frame['datetime'].values.astype(str) > last.values.astype(str)
+        if keep.any():
+            res.append(frame[keep])
+    return pd.concat(res, sort=False) if len(res) > 0 else None
+
+
+def _QA_SU_save_min_derived(code_list, coll, fetcher, market, job,
+                            ui_log=None, ui_progress=None):
+    """只下载 1min, 5/15/30/60min 由 1min 合成 (QA_data_min_resample_batch)
+
+    每 50 个代码的 1min 在 QA_SaveEngine 的 transform 进程里一起合成,
+    所有周期只写入各自保存位置之后的 bar
+
+    新代码只有 1min 能取到的历史 (通达信约 20800 根), 更早的高周期数据不会补
+    """
+    return QA_SaveEngine(
+        '{}_min_derived'.format(market),
+        coll,
+        fetcher,
+        frequence='1min',
+        start='2015-01-01',
+        plan=functools.partial(_QA_SU_plan_min_derived, market=market),
+        transform=_QA_SU_transform_min_derived,
+        transform_workers=2,
+        transform_batch=50,
+        job=job,
+        ui_log=ui_log,
+        ui_progress=ui_progress
+    ).run(code_list)
+
+
+def QA_SU_save_stock_min(client=DATABASE, ui_log=None, ui_progress=None, derive=False):
+    """save stock_min
+
+    Keyword Arguments:
+        client {[type]} -- [description] (default: {DATABASE})
+        derive {bool} -- 只下载 1min, 其他周期由 1min 合成 (default: {False})
+    """
+
+    stock_list = QA_fetch_get_stock_list().code.unique().tolist()
+    coll = client.stock_min
+    coll.create_index(
+        [
+            ('code',
+             pymongo.ASCENDING),
+            ('time_stamp',
+             pymongo.ASCENDING),
+            ('date_stamp',
+             pymongo.ASCENDING)
+        ]
+    )
+    if derive:
+        return _QA_SU_save_min_derived(
+            stock_list, coll, QA_fetch_get_stock_min, 'stock', 'JOB03',
+            ui_log, ui_progress)
+    QA_SaveEngine(
+        'stock_min',
+        coll,
+        QA_fetch_get_stock_min,
+        frequence=['1min', '5min', '15min', '30min', '60min'],
+        start='2015-01-01',
+        job='JOB03',
+        ui_log=ui_log,
+        ui_progress=ui_progress
+    ).run(stock_list)
+
 
 def QA_SU_save_single_stock_min(code : str, client=DATABASE, ui_log=None, ui_progress=None):
     """save single stock_min
@@ -789,109 +520,18 @@ def QA_SU_save_single_stock_min(code : str, client=DATABASE, ui_log=None, ui_pro
              pymongo.ASCENDING)
         ]
     )
-    err = []
-
-    def __saving_work(code, coll):
-        QA_util_log_info(
-            '##JOB03 Now Saving STOCK_MIN ==== {}'.format(str(code)),
-            ui_log=ui_log
-        )
-        try:
-            for type in ['1min', '5min', '15min', '30min', '60min']:
-                ref_ = coll.find({'code': str(code)[0:6], 'type': type})
-                end_time = str(now_time())[0:19]
-                if ref_.count() > 0:
-                    start_time = ref_[ref_.count() - 1]['datetime']
-
-                    QA_util_log_info(
-                        '##JOB03.{} Now Saving {} from {} to {} =={} '.format(
-                            ['1min',
-                             '5min',
-                             '15min',
-                             '30min',
-                             '60min'].index(type),
-                            str(code),
-                            start_time,
-                            end_time,
-                            type
-                        ),
-                        ui_log=ui_log
-                    )
-                    if start_time != end_time:
-                        __data = QA_fetch_get_stock_min(
-                            str(code),
-                            start_time,
-                            end_time,
-                            type
-                        )
-                        if len(__data) > 1:
-                            coll.insert_many(
-                                QA_util_to_json_from_pandas(__data)[1::]
-                            )
-                else:
-                    start_time = '2015-01-01'
-                    QA_util_log_info(
-                        '##JOB03.{} Now Saving {} from {} to {} =={} '.format(
-                            ['1min',
-                             '5min',
-                             '15min',
-                             '30min',
-                             '60min'].index(type),
-                            str(code),
-                            start_time,
-                            end_time,
-                            type
-                        ),
-                        ui_log=ui_log
-                    )
-                    if start_time != end_time:
-                        __data = QA_fetch_get_stock_min(
-                            str(code),
-                            start_time,
-                            end_time,
-                            type
-                        )
-                        if len(__data) > 1:
-                            coll.insert_many(
-                                QA_util_to_json_from_pandas(__data)
-                            )
-        except Exception as e:
-            QA_util_log_info(e, ui_log=ui_log)
-            err.append(code)
-            QA_util_log_info(err, ui_log=ui_log)
-
-    executor = ThreadPoolExecutor(max_workers=4)
-    # executor.map((__saving_work,  stock_list[i_], coll),URLS)
-    res = {
-        executor.submit(__saving_work,
-                        stock_list[i_],
-                        coll)
-        for i_ in range(len(stock_list))
-    }
-    count = 1
-    for i_ in concurrent.futures.as_completed(res):
-        QA_util_log_info(
-            'The {} of Total {}'.format(count,
-                                        len(stock_list)),
-            ui_log=ui_log
-        )
+    QA_SaveEngine(
+        'stock_min',
+        coll,
+        QA_fetch_get_stock_min,
+        frequence=['1min', '5min', '15min', '30min', '60min'],
+        start='2015-01-01',
+        job='JOB03',
+        resume=False,
+        ui_log=ui_log,
+        ui_progress=ui_progress
+    ).run(stock_list)
 
-        strProgress = 'DOWNLOAD PROGRESS {} '.format(
-            str(float(count / len(stock_list) * 100))[0:4] + '%'
-        )
-        intProgress = int(count / len(stock_list) * 10000.0)
-        QA_util_log_info(
-            strProgress,
-            ui_log,
-            ui_progress=ui_progress,
-            ui_progress_int_value=intProgress
-        )
-        count = count + 1
-    if len(err) < 1:
-        QA_util_log_info('SUCCESS', ui_log=ui_log)
-    else:
-        QA_util_log_info(' ERROR CODE \n ', ui_log=ui_log)
-        QA_util_log_info(err, ui_log=ui_log)
 
 def QA_SU_save_single_index_day(code : str, client=DATABASE, ui_log=None):
     """save index_day
@@ -909,90 +549,25 @@ def QA_SU_save_single_index_day(code : str, client=DATABASE, ui_log=None):
          ('date_stamp',
           pymongo.ASCENDING)]
     )
-    err = []
-
-    def __saving_work(code, coll):
+    QA_SaveEngine(
+        'index_day',
+        coll,
+        QA_fetch_get_index_day,
+        frequence='day',
+        start=['1990-01-01', '2009-01-01'],
+        job='JOB04',
+        resume=False,
+        ui_log=ui_log
+    ).run([code])
+
+
+def QA_SU_save_index_day(client=DATABASE, ui_log=None, ui_progress=None, download_workers=4):
+    """save index_day
 
-        try:
-            ref_ = coll.find({'code': str(code)[0:6]})
-            end_time = str(now_time())[0:10]
-            if ref_.count() > 0:
-                start_time = ref_[ref_.count() - 1]['date']
-
-                QA_util_log_info(
-                    '##JOB04 Now Saving INDEX_DAY==== \n Trying updating {} from {} to {}'
-                        .format(code,
-                                start_time,
-                                end_time),
-                    ui_log=ui_log
-                )
-
-                if start_time != end_time:
-                    coll.insert_many(
-                        QA_util_to_json_from_pandas(
-                            QA_fetch_get_index_day(
-                                str(code),
-                                QA_util_get_next_day(start_time),
-                                end_time
-                            )
-                        )
-                    )
-            else:
-                try:
-                    start_time = '1990-01-01'
-                    QA_util_log_info(
-                        '##JOB04 Now Saving INDEX_DAY==== \n Trying updating {} from {} to {}'
-                            .format(code,
-                                    start_time,
-                                    end_time),
-                        ui_log=ui_log
-                    )
-                    coll.insert_many(
-                        QA_util_to_json_from_pandas(
-                            QA_fetch_get_index_day(
-                                str(code),
-                                start_time,
-                                end_time
-                            )
-                        )
-                    )
-                except:
-                    start_time = '2009-01-01'
-                    QA_util_log_info(
-                        '##JOB04 Now Saving INDEX_DAY==== \n Trying updating {} from {} to {}'
-                            .format(code,
-                                    start_time,
-                                    end_time),
-                        ui_log=ui_log
-                    )
-                    coll.insert_many(
-                        QA_util_to_json_from_pandas(
-                            QA_fetch_get_index_day(
-                                str(code),
-                                start_time,
-                                end_time
-                            )
-                        )
-                    )
-        except Exception as e:
-            QA_util_log_info(e, ui_log=ui_log)
-            err.append(str(code))
-            QA_util_log_info(err, ui_log=ui_log)
-
-
-    __saving_work(code, coll)
-    if len(err) < 1:
-        QA_util_log_info('SUCCESS', ui_log=ui_log)
-    else:
-        QA_util_log_info(' ERROR CODE \n ', ui_log=ui_log)
-        QA_util_log_info(err, ui_log=ui_log)
-
-def QA_SU_save_index_day(client=DATABASE, ui_log=None, ui_progress=None):
-    """save index_day
-
-    Keyword Arguments:
-        client {[type]} -- [description] (default: {DATABASE})
-    """
+    Keyword Arguments:
+        client {[type]} -- [description] (default: {DATABASE})
+        download_workers {int} -- 下载线程数 (default: {4})
+    """
 
     __index_list = QA_fetch_get_stock_list('index')
     coll = client.index_day
@@ -1002,107 +577,25 @@ def QA_SU_save_index_day(client=DATABASE, ui_log=None, ui_progress=None):
          ('date_stamp',
           pymongo.ASCENDING)]
     )
-    err = []
-
-    def __saving_work(code, coll):
-
-        try:
-            ref_ = coll.find({'code': str(code)[0:6]})
-            end_time = str(now_time())[0:10]
-            if ref_.count() > 0:
-                start_time = ref_[ref_.count() - 1]['date']
-
-                QA_util_log_info(
-                    '##JOB04 Now Saving INDEX_DAY==== \n Trying updating {} from {} to {}'
-                        .format(code,
-                                start_time,
-                                end_time),
-                    ui_log=ui_log
-                )
-
-                if start_time != end_time:
-                    coll.insert_many(
-                        QA_util_to_json_from_pandas(
-                            QA_fetch_get_index_day(
-                                str(code),
-                                QA_util_get_next_day(start_time),
-                                end_time
-                            )
-                        )
-                    )
-            else:
-                try:
-                    start_time = '1990-01-01'
-                    QA_util_log_info(
-                        '##JOB04 Now Saving INDEX_DAY==== \n Trying updating {} from {} to {}'
-                            .format(code,
-                                    start_time,
-                                    end_time),
-                        ui_log=ui_log
-                    )
-                    coll.insert_many(
-                        QA_util_to_json_from_pandas(
-                            QA_fetch_get_index_day(
-                                str(code),
-                                start_time,
-                                end_time
-                            )
-                        )
-                    )
-                except:
-                    start_time = '2009-01-01'
-                    QA_util_log_info(
-                        '##JOB04 Now Saving INDEX_DAY==== \n Trying updating {} from {} to {}'
-                            .format(code,
-                                    start_time,
-                                    end_time),
-                        ui_log=ui_log
-                    )
-                    coll.insert_many(
-                        QA_util_to_json_from_pandas(
-                            QA_fetch_get_index_day(
-                                str(code),
-                                start_time,
-                                end_time
-                            )
-                        )
-                    )
-        except Exception as e:
-            QA_util_log_info(e, ui_log=ui_log)
-            err.append(str(code))
-            QA_util_log_info(err, ui_log=ui_log)
-
-    for i_ in range(len(__index_list)):
-        # __saving_work('000001')
-        QA_util_log_info(
-            'The {} of Total {}'.format(i_,
-                                        len(__index_list)),
-            ui_log=ui_log
-        )
-
-        strLogProgress = 'DOWNLOAD PROGRESS {} '.format(
-            str(float(i_ / len(__index_list) * 100))[0:4] + '%'
-        )
-        intLogProgress = int(float(i_ / len(__index_list) * 10000.0))
-        QA_util_log_info(
-            strLogProgress,
-            ui_log=ui_log,
-            ui_progress=ui_progress,
-            ui_progress_int_value=intLogProgress
-        )
-        __saving_work(__index_list.index[i_][0], coll)
-    if len(err) < 1:
-        QA_util_log_info('SUCCESS', ui_log=ui_log)
-    else:
-        QA_util_log_info(' ERROR CODE \n ', ui_log=ui_log)
-        QA_util_log_info(err, ui_log=ui_log)
+    QA_SaveEngine(
+        'index_day',
+        coll,
+        QA_fetch_get_index_day,
+        frequence='day',
+        start=['1990-01-01', '2009-01-01'],
+        job='JOB04',
+        download_workers=download_workers,
+        ui_log=ui_log,
+        ui_progress=ui_progress
+    ).run([item[0] for item in __index_list.index])
 
 
-def QA_SU_save_index_min(client=DATABASE, ui_log=None, ui_progress=None):
+def QA_SU_save_index_min(client=DATABASE, ui_log=None, ui_progress=None, derive=False):
     """save index_min
 
     Keyword Arguments:
         client {[type]} -- [description] (default: {DATABASE})
+        derive {bool} -- 只下载 1min, 其他周期由 1min 合成 (default: {False})
     """
 
     __index_list = QA_fetch_get_stock_list('index')
@@ -1117,111 +610,21 @@ def QA_SU_save_index_min(client=DATABASE, ui_log=None, ui_progress=None):
              pymongo.ASCENDING)
         ]
     )
-    err = []
-
-    def __saving_work(code, coll):
-
-        QA_util_log_info(
-            '##JOB05 Now Saving Index_MIN ==== {}'.format(str(code)),
-            ui_log=ui_log
-        )
-        try:
-
-            for type in ['1min', '5min', '15min', '30min', '60min']:
-                ref_ = coll.find({'code': str(code)[0:6], 'type': type})
-                end_time = str(now_time())[0:19]
-                if ref_.count() > 0:
-                    start_time = ref_[ref_.count() - 1]['datetime']
-
-                    QA_util_log_info(
-                        '##JOB05.{} Now Saving {} from {} to {} =={} '.format(
-                            ['1min',
-                             '5min',
-                             '15min',
-                             '30min',
-                             '60min'].index(type),
-                            str(code),
-                            start_time,
-                            end_time,
-                            type
-                        ),
-                        ui_log=ui_log
-                    )
-
-                    if start_time != end_time:
-                        __data = QA_fetch_get_index_min(
-                            str(code),
-                            start_time,
-                            end_time,
-                            type
-                        )
-                        if len(__data) > 1:
-                            coll.insert_many(
-                                QA_util_to_json_from_pandas(__data[1::])
-                            )
-                else:
-                    start_time = '2015-01-01'
-
-                    QA_util_log_info(
-                        '##JOB05.{} Now Saving {} from {} to {} =={} '.format(
-                            ['1min',
-                             '5min',
-                             '15min',
-                             '30min',
-                             '60min'].index(type),
-                            str(code),
-                            start_time,
-                            end_time,
-                            type
-                        ),
-                        ui_log=ui_log
-                    )
+    if derive:
+        return _QA_SU_save_min_derived(
+            [item[0] for item in __index_list.index], coll, QA_fetch_get_index_min,
+            'index', 'JOB05', ui_log, ui_progress)
+    QA_SaveEngine(
+        'index_min',
+        coll,
+        QA_fetch_get_index_min,
+        frequence=['1min', '5min', '15min', '30min', '60min'],
+        start='2015-01-01',
+        job='JOB05',
+        ui_log=ui_log,
+        ui_progress=ui_progress
+    ).run([item[0] for item in __index_list.index])
 
-                    if start_time != end_time:
-                        __data = QA_fetch_get_index_min(
-                            str(code),
-                            start_time,
-                            end_time,
-                            type
-                        )
-                        if len(__data) > 1:
-                            coll.insert_many(
-                                QA_util_to_json_from_pandas(__data)
-                            )
-        except:
-            err.append(code)
-
-    executor = ThreadPoolExecutor(max_workers=4)
-
-    res = {
-        executor.submit(__saving_work,
-                        __index_list.index[i_][0],
-                        coll)
-        for i_ in range(len(__index_list))
-    }  # multi index ./.
-    count = 0
-    for i_ in concurrent.futures.as_completed(res):
-        strLogProgress = 'DOWNLOAD PROGRESS {} '.format(
-            str(float(count / len(__index_list) * 100))[0:4] + '%'
-        )
-        intLogProgress = int(float(count / len(__index_list) * 10000.0))
-        QA_util_log_info(
-            'The {} of Total {}'.format(count,
-                                        len(__index_list)),
-            ui_log=ui_log
-        )
-        QA_util_log_info(
-            strLogProgress,
-            ui_log=ui_log,
-            ui_progress=ui_progress,
-            ui_progress_int_value=intLogProgress
-        )
-        count = count + 1
-    if len(err) < 1:
-        QA_util_log_info('SUCCESS', ui_log=ui_log)
-    else:
-        QA_util_log_info(' ERROR CODE \n ', ui_log=ui_log)
-        QA_util_log_info(err, ui_log=ui_log)
 
 def QA_SU_save_single_index_min(code : str, client=DATABASE, ui_log=None, ui_progress=None):
     """save single index_min
@@ -1243,111 +646,17 @@ def QA_SU_save_single_index_min(code : str, client=DATABASE, ui_log=None, ui_pro
              pymongo.ASCENDING)
         ]
     )
-    err = []
-
-    def __saving_work(code, coll):
-
-        QA_util_log_info(
-            '##JOB05 Now Saving Index_MIN ==== {}'.format(str(code)),
-            ui_log=ui_log
-        )
-        try:
-
-            for type in ['1min', '5min', '15min', '30min', '60min']:
-                ref_ = coll.find({'code': str(code)[0:6], 'type': type})
-                end_time = str(now_time())[0:19]
-                if ref_.count() > 0:
-                    start_time = ref_[ref_.count() - 1]['datetime']
-
-                    QA_util_log_info(
-                        '##JOB05.{} Now Saving {} from {} to {} =={} '.format(
-                            ['1min',
-                             '5min',
-                             '15min',
-                             '30min',
-                             '60min'].index(type),
-                            str(code),
-                            start_time,
-                            end_time,
-                            type
-                        ),
-                        ui_log=ui_log
-                    )
-
-                    if start_time != end_time:
-                        __data = QA_fetch_get_index_min(
-                            str(code),
-                            start_time,
-                            end_time,
-                            type
-                        )
-                        if len(__data) > 1:
-                            coll.insert_many(
-                                QA_util_to_json_from_pandas(__data[1::])
-                            )
-                else:
-                    start_time = '2015-01-01'
-
-                    QA_util_log_info(
-                        '##JOB05.{} Now Saving {} from {} to {} =={} '.format(
-                            ['1min',
-                             '5min',
-                             '15min',
-                             '30min',
-                             '60min'].index(type),
-                            str(code),
-                            start_time,
-                            end_time,
-                            type
-                        ),
-                        ui_log=ui_log
-                    )
-
-                    if start_time != end_time:
-                        __data = QA_fetch_get_index_min(
-                            str(code),
-                            start_time,
-                            end_time,
-                            type
-                        )
-                        if len(__data) > 1:
-                            coll.insert_many(
-                                QA_util_to_json_from_pandas(__data)
-                            )
-        except:
-            err.append(code)
-
-    executor = ThreadPoolExecutor(max_workers=4)
-
-    res = {
-        executor.submit(__saving_work,
-                        __index_list[i_],
-                        coll)
-        for i_ in range(len(__index_list))
-    }  # multi index ./.
-    count = 1
-    for i_ in concurrent.futures.as_completed(res):
-        strLogProgress = 'DOWNLOAD PROGRESS {} '.format(
-            str(float(count / len(__index_list) * 100))[0:4] + '%'
-        )
-        intLogProgress = int(float(count / len(__index_list) * 10000.0))
-        QA_util_log_info(
-            'The {} of Total {}'.format(count,
-                                        len(__index_list)),
-            ui_log=ui_log
-        )
-        QA_util_log_info(
-            strLogProgress,
-            ui_log=ui_log,
-            ui_progress=ui_progress,
-            ui_progress_int_value=intLogProgress
-        )
-        count = count + 1
-    if len(err) < 1:
-        QA_util_log_info('SUCCESS', ui_log=ui_log)
-    else:
-        QA_util_log_info(' ERROR CODE \n ', ui_log=ui_log)
-        QA_util_log_info(err, ui_log=ui_log)
+    QA_SaveEngine(
+        'index_min',
+        coll,
+        QA_fetch_get_index_min,
+        frequence=['1min', '5min', '15min', '30min', '60min'],
+        start='2015-01-01',
+        job='JOB05',
+        resume=False,
+        ui_log=ui_log,
+        ui_progress=ui_progress
+    ).run(__index_list)
 
 
 def QA_SU_save_single_etf_day(code : str, client=DATABASE, ui_log=None):
@@ -1366,70 +675,24 @@ def QA_SU_save_single_etf_day(code : str, client=DATABASE, ui_log=None):
          ('date_stamp',
           pymongo.ASCENDING)]
     )
-    err = []
-
-    def __saving_work(code, coll):
-
-        try:
-
-            ref_ = coll.find({'code': str(code)[0:6]})
-            end_time = str(now_time())[0:10]
-            if ref_.count() > 0:
-                start_time = ref_[ref_.count() - 1]['date']
-
-                QA_util_log_info(
-                    '##JOB06 Now Saving ETF_DAY==== \n Trying updating {} from {} to {}'
-                        .format(code,
-                                start_time,
-                                end_time),
-                    ui_log=ui_log
-                )
-
-                if start_time != end_time:
-                    coll.insert_many(
-                        QA_util_to_json_from_pandas(
-                            QA_fetch_get_index_day(
-                                str(code),
-                                QA_util_get_next_day(start_time),
-                                end_time
-                            )
-                        )
-                    )
-            else:
-                start_time = '1990-01-01'
-                QA_util_log_info(
-                    '##JOB06 Now Saving ETF_DAY==== \n Trying updating {} from {} to {}'
-                        .format(code,
-                                start_time,
-                                end_time),
-                    ui_log=ui_log
-                )
-
-                if start_time != end_time:
-                    coll.insert_many(
-                        QA_util_to_json_from_pandas(
-                            QA_fetch_get_index_day(
-                                str(code),
-                                start_time,
-                                end_time
-                            )
-                        )
-                    )
-        except:
-            err.append(str(code))
-
-    __saving_work(code, coll)
-    if len(err) < 1:
-        QA_util_log_info('SUCCESS', ui_log=ui_log)
-    else:
-        QA_util_log_info(' ERROR CODE \n ', ui_log=ui_log)
-        QA_util_log_info(err, ui_log=ui_log)
-
-def QA_SU_save_etf_day(client=DATABASE, ui_log=None, ui_progress=None):
+    QA_SaveEngine(
+        'etf_day',
+        coll,
+        QA_fetch_get_index_day,
+        frequence='day',
+        start='1990-01-01',
+        job='JOB06',
+        resume=False,
+        ui_log=ui_log
+    ).run([code])
+
+
+def QA_SU_save_etf_day(client=DATABASE, ui_log=None, ui_progress=None, download_workers=4):
     """save etf_day
 
     Keyword Arguments:
         client {[type]} -- [description] (default: {DATABASE})
+        download_workers {int} -- 下载线程数 (default: {4})
     """
 
     __index_list = QA_fetch_get_stock_list('etf')
@@ -1440,90 +703,25 @@ def QA_SU_save_etf_day(client=DATABASE, ui_log=None, ui_progress=None):
          ('date_stamp',
           pymongo.ASCENDING)]
     )
-    err = []
-
-    def __saving_work(code, coll):
-
-        try:
-
-            ref_ = coll.find({'code': str(code)[0:6]})
-            end_time = str(now_time())[0:10]
-            if ref_.count() > 0:
-                start_time = ref_[ref_.count() - 1]['date']
-
-                QA_util_log_info(
-                    '##JOB06 Now Saving ETF_DAY==== \n Trying updating {} from {} to {}'
-                        .format(code,
-                                start_time,
-                                end_time),
-                    ui_log=ui_log
-                )
-
-                if start_time != end_time:
-                    coll.insert_many(
-                        QA_util_to_json_from_pandas(
-                            QA_fetch_get_index_day(
-                                str(code),
-                                QA_util_get_next_day(start_time),
-                                end_time
-                            )
-                        )
-                    )
-            else:
-                start_time = '1990-01-01'
-                QA_util_log_info(
-                    '##JOB06 Now Saving ETF_DAY==== \n Trying updating {} from {} to {}'
-                        .format(code,
-                                start_time,
-                                end_time),
-                    ui_log=ui_log
-                )
-
-                if start_time != end_time:
-                    coll.insert_many(
-                        QA_util_to_json_from_pandas(
-                            QA_fetch_get_index_day(
-                                str(code),
-                                start_time,
-                                end_time
-                            )
-                        )
-                    )
-        except:
-            err.append(str(code))
-
-    for i_ in range(len(__index_list)):
-        # __saving_work('000001')
-        QA_util_log_info(
-            'The {} of Total {}'.format(i_,
-                                        len(__index_list)),
-            ui_log=ui_log
-        )
-
-        strLogProgress = 'DOWNLOAD PROGRESS {} '.format(
-            str(float(i_ / len(__index_list) * 100))[0:4] + '%'
-        )
-        intLogProgress = int(float(i_ / len(__index_list) * 10000.0))
-        QA_util_log_info(
-            strLogProgress,
-            ui_log=ui_log,
-            ui_progress=ui_progress,
-            ui_progress_int_value=intLogProgress
-        )
-
-        __saving_work(__index_list.index[i_][0], coll)
-    if len(err) < 1:
-        QA_util_log_info('SUCCESS', ui_log=ui_log)
-    else:
-        QA_util_log_info(' ERROR CODE \n ', ui_log=ui_log)
-        QA_util_log_info(err, ui_log=ui_log)
+    QA_SaveEngine(
+        'etf_day',
+        coll,
+        QA_fetch_get_index_day,
+        frequence='day',
+        start='1990-01-01',
+        job='JOB06',
+        download_workers=download_workers,
+        ui_log=ui_log,
+        ui_progress=ui_progress
+    ).run([item[0] for item in __index_list.index])
 
 
-def QA_SU_save_etf_min(client=DATABASE, ui_log=None, ui_progress=None):
+def QA_SU_save_etf_min(client=DATABASE, ui_log=None, ui_progress=None, derive=False):
     """save etf_min
 
     Keyword Arguments:
         client {[type]} -- [description] (default: {DATABASE})
+        derive {bool} -- 只下载 1min, 其他周期由 1min 合成 (default: {False})
     """
 
     __index_list = QA_fetch_get_stock_list('etf')
@@ -1538,112 +736,21 @@ def QA_SU_save_etf_min(client=DATABASE, ui_log=None, ui_progress=None):
              pymongo.ASCENDING)
         ]
     )
-    err = []
-
-    def __saving_work(code, coll):
-
-        QA_util_log_info(
-            '##JOB07 Now Saving ETF_MIN ==== {}'.format(str(code)),
-            ui_log=ui_log
-        )
-        try:
-
-            for type in ['1min', '5min', '15min', '30min', '60min']:
-                ref_ = coll.find({'code': str(code)[0:6], 'type': type})
-                end_time = str(now_time())[0:19]
-                if ref_.count() > 0:
-                    start_time = ref_[ref_.count() - 1]['datetime']
-
-                    QA_util_log_info(
-                        '##JOB07.{} Now Saving {} from {} to {} =={} '.format(
-                            ['1min',
-                             '5min',
-                             '15min',
-                             '30min',
-                             '60min'].index(type),
-                            str(code),
-                            start_time,
-                            end_time,
-                            type
-                        ),
-                        ui_log=ui_log
-                    )
-
-                    if start_time != end_time:
-                        __data = QA_fetch_get_index_min(
-                            str(code),
-                            start_time,
-                            end_time,
-                            type
-                        )
-                        if len(__data) > 1:
-                            coll.insert_many(
-                                QA_util_to_json_from_pandas(__data[1::])
-                            )
-                else:
-                    start_time = '2015-01-01'
-
-                    QA_util_log_info(
-                        '##JOB07.{} Now Saving {} from {} to {} =={} '.format(
-                            ['1min',
-                             '5min',
-                             '15min',
-                             '30min',
-                             '60min'].index(type),
-                            str(code),
-                            start_time,
-                            end_time,
-                            type
-                        ),
-                        ui_log=ui_log
-                    )
-
-                    if start_time != end_time:
-                        __data = QA_fetch_get_index_min(
-                            str(code),
-                            start_time,
-                            end_time,
-                            type
-                        )
-                        if len(__data) > 1:
-                            coll.insert_many(
-                                QA_util_to_json_from_pandas(__data)
-                            )
-        except:
-            err.append(code)
-
-    executor = ThreadPoolExecutor(max_workers=4)
-
-    res = {
-        executor.submit(__saving_work,
-                        __index_list.index[i_][0],
-                        coll)
-        for i_ in range(len(__index_list))
-    }  # multi index ./.
-    count = 1
-    for i_ in concurrent.futures.as_completed(res):
-        QA_util_log_info(
-            'The {} of Total {}'.format(count,
-                                        len(__index_list)),
-            ui_log=ui_log
-        )
-        strLogProgress = 'DOWNLOAD PROGRESS {} '.format(
-            str(float(count / len(__index_list) * 100))[0:4] + '%'
-        )
-        intLogProgress = int(float(count / len(__index_list) * 10000.0))
+    if derive:
+        return _QA_SU_save_min_derived(
+            [item[0] for item in __index_list.index], coll, QA_fetch_get_index_min,
+            'etf', 'JOB07', ui_log, ui_progress)
+    QA_SaveEngine(
+        'etf_min',
+        coll,
+        QA_fetch_get_index_min,
+        frequence=['1min', '5min', '15min', '30min', '60min'],
+        start='2015-01-01',
+        job='JOB07',
+        ui_log=ui_log,
+        ui_progress=ui_progress
+    ).run([item[0] for item in __index_list.index])
 
-        QA_util_log_info(
-            strLogProgress,
-            ui_log=ui_log,
-            ui_progress=ui_progress,
-            ui_progress_int_value=intLogProgress
-        )
-        count = count + 1
-    if len(err) < 1:
-        QA_util_log_info('SUCCESS', ui_log=ui_log)
-    else:
-        QA_util_log_info(' ERROR CODE \n ', ui_log=ui_log)
-        QA_util_log_info(err, ui_log=ui_log)
 
 def QA_SU_save_single_etf_min(code : str, client=DATABASE, ui_log=None, ui_progress=None):
     """save single etf_min
@@ -1665,112 +772,17 @@ def QA_SU_save_single_etf_min(code : str, client=DATABASE, ui_log=None, ui_progr
              pymongo.ASCENDING)
         ]
     )
-    err = []
-
-    def __saving_work(code, coll):
-
-        QA_util_log_info(
-            '##JOB07 Now Saving ETF_MIN ==== {}'.format(str(code)),
-            ui_log=ui_log
-        )
-        try:
-
-            for type in ['1min', '5min', '15min', '30min', '60min']:
-                ref_ = coll.find({'code': str(code)[0:6], 'type': type})
-                end_time = str(now_time())[0:19]
-                if ref_.count() > 0:
-                    start_time = ref_[ref_.count() - 1]['datetime']
-
-                    QA_util_log_info(
-                        '##JOB07.{} Now Saving {} from {} to {} =={} '.format(
-                            ['1min',
-                             '5min',
-                             '15min',
-                             '30min',
-                             '60min'].index(type),
-                            str(code),
-                            start_time,
-                            end_time,
-                            type
-                        ),
-                        ui_log=ui_log
-                    )
-
-                    if start_time != end_time:
-                        __data = QA_fetch_get_index_min(
-                            str(code),
-                            start_time,
-                            end_time,
-                            type
-                        )
-                        if len(__data) > 1:
-                            coll.insert_many(
-                                QA_util_to_json_from_pandas(__data[1::])
-                            )
-                else:
-                    start_time = '2015-01-01'
-
-                    QA_util_log_info(
-                        '##JOB07.{} Now Saving {} from {} to {} =={} '.format(
-                            ['1min',
-                             '5min',
-                             '15min',
-                             '30min',
-                             '60min'].index(type),
-                            str(code),
-                            start_time,
-                            end_time,
-                            type
-                        ),
-                        ui_log=ui_log
-                    )
-
-                    if start_time != end_time:
-                        __data = QA_fetch_get_index_min(
-                            str(code),
-                            start_time,
-                            end_time,
-                            type
-                        )
-                        if len(__data) > 1:
-                            coll.insert_many(
-                                QA_util_to_json_from_pandas(__data)
-                            )
-        except:
-            err.append(code)
-
-    executor = ThreadPoolExecutor(max_workers=4)
-
-    res = {
-        executor.submit(__saving_work,
-                        __index_list[i_],
-                        coll)
-        for i_ in range(len(__index_list))
-    }  # multi index ./.
-    count = 1
-    for i_ in concurrent.futures.as_completed(res):
-        QA_util_log_info(
-            'The {} of Total {}'.format(count,
-                                        len(__index_list)),
-            ui_log=ui_log
-        )
-        strLogProgress = 'DOWNLOAD PROGRESS {} '.format(
-            str(float(count / len(__index_list) * 100))[0:4] + '%'
-        )
-        intLogProgress = int(float(count / len(__index_list) * 10000.0))
-
-        QA_util_log_info(
-            strLogProgress,
-            ui_log=ui_log,
-            ui_progress=ui_progress,
-            ui_progress_int_value=intLogProgress
-        )
-        count = count + 1
-    if len(err) < 1:
-        QA_util_log_info('SUCCESS', ui_log=ui_log)
-    else:
-        QA_util_log_info(' ERROR CODE \n ', ui_log=ui_log)
-        QA_util_log_info(err, ui_log=ui_log)
+    QA_SaveEngine(
+        'etf_min',
+        coll,
+        QA_fetch_get_index_min,
+        frequence=['1min', '5min', '15min', '30min', '60min'],
+        start='2015-01-01',
+        job='JOB07',
+        resume=False,
+        ui_log=ui_log,
+        ui_progress=ui_progress
+    ).run(__index_list)
 
 
 def QA_SU_save_stock_list(client=DATABASE, ui_log=None, ui_progress=None):
@@ -1982,6 +994,15 @@ def QA_SU_save_stock_transaction(
         ]
     )
     err = []
+    # 同一分钟里有多笔成交, 按当天的序号 order 区分; 重复保存时覆盖
+    writer = QA_BulkWriter(
+        coll,
+        ('code',
+         'datetime',
+         'order'),
+        ensure_index=True,
+        ui_log=ui_log
+    )
 
     def __saving_work(code):
         QA_util_log_info(
@@ -1989,17 +1010,14 @@ def QA_SU_save_stock_transaction(
             ui_log=ui_log
         )
         try:
-            coll.insert_many(
-                QA_util_to_json_from_pandas(
-                    # 🛠todo  str(stock_list[code]) 参数不对？
-                    QA_fetch_get_stock_transaction(
-                        str(code),
-                        '2019-01-01',
-                        str(now_time())[0:10]
-                    )
+            writer.write(
+                QA_fetch_get_stock_transaction(
+                    str(code),
+                    '2019-01-01',
+                    str(now_time())[0:10]
                 )
             )
-        except:
+        except Exception:
             err.append(str(code))
 
     for i_ in range(len(stock_list)):
@@ -2022,6 +1040,8 @@ def QA_SU_save_stock_transaction(
             ui_progress_int_value=intLogProgress
         )
         __saving_work(stock_list[i_])
+    writer.close()
+    err.extend(sorted(writer.take_failed() - set(err)))
     if len(err) < 1:
         QA_util_log_info('SUCCESS', ui_log=ui_log)
     else:
@@ -2052,6 +1072,15 @@ def QA_SU_save_index_transaction(
         ]
     )
     err = []
+    # 同一分钟里有多笔成交, 按当天的序号 order 区分; 重复保存时覆盖
+    writer = QA_BulkWriter(
+        coll,
+        ('code',
+         'datetime',
+         'order'),
+        ensure_index=True,
+        ui_log=ui_log
+    )
 
     def __saving_work(code):
         QA_util_log_info(
@@ -2059,17 +1088,14 @@ def QA_SU_save_index_transaction(
             ui_log=ui_log
         )
         try:
-            coll.insert_many(
-                QA_util_to_json_from_pandas(
-                    # 🛠todo  str(stock_list[code]) 参数不对？
-                    QA_fetch_get_index_transaction(
-                        str(code),
-                        '2019-01-01',
-                        str(now_time())[0:10]
-                    )
+            writer.write(
+                QA_fetch_get_index_transaction(
+                    str(code),
+                    '2019-01-01',
+                    str(now_time())[0:10]
                 )
             )
-        except:
+        except Exception:
             err.append(str(code))
 
     for i_ in range(len(index_list)):
@@ -2092,6 +1118,8 @@ def QA_SU_save_index_transaction(
             ui_progress_int_value=intLogProgress
         )
         __saving_work(index_list[i_])
+    writer.close()
+    err.extend(sorted(writer.take_failed() - set(err)))
     if len(err) < 1:
         QA_util_log_info('SUCCESS', ui_log=ui_log)
     else:
@@ -2107,150 +1135,24 @@ def _save_option_commodity_ru_day(
         ui_progress=None
 ):
     ##################### ru 天然橡胶 ############################################################################
-    option_ru_contract_list = QA_fetch_get_commodity_option_RU_contract_time_to_market()
-    coll_option_commodity_ru_day = client.option_commodity_ru_day
-    coll_option_commodity_ru_day.create_index(
+    option_contract_list = QA_fetch_get_commodity_option_RU_contract_time_to_market()
+    coll_option_day = client.option_commodity_ru_day
+    coll_option_day.create_index(
         [("code",
           pymongo.ASCENDING),
          ("date_stamp",
           pymongo.ASCENDING)]
     )
-    err = []
-
-    def __saving_work(code, coll_option_commodity_ru_day):
-        try:
-            QA_util_log_info(
-                '##JOB12 Now Saving OPTION_DAY_COMMODITY_RU 天然橡胶 ==== {}'.format(
-                    str(code)
-                ),
-                ui_log=ui_log
-            )
-
-            # 首选查找数据库 是否 有 这个代码的数据
-            ref = coll_option_commodity_ru_day.find({'code': str(code)[0:8]})
-            end_date = str(now_time())[0:10]
-
-            # 当前数据库已经包含了这个代码的数据， 继续增量更新
-            # 加入这个判断的原因是因为如果是刚上市的 数据库会没有数据 所以会有负索引问题出现
-            if ref.count() > 0:
-
-                # 接着上次获取的日期继续更新
-                start_date = ref[ref.count() - 1]['date']
-                QA_util_log_info(
-                    ' 上次获取 期权ru 天然橡胶 日线数据的最后日期是 {}'.format(start_date),
-                    ui_log=ui_log
-                )
-
-                QA_util_log_info(
-                    'UPDATE_OPTION_RU_DAY \n 从上一次下载数据开始继续 Trying update {} from {} to {}'
-                        .format(code,
-                                start_date,
-                                end_date),
-                    ui_log=ui_log
-                )
-                if start_date != end_date:
-
-                    start_date0 = QA_util_get_next_day(start_date)
-                    df0 = QA_fetch_get_option_day(
-                        code=code,
-                        start_date=start_date0,
-                        end_date=end_date,
-                        frequence='day',
-                        ip=None,
-                        port=None
-                    )
-                    retCount = df0.iloc[:, 0].size
-                    QA_util_log_info(
-                        "日期从开始{}-结束{} , 合约代码{} , 返回了{}条记录 , 准备写入数据库".format(
-                            start_date0,
-                            end_date,
-                            code,
-                            retCount
-                        ),
-                        ui_log=ui_log
-                    )
-                    coll_option_commodity_ru_day.insert_many(
-                        QA_util_to_json_from_pandas(df0)
-                    )
-                else:
-                    QA_util_log_info(
-                        "^已经获取过这天的数据了^ {}".format(start_date),
-                        ui_log=ui_log
-                    )
-
-            else:
-                start_date = '1990-01-01'
-                QA_util_log_info(
-                    'UPDATE_M_OPTION_DAY \n 从新开始下载数据 Trying update {} from {} to {}'
-                        .format(code,
-                                start_date,
-                                end_date),
-                    ui_log=ui_log
-                )
-                if start_date != end_date:
-
-                    df0 = QA_fetch_get_option_day(
-                        code=code,
-                        start_date=start_date,
-                        end_date=end_date,
-                        frequence='day',
-                        ip=None,
-                        port=None
-                    )
-                    retCount = df0.iloc[:, 0].size
-                    QA_util_log_info(
-                        "日期从开始{}-结束{} , 合约代码{} , 获取了{}条记录 , 准备写入数据库^_^ ".format(
-                            start_date,
-                            end_date,
-                            code,
-                            retCount
-                        ),
-                        ui_log=ui_log
-                    )
-
-                    coll_option_commodity_ru_day.insert_many(
-                        QA_util_to_json_from_pandas(df0)
-                    )
-                else:
-                    QA_util_log_info(
-                        "*已经获取过这天的数据了* {}".format(start_date),
-                        ui_log=ui_log
-                    )
-
-        except Exception as error0:
-            print(error0)
-            err.append(str(code))
-
-    for item in range(len(option_ru_contract_list)):
-        QA_util_log_info(
-            'The {} of Total {}'.format(item,
-                                        len(option_ru_contract_list)),
-            ui_log=ui_log
-        )
-
-        strLogProgress = 'DOWNLOAD PROGRESS {} '.format(
-            str(float(item / len(option_ru_contract_list) * 100))[0:4] + '%'
-        )
-        intLogProgress = int(
-            float(item / len(option_ru_contract_list) * 10000.0)
-        )
-        QA_util_log_info(
-            strLogProgress,
-            ui_log=ui_log,
-            ui_progress=ui_progress,
-            ui_progress_int_value=intLogProgress
-        )
-
-        __saving_work(
-            option_ru_contract_list[item].code,
-            coll_option_commodity_ru_day
-        )
-
-    if len(err) < 1:
-        QA_util_log_info('SUCCESS save option ru day ^_^ ', ui_log=ui_log)
-    else:
-        QA_util_log_info(' ERROR CODE \n ', ui_log=ui_log)
-        QA_util_log_info(err, ui_log=ui_log)
+    QA_SaveEngine(
+        'option_commodity_ru_day',
+        coll_option_day,
+        QA_fetch_get_option_day,
+        frequence='day',
+        code_length=8,
+        job='JOB12',
+        ui_log=ui_log,
+        ui_progress=ui_progress
+    ).run([item['code'] for item in option_contract_list])
 
 
 def _save_option_commodity_c_day(
@@ -2259,150 +1161,24 @@ def _save_option_commodity_c_day(
         ui_progress=None
 ):
     ##################### c  玉米 ############################################################################
-    option_c_contract_list = QA_fetch_get_commodity_option_C_contract_time_to_market()
-    coll_option_commodity_c_day = client.option_commodity_c_day
-    coll_option_commodity_c_day.create_index(
+    option_contract_list = QA_fetch_get_commodity_option_C_contract_time_to_market()
+    coll_option_day = client.option_commodity_c_day
+    coll_option_day.create_index(
         [("code",
           pymongo.ASCENDING),
          ("date_stamp",
           pymongo.ASCENDING)]
     )
-    err = []
-
-    def __saving_work(code, coll_option_commodity_c_day):
-        try:
-            QA_util_log_info(
-                '##JOB12 Now Saving OPTION_DAY_COMMODITY_C 玉米 ==== {}'.format(
-                    str(code)
-                ),
-                ui_log=ui_log
-            )
-
-            # 首选查找数据库 是否 有 这个代码的数据
-            ref = coll_option_commodity_c_day.find({'code': str(code)[0:8]})
-            end_date = str(now_time())[0:10]
-
-            # 当前数据库已经包含了这个代码的数据， 继续增量更新
-            # 加入这个判断的原因是因为如果是刚上市的 数据库会没有数据 所以会有负索引问题出现
-            if ref.count() > 0:
-
-                # 接着上次获取的日期继续更新
-                start_date = ref[ref.count() - 1]['date']
-                QA_util_log_info(
-                    ' 上次获取 玉米C 天然橡胶 日线数据的最后日期是 {}'.format(start_date),
-                    ui_log=ui_log
-                )
-
-                QA_util_log_info(
-                    'UPDATE_OPTION_C_DAY \n 从上一次下载数据开始继续 Trying update {} from {} to {}'
-                        .format(code,
-                                start_date,
-                                end_date),
-                    ui_log=ui_log
-                )
-                if start_date != end_date:
-
-                    start_date0 = QA_util_get_next_day(start_date)
-                    df0 = QA_fetch_get_option_day(
-                        code=code,
-                        start_date=start_date0,
-                        end_date=end_date,
-                        frequence='day',
-                        ip=None,
-                        port=None
-                    )
-                    retCount = df0.iloc[:, 0].size
-                    QA_util_log_info(
-                        "日期从开始{}-结束{} , 合约代码{} , 返回了{}条记录 , 准备写入数据库".format(
-                            start_date0,
-                            end_date,
-                            code,
-                            retCount
-                        ),
-                        ui_log=ui_log
-                    )
-                    coll_option_commodity_c_day.insert_many(
-                        QA_util_to_json_from_pandas(df0)
-                    )
-                else:
-                    QA_util_log_info(
-                        "^已经获取过这天的数据了^ {}".format(start_date),
-                        ui_log=ui_log
-                    )
-
-            else:
-                start_date = '1990-01-01'
-                QA_util_log_info(
-                    'UPDATE_C_OPTION_DAY \n 从新开始下载数据 Trying update {} from {} to {}'
-                        .format(code,
-                                start_date,
-                                end_date),
-                    ui_log=ui_log
-                )
-                if start_date != end_date:
-
-                    df0 = QA_fetch_get_option_day(
-                        code=code,
-                        start_date=start_date,
-                        end_date=end_date,
-                        frequence='day',
-                        ip=None,
-                        port=None
-                    )
-                    retCount = df0.iloc[:, 0].size
-                    QA_util_log_info(
-                        "日期从开始{}-结束{} , 合约代码{} , 获取了{}条记录 , 准备写入数据库^_^ ".format(
-                            start_date,
-                            end_date,
-                            code,
-                            retCount
-                        ),
-                        ui_log=ui_log
-                    )
-
-                    coll_option_commodity_c_day.insert_many(
-                        QA_util_to_json_from_pandas(df0)
-                    )
-                else:
-                    QA_util_log_info(
-                        "*已经获取过这天的数据了* {}".format(start_date),
-                        ui_log=ui_log
-                    )
-
-        except Exception as error0:
-            print(error0)
-            err.append(str(code))
-
-    for item in range(len(option_c_contract_list)):
-        QA_util_log_info(
-            'The {} of Total {}'.format(item,
-                                        len(option_c_contract_list)),
-            ui_log=ui_log
-        )
-
-        strLogProgress = 'DOWNLOAD PROGRESS {} '.format(
-            str(float(item / len(option_c_contract_list) * 100))[0:4] + '%'
-        )
-        intLogProgress = int(
-            float(item / len(option_c_contract_list) * 10000.0)
-        )
-        QA_util_log_info(
-            strLogProgress,
-            ui_log=ui_log,
-            ui_progress=ui_progress,
-            ui_progress_int_value=intLogProgress
-        )
-
-        __saving_work(
-            option_c_contract_list[item].code,
-            coll_option_commodity_c_day
-        )
-
-    if len(err) < 1:
-        QA_util_log_info('SUCCESS save option ru day ^_^ ', ui_log=ui_log)
-    else:
-        QA_util_log_info(' ERROR CODE \n ', ui_log=ui_log)
-        QA_util_log_info(err, ui_log=ui_log)
+    QA_SaveEngine(
+        'option_commodity_c_day',
+        coll_option_day,
+        QA_fetch_get_option_day,
+        frequence='day',
+        code_length=8,
+        job='JOB12',
+        ui_log=ui_log,
+        ui_progress=ui_progress
+    ).run([item['code'] for item in option_contract_list])
 
 
 def _save_option_commodity_cf_day(
@@ -2411,150 +1187,24 @@ def _save_option_commodity_cf_day(
         ui_progress=None
 ):
     ##################### cf  棉花 ############################################################################
-    option_cf_contract_list = QA_fetch_get_commodity_option_CF_contract_time_to_market()
-    coll_option_commodity_cf_day = client.option_commodity_cf_day
-    coll_option_commodity_cf_day.create_index(
+    option_contract_list = QA_fetch_get_commodity_option_CF_contract_time_to_market()
+    coll_option_day = client.option_commodity_cf_day
+    coll_option_day.create_index(
         [("code",
           pymongo.ASCENDING),
          ("date_stamp",
           pymongo.ASCENDING)]
     )
-    err = []
-
-    def __saving_work(code, coll_option_commodity_cf_day):
-        try:
-            QA_util_log_info(
-                '##JOB12 Now Saving OPTION_DAY_COMMODITY_CF 棉花 ==== {}'.format(
-                    str(code)
-                ),
-                ui_log=ui_log
-            )
-
-            # 首选查找数据库 是否 有 这个代码的数据
-            ref = coll_option_commodity_cf_day.find({'code': str(code)[0:8]})
-            end_date = str(now_time())[0:10]
-
-            # 当前数据库已经包含了这个代码的数据， 继续增量更新
-            # 加入这个判断的原因是因为如果是刚上市的 数据库会没有数据 所以会有负索引问题出现
-            if ref.count() > 0:
-
-                # 接着上次获取的日期继续更新
-                start_date = ref[ref.count() - 1]['date']
-                QA_util_log_info(
-                    ' 上次获取 期权ru 天然橡胶 日线数据的最后日期是 {}'.format(start_date),
-                    ui_log=ui_log
-                )
-
-                QA_util_log_info(
-                    'UPDATE_OPTION_CF_DAY \n 从上一次下载数据开始继续 Trying update {} from {} to {}'
-                        .format(code,
-                                start_date,
-                                end_date),
-                    ui_log=ui_log
-                )
-                if start_date != end_date:
-
-                    start_date0 = QA_util_get_next_day(start_date)
-                    df0 = QA_fetch_get_option_day(
-                        code=code,
-                        start_date=start_date0,
-                        end_date=end_date,
-                        frequence='day',
-                        ip=None,
-                        port=None
-                    )
-                    retCount = df0.iloc[:, 0].size
-                    QA_util_log_info(
-                        "日期从开始{}-结束{} , 合约代码{} , 返回了{}条记录 , 准备写入数据库".format(
-                            start_date0,
-                            end_date,
-                            code,
-                            retCount
-                        ),
-                        ui_log=ui_log
-                    )
-                    coll_option_commodity_cf_day.insert_many(
-                        QA_util_to_json_from_pandas(df0)
-                    )
-                else:
-                    QA_util_log_info(
-                        "^已经获取过这天的数据了^ {}".format(start_date),
-                        ui_log=ui_log
-                    )
-
-            else:
-                start_date = '1990-01-01'
-                QA_util_log_info(
-                    'UPDATE_M_OPTION_DAY \n 从新开始下载数据 Trying update {} from {} to {}'
-                        .format(code,
-                                start_date,
-                                end_date),
-                    ui_log=ui_log
-                )
-                if start_date != end_date:
-
-                    df0 = QA_fetch_get_option_day(
-                        code=code,
-                        start_date=start_date,
-                        end_date=end_date,
-                        frequence='day',
-                        ip=None,
-                        port=None
-                    )
-                    retCount = df0.iloc[:, 0].size
-                    QA_util_log_info(
-                        "日期从开始{}-结束{} , 合约代码{} , 获取了{}条记录 , 准备写入数据库^_^ ".format(
-                            start_date,
-                            end_date,
-                            code,
-                            retCount
-                        ),
-                        ui_log=ui_log
-                    )
-
-                    coll_option_commodity_cf_day.insert_many(
-                        QA_util_to_json_from_pandas(df0)
-                    )
-                else:
-                    QA_util_log_info(
-                        "*已经获取过这天的数据了* {}".format(start_date),
-                        ui_log=ui_log
-                    )
-
-        except Exception as error0:
-            print(error0)
-            err.append(str(code))
-
-    for item in range(len(option_cf_contract_list)):
-        QA_util_log_info(
-            'The {} of Total {}'.format(item,
-                                        len(option_cf_contract_list)),
-            ui_log=ui_log
-        )
-
-        strLogProgress = 'DOWNLOAD PROGRESS {} '.format(
-            str(float(item / len(option_cf_contract_list) * 100))[0:4] + '%'
-        )
-        intLogProgress = int(
-            float(item / len(option_cf_contract_list) * 10000.0)
-        )
-        QA_util_log_info(
-            strLogProgress,
-            ui_log=ui_log,
-            ui_progress=ui_progress,
-            ui_progress_int_value=intLogProgress
-        )
-
-        __saving_work(
-            option_cf_contract_list[item].code,
-            coll_option_commodity_cf_day
-        )
-
-    if len(err) < 1:
-        QA_util_log_info('SUCCESS save option ru day ^_^ ', ui_log=ui_log)
-    else:
-        QA_util_log_info(' ERROR CODE \n ', ui_log=ui_log)
-        QA_util_log_info(err, ui_log=ui_log)
+    QA_SaveEngine(
+        'option_commodity_cf_day',
+        coll_option_day,
+        QA_fetch_get_option_day,
+        frequence='day',
+        code_length=8,
+        job='JOB12',
+        ui_log=ui_log,
+        ui_progress=ui_progress
+    ).run([item['code'] for item in option_contract_list])
 
 
 def _save_option_commodity_sr_day(
@@ -2563,151 +1213,24 @@ def _save_option_commodity_sr_day(
         ui_progress=None
 ):
     ##################### sr 白糖 ############################################################################
-    option_sr_contract_list = QA_fetch_get_commodity_option_SR_contract_time_to_market(
-    )
-    coll_option_commodity_sr_day = client.option_commodity_sr_day
-    coll_option_commodity_sr_day.create_index(
+    option_contract_list = QA_fetch_get_commodity_option_SR_contract_time_to_market()
+    coll_option_day = client.option_commodity_sr_day
+    coll_option_day.create_index(
         [("code",
           pymongo.ASCENDING),
          ("date_stamp",
           pymongo.ASCENDING)]
     )
-    err = []
-
-    def __saving_work(code, coll_option_commodity_sr_day):
-        try:
-            QA_util_log_info(
-                '##JOB12 Now Saving OPTION_DAY_COMMODITY_SR 白糖 ==== {}'.format(
-                    str(code)
-                ),
-                ui_log=ui_log
-            )
-
-            # 首选查找数据库 是否 有 这个代码的数据
-            ref = coll_option_commodity_sr_day.find({'code': str(code)[0:8]})
-            end_date = str(now_time())[0:10]
-
-            # 当前数据库已经包含了这个代码的数据， 继续增量更新
-            # 加入这个判断的原因是因为如果是刚上市的 数据库会没有数据 所以会有负索引问题出现
-            if ref.count() > 0:
-
-                # 接着上次获取的日期继续更新
-                start_date = ref[ref.count() - 1]['date']
-                QA_util_log_info(
-                    ' 上次获取期权sr白糖日线数据的最后日期是 {}'.format(start_date),
-                    ui_log=ui_log
-                )
-
-                QA_util_log_info(
-                    'UPDATE_OPTION_M_DAY \n 从上一次下载数据开始继续 Trying update {} from {} to {}'
-                        .format(code,
-                                start_date,
-                                end_date),
-                    ui_log=ui_log
-                )
-                if start_date != end_date:
-
-                    start_date0 = QA_util_get_next_day(start_date)
-                    df0 = QA_fetch_get_option_day(
-                        code=code,
-                        start_date=start_date0,
-                        end_date=end_date,
-                        frequence='day',
-                        ip=None,
-                        port=None
-                    )
-                    retCount = df0.iloc[:, 0].size
-                    QA_util_log_info(
-                        "日期从开始{}-结束{} , 合约代码{} , 返回了{}条记录 , 准备写入数据库".format(
-                            start_date0,
-                            end_date,
-                            code,
-                            retCount
-                        ),
-                        ui_log=ui_log
-                    )
-                    coll_option_commodity_sr_day.insert_many(
-                        QA_util_to_json_from_pandas(df0)
-                    )
-                else:
-                    QA_util_log_info(
-                        "^已经获取过这天的数据了^ {}".format(start_date),
-                        ui_log=ui_log
-                    )
-
-            else:
-                start_date = '1990-01-01'
-                QA_util_log_info(
-                    'UPDATE_M_OPTION_DAY \n 从新开始下载数据 Trying update {} from {} to {}'
-                        .format(code,
-                                start_date,
-                                end_date),
-                    ui_log=ui_log
-                )
-                if start_date != end_date:
-
-                    df0 = QA_fetch_get_option_day(
-                        code=code,
-                        start_date=start_date,
-                        end_date=end_date,
-                        frequence='day',
-                        ip=None,
-                        port=None
-                    )
-                    retCount = df0.iloc[:, 0].size
-                    QA_util_log_info(
-                        "日期从开始{}-结束{} , 合约代码{} , 获取了{}条记录 , 准备写入数据库^_^ ".format(
-                            start_date,
-                            end_date,
-                            code,
-                            retCount
-                        ),
-                        ui_log=ui_log
-                    )
-
-                    coll_option_commodity_sr_day.insert_many(
-                        QA_util_to_json_from_pandas(df0)
-                    )
-                else:
-                    QA_util_log_info(
-                        "*已经获取过这天的数据了* {}".format(start_date),
-                        ui_log=ui_log
-                    )
-
-        except Exception as error0:
-            print(error0)
-            err.append(str(code))
-
-    for item in range(len(option_sr_contract_list)):
-        QA_util_log_info(
-            'The {} of Total {}'.format(item,
-                                        len(option_sr_contract_list)),
-            ui_log=ui_log
-        )
-
-        strLogProgress = 'DOWNLOAD PROGRESS {} '.format(
-            str(float(item / len(option_sr_contract_list) * 100))[0:4] + '%'
-        )
-        intLogProgress = int(
-            float(item / len(option_sr_contract_list) * 10000.0)
-        )
-        QA_util_log_info(
-            strLogProgress,
-            ui_log=ui_log,
-            ui_progress=ui_progress,
-            ui_progress_int_value=intLogProgress
-        )
-
-        __saving_work(
-            option_sr_contract_list[item].code,
-            coll_option_commodity_sr_day
-        )
-
-    if len(err) < 1:
-        QA_util_log_info('SUCCESS save option sr day ^_^ ', ui_log=ui_log)
-    else:
-        QA_util_log_info(' ERROR CODE \n ', ui_log=ui_log)
-        QA_util_log_info(err, ui_log=ui_log)
+    QA_SaveEngine(
+        'option_commodity_sr_day',
+        coll_option_day,
+        QA_fetch_get_option_day,
+        frequence='day',
+        code_length=8,
+        job='JOB12',
+        ui_log=ui_log,
+        ui_progress=ui_progress
+    ).run([item['code'] for item in option_contract_list])
 
 
 def _save_option_commodity_m_day(
@@ -2716,153 +1239,24 @@ def _save_option_commodity_m_day(
         ui_progress=None
 ):
     ##################### M 豆粕 ############################################################################
-    option_m_contract_list = QA_fetch_get_commodity_option_M_contract_time_to_market(
-    )
-    coll_option_commodity_m_day = client.option_commodity_m_day
-    coll_option_commodity_m_day.create_index(
+    option_contract_list = QA_fetch_get_commodity_option_M_contract_time_to_market()
+    coll_option_day = client.option_commodity_m_day
+    coll_option_day.create_index(
         [("code",
           pymongo.ASCENDING),
          ("date_stamp",
           pymongo.ASCENDING)]
     )
-    err = []
-
-    def __saving_work(code, coll_option_commodity_m_day):
-        try:
-            QA_util_log_info(
-                '##JOB12 Now Saving OPTION_DAY_COMMODITY_M 豆粕 ==== {}'.format(
-                    str(code)
-                ),
-                ui_log=ui_log
-            )
-
-            # 首选查找数据库 是否 有 这个代码的数据
-            # M XXXXXX 编码格式
-
-            ref = coll_option_commodity_m_day.find({'code': str(code)[0:8]})
-            end_date = str(now_time())[0:10]
-
-            # 当前数据库已经包含了这个代码的数据， 继续增量更新
-            # 加入这个判断的原因是因为如果是刚上市的 数据库会没有数据 所以会有负索引问题出现
-            if ref.count() > 0:
-
-                # 接着上次获取的日期继续更新
-                start_date = ref[ref.count() - 1]['date']
-                QA_util_log_info(
-                    ' 上次获取期权M豆粕日线数据的最后日期是 {}'.format(start_date),
-                    ui_log=ui_log
-                )
-
-                QA_util_log_info(
-                    'UPDATE_OPTION_M_DAY \n 从上一次下载数据开始继续 Trying update {} from {} to {}'
-                        .format(code,
-                                start_date,
-                                end_date),
-                    ui_log=ui_log
-                )
-                if start_date != end_date:
-
-                    start_date0 = QA_util_get_next_day(start_date)
-                    df0 = QA_fetch_get_option_day(
-                        code=code,
-                        start_date=start_date0,
-                        end_date=end_date,
-                        frequence='day',
-                        ip=None,
-                        port=None
-                    )
-                    retCount = df0.iloc[:, 0].size
-                    QA_util_log_info(
-                        "日期从开始{}-结束{} , 合约代码{} , 返回了{}条记录 , 准备写入数据库".format(
-                            start_date0,
-                            end_date,
-                            code,
-                            retCount
-                        ),
-                        ui_log=ui_log
-                    )
-                    coll_option_commodity_m_day.insert_many(
-                        QA_util_to_json_from_pandas(df0)
-                    )
-                else:
-                    QA_util_log_info(
-                        "^已经获取过这天的数据了^ {}".format(start_date),
-                        ui_log=ui_log
-                    )
-
-            else:
-                start_date = '1990-01-01'
-                QA_util_log_info(
-                    'UPDATE_M_OPTION_DAY \n 从新开始下载数据 Trying update {} from {} to {}'
-                        .format(code,
-                                start_date,
-                                end_date),
-                    ui_log=ui_log
-                )
-                if start_date != end_date:
-
-                    df0 = QA_fetch_get_option_day(
-                        code=code,
-                        start_date=start_date,
-                        end_date=end_date,
-                        frequence='day',
-                        ip=None,
-                        port=None
-                    )
-                    retCount = df0.iloc[:, 0].size
-                    QA_util_log_info(
-                        "日期从开始{}-结束{} , 合约代码{} , 获取了{}条记录 , 准备写入数据库^_^ ".format(
-                            start_date,
-                            end_date,
-                            code,
-                            retCount
-                        ),
-                        ui_log=ui_log
-                    )
-
-                    coll_option_commodity_m_day.insert_many(
-                        QA_util_to_json_from_pandas(df0)
-                    )
-                else:
-                    QA_util_log_info(
-                        "*已经获取过这天的数据了* {}".format(start_date),
-                        ui_log=ui_log
-                    )
-
-        except Exception as error0:
-            print(error0)
-            err.append(str(code))
-
-    for item in range(len(option_m_contract_list)):
-        QA_util_log_info(
-            'The {} of Total {}'.format(item,
-                                        len(option_m_contract_list)),
-            ui_log=ui_log
-        )
-
-        strLogProgress = 'DOWNLOAD PROGRESS {} '.format(
-            str(float(item / len(option_m_contract_list) * 100))[0:4] + '%'
-        )
-        intLogProgress = int(
-            float(item / len(option_m_contract_list) * 10000.0)
-        )
-        QA_util_log_info(
-            strLogProgress,
-            ui_log=ui_log,
-            ui_progress=ui_progress,
-            ui_progress_int_value=intLogProgress
-        )
-
-        __saving_work(
-            option_m_contract_list[item].code,
-            coll_option_commodity_m_day
-        )
-
-    if len(err) < 1:
-        QA_util_log_info('SUCCESS save option m day ^_^ ', ui_log=ui_log)
-    else:
-        QA_util_log_info(' ERROR CODE \n ', ui_log=ui_log)
-        QA_util_log_info(err, ui_log=ui_log)
+    QA_SaveEngine(
+        'option_commodity_m_day',
+        coll_option_day,
+        QA_fetch_get_option_day,
+        frequence='day',
+        code_length=8,
+        job='JOB12',
+        ui_log=ui_log,
+        ui_progress=ui_progress
+    ).run([item['code'] for item in option_contract_list])
 
 
 def _save_option_commodity_cu_day(
@@ -2871,152 +1265,24 @@ def _save_option_commodity_cu_day(
         ui_progress=None
 ):
     ##################### CU 铜 ############################################################################
-    option_cu_contract_list = QA_fetch_get_commodity_option_CU_contract_time_to_market(
-    )
-    coll_option_commodity_cu_day = client.option_commodity_cu_day
-    coll_option_commodity_cu_day.create_index(
+    option_contract_list = QA_fetch_get_commodity_option_CU_contract_time_to_market()
+    coll_option_day = client.option_commodity_cu_day
+    coll_option_day.create_index(
         [("code",
           pymongo.ASCENDING),
          ("date_stamp",
           pymongo.ASCENDING)]
     )
-    err = []
-
-    def __saving_work(code, coll_option_commodity_cu_day):
-        try:
-            QA_util_log_info(
-                '##JOB12 Now Saving OPTION_DAY_COMMODITY_CU 铜 ==== {}'.format(
-                    str(code)
-                ),
-                ui_log=ui_log
-            )
-
-            # 首选查找数据库 是否 有 这个代码的数据
-            # 期权代码 从 10000001 开始编码  10001228
-            ref = coll_option_commodity_cu_day.find({'code': str(code)[0:8]})
-            end_date = str(now_time())[0:10]
-
-            # 当前数据库已经包含了这个代码的数据， 继续增量更新
-            # 加入这个判断的原因是因为如果是刚上市的 数据库会没有数据 所以会有负索引问题出现
-            if ref.count() > 0:
-
-                # 接着上次获取的日期继续更新
-                start_date = ref[ref.count() - 1]['date']
-                QA_util_log_info(
-                    ' 上次获取期权CU日线数据的最后日期是 {}'.format(start_date),
-                    ui_log=ui_log
-                )
-
-                QA_util_log_info(
-                    'UPDATE_OPTION_CU_DAY \n 从上一次下载数据开始继续 Trying update {} from {} to {}'
-                        .format(code,
-                                start_date,
-                                end_date),
-                    ui_log=ui_log
-                )
-                if start_date != end_date:
-
-                    start_date0 = QA_util_get_next_day(start_date)
-                    df0 = QA_fetch_get_option_day(
-                        code=code,
-                        start_date=start_date0,
-                        end_date=end_date,
-                        frequence='day',
-                        ip=None,
-                        port=None
-                    )
-                    retCount = df0.iloc[:, 0].size
-                    QA_util_log_info(
-                        "日期从开始{}-结束{} , 合约代码{} , 返回了{}条记录 , 准备写入数据库".format(
-                            start_date0,
-                            end_date,
-                            code,
-                            retCount
-                        ),
-                        ui_log=ui_log
-                    )
-                    coll_option_commodity_cu_day.insert_many(
-                        QA_util_to_json_from_pandas(df0)
-                    )
-                else:
-                    QA_util_log_info(
-                        "^已经获取过这天的数据了^ {}".format(start_date),
-                        ui_log=ui_log
-                    )
-
-            else:
-                start_date = '1990-01-01'
-                QA_util_log_info(
-                    'UPDATE_CU_OPTION_DAY \n 从新开始下载数据 Trying update {} from {} to {}'
-                        .format(code,
-                                start_date,
-                                end_date),
-                    ui_log=ui_log
-                )
-                if start_date != end_date:
-
-                    df0 = QA_fetch_get_option_day(
-                        code=code,
-                        start_date=start_date,
-                        end_date=end_date,
-                        frequence='day',
-                        ip=None,
-                        port=None
-                    )
-                    retCount = df0.iloc[:, 0].size
-                    QA_util_log_info(
-                        "日期从开始{}-结束{} , 合约代码{} , 获取了{}条记录 , 准备写入数据库^_^ ".format(
-                            start_date,
-                            end_date,
-                            code,
-                            retCount
-                        ),
-                        ui_log=ui_log
-                    )
-
-                    coll_option_commodity_cu_day.insert_many(
-                        QA_util_to_json_from_pandas(df0)
-                    )
-                else:
-                    QA_util_log_info(
-                        "*已经获取过这天的数据了* {}".format(start_date),
-                        ui_log=ui_log
-                    )
-
-        except Exception as error0:
-            print(error0)
-            err.append(str(code))
-
-    for item in range(len(option_cu_contract_list)):
-        QA_util_log_info(
-            'The {} of Total {}'.format(item,
-                                        len(option_cu_contract_list)),
-            ui_log=ui_log
-        )
-
-        strLogProgress = 'DOWNLOAD PROGRESS {} '.format(
-            str(float(item / len(option_cu_contract_list) * 100))[0:4] + '%'
-        )
-        intLogProgress = int(
-            float(item / len(option_cu_contract_list) * 10000.0)
-        )
-        QA_util_log_info(
-            strLogProgress,
-            ui_log=ui_log,
-            ui_progress=ui_progress,
-            ui_progress_int_value=intLogProgress
-        )
-
-        __saving_work(
-            option_cu_contract_list[item].code,
-            coll_option_commodity_cu_day
-        )
-
-    if len(err) < 1:
-        QA_util_log_info('SUCCESS save option cu day ^_^ ', ui_log=ui_log)
-    else:
-        QA_util_log_info(' ERROR CODE \n ', ui_log=ui_log)
-        QA_util_log_info(err, ui_log=ui_log)
+    QA_SaveEngine(
+        'option_commodity_cu_day',
+        coll_option_day,
+        QA_fetch_get_option_day,
+        frequence='day',
+        code_length=8,
+        job='JOB12',
+        ui_log=ui_log,
+        ui_progress=ui_progress
+    ).run([item['code'] for item in option_contract_list])
 
 
 def QA_SU_save_option_commodity_day(
@@ -3063,159 +1329,9 @@ def QA_SU_save_option_commodity_day(
 
 '''
 期权分钟线
-todo: 代码需要重构 ， 把重复的代码合并在一起
 '''
 
 
-def _save_option_commodity_ru_min(
-        client=DATABASE,
-        ui_log=None,
-        ui_progress=None
-):
-    '''
-
-    :param client:
-    :param ui_log:
-    :param ui_progress:
-    :return:
-    '''
-    '''
-        :param client:
-        :return:
-        '''
-    option_contract_list = QA_fetch_get_commodity_option_C_contract_time_to_market()
-    coll_option_min = client.option_commodity_ru_min
-    coll_option_min.create_index(
-        [("code",
-          pymongo.ASCENDING),
-         ("date_stamp",
-          pymongo.ASCENDING)]
-    )
-    err = []
-
-    # 索引 code
-
-    err = []
-
-    def __saving_work(code, coll):
-
-        QA_util_log_info(
-            '##JOB13 Now Saving Option RU 棉花 MIN ==== {}'.format(str(code)),
-            ui_log=ui_log
-        )
-        try:
-
-            for type in ['1min', '5min', '15min', '30min', '60min']:
-                ref_ = coll.find({'code': str(code)[0:8], 'type': type})
-
-                end_time = str(now_time())[0:19]
-                if ref_.count() > 0:
-                    start_time = ref_[ref_.count() - 1]['datetime']
-
-                    QA_util_log_info(
-                        '##JOB13.{} Now Saving Option RU 天然橡胶 {} from {} to {} =={} '
-                            .format(
-                            ['1min',
-                             '5min',
-                             '15min',
-                             '30min',
-                             '60min'].index(type),
-                            str(code),
-                            start_time,
-                            end_time,
-                            type
-                        ),
-                        ui_log=ui_log
-                    )
-
-                    if start_time != end_time:
-                        __data = QA_fetch_get_future_min(
-                            str(code),
-                            start_time,
-                            end_time,
-                            type
-                        )
-                        if len(__data) > 1:
-                            QA_util_log_info(
-                                " 写入 新增历史合约记录数 {} ".format(len(__data))
-                            )
-                            coll.insert_many(
-                                QA_util_to_json_from_pandas(__data[1::])
-                            )
-                else:
-                    start_time = '2015-01-01'
-
-                    QA_util_log_info(
-                        '##JOB13.{} Now Option RU 天然橡胶 {} from {} to {} =={} '
-                            .format(
-                            ['1min',
-                             '5min',
-                             '15min',
-                             '30min',
-                             '60min'].index(type),
-                            str(code),
-                            start_time,
-                            end_time,
-                            type
-                        ),
-                        ui_log=ui_log
-                    )
-
-                    if start_time != end_time:
-                        __data = QA_fetch_get_future_min(
-                            str(code),
-                            start_time,
-                            end_time,
-                            type
-                        )
-                        if len(__data) > 1:
-                            QA_util_log_info(
-                                " 写入 新增合约记录数 {} ".format(len(__data))
-                            )
-                            coll.insert_many(
-                                QA_util_to_json_from_pandas(__data)
-                            )
-        except:
-            err.append(code)
-
-    executor = ThreadPoolExecutor(max_workers=4)
-
-    res = {
-        executor.submit(
-            __saving_work,
-            option_contract_list[i_]["code"],
-            coll_option_min
-        )
-        for i_ in range(len(option_contract_list))
-    }  # multi index ./.
-    count = 0
-    for i_ in concurrent.futures.as_completed(res):
-        QA_util_log_info(
-            'The {} of Total {}'.format(count,
-                                        len(option_contract_list)),
-            ui_log=ui_log
-        )
-        strLogProgress = 'DOWNLOAD PROGRESS {} '.format(
-            str(float(count / len(option_contract_list) * 100))[0:4] + '%'
-        )
-        intLogProgress = int(float(count / len(option_contract_list) * 10000.0))
-
-        QA_util_log_info(
-            strLogProgress,
-            ui_log=ui_log,
-            ui_progress=ui_progress,
-            ui_progress_int_value=intLogProgress
-        )
-        count = count + 1
-    if len(err) < 1:
-        QA_util_log_info('SUCCESS', ui_log=ui_log)
-    else:
-        QA_util_log_info(' ERROR CODE \n ', ui_log=ui_log)
-        QA_util_log_info(err, ui_log=ui_log)
-
-    pass
-
-
 def _save_option_commodity_c_min(
         client=DATABASE,
         ui_log=None,
@@ -3240,129 +1356,17 @@ def _save_option_commodity_c_min(
          ("date_stamp",
           pymongo.ASCENDING)]
     )
-    err = []
-
-    # 索引 code
-
-    err = []
-
-    def __saving_work(code, coll):
-
-        QA_util_log_info(
-            '##JOB13 Now Saving Option C 玉米 MIN ==== {}'.format(str(code)),
-            ui_log=ui_log
-        )
-        try:
-
-            for type in ['1min', '5min', '15min', '30min', '60min']:
-                ref_ = coll.find({'code': str(code)[0:8], 'type': type})
-
-                end_time = str(now_time())[0:19]
-                if ref_.count() > 0:
-                    start_time = ref_[ref_.count() - 1]['datetime']
-
-                    QA_util_log_info(
-                        '##JOB13.{} Now Saving Option C 玉米 {} from {} to {} =={} '
-                            .format(
-                            ['1min',
-                             '5min',
-                             '15min',
-                             '30min',
-                             '60min'].index(type),
-                            str(code),
-                            start_time,
-                            end_time,
-                            type
-                        ),
-                        ui_log=ui_log
-                    )
-
-                    if start_time != end_time:
-                        __data = QA_fetch_get_future_min(
-                            str(code),
-                            start_time,
-                            end_time,
-                            type
-                        )
-                        if len(__data) > 1:
-                            QA_util_log_info(
-                                " 写入 新增历史合约记录数 {} ".format(len(__data))
-                            )
-                            coll.insert_many(
-                                QA_util_to_json_from_pandas(__data[1::])
-                            )
-                else:
-                    start_time = '2015-01-01'
-
-                    QA_util_log_info(
-                        '##JOB13.{} Now Option C 玉米 {} from {} to {} =={} '
-                            .format(
-                            ['1min',
-                             '5min',
-                             '15min',
-                             '30min',
-                             '60min'].index(type),
-                            str(code),
-                            start_time,
-                            end_time,
-                            type
-                        ),
-                        ui_log=ui_log
-                    )
-
-                    if start_time != end_time:
-                        __data = QA_fetch_get_future_min(
-                            str(code),
-                            start_time,
-                            end_time,
-                            type
-                        )
-                        if len(__data) > 1:
-                            QA_util_log_info(
-                                " 写入 新增合约记录数 {} ".format(len(__data))
-                            )
-                            coll.insert_many(
-                                QA_util_to_json_from_pandas(__data)
-                            )
-        except:
-            err.append(code)
-
-    executor = ThreadPoolExecutor(max_workers=4)
-
-    res = {
-        executor.submit(
-            __saving_work,
-            option_contract_list[i_]["code"],
-            coll_option_min
-        )
-        for i_ in range(len(option_contract_list))
-    }  # multi index ./.
-    count = 0
-    for i_ in concurrent.futures.as_completed(res):
-        QA_util_log_info(
-            'The {} of Total {}'.format(count,
-                                        len(option_contract_list)),
-            ui_log=ui_log
-        )
-        strLogProgress = 'DOWNLOAD PROGRESS {} '.format(
-            str(float(count / len(option_contract_list) * 100))[0:4] + '%'
-        )
-        intLogProgress = int(float(count / len(option_contract_list) * 10000.0))
-
-        QA_util_log_info(
-            strLogProgress,
-            ui_log=ui_log,
-            ui_progress=ui_progress,
-            ui_progress_int_value=intLogProgress
-        )
-        count = count + 1
-    if len(err) < 1:
-        QA_util_log_info('SUCCESS', ui_log=ui_log)
-    else:
-        QA_util_log_info(' ERROR CODE \n ', ui_log=ui_log)
-        QA_util_log_info(err, ui_log=ui_log)
-
-    pass
+    QA_SaveEngine(
+        'option_commodity_c_min',
+        coll_option_min,
+        QA_fetch_get_future_min,
+        frequence=['1min', '5min', '15min', '30min', '60min'],
+        start='2015-01-01',
+        code_length=8,
+        job='JOB13',
+        ui_log=ui_log,
+        ui_progress=ui_progress
+    ).run([item['code'] for item in option_contract_list])
 
 
 def _save_option_commodity_cf_min(
@@ -3389,129 +1393,17 @@ def _save_option_commodity_cf_min(
          ("date_stamp",
           pymongo.ASCENDING)]
     )
-    err = []
-
-    # 索引 code
-
-    err = []
-
-    def __saving_work(code, coll):
-
-        QA_util_log_info(
-            '##JOB13 Now Saving Option CF 棉花 MIN ==== {}'.format(str(code)),
-            ui_log=ui_log
-        )
-        try:
-
-            for type in ['1min', '5min', '15min', '30min', '60min']:
-                ref_ = coll.find({'code': str(code)[0:8], 'type': type})
-
-                end_time = str(now_time())[0:19]
-                if ref_.count() > 0:
-                    start_time = ref_[ref_.count() - 1]['datetime']
-
-                    QA_util_log_info(
-                        '##JOB13.{} Now Saving Option CF 棉花 {} from {} to {} =={} '
-                            .format(
-                            ['1min',
-                             '5min',
-                             '15min',
-                             '30min',
-                             '60min'].index(type),
-                            str(code),
-                            start_time,
-                            end_time,
-                            type
-                        ),
-                        ui_log=ui_log
-                    )
-
-                    if start_time != end_time:
-                        __data = QA_fetch_get_future_min(
-                            str(code),
-                            start_time,
-                            end_time,
-                            type
-                        )
-                        if len(__data) > 1:
-                            QA_util_log_info(
-                                " 写入 新增历史合约记录数 {} ".format(len(__data))
-                            )
-                            coll.insert_many(
-                                QA_util_to_json_from_pandas(__data[1::])
-                            )
-                else:
-                    start_time = '2015-01-01'
-
-                    QA_util_log_info(
-                        '##JOB13.{} Now Option CF 棉花 {} from {} to {} =={} '
-                            .format(
-                            ['1min',
-                             '5min',
-                             '15min',
-                             '30min',
-                             '60min'].index(type),
-                            str(code),
-                            start_time,
-                            end_time,
-                            type
-                        ),
-                        ui_log=ui_log
-                    )
-
-                    if start_time != end_time:
-                        __data = QA_fetch_get_future_min(
-                            str(code),
-                            start_time,
-                            end_time,
-                            type
-                        )
-                        if len(__data) > 1:
-                            QA_util_log_info(
-                                " 写入 新增合约记录数 {} ".format(len(__data))
-                            )
-                            coll.insert_many(
-                                QA_util_to_json_from_pandas(__data)
-                            )
-        except:
-            err.append(code)
-
-    executor = ThreadPoolExecutor(max_workers=4)
-
-    res = {
-        executor.submit(
-            __saving_work,
-            option_contract_list[i_]["code"],
-            coll_option_min
-        )
-        for i_ in range(len(option_contract_list))
-    }  # multi index ./.
-    count = 0
-    for i_ in concurrent.futures.as_completed(res):
-        QA_util_log_info(
-            'The {} of Total {}'.format(count,
-                                        len(option_contract_list)),
-            ui_log=ui_log
-        )
-        strLogProgress = 'DOWNLOAD PROGRESS {} '.format(
-            str(float(count / len(option_contract_list) * 100))[0:4] + '%'
-        )
-        intLogProgress = int(float(count / len(option_contract_list) * 10000.0))
-
-        QA_util_log_info(
-            strLogProgress,
-            ui_log=ui_log,
-            ui_progress=ui_progress,
-            ui_progress_int_value=intLogProgress
-        )
-        count = count + 1
-    if len(err) < 1:
-        QA_util_log_info('SUCCESS', ui_log=ui_log)
-    else:
-        QA_util_log_info(' ERROR CODE \n ', ui_log=ui_log)
-        QA_util_log_info(err, ui_log=ui_log)
-
-    pass
+    QA_SaveEngine(
+        'option_commodity_cf_min',
+        coll_option_min,
+        QA_fetch_get_future_min,
+        frequence=['1min', '5min', '15min', '30min', '60min'],
+        start='2015-01-01',
+        code_length=8,
+        job='JOB13',
+        ui_log=ui_log,
+        ui_progress=ui_progress
+    ).run([item['code'] for item in option_contract_list])
 
 
 def _save_option_commodity_ru_min(
@@ -3539,129 +1431,17 @@ def _save_option_commodity_ru_min(
          ("date_stamp",
           pymongo.ASCENDING)]
     )
-    err = []
-
-    # 索引 code
-
-    err = []
-
-    def __saving_work(code, coll):
-
-        QA_util_log_info(
-            '##JOB13 Now Saving Option RU 天然橡胶 MIN ==== {}'.format(str(code)),
-            ui_log=ui_log
-        )
-        try:
-
-            for type in ['1min', '5min', '15min', '30min', '60min']:
-                ref_ = coll.find({'code': str(code)[0:8], 'type': type})
-
-                end_time = str(now_time())[0:19]
-                if ref_.count() > 0:
-                    start_time = ref_[ref_.count() - 1]['datetime']
-
-                    QA_util_log_info(
-                        '##JOB13.{} Now Saving Option RU 天然橡胶 {} from {} to {} =={} '
-                            .format(
-                            ['1min',
-                             '5min',
-                             '15min',
-                             '30min',
-                             '60min'].index(type),
-                            str(code),
-                            start_time,
-                            end_time,
-                            type
-                        ),
-                        ui_log=ui_log
-                    )
-
-                    if start_time != end_time:
-                        __data = QA_fetch_get_future_min(
-                            str(code),
-                            start_time,
-                            end_time,
-                            type
-                        )
-                        if len(__data) > 1:
-                            QA_util_log_info(
-                                " 写入 新增历史合约记录数 {} ".format(len(__data))
-                            )
-                            coll.insert_many(
-                                QA_util_to_json_from_pandas(__data[1::])
-                            )
-                else:
-                    start_time = '2015-01-01'
-
-                    QA_util_log_info(
-                        '##JOB13.{} Now Option RU 天然橡胶 {} from {} to {} =={} '
-                            .format(
-                            ['1min',
-                             '5min',
-                             '15min',
-                             '30min',
-                             '60min'].index(type),
-                            str(code),
-                            start_time,
-                            end_time,
-                            type
-                        ),
-                        ui_log=ui_log
-                    )
-
-                    if start_time != end_time:
-                        __data = QA_fetch_get_future_min(
-                            str(code),
-                            start_time,
-                            end_time,
-                            type
-                        )
-                        if len(__data) > 1:
-                            QA_util_log_info(
-                                " 写入 新增合约记录数 {} ".format(len(__data))
-                            )
-                            coll.insert_many(
-                                QA_util_to_json_from_pandas(__data)
-                            )
-        except:
-            err.append(code)
-
-    executor = ThreadPoolExecutor(max_workers=4)
-
-    res = {
-        executor.submit(
-            __saving_work,
-            option_contract_list[i_]["code"],
-            coll_option_min
-        )
-        for i_ in range(len(option_contract_list))
-    }  # multi index ./.
-    count = 0
-    for i_ in concurrent.futures.as_completed(res):
-        QA_util_log_info(
-            'The {} of Total {}'.format(count,
-                                        len(option_contract_list)),
-            ui_log=ui_log
-        )
-        strLogProgress = 'DOWNLOAD PROGRESS {} '.format(
-            str(float(count / len(option_contract_list) * 100))[0:4] + '%'
-        )
-        intLogProgress = int(float(count / len(option_contract_list) * 10000.0))
-
-        QA_util_log_info(
-            strLogProgress,
-            ui_log=ui_log,
-            ui_progress=ui_progress,
-            ui_progress_int_value=intLogProgress
-        )
-        count = count + 1
-    if len(err) < 1:
-        QA_util_log_info('SUCCESS', ui_log=ui_log)
-    else:
-        QA_util_log_info(' ERROR CODE \n ', ui_log=ui_log)
-        QA_util_log_info(err, ui_log=ui_log)
-
-    pass
+    QA_SaveEngine(
+        'option_commodity_ru_min',
+        coll_option_min,
+        QA_fetch_get_future_min,
+        frequence=['1min', '5min', '15min', '30min', '60min'],
+        start='2015-01-01',
+        code_length=8,
+        job='JOB13',
+        ui_log=ui_log,
+        ui_progress=ui_progress
+    ).run([item['code'] for item in option_contract_list])
 
 
 def _save_option_commodity_cu_min(
@@ -3689,129 +1469,17 @@ def _save_option_commodity_cu_min(
          ("date_stamp",
           pymongo.ASCENDING)]
     )
-    err = []
-
-    # 索引 code
-
-    err = []
-
-    def __saving_work(code, coll):
-
-        QA_util_log_info(
-            '##JOB13 Now Saving Option CU 铜 MIN ==== {}'.format(str(code)),
-            ui_log=ui_log
-        )
-        try:
-
-            for type in ['1min', '5min', '15min', '30min', '60min']:
-                ref_ = coll.find({'code': str(code)[0:8], 'type': type})
-
-                end_time = str(now_time())[0:19]
-                if ref_.count() > 0:
-                    start_time = ref_[ref_.count() - 1]['datetime']
-
-                    QA_util_log_info(
-                        '##JOB13.{} Now Saving Option CU 铜 {} from {} to {} =={} '
-                            .format(
-                            ['1min',
-                             '5min',
-                             '15min',
-                             '30min',
-                             '60min'].index(type),
-                            str(code),
-                            start_time,
-                            end_time,
-                            type
-                        ),
-                        ui_log=ui_log
-                    )
-
-                    if start_time != end_time:
-                        __data = QA_fetch_get_future_min(
-                            str(code),
-                            start_time,
-                            end_time,
-                            type
-                        )
-                        if len(__data) > 1:
-                            QA_util_log_info(
-                                " 写入 新增历史合约记录数 {} ".format(len(__data))
-                            )
-                            coll.insert_many(
-                                QA_util_to_json_from_pandas(__data[1::])
-                            )
-                else:
-                    start_time = '2015-01-01'
-
-                    QA_util_log_info(
-                        '##JOB13.{} Now Option CU 铜 {} from {} to {} =={} '
-                            .format(
-                            ['1min',
-                             '5min',
-                             '15min',
-                             '30min',
-                             '60min'].index(type),
-                            str(code),
-                            start_time,
-                            end_time,
-                            type
-                        ),
-                        ui_log=ui_log
-                    )
-
-                    if start_time != end_time:
-                        __data = QA_fetch_get_future_min(
-                            str(code),
-                            start_time,
-                            end_time,
-                            type
-                        )
-                        if len(__data) > 1:
-                            QA_util_log_info(
-                                " 写入 新增合约记录数 {} ".format(len(__data))
-                            )
-                            coll.insert_many(
-                                QA_util_to_json_from_pandas(__data)
-                            )
-        except:
-            err.append(code)
-
-    executor = ThreadPoolExecutor(max_workers=4)
-
-    res = {
-        executor.submit(
-            __saving_work,
-            option_contract_list[i_]["code"],
-            coll_option_min
-        )
-        for i_ in range(len(option_contract_list))
-    }  # multi index ./.
-    count = 0
-    for i_ in concurrent.futures.as_completed(res):
-        QA_util_log_info(
-            'The {} of Total {}'.format(count,
-                                        len(option_contract_list)),
-            ui_log=ui_log
-        )
-        strLogProgress = 'DOWNLOAD PROGRESS {} '.format(
-            str(float(count / len(option_contract_list) * 100))[0:4] + '%'
-        )
-        intLogProgress = int(float(count / len(option_contract_list) * 10000.0))
-
-        QA_util_log_info(
-            strLogProgress,
-            ui_log=ui_log,
-            ui_progress=ui_progress,
-            ui_progress_int_value=intLogProgress
-        )
-        count = count + 1
-    if len(err) < 1:
-        QA_util_log_info('SUCCESS', ui_log=ui_log)
-    else:
-        QA_util_log_info(' ERROR CODE \n ', ui_log=ui_log)
-        QA_util_log_info(err, ui_log=ui_log)
-
-    pass
+    QA_SaveEngine(
+        'option_commodity_cu_min',
+        coll_option_min,
+        QA_fetch_get_future_min,
+        frequence=['1min', '5min', '15min', '30min', '60min'],
+        start='2015-01-01',
+        code_length=8,
+        job='JOB13',
+        ui_log=ui_log,
+        ui_progress=ui_progress
+    ).run([item['code'] for item in option_contract_list])
 
 
 def _save_option_commodity_sr_min(
@@ -3839,129 +1507,17 @@ def _save_option_commodity_sr_min(
          ("date_stamp",
           pymongo.ASCENDING)]
     )
-    err = []
-
-    # 索引 code
-
-    err = []
-
-    def __saving_work(code, coll):
-
-        QA_util_log_info(
-            '##JOB13 Now Saving Option SR 白糖 ==== {}'.format(str(code)),
-            ui_log=ui_log
-        )
-        try:
-
-            for type in ['1min', '5min', '15min', '30min', '60min']:
-                ref_ = coll.find({'code': str(code)[0:8], 'type': type})
-
-                end_time = str(now_time())[0:19]
-                if ref_.count() > 0:
-                    start_time = ref_[ref_.count() - 1]['datetime']
-
-                    QA_util_log_info(
-                        '##JOB13.{} Now Saving Option SR 白糖 {} from {} to {} =={} '
-                            .format(
-                            ['1min',
-                             '5min',
-                             '15min',
-                             '30min',
-                             '60min'].index(type),
-                            str(code),
-                            start_time,
-                            end_time,
-                            type
-                        ),
-                        ui_log=ui_log
-                    )
-
-                    if start_time != end_time:
-                        __data = QA_fetch_get_future_min(
-                            str(code),
-                            start_time,
-                            end_time,
-                            type
-                        )
-                        if len(__data) > 1:
-                            QA_util_log_info(
-                                " 写入 新增历史合约记录数 {} ".format(len(__data))
-                            )
-                            coll.insert_many(
-                                QA_util_to_json_from_pandas(__data[1::])
-                            )
-                else:
-                    start_time = '2015-01-01'
-
-                    QA_util_log_info(
-                        '##JOB13.{} Now Option SR 白糖 {} from {} to {} =={} '
-                            .format(
-                            ['1min',
-                             '5min',
-                             '15min',
-                             '30min',
-                             '60min'].index(type),
-                            str(code),
-                            start_time,
-                            end_time,
-                            type
-                        ),
-                        ui_log=ui_log
-                    )
-
-                    if start_time != end_time:
-                        __data = QA_fetch_get_future_min(
-                            str(code),
-                            start_time,
-                            end_time,
-                            type
-                        )
-                        if len(__data) > 1:
-                            QA_util_log_info(
-                                " 写入 新增合约记录数 {} ".format(len(__data))
-                            )
-                            coll.insert_many(
-                                QA_util_to_json_from_pandas(__data)
-                            )
-        except:
-            err.append(code)
-
-    executor = ThreadPoolExecutor(max_workers=4)
-
-    res = {
-        executor.submit(
-            __saving_work,
-            option_contract_list[i_]["code"],
-            coll_option_min
-        )
-        for i_ in range(len(option_contract_list))
-    }  # multi index ./.
-    count = 0
-    for i_ in concurrent.futures.as_completed(res):
-        QA_util_log_info(
-            'The {} of Total {}'.format(count,
-                                        len(option_contract_list)),
-            ui_log=ui_log
-        )
-        strLogProgress = 'DOWNLOAD PROGRESS {} '.format(
-            str(float(count / len(option_contract_list) * 100))[0:4] + '%'
-        )
-        intLogProgress = int(float(count / len(option_contract_list) * 10000.0))
-
-        QA_util_log_info(
-            strLogProgress,
-            ui_log=ui_log,
-            ui_progress=ui_progress,
-            ui_progress_int_value=intLogProgress
-        )
-        count = count + 1
-    if len(err) < 1:
-        QA_util_log_info('SUCCESS', ui_log=ui_log)
-    else:
-        QA_util_log_info(' ERROR CODE \n ', ui_log=ui_log)
-        QA_util_log_info(err, ui_log=ui_log)
-
-    pass
+    QA_SaveEngine(
+        'option_commodity_sr_min',
+        coll_option_min,
+        QA_fetch_get_future_min,
+        frequence=['1min', '5min', '15min', '30min', '60min'],
+        start='2015-01-01',
+        code_length=8,
+        job='JOB13',
+        ui_log=ui_log,
+        ui_progress=ui_progress
+    ).run([item['code'] for item in option_contract_list])
 
 
 def _save_option_commodity_m_min(
@@ -3986,129 +1542,17 @@ def _save_option_commodity_m_min(
          ("date_stamp",
           pymongo.ASCENDING)]
     )
-    err = []
-
-    # 索引 code
-
-    err = []
-
-    def __saving_work(code, coll):
-
-        QA_util_log_info(
-            '##JOB13 Now Saving Option M 豆粕 ==== {}'.format(str(code)),
-            ui_log=ui_log
-        )
-        try:
-
-            for type in ['1min', '5min', '15min', '30min', '60min']:
-                ref_ = coll.find({'code': str(code)[0:8], 'type': type})
-
-                end_time = str(now_time())[0:19]
-                if ref_.count() > 0:
-                    start_time = ref_[ref_.count() - 1]['datetime']
-
-                    QA_util_log_info(
-                        '##JOB13.{} Now Saving Option M 豆粕  {} from {} to {} =={} '
-                            .format(
-                            ['1min',
-                             '5min',
-                             '15min',
-                             '30min',
-                             '60min'].index(type),
-                            str(code),
-                            start_time,
-                            end_time,
-                            type
-                        ),
-                        ui_log=ui_log
-                    )
-
-                    if start_time != end_time:
-                        __data = QA_fetch_get_future_min(
-                            str(code),
-                            start_time,
-                            end_time,
-                            type
-                        )
-                        if len(__data) > 1:
-                            QA_util_log_info(
-                                " 写入 新增历史合约记录数 {} ".format(len(__data))
-                            )
-                            coll.insert_many(
-                                QA_util_to_json_from_pandas(__data[1::])
-                            )
-                else:
-                    start_time = '2015-01-01'
-
-                    QA_util_log_info(
-                        '##JOB13.{} Now Option M 豆粕 {} from {} to {} =={} '
-                            .format(
-                            ['1min',
-                             '5min',
-                             '15min',
-                             '30min',
-                             '60min'].index(type),
-                            str(code),
-                            start_time,
-                            end_time,
-                            type
-                        ),
-                        ui_log=ui_log
-                    )
-
-                    if start_time != end_time:
-                        __data = QA_fetch_get_future_min(
-                            str(code),
-                            start_time,
-                            end_time,
-                            type
-                        )
-                        if len(__data) > 1:
-                            QA_util_log_info(
-                                " 写入 新增合约记录数 {} ".format(len(__data))
-                            )
-                            coll.insert_many(
-                                QA_util_to_json_from_pandas(__data)
-                            )
-        except:
-            err.append(code)
-
-    executor = ThreadPoolExecutor(max_workers=4)
-
-    res = {
-        executor.submit(
-            __saving_work,
-            option_contract_list[i_]["code"],
-            coll_option_min
-        )
-        for i_ in range(len(option_contract_list))
-    }  # multi index ./.
-    count = 0
-    for i_ in concurrent.futures.as_completed(res):
-        QA_util_log_info(
-            'The {} of Total {}'.format(count,
-                                        len(option_contract_list)),
-            ui_log=ui_log
-        )
-        strLogProgress = 'DOWNLOAD PROGRESS {} '.format(
-            str(float(count / len(option_contract_list) * 100))[0:4] + '%'
-        )
-        intLogProgress = int(float(count / len(option_contract_list) * 10000.0))
-
-        QA_util_log_info(
-            strLogProgress,
-            ui_log=ui_log,
-            ui_progress=ui_progress,
-            ui_progress_int_value=intLogProgress
-        )
-        count = count + 1
-    if len(err) < 1:
-        QA_util_log_info('SUCCESS', ui_log=ui_log)
-    else:
-        QA_util_log_info(' ERROR CODE \n ', ui_log=ui_log)
-        QA_util_log_info(err, ui_log=ui_log)
-
-    pass
+    QA_SaveEngine(
+        'option_commodity_m_min',
+        coll_option_min,
+        QA_fetch_get_future_min,
+        frequence=['1min', '5min', '15min', '30min', '60min'],
+        start='2015-01-01',
+        code_length=8,
+        job='JOB13',
+        ui_log=ui_log,
+        ui_progress=ui_progress
+    ).run([item['code'] for item in option_contract_list])
 
 
 def QA_SU_save_option_commodity_min(
@@ -4154,290 +1598,58 @@ def QA_SU_save_option_commodity_min(
         client=client,
         ui_log=ui_log,
         ui_progress=ui_progress
-    )
-
-
-def QA_SU_save_option_50etf_min(client=DATABASE, ui_log=None, ui_progress=None):
-    '''
-    :param client:
-    :return:
-    '''
-    option_contract_list = QA_fetch_get_option_50etf_contract_time_to_market()
-    coll_option_min = client.option_day_min
-    coll_option_min.create_index(
-        [("code",
-          pymongo.ASCENDING),
-         ("date_stamp",
-          pymongo.ASCENDING)]
-    )
-    err = []
-
-    # 索引 code
-
-    err = []
-
-    def __saving_work(code, coll):
-
-        QA_util_log_info(
-            '##JOB13 Now Saving Option 50ETF MIN ==== {}'.format(str(code)),
-            ui_log=ui_log
-        )
-        try:
-
-            for type in ['1min', '5min', '15min', '30min', '60min']:
-                ref_ = coll.find({'code': str(code)[0:8], 'type': type})
-
-                end_time = str(now_time())[0:19]
-                if ref_.count() > 0:
-                    start_time = ref_[ref_.count() - 1]['datetime']
-
-                    QA_util_log_info(
-                        '##JOB13.{} Now Saving Option 50ETF {} from {} to {} =={} '
-                            .format(
-                            ['1min',
-                             '5min',
-                             '15min',
-                             '30min',
-                             '60min'].index(type),
-                            str(code),
-                            start_time,
-                            end_time,
-                            type
-                        ),
-                        ui_log=ui_log
-                    )
-
-                    if start_time != end_time:
-                        __data = QA_fetch_get_future_min(
-                            str(code),
-                            start_time,
-                            end_time,
-                            type
-                        )
-                        if len(__data) > 1:
-                            QA_util_log_info(
-                                " 写入 新增历史合约记录数 {} ".format(len(__data))
-                            )
-                            coll.insert_many(
-                                QA_util_to_json_from_pandas(__data[1::])
-                            )
-                else:
-                    start_time = '2015-01-01'
-
-                    QA_util_log_info(
-                        '##JOB13.{} Now Option 50ETF {} from {} to {} =={} '
-                            .format(
-                            ['1min',
-                             '5min',
-                             '15min',
-                             '30min',
-                             '60min'].index(type),
-                            str(code),
-                            start_time,
-                            end_time,
-                            type
-                        ),
-                        ui_log=ui_log
-                    )
-
-                    if start_time != end_time:
-                        __data = QA_fetch_get_future_min(
-                            str(code),
-                            start_time,
-                            end_time,
-                            type
-                        )
-                        if len(__data) > 1:
-                            QA_util_log_info(
-                                " 写入 新增合约记录数 {} ".format(len(__data))
-                            )
-                            coll.insert_many(
-                                QA_util_to_json_from_pandas(__data)
-                            )
-        except:
-            err.append(code)
-
-    executor = ThreadPoolExecutor(max_workers=4)
-
-    res = {
-        executor.submit(
-            __saving_work,
-            option_contract_list[i_]["code"],
-            coll_option_min
-        )
-        for i_ in range(len(option_contract_list))
-    }  # multi index ./.
-    count = 0
-    for i_ in concurrent.futures.as_completed(res):
-        QA_util_log_info(
-            'The {} of Total {}'.format(count,
-                                        len(option_contract_list)),
-            ui_log=ui_log
-        )
-        strLogProgress = 'DOWNLOAD PROGRESS {} '.format(
-            str(float(count / len(option_contract_list) * 100))[0:4] + '%'
-        )
-        intLogProgress = int(float(count / len(option_contract_list) * 10000.0))
-
-        QA_util_log_info(
-            strLogProgress,
-            ui_log=ui_log,
-            ui_progress=ui_progress,
-            ui_progress_int_value=intLogProgress
-        )
-        count = count + 1
-    if len(err) < 1:
-        QA_util_log_info('SUCCESS', ui_log=ui_log)
-    else:
-        QA_util_log_info(' ERROR CODE \n ', ui_log=ui_log)
-        QA_util_log_info(err, ui_log=ui_log)
-
-
-def QA_SU_save_option_50etf_day(client=DATABASE, ui_log=None, ui_progress=None):
-    '''
-    :param client:
-    :return:
-    '''
-    option_contract_list = QA_fetch_get_option_50etf_contract_time_to_market()
-    coll_option_day = client.option_day
-    coll_option_day.create_index(
-        [("code",
-          pymongo.ASCENDING),
-         ("date_stamp",
-          pymongo.ASCENDING)]
-    )
-    err = []
-
-    # 索引 code
-
-    def __saving_work(code, coll_option_day):
-        try:
-            QA_util_log_info(
-                '##JOB12 Now Saving OPTION_DAY==== {}'.format(str(code)),
-                ui_log=ui_log
-            )
-
-            # 首选查找数据库 是否 有 这个代码的数据
-            # 期权代码 从 10000001 开始编码  10001228
-            ref = coll_option_day.find({'code': str(code)[0:8]})
-            end_date = str(now_time())[0:10]
-
-            # 当前数据库已经包含了这个代码的数据， 继续增量更新
-            # 加入这个判断的原因是因为如果是刚上市的 数据库会没有数据 所以会有负索引问题出现
-            if ref.count() > 0:
-
-                # 接着上次获取的日期继续更新
-                start_date = ref[ref.count() - 1]['date']
-                QA_util_log_info(
-                    ' 上次获取期权日线数据的最后日期是 {}'.format(start_date),
-                    ui_log=ui_log
-                )
-
-                QA_util_log_info(
-                    'UPDATE_OPTION_DAY \n 从上一次下载数据开始继续 Trying update {} from {} to {}'
-                        .format(code,
-                                start_date,
-                                end_date),
-                    ui_log=ui_log
-                )
-                if start_date != end_date:
-
-                    start_date0 = QA_util_get_next_day(start_date)
-                    df0 = QA_fetch_get_option_day(
-                        code=code,
-                        start_date=start_date0,
-                        end_date=end_date,
-                        frequence='day',
-                        ip=None,
-                        port=None
-                    )
-                    retCount = df0.iloc[:, 0].size
-                    QA_util_log_info(
-                        "日期从开始{}-结束{} , 合约代码{} , 返回了{}条记录 , 准备写入数据库".format(
-                            start_date0,
-                            end_date,
-                            code,
-                            retCount
-                        ),
-                        ui_log=ui_log
-                    )
-                    coll_option_day.insert_many(
-                        QA_util_to_json_from_pandas(df0)
-                    )
-                else:
-                    QA_util_log_info(
-                        "^已经获取过这天的数据了^ {}".format(start_date),
-                        ui_log=ui_log
-                    )
-
-            else:
-                start_date = '1990-01-01'
-                QA_util_log_info(
-                    'UPDATE_OPTION_DAY \n 从新开始下载数据 Trying update {} from {} to {}'
-                        .format(code,
-                                start_date,
-                                end_date),
-                    ui_log=ui_log
-                )
-                if start_date != end_date:
-
-                    df0 = QA_fetch_get_option_day(
-                        code=code,
-                        start_date=start_date,
-                        end_date=end_date,
-                        frequence='day',
-                        ip=None,
-                        port=None
-                    )
-                    retCount = df0.iloc[:, 0].size
-                    QA_util_log_info(
-                        "日期从开始{}-结束{} , 合约代码{} , 获取了{}条记录 , 准备写入数据库^_^ ".format(
-                            start_date,
-                            end_date,
-                            code,
-                            retCount
-                        ),
-                        ui_log=ui_log
-                    )
-
-                    coll_option_day.insert_many(
-                        QA_util_to_json_from_pandas(df0)
-                    )
-                else:
-                    QA_util_log_info(
-                        "*已经获取过这天的数据了* {}".format(start_date),
-                        ui_log=ui_log
-                    )
-
-        except Exception as error0:
-            print(error0)
-            err.append(str(code))
-
-    for item in range(len(option_contract_list)):
-        QA_util_log_info(
-            'The {} of Total {}'.format(item,
-                                        len(option_contract_list)),
-            ui_log=ui_log
-        )
+    )
 
-        strLogProgress = 'DOWNLOAD PROGRESS {} '.format(
-            str(float(item / len(option_contract_list) * 100))[0:4] + '%'
-        )
-        intLogProgress = int(float(item / len(option_contract_list) * 10000.0))
-        QA_util_log_info(
-            strLogProgress,
-            ui_log=ui_log,
-            ui_progress=ui_progress,
-            ui_progress_int_value=intLogProgress
-        )
 
-        __saving_work(option_contract_list[item].code, coll_option_day)
+def QA_SU_save_option_50etf_min(client=DATABASE, ui_log=None, ui_progress=None):
+    '''
+    :param client:
+    :return:
+    '''
+    option_contract_list = QA_fetch_get_option_50etf_contract_time_to_market()
+    coll_option_min = client.option_day_min
+    coll_option_min.create_index(
+        [("code",
+          pymongo.ASCENDING),
+         ("date_stamp",
+          pymongo.ASCENDING)]
+    )
+    QA_SaveEngine(
+        'option_50etf_min',
+        coll_option_min,
+        QA_fetch_get_future_min,
+        frequence=['1min', '5min', '15min', '30min', '60min'],
+        start='2015-01-01',
+        code_length=8,
+        job='JOB13',
+        ui_log=ui_log,
+        ui_progress=ui_progress
+    ).run([item['code'] for item in option_contract_list])
+
 
-    if len(err) < 1:
-        QA_util_log_info('SUCCESS save option day ^_^ ', ui_log=ui_log)
-    else:
-        QA_util_log_info(' ERROR CODE \n ', ui_log=ui_log)
-        QA_util_log_info(err, ui_log=ui_log)
+def QA_SU_save_option_50etf_day(client=DATABASE, ui_log=None, ui_progress=None):
+    '''
+    :param client:
+    :return:
+    '''
+    option_contract_list = QA_fetch_get_option_50etf_contract_time_to_market()
+    coll_option_day = client.option_day
+    coll_option_day.create_index(
+        [("code",
+          pymongo.ASCENDING),
+         ("date_stamp",
+          pymongo.ASCENDING)]
+    )
+    QA_SaveEngine(
+        'option_50etf_day',
+        coll_option_day,
+        QA_fetch_get_option_day,
+        frequence='day',
+        code_length=8,
+        job='JOB12',
+        ui_log=ui_log,
+        ui_progress=ui_progress
+    ).run([item['code'] for item in option_contract_list])
 
 
 def QA_SU_save_option_contract_list(
@@ -4513,138 +1725,16 @@ def QA_SU_save_option_day_all(client=DATABASE,ui_log=None,ui_progress=None):
          ("date_stamp",
           pymongo.ASCENDING)]
     )
-    err = []
-
-    # 索引 code
-
-    def __saving_work(code, coll_option_day):
-        try:
-            QA_util_log_info(
-                '##JOB12 Now Saving OPTION_DAY ALL ==== {}'.format(str(code)),
-                ui_log=ui_log
-            )
-
-            # 首选查找数据库 是否 有 这个代码的数据
-            # 期权代码 从 10000001 开始编码  10001228
-            ref = coll_option_day.find({'code': str(code)[0:8]})
-            end_date = str(now_time())[0:10]
-
-            # 当前数据库已经包含了这个代码的数据， 继续增量更新
-            # 加入这个判断的原因是因为如果是刚上市的 数据库会没有数据 所以会有负索引问题出现
-            if ref.count() > 0:
-
-                # 接着上次获取的日期继续更新
-                start_date = ref[ref.count() - 1]['date']
-                QA_util_log_info(
-                    ' 上次获取期权日线数据的最后日期是 {}'.format(start_date),
-                    ui_log=ui_log
-                )
-
-                QA_util_log_info(
-                    'UPDATE_OPTION_DAY \n 从上一次下载数据开始继续 Trying update {} from {} to {}'
-                        .format(code,
-                                start_date,
-                                end_date),
-                    ui_log=ui_log
-                )
-                if start_date != end_date:
-
-                    start_date0 = QA_util_get_next_day(start_date)
-                    df0 = QA_fetch_get_option_day(
-                        code=code,
-                        start_date=start_date0,
-                        end_date=end_date,
-                        frequence='day',
-                        ip=None,
-                        port=None
-                    )
-                    retCount = df0.iloc[:, 0].size
-                    QA_util_log_info(
-                        "日期从开始{}-结束{} , 合约代码{} , 返回了{}条记录 , 准备写入数据库".format(
-                            start_date0,
-                            end_date,
-                            code,
-                            retCount
-                        ),
-                        ui_log=ui_log
-                    )
-                    coll_option_day.insert_many(
-                        QA_util_to_json_from_pandas(df0)
-                    )
-                else:
-                    QA_util_log_info(
-                        "^已经获取过这天的数据了^ {}".format(start_date),
-                        ui_log=ui_log
-                    )
-
-            else:
-                start_date = '1990-01-01'
-                QA_util_log_info(
-                    'UPDATE_OPTION_DAY \n 从新开始下载数据 Trying update {} from {} to {}'
-                        .format(code,
-                                start_date,
-                                end_date),
-                    ui_log=ui_log
-                )
-                if start_date != end_date:
-
-                    df0 = QA_fetch_get_option_day(
-                        code=code,
-                        start_date=start_date,
-                        end_date=end_date,
-                        frequence='day',
-                        ip=None,
-                        port=None
-                    )
-                    retCount = df0.iloc[:, 0].size
-                    QA_util_log_info(
-                        "日期从开始{}-结束{} , 合约代码{} , 获取了{}条记录 , 准备写入数据库^_^ ".format(
-                            start_date,
-                            end_date,
-                            code,
-                            retCount
-                        ),
-                        ui_log=ui_log
-                    )
-
-                    coll_option_day.insert_many(
-                        QA_util_to_json_from_pandas(df0)
-                    )
-                else:
-                    QA_util_log_info(
-                        "*已经获取过这天的数据了* {}".format(start_date),
-                        ui_log=ui_log
-                    )
-
-        except Exception as error0:
-            print(error0)
-            err.append(str(code))
-
-    for item in range(len(option_contract_list)):
-        QA_util_log_info(
-            'The {} of Total {}'.format(item,
-                                        len(option_contract_list)),
-            ui_log=ui_log
-        )
-
-        strLogProgress = 'DOWNLOAD PROGRESS {} '.format(
-            str(float(item / len(option_contract_list) * 100))[0:4] + '%'
-        )
-        intLogProgress = int(float(item / len(option_contract_list) * 10000.0))
-        QA_util_log_info(
-            strLogProgress,
-            ui_log=ui_log,
-            ui_progress=ui_progress,
-            ui_progress_int_value=intLogProgress
-        )
-
-        __saving_work(option_contract_list[item].code, coll_option_day)
-
-    if len(err) < 1:
-        QA_util_log_info('SUCCESS save option day all contract ^_^ ', ui_log=ui_log)
-    else:
-        QA_util_log_info(' ERROR CODE \n ', ui_log=ui_log)
-        QA_util_log_info(err, ui_log=ui_log)
+    QA_SaveEngine(
+        'option_day_all',
+        coll_option_day,
+        QA_fetch_get_option_day,
+        frequence='day',
+        code_length=8,
+        job='JOB12',
+        ui_log=ui_log,
+        ui_progress=ui_progress
+    ).run([item['code'] for item in option_contract_list])
 
 
 
@@ -4664,130 +1754,18 @@ def QA_SU_save_option_min_all(client=DATABASE, ui_log=None, ui_progress=None):
          ("date_stamp",
           pymongo.ASCENDING)]
     )
-    err = []
-
-    # 索引 code
-
-    err = []
-
-    def __saving_work(code, coll):
-
-        QA_util_log_info(
-            '##JOB15 Now Saving Option ALL MIN ==== {}'.format(str(code)),
-            ui_log=ui_log
-        )
-        try:
-
-            for type in ['1min', '5min', '15min', '30min', '60min']:
-                ref_ = coll.find({'code': str(code)[0:8], 'type': type})
-
-                end_time = str(now_time())[0:19]
-                if ref_.count() > 0:
-                    start_time = ref_[ref_.count() - 1]['datetime']
-
-                    QA_util_log_info(
-                        '##JOB99.{} Now Saving Option ALL MIN {} from {} to {} =={} '
-                            .format(
-                            ['1min',
-                             '5min',
-                             '15min',
-                             '30min',
-                             '60min'].index(type),
-                            str(code),
-                            start_time,
-                            end_time,
-                            type
-                        ),
-                        ui_log=ui_log
-                    )
-
-                    if start_time != end_time:
-                        __data = QA_fetch_get_future_min(
-                            str(code),
-                            start_time,
-                            end_time,
-                            type
-                        )
-                        if len(__data) > 1:
-                            QA_util_log_info(
-                                " 写入 新增历史合约记录数 {} ".format(len(__data))
-                            )
-                            coll.insert_many(
-                                QA_util_to_json_from_pandas(__data[1::])
-                            )
-                else:
-                    start_time = '2015-01-01'
-
-                    QA_util_log_info(
-                        '##JOB15.{} Now Option ALL MIN {} from {} to {} =={} '
-                            .format(
-                            ['1min',
-                             '5min',
-                             '15min',
-                             '30min',
-                             '60min'].index(type),
-                            str(code),
-                            start_time,
-                            end_time,
-                            type
-                        ),
-                        ui_log=ui_log
-                    )
-
-                    if start_time != end_time:
-                        __data = QA_fetch_get_future_min(
-                            str(code),
-                            start_time,
-                            end_time,
-                            type
-                        )
-                        if len(__data) > 1:
-                            QA_util_log_info(
-                                " 写入 新增合约记录数 {} ".format(len(__data))
-                            )
-                            coll.insert_many(
-                                QA_util_to_json_from_pandas(__data)
-                            )
-        except:
-            err.append(code)
-
-    executor = ThreadPoolExecutor(max_workers=4)
-
-    res = {
-        executor.submit(
-            __saving_work,
-            option_contract_list[i_]["code"],
-            coll_option_min
-        )
-        for i_ in range(len(option_contract_list))
-    }  # multi index ./.
-    count = 0
-    for i_ in concurrent.futures.as_completed(res):
-        QA_util_log_info(
-            'The {} of Total {}'.format(count,
-                                        len(option_contract_list)),
-            ui_log=ui_log
-        )
-        strLogProgress = 'DOWNLOAD PROGRESS {} '.format(
-            str(float(count / len(option_contract_list) * 100))[0:4] + '%'
-        )
-        intLogProgress = int(float(count / len(option_contract_list) * 10000.0))
-
-        QA_util_log_info(
-            strLogProgress,
-            ui_log=ui_log,
-            ui_progress=ui_progress,
-            ui_progress_int_value=intLogProgress
-        )
-        count = count + 1
-    if len(err) < 1:
-        QA_util_log_info('SUCCESS', ui_log=ui_log)
-    else:
-        QA_util_log_info(' ERROR CODE \n ', ui_log=ui_log)
-        QA_util_log_info(err, ui_log=ui_log)
-
+    QA_SaveEngine(
+        'option_min_all',
+        coll_option_min,
+        QA_fetch_get_future_min,
+        frequence=['1min', '5min', '15min', '30min', '60min'],
+        start='2015-01-01',
+        code_length=8,
+        job='JOB15',
+        ui_log=ui_log,
+        ui_progress=ui_progress
+    ).run([item['code'] for item in option_contract_list])
 
-#######################################################################################
 
 def QA_SU_save_future_list(client=DATABASE, ui_log=None, ui_progress=None):
     future_list = QA_fetch_get_future_list()
@@ -4838,90 +1816,17 @@ def QA_SU_save_future_day(client=DATABASE, ui_log=None, ui_progress=None):
          ("date_stamp",
           pymongo.ASCENDING)]
     )
-    err = []
-
-    def __saving_work(code, coll_future_day):
-        try:
-            QA_util_log_info(
-                '##JOB12 Now Saving Future_DAY==== {}'.format(str(code)),
-                ui_log
-            )
-
-            # 首选查找数据库 是否 有 这个代码的数据
-            ref = coll_future_day.find({'code': str(code)[0:4]})
-            end_date = str(now_time())[0:10]
-
-            # 当前数据库已经包含了这个代码的数据， 继续增量更新
-            # 加入这个判断的原因是因为如果股票是刚上市的 数据库会没有数据 所以会有负索引问题出现
-            if ref.count() > 0:
-
-                # 接着上次获取的日期继续更新
-                start_date = ref[ref.count() - 1]['date']
-
-                QA_util_log_info(
-                    'UPDATE_Future_DAY \n Trying updating {} from {} to {}'
-                        .format(code,
-                                start_date,
-                                end_date),
-                    ui_log
-                )
-                if start_date != end_date:
-                    coll_future_day.insert_many(
-                        QA_util_to_json_from_pandas(
-                            QA_fetch_get_future_day(
-                                str(code),
-                                QA_util_get_next_day(start_date),
-                                end_date
-                            )
-                        )
-                    )
-
-            # 当前数据库中没有这个代码的股票数据， 从1990-01-01 开始下载所有的数据
-            else:
-                start_date = '2001-01-01'
-                QA_util_log_info(
-                    'UPDATE_Future_DAY \n Trying updating {} from {} to {}'
-                        .format(code,
-                                start_date,
-                                end_date),
-                    ui_log
-                )
-                if start_date != end_date:
-                    coll_future_day.insert_many(
-                        QA_util_to_json_from_pandas(
-                            QA_fetch_get_future_day(
-                                str(code),
-                                start_date,
-                                end_date
-                            )
-                        )
-                    )
-        except Exception as error0:
-            print(error0)
-            err.append(str(code))
-
-    for item in range(len(future_list)):
-        QA_util_log_info('The {} of Total {}'.format(item, len(future_list)))
-
-        strProgressToLog = 'DOWNLOAD PROGRESS {} {}'.format(
-            str(float(item / len(future_list) * 100))[0:4] + '%',
-            ui_log
-        )
-        intProgressToLog = int(float(item / len(future_list) * 100))
-        QA_util_log_info(
-            strProgressToLog,
-            ui_log=ui_log,
-            ui_progress=ui_progress,
-            ui_progress_int_value=intProgressToLog
-        )
-
-        __saving_work(future_list[item], coll_future_day)
-
-    if len(err) < 1:
-        QA_util_log_info('SUCCESS save future day ^_^', ui_log)
-    else:
-        QA_util_log_info(' ERROR CODE \n ', ui_log)
-        QA_util_log_info(err, ui_log)
+    QA_SaveEngine(
+        'future_day',
+        coll_future_day,
+        QA_fetch_get_future_day,
+        frequence='day',
+        start='2001-01-01',
+        code_length=4,
+        job='JOB12',
+        ui_log=ui_log,
+        ui_progress=ui_progress
+    ).run(future_list)
 
 
 def QA_SU_save_future_day_all(client=DATABASE, ui_log=None, ui_progress=None):
@@ -4942,97 +1847,24 @@ def QA_SU_save_future_day_all(client=DATABASE, ui_log=None, ui_progress=None):
          ("date_stamp",
           pymongo.ASCENDING)]
     )
-    err = []
-
-    def __saving_work(code, coll_future_day):
-        try:
-            QA_util_log_info(
-                '##JOB12 Now Saving Future_DAY==== {}'.format(str(code)),
-                ui_log
-            )
-
-            # 首选查找数据库 是否 有 这个代码的数据
-            ref = coll_future_day.find({'code': str(code)[0:6]})
-            end_date = str(now_time())[0:10]
-
-            # 当前数据库已经包含了这个代码的数据， 继续增量更新
-            # 加入这个判断的原因是因为如果股票是刚上市的 数据库会没有数据 所以会有负索引问题出现
-            if ref.count() > 0:
-
-                # 接着上次获取的日期继续更新
-                start_date = ref[ref.count() - 1]['date']
-
-                QA_util_log_info(
-                    'UPDATE_Future_DAY \n Trying updating {} from {} to {}'
-                        .format(code,
-                                start_date,
-                                end_date),
-                    ui_log
-                )
-                if start_date != end_date:
-                    coll_future_day.insert_many(
-                        QA_util_to_json_from_pandas(
-                            QA_fetch_get_future_day(
-                                str(code),
-                                QA_util_get_next_day(start_date),
-                                end_date
-                            )
-                        )
-                    )
-
-            # 当前数据库中没有这个代码的股票数据， 从1990-01-01 开始下载所有的数据
-            else:
-                start_date = '2001-01-01'
-                QA_util_log_info(
-                    'UPDATE_Future_DAY \n Trying updating {} from {} to {}'
-                        .format(code,
-                                start_date,
-                                end_date),
-                    ui_log
-                )
-                if start_date != end_date:
-                    coll_future_day.insert_many(
-                        QA_util_to_json_from_pandas(
-                            QA_fetch_get_future_day(
-                                str(code),
-                                start_date,
-                                end_date
-                            )
-                        )
-                    )
-        except Exception as error0:
-            print(error0)
-            err.append(str(code))
-
-    for item in range(len(future_list)):
-        QA_util_log_info('The {} of Total {}'.format(item, len(future_list)))
-
-        strProgressToLog = 'DOWNLOAD PROGRESS {} {}'.format(
-            str(float(item / len(future_list) * 100))[0:4] + '%',
-            ui_log
-        )
-        intProgressToLog = int(float(item / len(future_list) * 100))
-        QA_util_log_info(
-            strProgressToLog,
-            ui_log=ui_log,
-            ui_progress=ui_progress,
-            ui_progress_int_value=intProgressToLog
-        )
-
-        __saving_work(future_list[item], coll_future_day)
-
-    if len(err) < 1:
-        QA_util_log_info('SUCCESS save future day ^_^', ui_log)
-    else:
-        QA_util_log_info(' ERROR CODE \n ', ui_log)
-        QA_util_log_info(err, ui_log)
+    QA_SaveEngine(
+        'future_day_all',
+        coll_future_day,
+        QA_fetch_get_future_day,
+        frequence='day',
+        start='2001-01-01',
+        job='JOB12',
+        ui_log=ui_log,
+        ui_progress=ui_progress
+    ).run(future_list)
 
 
-def QA_SU_save_future_min(client=DATABASE, ui_log=None, ui_progress=None):
+def QA_SU_save_future_min(client=DATABASE, ui_log=None, ui_progress=None, derive=False):
     """save future_min
 
     Keyword Arguments:
         client {[type]} -- [description] (default: {DATABASE})
+        derive {bool} -- 只下载 1min, 其他周期由 1min 合成 (default: {False})
     """
 
     future_list = [
@@ -5051,114 +1883,20 @@ def QA_SU_save_future_min(client=DATABASE, ui_log=None, ui_progress=None):
              pymongo.ASCENDING)
         ]
     )
-    err = []
-
-    def __saving_work(code, coll):
-
-        QA_util_log_info(
-            '##JOB13 Now Saving Future_MIN ==== {}'.format(str(code)),
-            ui_log=ui_log
-        )
-        try:
-
-            for type in ['1min', '5min', '15min', '30min', '60min']:
-                ref_ = coll.find({'code': str(code)[0:6], 'type': type})
-                end_time = str(now_time())[0:19]
-                if ref_.count() > 0:
-                    start_time = ref_[ref_.count() - 1]['datetime']
-
-                    QA_util_log_info(
-                        '##JOB13.{} Now Saving Future {} from {} to {} =={} '
-                            .format(
-                            ['1min',
-                             '5min',
-                             '15min',
-                             '30min',
-                             '60min'].index(type),
-                            str(code),
-                            start_time,
-                            end_time,
-                            type
-                        ),
-                        ui_log=ui_log
-                    )
-
-                    if start_time != end_time:
-                        __data = QA_fetch_get_future_min(
-                            str(code),
-                            start_time,
-                            end_time,
-                            type
-                        )
-                        if len(__data) > 1:
-                            coll.insert_many(
-                                QA_util_to_json_from_pandas(__data[1::])
-                            )
-                else:
-                    start_time = '2015-01-01'
-
-                    QA_util_log_info(
-                        '##JOB13.{} Now Saving Future {} from {} to {} =={} '
-                            .format(
-                            ['1min',
-                             '5min',
-                             '15min',
-                             '30min',
-                             '60min'].index(type),
-                            str(code),
-                            start_time,
-                            end_time,
-                            type
-                        ),
-                        ui_log=ui_log
-                    )
-
-                    if start_time != end_time:
-                        __data = QA_fetch_get_future_min(
-                            str(code),
-                            start_time,
-                            end_time,
-                            type
-                        )
-                        if len(__data) > 1:
-                            coll.insert_many(
-                                QA_util_to_json_from_pandas(__data)
-                            )
-        except:
-            err.append(code)
-
-    executor = ThreadPoolExecutor(max_workers=4)
-
-    res = {
-        executor.submit(__saving_work,
-                        future_list[i_],
-                        coll)
-        for i_ in range(len(future_list))
-    }  # multi index ./.
-    count = 0
-    for i_ in concurrent.futures.as_completed(res):
-        QA_util_log_info(
-            'The {} of Total {}'.format(count,
-                                        len(future_list)),
-            ui_log=ui_log
-        )
-        strLogProgress = 'DOWNLOAD PROGRESS {} '.format(
-            str(float(count / len(future_list) * 100))[0:4] + '%'
-        )
-        intLogProgress = int(float(count / len(future_list) * 10000.0))
-
-        QA_util_log_info(
-            strLogProgress,
-            ui_log=ui_log,
-            ui_progress=ui_progress,
-            ui_progress_int_value=intLogProgress
-        )
-        count = count + 1
-    if len(err) < 1:
-        QA_util_log_info('SUCCESS', ui_log=ui_log)
-    else:
-        QA_util_log_info(' ERROR CODE \n ', ui_log=ui_log)
-        QA_util_log_info(err, ui_log=ui_log)
+    if derive:
+        return _QA_SU_save_min_derived(
+            future_list, coll, QA_fetch_get_future_min, 'future', 'JOB13',
+            ui_log, ui_progress)
+    QA_SaveEngine(
+        'future_min',
+        coll,
+        QA_fetch_get_future_min,
+        frequence=['1min', '5min', '15min', '30min', '60min'],
+        start='2015-01-01',
+        job='JOB13',
+        ui_log=ui_log,
+        ui_progress=ui_progress
+    ).run(future_list)
 
 
 def QA_SU_save_future_min_all(client=DATABASE, ui_log=None, ui_progress=None):
@@ -5180,127 +1918,14 @@ def QA_SU_save_future_min_all(client=DATABASE, ui_log=None, ui_progress=None):
              pymongo.ASCENDING)
         ]
     )
-    err = []
-
-    def __saving_work(code, coll):
-
-        QA_util_log_info(
-            '##JOB13 Now Saving Future_MIN ==== {}'.format(str(code)),
-            ui_log=ui_log
-        )
-        try:
-
-            for type in ['1min', '5min', '15min', '30min', '60min']:
-                ref_ = coll.find({'code': str(code)[0:6], 'type': type})
-                end_time = str(now_time())[0:19]
-                if ref_.count() > 0:
-                    start_time = ref_[ref_.count() - 1]['datetime']
-
-                    QA_util_log_info(
-                        '##JOB13.{} Now Saving Future {} from {} to {} =={} '
-                            .format(
-                            ['1min',
-                             '5min',
-                             '15min',
-                             '30min',
-                             '60min'].index(type),
-                            str(code),
-                            start_time,
-                            end_time,
-                            type
-                        ),
-                        ui_log=ui_log
-                    )
-
-                    if start_time != end_time:
-                        __data = QA_fetch_get_future_min(
-                            str(code),
-                            start_time,
-                            end_time,
-                            type
-                        )
-                        if len(__data) > 1:
-                            coll.insert_many(
-                                QA_util_to_json_from_pandas(__data[1::])
-                            )
-                else:
-                    start_time = '2015-01-01'
-
-                    QA_util_log_info(
-                        '##JOB13.{} Now Saving Future {} from {} to {} =={} '
-                            .format(
-                            ['1min',
-                             '5min',
-                             '15min',
-                             '30min',
-                             '60min'].index(type),
-                            str(code),
-                            start_time,
-                            end_time,
-                            type
-                        ),
-                        ui_log=ui_log
-                    )
-
-                    if start_time != end_time:
-                        __data = QA_fetch_get_future_min(
-                            str(code),
-                            start_time,
-                            end_time,
-                            type
-                        )
-                        if len(__data) > 1:
-                            coll.insert_many(
-                                QA_util_to_json_from_pandas(__data)
-                            )
-        except:
-            err.append(code)
-
-    executor = ThreadPoolExecutor(max_workers=4)
-
-    res = {
-        executor.submit(__saving_work,
-                        future_list[i_],
-                        coll)
-        for i_ in range(len(future_list))
-    }  # multi index ./.
-    count = 0
-    for i_ in concurrent.futures.as_completed(res):
-        QA_util_log_info(
-            'The {} of Total {}'.format(count,
-                                        len(future_list)),
-            ui_log=ui_log
-        )
-        strLogProgress = 'DOWNLOAD PROGRESS {} '.format(
-            str(float(count / len(future_list) * 100))[0:4] + '%'
-        )
-        intLogProgress = int(float(count / len(future_list) * 10000.0))
-
-        QA_util_log_info(
-            strLogProgress,
-            ui_log=ui_log,
-            ui_progress=ui_progress,
-            ui_progress_int_value=intLogProgress
-        )
-        count = count + 1
-    if len(err) < 1:
-        QA_util_log_info('SUCCESS', ui_log=ui_log)
-    else:
-        QA_util_log_info(' ERROR CODE \n ', ui_log=ui_log)
-        QA_util_log_info(err, ui_log=ui_log)
-
-
-if __name__ == '__main__':
-    # QA_SU_save_stock_day()
-    # QA_SU_save_stock_xdxr()
-    # QA_SU_save_stock_min()
-    # QA_SU_save_stock_transaction()
-    # QA_SU_save_index_day()
-    # QA_SU_save_stock_list()
-    # QA_SU_save_index_min()
-    # QA_SU_save_index_list()
-    # QA_SU_save_future_list()
-
-    QA_SU_save_future_day()
+    QA_SaveEngine(
+        'future_min_all',
+        coll,
+        QA_fetch_get_future_min,
+        frequence=['1min', '5min', '15min', '30min', '60min'],
+        start='2015-01-01',
+        job='JOB13',
+        ui_log=ui_log,
+        ui_progress=ui_progress
+    ).run(future_list)
 
-    QA_SU_save_future_min()
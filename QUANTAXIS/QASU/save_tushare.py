@@ -40,6 +40,7 @@ from QUANTAXIS.QAFetch.QATushare import (
 from QUANTAXIS.QAUtil import (
     QA_util_date_stamp,
     QA_util_log_info,
+    QA_util_sql_mongo_last,
     QA_util_time_stamp,
     QA_util_to_json_from_pandas,
     trade_date_sse,
@@ -307,16 +308,16 @@ def _saving_work(code, coll_stock_day, ui_log=None, err=[]):
         )
 
         # 首选查找数据库 是否 有 这个代码的数据
-        ref = coll_stock_day.find({'code': str(code)[0:9]})
+        ref = QA_util_sql_mongo_last(coll_stock_day, {'code': str(code)[0:9]}, 'date_stamp')
         end_date = now_time()
 
         # 当前数据库已经包含了这个代码的数据， 继续增量更新
         # 加入这个判断的原因是因为如果股票是刚上市的 数据库会没有数据 所以会有负索引问题出现
-        if ref.count() > 0:
+        if ref is not None:
 
             # 接着上次获取的日期继续更新
-            start_date_new_format = ref[ref.count() - 1]['trade_date']
-            start_date = ref[ref.count() - 1]['date']
+            start_date_new_format = ref['trade_date']
+            start_date = ref['date']
 
             QA_util_log_info(
                 'UPDATE_STOCK_DAY \n Trying updating {} from {} to {}'
@@ -0,0 +1,255 @@
+# coding:utf-8
+#
+# The MIT License (MIT)
+#
+# Copyright (c) 2016-2019 yutiansut/QUANTAXIS
+#
+# Permission is hereby granted, free of charge, to any person obtaining a copy
+# of this software and associated documentation files (the "Software"), to deal
+# in the Software without restriction, including without limitation the rights
+# to use, copy, modify, merge, publish, distribute, sublicense, and/or sell
+# copies of the Software, and to permit persons to whom the Software is
+# furnished to do so, subject to the following conditions:
+#
+# The above copyright notice and this permission notice shall be included in all
+# copies or substantial portions of the Software.
+#
+# THE SOFTWARE IS PROVIDED "AS IS", WITHOUT WARRANTY OF ANY KIND, EXPRESS OR
+# IMPLIED, INCLUDING BUT NOT LIMITED TO THE WARRANTIES OF MERCHANTABILITY,
+# FITNESS FOR A PARTICULAR PURPOSE AND NONINFRINGEMENT. IN NO EVENT SHALL THE
+# AUTHORS OR COPYRIGHT HOLDERS BE LIABLE FOR ANY CLAIM, DAMAGES OR OTHER
+# LIABILITY, WHETHER IN AN ACTION OF CONTRACT, TORT OR OTHERWISE, ARISING FROM,
+# OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
+# SOFTWARE.
+
+"""
+QASU 的批量写入
+
+多个代码/线程的数据先放进同一个缓冲区, 攒够 batch_size 条后用一次无序的 bulk_write 写入:
+
+    upsert=True   每条记录按 keys 匹配 ReplaceOne(upsert=True), 重复保存不会产生重复记录,
+                  增量更新时和库里最后一条重叠的那一行直接覆盖, 不需要再切掉第一行
+    upsert=False  InsertOne, 和原来的 insert_many 一样
+
+缓冲区里 keys 相同的记录只保留最后一条
+
+写入出错 (唯一索引冲突以外的 writeErrors, 或者连接断开之类的 PyMongoError) 只记日志不抛出,
+出错的记录所属的代码记在 failed 里, 调用的一方用 take_failed() 取走, 决定要不要记进度
+
+upsert 靠 keys 上的索引定位, 没有索引时每一条都要扫全表; 索引不会自动建立, 要传 ensure_index=True
+或者调用 create_index(). 在已经有很多数据的表上建索引要扫一遍全表, 可能需要几分钟;
+库里已经有重复记录时建不了唯一索引, 改建普通索引 (这时多个进程同时写同一张表可能写入重复的记录)
+"""
+
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+import pymongo
+from pymongo import InsertOne, ReplaceOne
+from pymongo.errors import BulkWriteError, OperationFailure, PyMongoError
+
+from QUANTAXIS.QAFetch.QACache import QA_fetch_cache
+from QUANTAXIS.QAUtil import QA_util_log_info, QA_util_to_records_from_pandas
+
+# 唯一索引冲突
+_DUPLICATE_KEY = 11000
+
+
+class QA_BulkWriter():
+    """按 keys upsert 的批量写入, 线程安全
+
+    Arguments:
+        coll {pymongo.collection.Collection} -- 表
+
+    Keyword Arguments:
+        keys {tuple} -- 唯一确定一条记录的字段, 日线为 ('code', 'date') (default: {('code', 'datetime', 'type')})
+        batch_size {int} -- 攒够这么多条写一次 (default: {20000})
+        upsert {bool} -- False 时直接插入 (default: {True})
+        ensure_index {bool} -- 初始化时调用 create_index() (default: {False})
+        ui_log {[type]} -- 给GUI qt 界面使用 (default: {None})
+    """
+
+    def __init__(
+            self,
+            coll,
+            keys=('code',
+                  'datetime',
+                  'type'),
+            batch_size=20000,
+            upsert=True,
+            ensure_index=False,
+            ui_log=None
+    ):
+        self.coll = coll
+        self.keys = tuple(keys)
+        self.batch_size = batch_size
+        self.upsert = upsert
+        self.ensure_index = ensure_index
+        self.ui_log = ui_log
+        self._lock = threading.Lock()
+        self._buffer = OrderedDict() if upsert else []
+        self.written = 0
+        self.upserted = 0
+        self.modified = 0
+        self.duplicates = 0
+        self.errors = 0
+        self.batches = 0
+        self.failed = set()  # 写入出错的记录所属的代码
+        if ensure_index:
+            self.create_index()
+
+    def __repr__(self):
+        return '< QA_BulkWriter {} {} buffered >'.format(
+            getattr(self.coll,
+                    'full_name',
+                    self.coll),
+            len(self._buffer)
+        )
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def create_index(self):
+        """在 keys 上建唯一索引, 已经有重复记录时建普通索引
+
+        索引已经存在时很快返回; 大表上第一次建立需要扫一遍全表
+        """
+        index = [(key, pymongo.ASCENDING) for key in self.keys]
+        QA_util_log_info(
+            'QA_BulkWriter: create index {} on {}'.format(
+                self.keys,
+                getattr(self.coll, 'full_name', self.coll)
+            ),
+            self.ui_log
+        )
+        try:
+            self.coll.create_index(index, unique=True, background=True)
+        except OperationFailure as e:
+            # 库里已经有重复记录, 或者已经有同样字段的普通索引
+            QA_util_log_info(
+                'QA_BulkWriter: unique index on {} failed, {}'.format(self.keys, e),
+                self.ui_log
+            )
+            self.coll.create_index(index, background=True)
+
+    def write(self, data):
+        """放进缓冲区, 满了就写入
+
+        Arguments:
+            data {pd.DataFrame/list} -- DataFrame 或者 [dict], None 和空的直接忽略
+
+        Returns:
+            int -- 这次放进缓冲区的条数
+        """
+        if data is None:
+            return 0
+        docs = QA_util_to_records_from_pandas(data) if isinstance(
+            data,
+            pd.DataFrame
+        ) else list(data)
+        if len(docs) == 0:
+            return 0
+        batch = None
+        with self._lock:
+            if self.upsert:
+                keys = self.keys
+                for doc in docs:
+                    self._buffer[tuple(doc[key] for key in keys)] = doc
+            else:
+                self._buffer.extend(docs)
+            if len(self._buffer) >= self.batch_size:
+                batch = self._take()
+        if batch is not None:
+            self._write(batch)
+        return len(docs)
+
+    def _take(self):
+        batch = list(self._buffer.values()) if self.upsert else self._buffer
+        self._buffer = OrderedDict() if self.upsert else []
+        return batch
+
+    def _write(self, docs):
+        '缓冲区在锁外写入, 一个线程写库的时候其他线程可以继续往缓冲区里放'
+        if self.upsert:
+            keys = self.keys
+            requests = [
+                ReplaceOne({key: doc[key] for key in keys},
+                           doc,
+                           upsert=True) for doc in docs
+            ]
+        else:
+            requests = [InsertOne(doc) for doc in docs]
+        try:
+            res = self.coll.bulk_write(requests, ordered=False)
+            details = res.bulk_api_result
+        except BulkWriteError as e:
+            details = e.details
+        except PyMongoError as e:
+            # 整批都没有写进去
+            details = {
+                'writeErrors': [{'index': i, 'errmsg': str(e)} for i in range(len(docs))]
+            }
+        # 写入的代码在进程内缓存里的数据作废
+        QA_fetch_cache.invalidate(
+            self.coll,
+            list({doc['code'] for doc in docs if 'code' in doc})
+        )
+        errors = details.get('writeErrors', [])
+        duplicates = sum(1 for item in errors if item.get('code') == _DUPLICATE_KEY)
+        failed = {
+            str(docs[item['index']].get('code')) for item in errors
+            if item.get('code') != _DUPLICATE_KEY and 'index' in item
+        }
+        with self._lock:
+            self.failed.update(failed)
+            self.batches += 1
+            self.written += len(docs) - len(errors)
+            self.upserted += details.get('nUpserted', 0) + details.get('nInserted', 0)
+            self.modified += details.get('nModified', 0)
+            self.duplicates += duplicates
+            self.errors += len(errors) - duplicates
+        if len(errors) > duplicates:
+            QA_util_log_info(
+                'QA_BulkWriter: {} write errors, {}'.format(
+                    len(errors) - duplicates,
+                    [item.get('errmsg') for item in errors
+                     if item.get('code') != _DUPLICATE_KEY][0]
+                ),
+                self.ui_log
+            )
+
+    def take_failed(self):
+        """取走到目前为止写入出错的代码
+
+        Returns:
+            set -- 代码
+        """
+        with self._lock:
+            failed, self.failed = self.failed, set()
+        return failed
+
+    def flush(self):
+        with self._lock:
+            batch = self._take()
+        if len(batch) > 0:
+            self._write(batch)
+
+    def close(self):
+        '写入缓冲区里剩下的记录'
+        self.flush()
+
+    def stats(self):
+        with self._lock:
+            return {
+                'written': self.written,
+                'upserted': self.upserted,
+                'modified': self.modified,
+                'duplicates': self.duplicates,
+                'errors': self.errors,
+                'batches': self.batches,
+                'buffered': len(self._buffer)
+            }
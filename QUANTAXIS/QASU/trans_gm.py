@@ -14,8 +14,9 @@ import os
 import QUANTAXIS as QA
 from QUANTAXIS.QAFetch.QATdx import QA_fetch_get_stock_list
 from QUANTAXIS.QAUtil import (
-    DATABASE, QA_util_date_stamp, QA_util_get_real_date, QA_util_log_info,
-    QA_util_time_stamp, QA_util_to_json_from_pandas, trade_date_sse)
+    DATABASE, QA_util_date_stamp, QA_util_date_stamp_array,
+    QA_util_get_real_date, QA_util_log_info, QA_util_time_stamp,
+    QA_util_time_stamp_array, QA_util_to_json_from_pandas, trade_date_sse)
 
 
 def QA_SU_trans_stock_min(client=DATABASE, ui_log=None, ui_progress=None,
@@ -69,10 +70,9 @@ def QA_SU_trans_stock_min(client=DATABASE, ui_log=None, ui_progress=None,
             0, 19))
         df_local["date"] = df_local.datetime.map(str).str.slice(0, 10)
         df_local = df_local.set_index("datetime", drop=False)
-        df_local["date_stamp"] = df_local["date"].apply(
-            lambda x: QA_util_date_stamp(x))
+        df_local["date_stamp"] = QA_util_date_stamp_array(df_local["date"])
         df_local["time_stamp"] = (
-            df_local["datetime"].map(str).apply(lambda x: QA_util_time_stamp(x)))
+            QA_util_time_stamp_array(df_local["datetime"].map(str)))
         df_local["type"] = type_
 
         df_local = df_local.loc[slice(None, end_time)]
@@ -14,8 +14,9 @@ import os
 import QUANTAXIS as QA
 from QUANTAXIS.QAFetch.QATdx import QA_fetch_get_stock_list
 from QUANTAXIS.QAUtil import (
-    DATABASE, QA_util_date_stamp, QA_util_get_real_date, QA_util_log_info,
-    QA_util_time_stamp, QA_util_to_json_from_pandas, trade_date_sse)
+    DATABASE, QA_util_date_stamp, QA_util_date_stamp_array,
+    QA_util_get_real_date, QA_util_log_info, QA_util_time_stamp,
+    QA_util_time_stamp_array, QA_util_to_json_from_pandas, trade_date_sse)
 
 
 def QA_SU_trans_stock_min(client=DATABASE, ui_log=None, ui_progress=None,
@@ -68,9 +69,8 @@ def QA_SU_trans_stock_min(client=DATABASE, ui_log=None, ui_progress=None,
             "symbol", axis=1)
         df_local = df_local.assign(
             datetime=pd.to_datetime(df_local.datetime),
-            date_stamp=df_local.date.apply(lambda x: QA_util_date_stamp(x)),
-            time_stamp=df_local.datetime.apply(
-                lambda x: QA_util_time_stamp(x)),
+            date_stamp=QA_util_date_stamp_array(df_local.date),
+            time_stamp=QA_util_time_stamp_array(df_local.datetime),
             type="1min",
         ).set_index(
             "datetime", drop=False)
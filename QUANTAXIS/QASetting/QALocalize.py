@@ -10,6 +10,7 @@ import os
 4. download_path ==> 下载的数据/财务文件
 5. strategy_path ==> 存放策略模板
 6. bin_path ==> 存放一些交易的sdk/bin文件等
+7. datastore_path ==> 本地列式行情库 (QASU.save_local/QAFetch.QALocal)
 """
 
 
@@ -31,6 +32,7 @@ log_path = generate_path('log')
 download_path = generate_path('downloads')
 strategy_path = generate_path('strategy')
 bin_path = generate_path('bin')  #给一些dll文件存储用
+datastore_path = generate_path('datastore')
 
 
 make_dir(qa_path, exist_ok=True)
@@ -40,3 +42,4 @@ make_dir(download_path, exist_ok=True)
 make_dir(log_path, exist_ok=True)
 make_dir(strategy_path, exist_ok=True)
 make_dir(bin_path, exist_ok=True)
+make_dir(datastore_path, exist_ok=True)
@@ -1 +1 @@
-from QUANTAXIS.QASetting.QALocalize import qa_path, setting_path, cache_path, download_path, log_path
\ No newline at end of file
+from QUANTAXIS.QASetting.QALocalize import qa_path, setting_path, cache_path, download_path, log_path, datastore_path
\ No newline at end of file
@@ -33,6 +33,7 @@ from QUANTAXIS.QAUtil.QADate_trade import (
     QA_util_get_real_datelist,
     QA_util_get_trade_range,
     QA_util_if_trade,
+    trade_calendar,
     trade_date_sse
 )
 
@@ -131,12 +132,12 @@ def QA_util_time_gap(time, gap, methods, type_):
             [
                 pd.DataFrame(QA_util_make_min_index(day,
                                                     type_))
-                for day in trade_date_sse[trade_date_sse.index(
+                for day in trade_date_sse[trade_calendar.index(
                     str(
                         datetime.datetime.strptime(time,
                                                    '%Y-%m-%d %H:%M:%S').date()
                     )
-                ):trade_date_sse.index(
+                ):trade_calendar.index(
                     str(
                         datetime.datetime.strptime(time,
                                                    '%Y-%m-%d %H:%M:%S').date()
@@ -152,12 +153,12 @@ def QA_util_time_gap(time, gap, methods, type_):
             [
                 pd.DataFrame(QA_util_make_min_index(day,
                                                     type_))
-                for day in trade_date_sse[trade_date_sse.index(
+                for day in trade_date_sse[trade_calendar.index(
                     str(
                         datetime.datetime.strptime(time,
                                                    '%Y-%m-%d %H:%M:%S').date()
                     )
-                ):trade_date_sse.index(
+                ):trade_calendar.index(
                     str(
                         datetime.datetime.strptime(time,
                                                    '%Y-%m-%d %H:%M:%S').date()
@@ -174,12 +175,12 @@ def QA_util_time_gap(time, gap, methods, type_):
             [
                 pd.DataFrame(QA_util_make_min_index(day,
                                                     type_))
-                for day in trade_date_sse[trade_date_sse.index(
+                for day in trade_date_sse[trade_calendar.index(
                     str(
                         datetime.datetime.strptime(time,
                                                    '%Y-%m-%d %H:%M:%S').date()
                     )
-                ) - day_gap:trade_date_sse.index(
+                ) - day_gap:trade_calendar.index(
                     str(
                         datetime.datetime.strptime(time,
                                                    '%Y-%m-%d %H:%M:%S').date()
@@ -196,12 +197,12 @@ def QA_util_time_gap(time, gap, methods, type_):
             [
                 pd.DataFrame(QA_util_make_min_index(day,
                                                     type_))
-                for day in trade_date_sse[trade_date_sse.index(
+                for day in trade_date_sse[trade_calendar.index(
                     str(
                         datetime.datetime.strptime(time,
                                                    '%Y-%m-%d %H:%M:%S').date()
                     )
-                ) - day_gap:trade_date_sse.index(
+                ) - day_gap:trade_calendar.index(
                     str(
                         datetime.datetime.strptime(time,
                                                    '%Y-%m-%d %H:%M:%S').date()
@@ -26,6 +26,8 @@
 import datetime
 import threading
 import time
+
+import numpy as np
 import pandas as pd
 
 from QUANTAXIS.QAUtil.QALogs import QA_util_log_info
@@ -153,6 +155,82 @@ def QA_util_time_stamp(time_):
         return time.mktime(time.strptime(timestr, '%Y-%m-%d %H:%M:%S'))
 
 
+def _QA_util_to_datetime64(values, length=19):
+    """任意的日期/时间序列 -> datetime64[ns] 数组 (不带时区)
+
+    不是 datetime64 的先转成字符串取前 length 位, 和 str(x)[0:length] 的解析方式一致
+    """
+    values = np.asarray(values)
+    if not np.issubdtype(values.dtype, np.datetime64):
+        values = pd.to_datetime(values.ravel().astype('U{}'.format(length))).values
+    return values.astype('datetime64[ns]')
+
+
+def _QA_util_local_mktime(seconds):
+    """把 "当成 UTC 算出来的秒数" 换成 time.mktime 的本地时间秒数
+
+    和 time.mktime(time.strptime(...)) 一样按本地时区(含夏令时)解释
+    """
+    return np.array(
+        [time.mktime(time.gmtime(item)[:8] + (-1,)) for item in seconds.tolist()],
+        dtype=np.float64
+    )
+
+
+def QA_util_date_stamp_array(dates):
+    """
+    QA_util_date_stamp 的向量化版本, 只取日期部分
+    每个不同的日期只调用一次 time.mktime
+    :param dates: 字符串/datetime 的 Series 或数组
+    :return: 类型 np.ndarray float64
+    """
+    days = _QA_util_to_datetime64(dates, 10).astype('datetime64[D]').astype(np.int64)
+    if len(days) == 0:
+        return np.zeros(0, dtype=np.float64)
+    unique, inverse = np.unique(days, return_inverse=True)
+    return _QA_util_local_mktime(unique * 86400)[inverse]
+
+
+def QA_util_time_stamp_array(times):
+    """
+    QA_util_time_stamp 的向量化版本
+    本地时区的偏移按小时计算, 每个不同的小时只调用一次 time.mktime
+    :param times: 字符串/datetime 的 Series 或数组, 字符串格式同 QA_util_time_stamp
+    :return: 类型 np.ndarray float64
+    """
+    ns = _QA_util_to_datetime64(times).astype(np.int64)
+    if len(ns) == 0:
+        return np.zeros(0, dtype=np.float64)
+    hours, inverse = np.unique(ns // 3600000000000, return_inverse=True)
+    offset = _QA_util_local_mktime(hours * 3600) - hours * 3600
+    return (ns // 1000000000).astype(np.float64) + offset[inverse]
+
+
+def QA_util_date_str_array(dates):
+    """
+    日期序列 -> 'YYYY-MM-DD' 字符串, 等价于 .apply(lambda x: str(x)[0:10])
+    :return: 类型 np.ndarray object
+    """
+    values = np.asarray(dates)
+    if np.issubdtype(values.dtype, np.datetime64):
+        return np.datetime_as_string(values, unit='D').astype(object)
+    return values.astype('U10').astype(object)
+
+
+def QA_util_datetime_str_array(times):
+    """
+    时间序列 -> 'YYYY-MM-DD HH:MM:SS' 字符串, 等价于 .apply(lambda x: str(x)[0:19])
+    :return: 类型 np.ndarray object
+    """
+    values = np.asarray(times)
+    if not np.issubdtype(values.dtype, np.datetime64):
+        return values.astype('U19').astype(object)
+    res = np.datetime_as_string(values, unit='s').astype('U19')
+    # 'YYYY-MM-DDTHH:MM:SS' 中间的 T 换成空格
+    res.view('U1').reshape(-1, 19)[:, 10] = ' '
+    return res.astype(object)
+
+
 def QA_util_tdxtimestamp(time_stamp):
     """转换tdx的realtimeQuote数据
     https://github.com/rainx/pytdx/issues/187#issuecomment-441270487
@@ -22,13 +22,19 @@
 # OUT OF OR IN CONNECTION WITH THE SOFTWARE OR THE USE OR OTHER DEALINGS IN THE
 # SOFTWARE.
 
+import bisect
 import datetime
+import functools
+
+import numpy as np
 import pandas as pd
 
 from QUANTAXIS.QAUtil.QAParameter import MARKET_TYPE
 
 # todo 🛠 只记录非交易日，其余的用程序迭代 生成交易日
 
+_EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+
 trade_date_sse = [
     '1990-12-19',
     '1990-12-20',
@@ -7132,6 +7138,175 @@ trade_date_sse = [
     '2019-12-31'
 ]
 
+
+class QA_TradeCalendar():
+    """交易日历
+
+    trade_list 是升序的 'YYYY-MM-DD' 列表, 建立:
+
+        ordinal  {日期字符串: 序号} 的 hash, 交易日的判断和定位都是 O(1)
+        days     每个交易日距 1970-01-01 的天数 (int64 升序), 非交易日用二分查找前/后一个交易日
+
+    *_array 方法接受一组日期, 一次 searchsorted 完成
+    """
+
+    def __init__(self, trade_list):
+        self.trade_list = list(trade_list)
+        self.ordinal = {date: i for i, date in enumerate(self.trade_list)}
+        self.days = np.array(self.trade_list, dtype='datetime64[D]').astype(np.int64)
+        # bisect 在 list 上比在 ndarray 上快
+        self._days = self.days.tolist()
+        self._dates = np.array(self.trade_list, dtype=object)
+
+    def __len__(self):
+        return len(self.trade_list)
+
+    @staticmethod
+    def to_days(date):
+        '日期 -> 距 1970-01-01 的天数'
+        date = str(date)[0:10]
+        return datetime.date(int(date[0:4]), int(date[5:7]), int(date[8:10])).toordinal() - _EPOCH_ORDINAL
+
+    @staticmethod
+    def to_days_array(dates):
+        return pd.to_datetime(np.asarray(dates).ravel()).values.astype('datetime64[D]').astype(np.int64)
+
+    def index(self, date):
+        '交易日的序号, 和 list.index 一样, 不是交易日 raise ValueError'
+        try:
+            return self.ordinal[date]
+        except (KeyError, TypeError):
+            raise ValueError('{} is not in trade list'.format(date))
+
+    def if_trade(self, date):
+        try:
+            return date in self.ordinal
+        except TypeError:
+            return False
+
+    def real_index(self, date, towards=-1):
+        """date 是交易日返回它的序号, 否则 towards=-1 返回前一个交易日, towards=1 返回后一个交易日
+
+        超出日历范围返回 None
+        """
+        date = str(date)[0:10]
+        pos = self.ordinal.get(date)
+        if pos is not None:
+            return pos
+        if towards == 1:
+            pos = bisect.bisect_left(self._days, self.to_days(date))
+            return pos if pos < len(self._days) else None
+        pos = bisect.bisect_right(self._days, self.to_days(date)) - 1
+        return pos if pos >= 0 else None
+
+    def real_date(self, date, towards=-1):
+        pos = self.real_index(date, towards)
+        return None if pos is None else self.trade_list[pos]
+
+    def real_datelist(self, start, end):
+        '(真实开始序号, 真实结束序号), 中间没有交易日返回 (None, None)'
+        start, end = self.real_index(start, 1), self.real_index(end, -1)
+        if start is None or end is None or start > end:
+            return None, None
+        return start, end
+
+    def trade_range(self, start, end):
+        start, end = self.real_datelist(start, end)
+        if start is None:
+            return None
+        return self.trade_list[start:end + 1]
+
+    def trade_gap(self, start, end):
+        start, end = self.real_datelist(start, end)
+        if start is None:
+            return 0
+        return end + 1 - start
+
+    def date_gap(self, date, gap, methods):
+        """和 QA_util_date_gap 一致, date 必须是交易日, 否则返回 'wrong date'
+        """
+        try:
+            if methods in ['>', 'gt']:
+                return self.trade_list[self.ordinal[date] + gap]
+            elif methods in ['>=', 'gte']:
+                return self.trade_list[self.ordinal[date] + gap - 1]
+            elif methods in ['<', 'lt']:
+                return self.trade_list[self.ordinal[date] - gap]
+            elif methods in ['<=', 'lte']:
+                return self.trade_list[self.ordinal[date] - gap + 1]
+            elif methods in ['==', '=', 'eq']:
+                return date
+        except:
+            return 'wrong date'
+
+    def if_trade_array(self, dates):
+        days = self.to_days_array(dates)
+        pos = np.searchsorted(self.days, days).clip(0, max(len(self.days) - 1, 0))
+        return self.days[pos] == days
+
+    def real_index_array(self, dates, towards=-1):
+        '一组日期的 real_index, 超出日历范围的为 -1'
+        days = self.to_days_array(dates)
+        if towards == 1:
+            pos = np.searchsorted(self.days, days, side='left')
+            pos[pos >= len(self.days)] = -1
+        else:
+            pos = np.searchsorted(self.days, days, side='right') - 1
+        return pos
+
+    def real_date_array(self, dates, towards=-1):
+        '一组日期的 real_date, 超出日历范围的为 None'
+        pos = self.real_index_array(dates, towards)
+        res = self._dates[pos]
+        res[pos < 0] = None
+        return res
+
+    def date_gap_array(self, dates, gap, methods):
+        '一组交易日的 date_gap, 非交易日或越界的为 None'
+        days = self.to_days_array(dates)
+        pos = np.searchsorted(self.days, days).clip(0, max(len(self.days) - 1, 0))
+        valid = self.days[pos] == days
+        if methods in ['>', 'gt']:
+            pos = pos + gap
+        elif methods in ['>=', 'gte']:
+            pos = pos + gap - 1
+        elif methods in ['<', 'lt']:
+            pos = pos - gap
+        elif methods in ['<=', 'lte']:
+            pos = pos - gap + 1
+        elif methods not in ['==', '=', 'eq']:
+            raise ValueError('QA CURRENTLY DONOT HAVE THIS METHODS {}'.format(methods))
+        valid &= (pos >= 0) & (pos < len(self.days))
+        res = np.full(len(pos), None, dtype=object)
+        res[valid] = self._dates[pos[valid]]
+        return res
+
+    def trade_gap_array(self, start, end):
+        '一组 [start, end] 的交易日个数'
+        start = self.real_index_array(start, 1)
+        end = self.real_index_array(end, -1)
+        res = end + 1 - start
+        res[(start < 0) | (end < 0) | (res < 0)] = 0
+        return res
+
+
+trade_calendar = QA_TradeCalendar(trade_date_sse)
+
+
+@functools.lru_cache(maxsize=8)
+def _QA_util_calendar_cached(trade_list):
+    return QA_TradeCalendar(trade_list)
+
+
+def _QA_util_calendar(trade_list):
+    """trade_list 对应的 QA_TradeCalendar
+
+    自定义的 trade_list 按内容 (转成 tuple) 缓存, 列表被修改之后会重新建立
+    """
+    if trade_list is trade_date_sse:
+        return trade_calendar
+    return _QA_util_calendar_cached(tuple(trade_list))
+
 def QA_util_format_date2str(cursor_date):
     """
     对输入日期进行格式化处理，返回格式为 "%Y-%m-%d" 格式字符串
@@ -7167,7 +7342,7 @@ def QA_util_get_next_trade_date(cursor_date, n=1):
     """
 
     cursor_date = QA_util_format_date2str(cursor_date)
-    if cursor_date in trade_date_sse:
+    if trade_calendar.if_trade(cursor_date):
         # 如果指定日期为交易日
         return QA_util_date_gap(cursor_date, n, "gt")
     real_pre_trade_date = QA_util_get_real_date(cursor_date)
@@ -7182,7 +7357,7 @@ def QA_util_get_pre_trade_date(cursor_date, n=1):
     """
 
     cursor_date = QA_util_format_date2str(cursor_date)
-    if cursor_date in trade_date_sse:
+    if trade_calendar.if_trade(cursor_date):
         return QA_util_date_gap(cursor_date, n, "lt")
     real_aft_trade_date = QA_util_get_real_date(cursor_date)
     return QA_util_date_gap(real_aft_trade_date, n, "lt")
@@ -7196,10 +7371,7 @@ def QA_util_if_trade(day):
     :param day: 类型 str eg: 2018-11-11
     :return: Boolean 类型
     '''
-    if day in trade_date_sse:
-        return True
-    else:
-        return False
+    return trade_calendar.if_trade(day)
 
 
 def QA_util_if_tradetime(
@@ -7345,26 +7517,10 @@ def QA_util_get_real_date(date, trade_list=trade_date_sse, towards=-1):
     towards=-1 日期向前迭代
     @ yutiansut
 
+    超出交易日历的范围时返回 None
     """
-    date = str(date)[0:10]
-    if towards == 1:
-        while date not in trade_list:
-            date = str(
-                datetime.datetime.strptime(str(date)[0:10],
-                                           '%Y-%m-%d') +
-                datetime.timedelta(days=1)
-            )[0:10]
-        else:
-            return str(date)[0:10]
-    elif towards == -1:
-        while date not in trade_list:
-            date = str(
-                datetime.datetime.strptime(str(date)[0:10],
-                                           '%Y-%m-%d') -
-                datetime.timedelta(days=1)
-            )[0:10]
-        else:
-            return str(date)[0:10]
+    if towards in [1, -1]:
+        return _QA_util_calendar(trade_list).real_date(date, towards)
 
 
 def QA_util_get_real_datelist(start, end):
@@ -7376,31 +7532,21 @@ def QA_util_get_real_datelist(start, end):
     当start end中间没有交易日 返回None, None
     @yutiansut/ 2017-12-19
     """
-    real_start = QA_util_get_real_date(start, trade_date_sse, 1)
-    real_end = QA_util_get_real_date(end, trade_date_sse, -1)
-    if trade_date_sse.index(real_start) > trade_date_sse.index(real_end):
+    real_start, real_end = trade_calendar.real_datelist(start, end)
+    if real_start is None:
         return None, None
     else:
-        return (real_start, real_end)
+        return (trade_date_sse[real_start], trade_date_sse[real_end])
 
 
 def QA_util_get_trade_range(start, end):
     '给出交易具体时间'
-    start, end = QA_util_get_real_datelist(start, end)
-    if start is not None:
-        return trade_date_sse[trade_date_sse
-                              .index(start):trade_date_sse.index(end) + 1:1]
-    else:
-        return None
+    return trade_calendar.trade_range(start, end)
 
 
 def QA_util_get_trade_gap(start, end):
     '返回start_day到end_day中间有多少个交易天 算首尾'
-    start, end = QA_util_get_real_datelist(start, end)
-    if start is not None:
-        return trade_date_sse.index(end) + 1 - trade_date_sse.index(start)
-    else:
-        return 0
+    return trade_calendar.trade_gap(start, end)
 
 
 def QA_util_date_gap(date, gap, methods):
@@ -7410,20 +7556,7 @@ def QA_util_date_gap(date, gap, methods):
     :param methods:  gt大于 ，gte 大于等于， 小于lt ，小于等于lte ， 等于===
     :return: 字符串 eg：2000-01-01
     '''
-    try:
-        if methods in ['>', 'gt']:
-            return trade_date_sse[trade_date_sse.index(date) + gap]
-        elif methods in ['>=', 'gte']:
-            return trade_date_sse[trade_date_sse.index(date) + gap - 1]
-        elif methods in ['<', 'lt']:
-            return trade_date_sse[trade_date_sse.index(date) - gap]
-        elif methods in ['<=', 'lte']:
-            return trade_date_sse[trade_date_sse.index(date) - gap + 1]
-        elif methods in ['==', '=', 'eq']:
-            return date
-
-    except:
-        return 'wrong date'
+    return trade_calendar.date_gap(date, gap, methods)
 
 
 def QA_util_get_trade_datetime(dt=datetime.datetime.now()):
@@ -66,6 +66,23 @@ DESCENDING = pymongo.DESCENDING
 QA_util_sql_mongo_sort_ASCENDING = pymongo.ASCENDING
 QA_util_sql_mongo_sort_DESCENDING = pymongo.DESCENDING
 
+
+def QA_util_sql_mongo_last(coll, query, sort_key):
+    """查询最后一条记录, 增量更新时用来找上次保存到哪里
+
+    按 sort_key 倒序 find_one, 走 (code, sort_key) 索引, 耗时和表的大小无关;
+    代替 ref = coll.find(query); ref[ref.count() - 1] (count 加 skip 到最后, 表越大越慢)
+
+    Arguments:
+        coll {pymongo.collection.Collection} -- 表
+        query {dict} -- 查询条件, 如 {'code': '000001', 'type': '1min'}
+        sort_key {str} -- 有索引的时间字段, date_stamp/time_stamp
+
+    Returns:
+        dict -- 没有数据返回 None
+    """
+    return coll.find_one(query, sort=[(sort_key, pymongo.DESCENDING)])
+
 if __name__ == '__main__':
     # test async_mongo
     client = QA_util_sql_async_mongo_setting().quantaxis.stock_day
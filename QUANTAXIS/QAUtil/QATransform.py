@@ -23,7 +23,10 @@
 # SOFTWARE.
 
 import csv
+import datetime
 import json
+from itertools import islice
+from operator import itemgetter
 
 import numpy as np
 import pandas as pd
@@ -38,6 +41,151 @@ def QA_util_to_json_from_pandas(data):
     return json.loads(data.to_json(orient='records'))
 
 
+_NAT = np.iinfo(np.int64).min
+
+
+def _records_stamp(values):
+    'datetime64/timedelta64 转成毫秒, NaT 为 None'
+    stamp = values.view(np.int64)
+    res = (stamp // 10**6).tolist()
+    nat = stamp == _NAT
+    if nat.any():
+        res = [None if is_nat else item for item, is_nat in zip(res, nat.tolist())]
+    return res
+
+
+def _records_object(item):
+    'object 列里的单个值, 规则同 to_json: nan/inf/NaT 为 None, 时间为毫秒'
+    if item is None or isinstance(item, (str, bool, int)):
+        return item
+    if isinstance(item, np.generic):
+        item = item.item()
+    if isinstance(item, float):
+        return item if np.isfinite(item) else None
+    if isinstance(item, (datetime.date, np.datetime64)):
+        # datetime.date/datetime.datetime/pd.Timestamp, NaT 也是 datetime 的子类
+        stamp = pd.Timestamp(item)
+        return None if stamp is pd.NaT else stamp.value // 10**6
+    if isinstance(item, (datetime.timedelta, np.timedelta64)):
+        delta = pd.Timedelta(item)
+        return None if delta is pd.NaT else delta.value // 10**6
+    return item
+
+
+def _records_column(name, col):
+    """一列转成 python 对象的 list
+
+    和 to_json 的结果一致: nan/inf/NaT 为 None, 时间为毫秒;
+    只有 float 保留全部精度 (to_json 只保留 10 位小数)
+    """
+    values = col.values
+    kind = getattr(values, 'dtype', np.dtype(object)).kind
+    if name in ('datetime', 'date'):
+        if kind == 'M' and values.dtype == np.dtype('datetime64[ns]') and \
+                (values.view(np.int64) % 10**9 == 0).all():
+            # 和 str(pd.Timestamp) 一样是 '2019-01-02 09:31:00', NaT 为 'NaT'
+            return np.char.replace(
+                np.datetime_as_string(values, unit='s'), 'T', ' '
+            ).tolist()
+        if kind == 'O' and pd.api.types.infer_dtype(values, skipna=False) == 'string':
+            return values.tolist()
+        return [str(item) for item in col.tolist()]
+    if kind in 'iub':
+        return values.tolist()
+    if kind == 'f':
+        res = values.tolist()
+        if not np.isfinite(values).all():
+            res = [None if bad else item
+                   for item, bad in zip(res, (~np.isfinite(values)).tolist())]
+        return res
+    if kind in 'mM' and isinstance(values, np.ndarray):
+        return _records_stamp(values)
+    res = col.tolist()
+    if kind == 'O' and pd.api.types.infer_dtype(values, skipna=False) == 'string':
+        return res
+    return [_records_object(item) for item in res]
+
+
+def QA_util_to_records_from_pandas(data):
+    """DataFrame 转成可以直接写入 mongodb 的 list of dict
+
+    按列转成 python 对象再拼成 dict, 不经过 to_json/json.loads, 也不修改 data;
+    datetime/date 列转为字符串, 其他列和 QA_util_to_json_from_pandas 的结果相同
+    (nan/inf/NaT 为 None, object 列里的时间也是毫秒), 只有 float 不会被截成 10 位小数
+
+    Arguments:
+        data {pd.DataFrame} -- [description]
+
+    Returns:
+        list -- [{column: value}]
+    """
+    if data is None or len(data) == 0:
+        return []
+    columns = [str(item) for item in data.columns]
+    values = [
+        _records_column(name,
+                        data.iloc[:, i]) for i, name in enumerate(columns)
+    ]
+    return [dict(zip(columns, row)) for row in zip(*values)]
+
+
+def QA_util_cursor_to_columns(cursor, fields, dtypes=None, batch_size=100000):
+    """把 mongodb 的 cursor 分批解码成按列存放的 numpy 数组
+
+    每攒够 batch_size 条记录就按字段转成带类型的数组, 内存里最多只有一批记录的 dict,
+    不会像 pd.DataFrame([item for item in cursor]) 那样一次生成所有记录的 dict
+
+    Arguments:
+        cursor {iterable} -- pymongo 的 cursor (最好带上只包含 fields 的 projection)
+        fields {list} -- 需要的字段
+
+    Keyword Arguments:
+        dtypes {dict} -- 字段: dtype, 没有指定的字段按字符串处理,
+                         相同的字符串共用一个对象 (default: {None})
+        batch_size {int} -- 每批解码的记录数 (default: {100000})
+
+    Returns:
+        dict -- 字段: np.ndarray
+    """
+    fields = list(fields)
+    dtypes = {} if dtypes is None else dtypes
+    getter = itemgetter(*fields) if len(fields) > 1 else \
+        (lambda item: (item[fields[0]],))
+    chunks = {field: [] for field in fields}
+    strings = {}
+
+    def flush(batch):
+        for field, col in zip(fields, zip(*batch)):
+            dtype = dtypes.get(field)
+            if dtype is None:
+                uniq, inverse = np.unique(np.array(col, dtype=str), return_inverse=True)
+                uniq = np.array(
+                    [strings.setdefault(item, item) for item in uniq.tolist()],
+                    dtype=object
+                )
+                chunks[field].append(uniq[inverse])
+            else:
+                chunks[field].append(np.array(col, dtype=dtype))
+
+    cursor = iter(cursor)
+    while True:
+        items = list(islice(cursor, batch_size))
+        if len(items) == 0:
+            break
+        try:
+            batch = list(map(getter, items))
+        except KeyError:
+            # 有记录缺字段的时候这一批逐条取, 缺的字段为 None
+            batch = [tuple(item.get(field) for field in fields) for item in items]
+        del items
+        flush(batch)
+
+    return {
+        field: np.concatenate(chunks[field]) if len(chunks[field]) > 0 else
+        np.array([], dtype=dtypes.get(field, object)) for field in fields
+    }
+
+
 def QA_util_to_json_from_numpy(data):
     pass
 
@@ -40,6 +40,10 @@ from QUANTAXIS.QAUtil.QACsv import QA_util_save_csv
 # date
 from QUANTAXIS.QAUtil.QADate import (QA_util_calc_time, QA_util_date_int2str,
                                      QA_util_date_stamp, QA_util_date_str2int,
+                                     QA_util_date_stamp_array,
+                                     QA_util_time_stamp_array,
+                                     QA_util_date_str_array,
+                                     QA_util_datetime_str_array,
                                      QA_util_date_today, QA_util_date_valid,
                                      QA_util_datetime_to_strdate,
                                      QA_util_get_date_index,
@@ -78,6 +82,7 @@ from QUANTAXIS.QAUtil.QADate_trade import (QA_util_date_gap,
                                            QA_util_get_trade_datetime,
                                            QA_util_future_to_realdatetime,
                                            QA_util_future_to_tradedatetime,
+                                           QA_TradeCalendar, trade_calendar,
                                            trade_date_sse)
 # datetolls
 from QUANTAXIS.QAUtil.QADateTools import (QA_util_add_months,
@@ -119,14 +124,17 @@ from QUANTAXIS.QAUtil.QASingleton import singleton
 # sql
 from QUANTAXIS.QAUtil.QASql import (QA_util_sql_async_mongo_setting,
                                     QA_util_sql_mongo_setting,
+                                    QA_util_sql_mongo_last,
                                     QA_util_sql_mongo_sort_ASCENDING,
                                     QA_util_sql_mongo_sort_DESCENDING)
 # format
-from QUANTAXIS.QAUtil.QATransform import (QA_util_to_json_from_pandas,
+from QUANTAXIS.QAUtil.QATransform import (QA_util_cursor_to_columns,
+                                          QA_util_to_json_from_pandas,
                                           QA_util_to_list_from_numpy,
                                           QA_util_to_list_from_pandas,
                                           QA_util_to_pandas_from_json,
-                                          QA_util_to_pandas_from_list)
+                                          QA_util_to_pandas_from_list,
+                                          QA_util_to_records_from_pandas)
 
 # 网络相关
 from QUANTAXIS.QAUtil.QAWebutil import QA_util_web_ping
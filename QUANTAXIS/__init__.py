@@ -47,7 +47,7 @@ from QUANTAXIS.QAApplication.QABacktest import QA_Backtest
 from QUANTAXIS.QAApplication.QAResult import backtest_result_analyzer
 from QUANTAXIS.QAARP.QAAccount import QA_Account
 from QUANTAXIS.QAARP.QAPortfolio import QA_Portfolio, QA_PortfolioView
-from QUANTAXIS.QAARP.QARisk import QA_Performance, QA_Risk
+from QUANTAXIS.QAARP.QARisk import QA_Performance, QA_Risk, QA_batch_risk
 from QUANTAXIS.QAARP.QAStrategy import QA_Strategy
 from QUANTAXIS.QAARP.QAUser import QA_User
 from QUANTAXIS.QACmd import QA_cmd
@@ -56,7 +56,9 @@ from QUANTAXIS.QAData import (
     QA_data_calc_marketvalue, QA_data_ctptick_resample, QA_data_day_resample,
     QA_data_futuremin_resample, QA_data_futuremin_resample_series,
     QA_data_futuremin_resample_tb_kq, QA_data_futuremin_resample_tb_kq2,
-    QA_data_marketvalue, QA_data_min_resample, QA_data_stock_to_fq,
+    QA_data_marketvalue, QA_data_min_resample, QA_data_min_resample_batch,
+    QA_data_stock_to_fq,
+    QA_data_stock_to_fq_panel, QA_data_calc_adj_factor,
     QA_data_tick_resample, QA_data_tick_resample_1min, QA_DataStruct_Day,
     QA_DataStruct_Financial, QA_DataStruct_Future_day,
     QA_DataStruct_Future_min, QA_DataStruct_Index_day, QA_DataStruct_Index_min,
@@ -110,6 +112,13 @@ from QUANTAXIS.QAFetch.QAQuery import (
     QA_fetch_stock_transaction, QA_fetch_index_transaction,
     QA_fetch_stock_name, QA_fetch_stock_xdxr, QA_fetch_trade_date)
 from QUANTAXIS.QAFetch.QAQuery_Advance import *
+from QUANTAXIS.QAFetch.QALocal import (
+    QA_fetch_local_adv, QA_fetch_stock_day_local_adv,
+    QA_fetch_stock_min_local_adv, QA_fetch_index_day_local_adv,
+    QA_fetch_index_min_local_adv, QA_fetch_future_day_local_adv,
+    QA_fetch_future_min_local_adv)
+from QUANTAXIS.QAFetch.QATdxPool import QA_TdxPool
+from QUANTAXIS.QAFetch.QATdx import QA_tdx_stock_pool, QA_tdx_future_pool
 from QUANTAXIS.QAIndicator import *
 # market
 from QUANTAXIS.QAMarket import (QA_BacktestBroker, QA_Broker, QA_Dealer,
@@ -117,14 +126,17 @@ from QUANTAXIS.QAMarket import (QA_BacktestBroker, QA_Broker, QA_Dealer,
                                 QA_OrderQueue, QA_Position, QA_RandomBroker,
                                 QA_RealBroker, QA_SimulatedBroker,
                                 QA_TTSBroker)
-from QUANTAXIS.QASetting.QALocalize import (cache_path, download_path,
-                                            log_path, qa_path, setting_path)
+from QUANTAXIS.QASetting.QALocalize import (cache_path, datastore_path,
+                                            download_path, log_path, qa_path,
+                                            setting_path)
 # save
 from QUANTAXIS.QASU.main import (QA_SU_save_etf_day, QA_SU_save_etf_min,
                                  QA_SU_save_financialfiles,
                                  QA_SU_save_future_list, QA_SU_save_index_day,
                                  QA_SU_save_index_list, QA_SU_save_index_min,
-                                 QA_SU_save_stock_block, QA_SU_save_stock_day,
+                                 QA_SU_save_local,
+                                 QA_SU_save_stock_adj, QA_SU_save_stock_block,
+                                 QA_SU_save_stock_day,
                                  QA_SU_save_stock_info,
                                  QA_SU_save_stock_info_tushare,
                                  QA_SU_save_stock_list, QA_SU_save_stock_min,
@@ -159,7 +171,8 @@ from QUANTAXIS.QAUtil import (  # QAPARAMETER
     QA_util_time_delay, QA_util_time_gap, QA_util_time_now, QA_util_time_stamp,
     QA_util_to_datetime, QA_util_to_json_from_pandas,
     QA_util_to_list_from_numpy, QA_util_to_list_from_pandas,
-    QA_util_to_pandas_from_json, QA_util_to_pandas_from_list, QA_util_web_ping,
+    QA_util_to_pandas_from_json, QA_util_to_pandas_from_list,
+    QA_util_to_records_from_pandas, QA_util_web_ping,
     QATZInfo_CN, future_ip_list, info_ip_list, stock_ip_list, trade_date_sse)
 
 # from QUANTAXIS.QASU.save_backtest import (
@@ -0,0 +1,136 @@
+import random
+import unittest
+
+import numpy as np
+import pandas as pd
+
+import QUANTAXIS as QA
+from QUANTAXIS.QAARP.QAAccountPro import QA_AccountPRO
+from QUANTAXIS.QAARP.QAHistory import QA_HistoryStore
+from QUANTAXIS.QAUtil.QADate_trade import QA_util_get_trade_range
+
+
+class QAAccount_hold_Test(unittest.TestCase):
+    """持仓/可卖额度/每日持仓是增量计算的, 要和直接从 history_table 算出来的一致"""
+
+    def make_account(self, days=30, codes=('000001', '000002', '600000'), per_day=5,
+                     account_class=QA.QA_Account, **kwargs):
+        rng = random.Random(0)
+        account = account_class(
+            user_cookie='test',
+            portfolio_cookie='test',
+            account_cookie='test_hold',
+            init_cash=1e9,
+            init_hold={'000001': 1000, '300001': 500},
+            start='2019-01-02',
+            end='2019-12-31',
+            **kwargs
+        )
+        if account.history_limit is not None:
+            # 默认按 4096 条一块丢弃, 换成小块才能在测试里丢弃记录
+            account.history = QA_HistoryStore(
+                account._history_headers, chunk_size=8, max_rows=account.history_limit)
+        for date in QA_util_get_trade_range('2019-01-02', '2019-12-31')[:days]:
+            for i in range(per_day):
+                account.receive_simpledeal(
+                    code=rng.choice(codes),
+                    trade_price=10,
+                    trade_amount=100,
+                    trade_towards=rng.choice([QA.ORDER_DIRECTION.BUY,
+                                              QA.ORDER_DIRECTION.SELL]),
+                    trade_time='{} 09:{:02d}:00'.format(date, 31 + i)
+                )
+            account.settle()
+        return account
+
+    def test_hold(self):
+        account = self.make_account()
+        hold_available = account.history_table.groupby('code').amount.sum(
+        ).replace(0, np.nan).dropna().sort_index()
+        hold = pd.concat([account.init_hold, hold_available]).groupby(
+            'code').sum().replace(0, np.nan).dropna().sort_index()
+        pd.testing.assert_series_equal(
+            account.hold_available, hold_available, check_dtype=False)
+        pd.testing.assert_series_equal(account.hold, hold, check_dtype=False)
+        self.assertEqual(account.sell_available, hold.to_dict())
+
+        # history 被整体替换的时候重新计算
+        account.history = account.history[:10]
+        hold_available = account.history_table.groupby('code').amount.sum(
+        ).replace(0, np.nan).dropna().sort_index()
+        pd.testing.assert_series_equal(
+            account.hold_available, hold_available, check_dtype=False)
+
+    def test_daily_hold(self):
+        account = self.make_account()
+        data = account.trade.cumsum()
+        data = data.assign(account_cookie=account.account_cookie).assign(
+            date=pd.to_datetime(data.index.levels[0].str.slice(0, 10)))
+        data = data.set_index(['date', 'account_cookie'])
+        expected = data[~data.index.duplicated(keep='last')].sort_index()
+        res = account.daily_hold
+        expected = expected.reset_index(level=1, drop=True).reindex(
+            res.index).ffill().fillna(0)
+        np.testing.assert_allclose(
+            res[expected.columns].values, expected.values.astype(float))
+
+    def test_history_limit(self):
+        for account_class in [QA.QA_Account, QA_AccountPRO]:
+            full = self.make_account(account_class=account_class)
+            account = self.make_account(account_class=account_class, history_limit=16)
+            # 丢弃的成交记录不影响持仓
+            self.assertLess(len(account.history), len(full.history))
+            self.assertEqual(account.history.total, len(full.history))
+            pd.testing.assert_series_equal(
+                account.hold_available, full.hold_available, check_dtype=False)
+            pd.testing.assert_series_equal(account.hold, full.hold, check_dtype=False)
+            self.assertEqual(dict(account.sell_available), dict(full.sell_available))
+            pd.testing.assert_frame_equal(
+                account.daily_hold, full.daily_hold, check_dtype=False)
+
+    def test_history_limit_rows(self):
+        for account_class in [QA.QA_Account, QA_AccountPRO]:
+            full = self.make_account(days=5, account_class=account_class)
+            # 整体替换成 list 的时候超出 history_limit, 默认按 4096 条一块丢弃
+            rows = full.history.tolist() * (2 * 4096 // len(full.history) + 1)
+            account = self.make_account(days=0, account_class=account_class,
+                                        history_limit=16)
+            account.history = rows
+            self.assertGreater(account.history.dropped, 0)
+            hold_available = pd.DataFrame(
+                rows, columns=full.history.columns
+            ).groupby('code').amount.sum().replace(0, np.nan).dropna().sort_index()
+            pd.testing.assert_series_equal(
+                account.hold_available, hold_available, check_dtype=False)
+
+            # cash 也按 history_limit 丢弃, cash_table 和剩下的记录对应
+            cash = [1e9 + i for i in range(len(rows) + 1)]
+            account.cash = cash
+            account.time_index_max = [row[0] for row in rows]
+            self.assertGreater(account.cash.dropped, 0)
+            self.assertEqual(account.cash.total, len(cash))
+            table = account.cash_table
+            self.assertEqual(len(table), len(account.cash))
+            self.assertEqual(table.cash.tolist(), cash[account.cash.dropped:])
+            self.assertEqual(table.datetime.tolist(),
+                             account.time_index_max[account.cash.dropped - 1:])
+
+    def test_daily_hold_unsorted(self):
+        full = self.make_account(days=5)
+        # 成交不按时间追加, 而且最早追加的记录被丢弃
+        account = self.make_account(days=0, history_limit=8)
+        for row in full.history_table.sample(frac=1, random_state=1).itertuples():
+            account.receive_simpledeal(
+                code=row.code,
+                trade_price=row.price,
+                trade_amount=abs(row.amount),
+                trade_towards=row.direction,
+                trade_time=row.datetime
+            )
+        account.time_index_max = full.time_index_max
+        self.assertGreater(account.history.dropped, 0)
+        pd.testing.assert_frame_equal(
+            account.daily_hold, full.daily_hold, check_dtype=False)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+import unittest
+
+import numpy as np
+
+from QUANTAXIS.QAARP.QAHistory import QA_Column, QA_HistoryStore
+
+
+HEADERS = ['datetime', 'code', 'price', 'amount', 'cash', 'direction']
+
+
+def make_rows(n):
+    return [
+        ['2019-01-{:02d} 09:31:00'.format(i % 28 + 1),
+         '00000{}'.format(i % 3),
+         10.0 + i,
+         100 if i % 2 else -100,
+         1e6 - i,
+         1 if i % 2 else -1] for i in range(n)
+    ]
+
+
+class QAHistory_Test(unittest.TestCase):
+
+    def test_list_like(self):
+        rows = make_rows(50)
+        store = QA_HistoryStore(HEADERS, data=rows, chunk_size=8)
+        self.assertEqual(len(store), 50)
+        self.assertEqual(list(store), rows)
+        self.assertEqual(store.tolist(), rows)
+        self.assertEqual(store[0], rows[0])
+        self.assertEqual(store[-1], rows[-1])
+        self.assertEqual(store[17], rows[17])
+        self.assertEqual(store[10:20], rows[10:20])
+        with self.assertRaises(IndexError):
+            store[50]
+
+        frame = store.to_dataframe()
+        self.assertEqual(list(frame.columns), HEADERS)
+        self.assertEqual(frame.amount.dtype, np.float64)
+        self.assertEqual(frame.direction.dtype, np.int64)
+        self.assertEqual(frame.values.tolist(), rows)
+
+    def test_zero_copy(self):
+        store = QA_HistoryStore(HEADERS, data=make_rows(20), chunk_size=8)
+        price = store.column('price')
+        # 合并之后没有写满新的块, 再次读取是同一块内存
+        store.append(make_rows(21)[-1])
+        self.assertTrue(np.shares_memory(price, store.column('price')))
+        self.assertEqual(len(store.column('price')), 21)
+
+    def test_old_rows(self):
+        # 老版本保存的记录字段少
+        rows = [item[:4] for item in make_rows(5)]
+        store = QA_HistoryStore.from_rows(rows, HEADERS)
+        self.assertEqual(store.columns, HEADERS[:4])
+        self.assertEqual(list(store), rows)
+        self.assertEqual(QA_HistoryStore.from_rows([], HEADERS).columns, HEADERS)
+
+    def test_max_rows(self):
+        rows = make_rows(100)
+        store = QA_HistoryStore(HEADERS, data=rows, chunk_size=8, max_rows=30)
+        self.assertGreaterEqual(len(store), 30)
+        self.assertLess(len(store), 30 + 8)
+        self.assertEqual(store.total, 100)
+        self.assertEqual(list(store), rows[store.dropped:])
+
+        # 合并之后还是按块丢弃, 保留的记录数不会超出
+        store = QA_HistoryStore(HEADERS, chunk_size=8, max_rows=30)
+        for i, row in enumerate(rows):
+            store.append(row)
+            if i % 5 == 0:
+                store.to_numpy()
+            self.assertLess(len(store), 30 + 2 * 8)
+        self.assertEqual(store.total, 100)
+        self.assertEqual(store.column('price').tolist(),
+                         [row[2] for row in rows[store.dropped:]])
+        self.assertLessEqual(len(store.to_numpy().base), 30 + 2 * 8)
+
+    def test_column(self):
+        cash = QA_Column('f8', data=[1000000], chunk_size=4)
+        for i in range(10):
+            cash.append(cash[-1] - 10)
+        self.assertEqual(cash[-1], 999900)
+        self.assertIsInstance(cash[-1], float)
+        self.assertEqual(cash[1:3], [999990, 999980])
+        self.assertEqual(min(cash), 999900)
+
+
+if __name__ == '__main__':
+    unittest.main()
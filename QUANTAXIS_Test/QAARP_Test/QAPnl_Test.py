@@ -0,0 +1,109 @@
+import random
+import unittest
+from collections import deque
+
+import pandas as pd
+
+from QUANTAXIS.QAARP.QAPnl import QA_pnl_pairs
+
+
+def make_history(rows):
+    return pd.DataFrame(
+        rows, columns=['datetime', 'code', 'price', 'amount', 'direction'])
+
+
+def reference_pairs(history, model):
+    """逐条配对 (原来 pnl_fifo 的做法), 用来对照"""
+    lots = {}
+    res = []
+    for item in history.itertuples():
+        side = 'buy' if item.direction in [1, 2, -1, -3, -4] else 'sell'
+        queue = lots.setdefault((item.code, side), deque())
+        if item.direction in [1, 2, -2]:
+            queue.append([item.datetime, abs(item.amount), item.price])
+            continue
+        need = abs(item.amount)
+        while need > 0 and queue:
+            lot = queue[0] if model == 'fifo' else queue[-1]
+            matched = min(need, lot[1])
+            if side == 'buy':
+                res.append([item.code, item.datetime, lot[0], matched,
+                            item.price, lot[2], side])
+            else:
+                res.append([item.code, lot[0], item.datetime, matched,
+                            lot[2], item.price, side])
+            need -= matched
+            lot[1] -= matched
+            if lot[1] == 0:
+                queue.popleft() if model == 'fifo' else queue.pop()
+    return res
+
+
+class QAPnl_Test(unittest.TestCase):
+
+    def test_partial(self):
+        history = make_history([
+            ['2019-01-02 09:31:00', '000001', 10.0, 100, 1],
+            ['2019-01-02 09:32:00', '000001', 11.0, 200, 1],
+            ['2019-01-03 09:31:00', '000001', 12.0, -250, -1],
+            ['2019-01-03 09:32:00', '000001', 13.0, -100, -1],
+            ['2019-01-03 09:33:00', '000002', 13.0, -100, -1],
+        ])
+        fifo = QA_pnl_pairs(history, 'fifo')
+        self.assertEqual(fifo.amount.tolist(), [100, 150, 50])
+        self.assertEqual(fifo.buy_price.tolist(), [10, 11, 11])
+        self.assertEqual(fifo.sell_price.tolist(), [12, 12, 13])
+        lifo = QA_pnl_pairs(history, 'lifo')
+        self.assertEqual(lifo.amount.tolist(), [200, 50, 50])
+        self.assertEqual(lifo.buy_price.tolist(), [11, 10, 10])
+        # 没有开仓可以配对的平仓 (000002) 不出现在结果里
+        self.assertEqual(set(fifo.code), {'000001'})
+        self.assertEqual(fifo.sell_date.iloc[0], pd.Timestamp('2019-01-03 09:31:00'))
+
+    def test_future(self):
+        history = make_history([
+            ['2019-01-02 09:31:00', 'RB1905', 3500.0, -2, -2],
+            ['2019-01-02 09:32:00', 'RB1905', 3510.0, 1, 2],
+            ['2019-01-02 09:33:00', 'RB1905', 3490.0, 2, 3],
+            ['2019-01-02 09:34:00', 'RB1905', 3520.0, -1, -3],
+        ])
+        res = QA_pnl_pairs(history)
+        self.assertEqual(res.rawdirection.tolist(), ['sell', 'buy'])
+        self.assertEqual(res.sell_price.tolist(), [3500, 3520])
+        self.assertEqual(res.buy_price.tolist(), [3490, 3510])
+        with self.assertRaises(ValueError):
+            QA_pnl_pairs(history, 'avg')
+
+    def test_reference(self):
+        rng = random.Random(0)
+        rows = []
+        for i in range(2000):
+            direction = rng.choice([1, 2, -2, -1, 3, -3, -4, 4])
+            rows.append([
+                str(pd.Timestamp('2019-01-02 09:30:00') + pd.Timedelta(minutes=i)),
+                rng.choice(['000001', '000002', 'RB1905']),
+                10 + rng.random(),
+                rng.randint(1, 5) * 100 * (1 if direction > 0 else -1),
+                direction
+            ])
+        history = make_history(rows)
+        for model in ['fifo', 'lifo']:
+            expected = pd.DataFrame(
+                reference_pairs(history, model),
+                columns=['code', 'sell_date', 'buy_date', 'amount',
+                         'sell_price', 'buy_price', 'rawdirection'])
+            res = QA_pnl_pairs(history, model)
+            self.assertEqual(len(res), len(expected))
+            for column in ['code', 'rawdirection', 'sell_price', 'buy_price', 'amount']:
+                self.assertEqual(res[column].tolist(), expected[column].tolist())
+            self.assertTrue(
+                (res.buy_date == pd.to_datetime(expected.buy_date)).all())
+
+    def test_empty(self):
+        history = make_history([])
+        for model in ['fifo', 'lifo']:
+            self.assertEqual(len(QA_pnl_pairs(history, model)), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
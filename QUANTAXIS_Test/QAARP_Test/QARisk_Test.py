@@ -0,0 +1,160 @@
+import json
+import math
+import random
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+import QUANTAXIS as QA
+from QUANTAXIS.QAARP import QARisk
+from QUANTAXIS.QAData import QA_DataStruct_Index_day, QA_DataStruct_Stock_day
+from QUANTAXIS.QAUtil.QADate_trade import QA_util_get_trade_range
+
+START, END = '2019-01-02', '2019-03-29'
+CODES = ['000001', '000002']
+
+
+def make_bars(codes, seed):
+    rng = random.Random(seed)
+    rows = []
+    for code in codes:
+        close = 10.0
+        for date in QA_util_get_trade_range(START, END):
+            close = round(close * (1 + rng.uniform(-0.03, 0.03)), 2)
+            rows.append([pd.Timestamp(date), code, close, close, close, close,
+                         1e6, close * 1e6])
+    return pd.DataFrame(
+        rows,
+        columns=['date', 'code', 'open', 'high', 'low', 'close', 'volume', 'amount']
+    ).set_index(['date', 'code'])
+
+
+def make_account(account_cookie, seed, market_data):
+    rng = random.Random(seed)
+    account = QA.QA_Account(
+        user_cookie='test',
+        portfolio_cookie='test',
+        account_cookie=account_cookie,
+        init_cash=1e6,
+        start=START,
+        end=END
+    )
+    for date in QA_util_get_trade_range(START, END):
+        code = rng.choice(CODES)
+        towards = QA.ORDER_DIRECTION.BUY
+        if account.sell_available.get(code, 0) > 0 and rng.random() < 0.5:
+            towards = QA.ORDER_DIRECTION.SELL
+        trade(account, market_data, date, code, towards)
+        account.settle()
+    return account
+
+
+def trade(account, market_data, date, code, towards):
+    account.receive_simpledeal(
+        code=code,
+        trade_price=float(market_data.loc[(pd.Timestamp(date), code), 'close']),
+        trade_amount=100,
+        trade_towards=towards,
+        trade_time='{} 10:00:00'.format(date)
+    )
+
+
+def reference_metrics(risk):
+    """改成缓存之前 QA_Risk 的算法, 用来对照"""
+    account = risk.account
+    market_value = (
+        risk.market_data.pivot('close').fillna(method='ffill') *
+        account.daily_hold.apply(abs)
+    ).fillna(method='ffill')
+    _assets = (
+        market_value.sum(axis=1) + account.daily_cash.set_index('date').cash
+    ).fillna(method='pad')
+    x1 = _assets.reset_index()
+    assets = x1.assign(date=pd.to_datetime(x1.date)).set_index('date')[0]
+    return {
+        'assets': list(assets),
+        'max_dropback': round(float(max([
+            (assets.iloc[idx] - assets.iloc[idx::].min()) / assets.iloc[idx]
+            for idx in range(len(assets))
+        ])), 2),
+        'profit': round(float(risk.calc_profit(assets)), 2),
+        'annualize_return': round(
+            float(risk.calc_annualize_return(assets, risk.time_gap)), 2),
+        'volatility': round(
+            float(risk.calc_profitpctchange(assets).std() * math.sqrt(250)), 2),
+        'profit_money': float(round(assets.iloc[-1] - assets.iloc[0], 2)),
+        'last_assets': '%0.2f' % float(assets.iloc[-1])
+    }
+
+
+class QARisk_Test(unittest.TestCase):
+
+    def setUp(self):
+        self.bars = make_bars(CODES, 0)
+        self.market_data = QA_DataStruct_Stock_day(self.bars)
+        self.benchmark = QA_DataStruct_Index_day(make_bars(['000300'], 1))
+        self.patches = [
+            mock.patch.object(QARisk, 'DATABASE', mock.MagicMock()),
+            mock.patch.object(QARisk, 'QA_fetch_index_day_adv',
+                              lambda code, start, end: self.benchmark)
+        ]
+        for patch in self.patches:
+            patch.start()
+
+    def tearDown(self):
+        for patch in self.patches:
+            patch.stop()
+
+    def make_risk(self, account):
+        return QA.QA_Risk(account, if_fq=False, market_data=self.market_data)
+
+    def assertMetrics(self, risk):
+        message = risk.message
+        for key, value in reference_metrics(risk).items():
+            self.assertEqual(message[key], value, key)
+
+    def test_reference(self):
+        risk = self.make_risk(make_account('test_risk', 0, self.bars))
+        self.assertMetrics(risk)
+
+    def test_account_update(self):
+        account = make_account('test_risk', 0, self.bars)
+        risk = self.make_risk(account)
+        last_assets = risk.message['last_assets']
+        # 账户有了新的成交之后重新计算, 不会返回缓存的结果
+        trade(account, self.bars, END, '000001', QA.ORDER_DIRECTION.BUY)
+        self.assertNotEqual(risk.message['last_assets'], last_assets)
+        self.assertMetrics(risk)
+        # 没有新的成交时直接用缓存
+        self.assertIs(risk.message, risk.message)
+
+    def test_batch(self):
+        accounts = [make_account('test_risk_{}'.format(seed), seed, self.bars)
+                    for seed in range(2)]
+        save = mock.MagicMock()
+        with mock.patch.object(QARisk, 'save_riskanalysis_many', save):
+            res = QA.QA_batch_risk(
+                accounts,
+                if_fq=False,
+                market_data={QA.MARKET_TYPE.STOCK_CN: self.market_data},
+                if_save=True
+            )
+        self.assertEqual(res.index.tolist(), ['test_risk_0', 'test_risk_1'])
+        for account in accounts:
+            risk = self.make_risk(account)
+            message = risk.message
+            row = res.loc[account.account_cookie]
+            for key in ['time_gap', 'profit', 'annualize_return', 'bm_annualizereturn',
+                        'volatility', 'sharpe', 'max_dropback', 'beta', 'alpha']:
+                self.assertAlmostEqual(row[key], message[key], msg=key)
+            self.assertAlmostEqual(row['sortino'], risk.sortino)
+        # 写入 risk 表的是 json 原生类型
+        records = save.call_args[0][0]
+        self.assertEqual([item['account_cookie'] for item in records], res.index.tolist())
+        self.assertEqual(json.loads(json.dumps(records)), records)
+        self.assertIsInstance(records[0]['time_gap'], int)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from QUANTAXIS.QAData import QA_DataStruct_Stock_day
+
+
+def make_stock_day(codes=('000001', '300439', '600000'), days=60, seed=0):
+    rng = np.random.RandomState(seed)
+    rows = [(day, code) for code in codes
+            for day in pd.date_range('2019-01-01', periods=days)
+            if rng.rand() < 0.8]
+    data = pd.DataFrame(rows, columns=['date', 'code'])
+    for field in ['open', 'high', 'low', 'close', 'volume', 'amount']:
+        data[field] = rng.rand(len(data))
+    return data.set_index(['date', 'code'])
+
+
+class columnar_datastruct_test(unittest.TestCase):
+
+    def setUp(self):
+        self.frame = QA_DataStruct_Stock_day(make_stock_day())
+        self.columnar = self.frame.to_columnar()
+
+    def test_storage(self):
+        self.assertEqual(self.frame.storage, 'frame')
+        self.assertEqual(self.columnar.storage, 'columnar')
+        self.assertEqual(len(self.frame), len(self.columnar))
+        self.assertEqual(list(self.frame.code), list(self.columnar.code))
+        pd.testing.assert_frame_equal(self.frame.data, self.columnar.data)
+        pd.testing.assert_frame_equal(self.frame(), self.columnar())
+
+    def test_select(self):
+        pd.testing.assert_frame_equal(
+            self.frame.select_code('300439').data,
+            self.columnar.select_code('300439').data
+        )
+        pd.testing.assert_frame_equal(
+            self.frame.select_code(['600000', '000001']).data,
+            self.columnar.select_code(['600000', '000001']).data
+        )
+        pd.testing.assert_frame_equal(
+            self.frame.select_time('2019-01-10', '2019-02-01').data,
+            self.columnar.select_time('2019-01-10', '2019-02-01').data
+        )
+        pd.testing.assert_frame_equal(
+            self.frame.selects('600000', '2019-01-10').data,
+            self.columnar.selects('600000', '2019-01-10').data
+        )
+        self.assertRaises(ValueError, self.columnar.select_code, '999999')
+
+    def test_view(self):
+        data = self.frame.data
+        pd.testing.assert_frame_equal(
+            self.frame.select_time('2019-01-10', '2019-02-01').data,
+            data.loc[(slice(pd.Timestamp('2019-01-10'), pd.Timestamp('2019-02-01')), slice(None)), :]
+        )
+        pd.testing.assert_frame_equal(
+            self.frame.select_code(['600000', '000001']).data,
+            data.loc[(slice(None), ['000001', '600000']), :].sort_index()
+        )
+        part = data.iloc[10:20]
+        view = self.frame.new(part, view=True)
+        self.assertIs(view.data, part)
+        self.assertEqual(len(view), 10)
+
+    def test_get_bar(self):
+        date, code = self.frame.data.index[10]
+        pd.testing.assert_series_equal(
+            self.frame.get_bar(code, date),
+            self.columnar.get_bar(code, date)
+        )
+        self.assertRaises(
+            ValueError,
+            self.columnar.get_bar,
+            '000001',
+            '2030-01-01'
+        )
+
+    def test_bar_index(self):
+        date, code = self.frame.data.index[25]
+        bar = self.frame.data.loc[(date, code)].to_dict()
+        for ds in [self.frame, self.columnar]:
+            self.assertEqual(ds.get_dict(str(date)[0:10], code), bar)
+            self.assertEqual(ds.find_bar(code, str(date)[0:10]), bar)
+            self.assertRaises(KeyError, ds.get_dict, '2030-01-01', code)
+            # 和原来的 to_dict('index') 一样返回 python 标量
+            self.assertEqual(
+                {type(value) for value in ds.get_dict(date, code).values()},
+                {float})
+            # 每个代码第一根 bar 之前/最后一根之后都查不到
+            self.assertRaises(KeyError, ds.get_dict, '2018-12-31', code)
+            self.assertRaises(ValueError, ds.get_bar, '000002', date)
+            pd.testing.assert_frame_equal(
+                ds.select_time_with_gap(date, 3, 'lte').data,
+                self.frame.data.loc[:date].groupby(level=1).tail(3).sort_index()
+            )
+
+    def test_generators(self):
+        for item_frame, item_columnar in zip(self.frame.panel_gen, self.columnar.panel_gen):
+            pd.testing.assert_frame_equal(item_frame.data, item_columnar.data)
+        for item_frame, item_columnar in zip(self.frame.security_gen, self.columnar.security_gen):
+            pd.testing.assert_frame_equal(item_frame.data, item_columnar.data)
+
+
+if __name__ == '__main__':
+    unittest.main()
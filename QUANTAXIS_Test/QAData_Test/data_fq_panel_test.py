@@ -0,0 +1,160 @@
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from QUANTAXIS.QAData import data_fq
+from QUANTAXIS.QAData.data_fq import (QA_data_calc_adj_factor,
+                                      QA_data_stock_to_fq_panel,
+                                      _QA_data_stock_to_fq,
+                                      _QA_data_stock_to_fq_factor,
+                                      _QA_data_stock_to_fq_panel)
+
+
+class QAData_fq_panel_test(unittest.TestCase):
+    '''
+    多代码一次复权(_QA_data_stock_to_fq_panel) 和 逐个代码复权(_QA_data_stock_to_fq) 的结果对比
+    '''
+
+    def setUp(self):
+        rng = np.random.RandomState(3)
+        days = pd.bdate_range('2018-01-01', periods=200)
+        codes = ['000001', '000002', '600000', '600004', '300439']
+        rows = [(day, code) for code in codes
+                for day in days[rng.randint(0, 60):rng.randint(140, 200)]
+                if rng.rand() < 0.9]
+        data = pd.DataFrame(rows, columns=['date', 'code'])
+        for field in ['open', 'high', 'low', 'close']:
+            data[field] = rng.rand(len(data)) * 10 + 5
+        data['volume'] = rng.randint(1, 1000, len(data)).astype(float)
+        data['amount'] = rng.rand(len(data))
+        self.bfq = data.set_index(['date', 'code']).sort_index()
+
+        xdxr = []
+        # 最后一个代码没有除权信息, 非交易日的除权日也会出现
+        for code in codes[:-1]:
+            for day in pd.date_range('2017-12-01', '2018-12-31')[rng.choice(396, 6, replace=False)]:
+                xdxr.append({
+                    'code': code,
+                    'date': day,
+                    'category': 1 if rng.rand() < 0.8 else 2,
+                    'fenhong': rng.rand() * 3,
+                    'peigu': rng.choice([0, 0, 1.5]),
+                    'peigujia': rng.rand() * 5,
+                    'songzhuangu': rng.choice([0, 0, 2, 10])
+                })
+        self.xdxr = pd.DataFrame(xdxr)
+
+    def per_code(self, fqtype):
+        def _fq(data):
+            code = data.index.remove_unused_levels().levels[1][0]
+            xdxr = self.xdxr[self.xdxr.code == code]
+            return _QA_data_stock_to_fq(
+                data,
+                xdxr.set_index(['date', 'code'], drop=False).sort_index(),
+                fqtype
+            )
+        return self.bfq.groupby(level=1, group_keys=False).apply(_fq).sort_index()
+
+    def test_qfq(self):
+        pd.testing.assert_frame_equal(
+            self.per_code('qfq'),
+            _QA_data_stock_to_fq_panel(self.bfq, self.xdxr, 'qfq'),
+            check_dtype=False
+        )
+
+    def test_hfq(self):
+        pd.testing.assert_frame_equal(
+            self.per_code('hfq'),
+            _QA_data_stock_to_fq_panel(self.bfq, self.xdxr, 'hfq'),
+            check_dtype=False
+        )
+
+    def test_no_xdxr(self):
+        res = _QA_data_stock_to_fq_panel(self.bfq, self.xdxr.iloc[:0], 'qfq')
+        self.assertEqual(len(res), len(self.bfq.query('open != 0')))
+
+    def test_adj_factor(self):
+        '复权因子表(stock_adj)复权和现算的结果一致'
+        factor = QA_data_calc_adj_factor(self.bfq, self.xdxr)
+        for fqtype in ['qfq', 'hfq']:
+            pd.testing.assert_frame_equal(
+                _QA_data_stock_to_fq_panel(self.bfq, self.xdxr, fqtype),
+                _QA_data_stock_to_fq_factor(self.bfq, factor, fqtype),
+                check_dtype=False
+            )
+        # 只用一段行情复权, 因子表还是全量的
+        part = self.bfq.loc[pd.Timestamp('2018-03-01'):pd.Timestamp('2018-07-01')]
+        for fqtype in ['qfq', 'hfq']:
+            pd.testing.assert_frame_equal(
+                _QA_data_stock_to_fq_panel(part, self.xdxr, fqtype),
+                _QA_data_stock_to_fq_factor(part, factor, fqtype),
+                check_dtype=False
+            )
+        res = _QA_data_stock_to_fq_factor(self.bfq, factor.iloc[:0], 'qfq')
+        self.assertTrue((res['adj'] == 1).all())
+
+    def test_adj_factor_stale(self):
+        '因子表缺少除权事件的代码按 stock_xdxr 现算, 其余代码照样用因子表'
+        factor = QA_data_calc_adj_factor(self.bfq, self.xdxr)
+        # 000002 在行情区间内的最后一次除权还没有写进因子表
+        ex_date = self.xdxr.query('code == "000002" and category == 1')['date']
+        ex_date = ex_date[ex_date <= self.bfq.xs('000002', level=1).index.max()].max()
+        stale = factor[(factor.code == '000002') & (factor.date == ex_date)]
+        self.assertEqual(len(stale), 1)
+        factor = factor.drop(stale.index)
+
+        with mock.patch.object(data_fq, '_QA_fetch_stock_adj',
+                               lambda code: factor), \
+                mock.patch.object(data_fq, '_QA_fetch_stock_xdxr_panel',
+                                  lambda code: self.xdxr):
+            res = QA_data_stock_to_fq_panel(self.bfq, 'qfq')
+            self.assertEqual(
+                data_fq._QA_data_stock_adj_stale(self.bfq, factor, self.xdxr),
+                ['000002']
+            )
+        pd.testing.assert_frame_equal(
+            res,
+            _QA_data_stock_to_fq_panel(self.bfq, self.xdxr, 'qfq'),
+            check_dtype=False
+        )
+
+    def test_min(self):
+        '分钟线: 除权日当天第一根bar的 preclose 是除权后的理论价格'
+        rng = np.random.RandomState(0)
+        times = [day + pd.Timedelta(minutes=571 + i)
+                 for day in pd.bdate_range('2018-01-01', periods=10)
+                 for i in range(4)]
+        data = pd.DataFrame({'datetime': times, 'code': '000001'})
+        for field in ['open', 'high', 'low', 'close']:
+            data[field] = rng.rand(len(data)) * 10 + 5
+        data['volume'] = 1.0
+        data['amount'] = 1.0
+        bfq = data.set_index(['datetime', 'code'])
+        xdxr = pd.DataFrame([{
+            'code': '000001', 'date': pd.Timestamp('2018-01-05'), 'category': 1,
+            'fenhong': 1.0, 'peigu': 0, 'peigujia': 0, 'songzhuangu': 5
+        }])
+        factor = QA_data_calc_adj_factor(bfq, xdxr)
+        res = _QA_data_stock_to_fq_factor(bfq, factor, 'qfq')
+        pd.testing.assert_frame_equal(
+            _QA_data_stock_to_fq(
+                bfq, xdxr.set_index(['date', 'code'], drop=False), 'qfq'
+            ),
+            res.loc[:, bfq.columns.tolist() + ['preclose', 'adj']],
+            check_dtype=False,
+            check_names=False
+        )
+        pd.testing.assert_frame_equal(
+            _QA_data_stock_to_fq_panel(bfq, xdxr, 'qfq'),
+            res,
+            check_dtype=False
+        )
+        close_prev = bfq['close'].iloc[15]
+        first = res.loc[(pd.Timestamp('2018-01-05 09:31'), '000001')]
+        self.assertAlmostEqual(first['preclose'], (close_prev * 10 - 1) / 15)
+        self.assertAlmostEqual(res['adj'].iloc[0] * close_prev, (close_prev * 10 - 1) / 15)
+
+if __name__ == '__main__':
+    unittest.main()
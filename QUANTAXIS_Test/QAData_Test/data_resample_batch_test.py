@@ -0,0 +1,92 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from QUANTAXIS.QAData.data_resample import (QA_data_min_resample,
+                                            QA_data_min_resample_batch)
+from QUANTAXIS.QAUtil.QADate import QA_util_time_stamp, QA_util_time_stamp_array
+
+
+def make_stock_min(codes=('000001', '600000'), days=('2019-01-02', '2019-01-03'), seed=0):
+    rng = np.random.RandomState(seed)
+    times = [
+        item for day in days for item in
+        list(pd.date_range(day + ' 09:31', day + ' 11:30', freq='min')) +
+        list(pd.date_range(day + ' 13:01', day + ' 15:00', freq='min'))
+    ]
+    frames = []
+    for code in codes:
+        close = 10 + rng.randn(len(times)).cumsum() * 0.01
+        frames.append(pd.DataFrame({
+            'open': close + rng.rand(len(times)) * 0.01,
+            'close': close,
+            'high': close + 0.02,
+            'low': close - 0.02,
+            'vol': rng.randint(1, 1000, len(times)).astype(float),
+            'amount': rng.rand(len(times)) * 1e5,
+            'datetime': [str(item) for item in times],
+            'code': code,
+            'date': [str(item)[0:10] for item in times],
+            'time_stamp': QA_util_time_stamp_array(times),
+            'type': '1min'
+        }))
+    # 顺序打乱, 结果应该和顺序无关
+    return pd.concat(frames).sample(frac=1, random_state=seed)
+
+
+class data_resample_batch_test(unittest.TestCase):
+
+    def test_stock(self):
+        data = make_stock_min()
+        res = QA_data_min_resample_batch(data)
+        self.assertEqual(sorted(res.keys()), ['15min', '30min', '5min', '60min'])
+        for type_, count in [('5min', 48), ('15min', 16), ('30min', 8), ('60min', 4)]:
+            bars = res[type_]
+            self.assertEqual(len(bars), count * 2 * 2)
+            self.assertEqual(list(bars.columns), list(data.columns))
+            self.assertEqual(set(bars['type']), {type_})
+            for code in ['000001', '600000']:
+                one = data[data['code'] == code].assign(
+                    datetime=lambda x: pd.to_datetime(x['datetime'])
+                ).set_index('datetime').sort_index()
+                expect = QA_data_min_resample(one, type_)
+                got = bars[bars['code'] == code].assign(
+                    datetime=lambda x: pd.to_datetime(x['datetime'])
+                ).set_index(['datetime', 'code'])[list(expect.columns)]
+                pd.testing.assert_frame_equal(got, expect, check_dtype=False)
+        self.assertEqual(
+            list(res['60min']['datetime'].iloc[0:4]),
+            ['2019-01-02 10:30:00', '2019-01-02 11:30:00',
+             '2019-01-02 14:00:00', '2019-01-02 15:00:00']
+        )
+        self.assertEqual(
+            res['30min']['time_stamp'].iloc[0],
+            QA_util_time_stamp('2019-01-02 10:00:00')
+        )
+
+    def test_future(self):
+        times = pd.DatetimeIndex(
+            list(pd.date_range('2019-01-02 21:01', '2019-01-02 23:00', freq='min')) +
+            list(pd.date_range('2019-01-03 09:01', '2019-01-03 10:15', freq='min')) +
+            list(pd.date_range('2019-01-03 10:31', '2019-01-03 11:30', freq='min')) +
+            list(pd.date_range('2019-01-03 13:31', '2019-01-03 15:00', freq='min'))
+        )
+        data = pd.DataFrame({
+            'open': 1.0, 'close': 1.0, 'high': 1.0, 'low': 1.0,
+            'position': np.arange(len(times)), 'trade': 1.0,
+            'datetime': times.astype(str), 'code': 'RBL8', 'type': '1min'
+        })
+        bars = QA_data_min_resample_batch(data, ['60min'], 'future')['60min']
+        self.assertEqual(list(bars['datetime'].str[11:16]), [
+            '22:00', '23:00', '10:00', '11:00', '11:30', '14:00', '15:00'])
+        self.assertEqual(list(bars['trade']), [60, 60, 60, 45, 30, 30, 60])
+        self.assertEqual(bars['position'].iloc[-1], len(times) - 1)
+        # 中金所和股票一样从 9:30/13:00 切分
+        data = make_stock_min(codes=('IFL8',), days=('2019-01-02',))
+        bars = QA_data_min_resample_batch(data, ['60min'], 'future')['60min']
+        self.assertEqual(list(bars['datetime'].str[11:16]), ['10:30', '11:30', '14:00', '15:00'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+"""
+QA_DataStruct 切片的 benchmark
+
+对比三种切片方式:
+
+    rebuild  : 旧的方式, 切片后重新走 __init__ (drop_duplicates/sort_index/remove_unused_levels)
+    view     : new(view=True), 直接共享父结构的数据
+    columnar : to_columnar() 之后在数组上切片
+
+python datastruct_view_benchmark.py [codes] [bars]
+"""
+
+import sys
+import timeit
+
+import numpy as np
+import pandas as pd
+
+from QUANTAXIS.QAData import QA_DataStruct_Stock_min
+
+
+def make_stock_min(codes=200, bars=2400, seed=0):
+    rng = np.random.RandomState(seed)
+    datetime = pd.date_range('2019-01-02 09:31:00', periods=bars, freq='min')
+    code = ['{:06d}'.format(i) for i in range(codes)]
+    index = pd.MultiIndex.from_product([datetime, code], names=['datetime', 'code'])
+    price = rng.rand(len(index)) * 10 + 10
+    data = pd.DataFrame(
+        {
+            'open': price,
+            'high': price + 0.1,
+            'low': price - 0.1,
+            'close': price,
+            'volume': rng.randint(100, 10000, len(index)).astype(float),
+            'amount': price * 1000,
+            'type': '1min'
+        },
+        index=index
+    )
+    return QA_DataStruct_Stock_min(data)
+
+
+def rebuild_select_code(ds, code):
+    return ds.new(ds.data.loc[(slice(None), code), :], ds.type, ds.if_fq)
+
+
+def rebuild_select_time(ds, start, end):
+    return ds.new(
+        ds.data.loc[(slice(pd.Timestamp(start),
+                           pd.Timestamp(end)),
+                     slice(None)),
+                    :],
+        ds.type,
+        ds.if_fq
+    )
+
+
+def run(codes=200, bars=2400, number=3):
+    ds = make_stock_min(codes, bars)
+    columnar = ds.to_columnar()
+    code_list = list(ds.code)[:20]
+    times = ds.datetime
+    windows = [(times[i], times[i + 60]) for i in range(0, len(times) - 60, len(times) // 20)]
+
+    cases = {
+        'select_code rebuild': lambda: [rebuild_select_code(ds, code) for code in code_list],
+        'select_code view': lambda: [ds.select_code(code) for code in code_list],
+        'select_code columnar': lambda: [columnar.select_code(code) for code in code_list],
+        'select_time rebuild': lambda: [rebuild_select_time(ds, start, end) for start, end in windows],
+        'select_time view': lambda: [ds.select_time(start, end) for start, end in windows],
+        'select_time columnar': lambda: [columnar.select_time(start, end) for start, end in windows],
+    }
+
+    print('rows: {} codes: {} bars: {}'.format(len(ds), codes, bars))
+    for name, func in cases.items():
+        cost = min(timeit.repeat(func, number=1, repeat=number))
+        print('{:<24}{:>10.4f}s'.format(name, cost))
+
+
+if __name__ == '__main__':
+    run(*[int(item) for item in sys.argv[1:3]])
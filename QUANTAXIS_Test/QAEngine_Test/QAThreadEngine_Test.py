@@ -0,0 +1,102 @@
+import threading
+import time
+import unittest
+
+from QUANTAXIS.QAEngine.QATask import QA_Task
+from QUANTAXIS.QAEngine.QAThreadEngine import QA_Engine, QA_Thread
+
+
+class counter():
+
+    def __init__(self):
+        self.count = 0
+        self.lock = threading.Lock()
+
+    def run(self, event):
+        with self.lock:
+            self.count += 1
+        return event
+
+
+class QAThreadEngine_Test(unittest.TestCase):
+
+    def test_batch(self):
+        worker = counter()
+        thread = QA_Thread(queue_timeout=0.05, batch_size=8, daemon=True)
+        for i in range(100):
+            thread.put(QA_Task(worker, i))
+        thread.start()
+        thread.queue.join()
+        stats = thread.stats()
+        self.assertEqual(worker.count, 100)
+        self.assertEqual(stats['processed'], 100)
+        self.assertEqual(stats['max_depth'], 100)
+        self.assertEqual(stats['max_batch'], 8)
+        self.assertLessEqual(stats['batches'], 13)
+        thread.stop()
+        thread.join(1)
+        self.assertFalse(thread.is_alive())
+
+    def test_idle_and_stop(self):
+        thread = QA_Thread(queue_timeout=0.05, daemon=True)
+        thread.start()
+        # 没有任务的时候阻塞在队列上, 不占用 cpu
+        _time = time.process_time()
+        time.sleep(0.3)
+        self.assertLess(time.process_time() - _time, 0.1)
+        self.assertTrue(thread.idle)
+        thread.pause()
+        thread.stop()
+        thread.join(1)
+        self.assertFalse(thread.is_alive())
+
+    def test_pause(self):
+        worker = counter()
+        thread = QA_Thread(queue_timeout=0.05, daemon=True)
+        thread.start()
+        thread.pause()
+        thread.put(QA_Task(worker, 1))
+        time.sleep(0.2)
+        self.assertEqual(worker.count, 0)
+        thread.resume()
+        thread.queue.join()
+        self.assertEqual(worker.count, 1)
+        thread.stop()
+
+    def test_engine(self):
+        worker = counter()
+        res = []
+        engine = QA_Engine(queue_timeout=0.05, daemon=True)
+        engine.create_kernel('backtest', daemon=True, queue_timeout=0.05)
+        engine.start_kernel('backtest')
+        engine.start()
+        for i in range(20):
+            engine.put(QA_Task(worker, i, engine='backtest', callback=res.append))
+        engine.put(QA_Task(worker, 'engine'))
+        engine.queue.join()
+        engine.kernels_dict['backtest'].queue.join()
+        self.assertEqual(res, list(range(20)))
+        self.assertEqual(worker.count, 21)
+        self.assertEqual(engine.stats()['kernels']['backtest']['processed'], 20)
+        engine.stop_all()
+        engine.stop()
+
+    def test_override_run(self):
+
+        class loop(QA_Thread):
+
+            def run(self):
+                while self.running:
+                    self.sleep(10)
+
+        thread = loop(daemon=True)
+        thread.start()
+        _time = time.time()
+        thread.stop()
+        thread.join(1)
+        self.assertFalse(thread.is_alive())
+        self.assertLess(time.time() - _time, 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
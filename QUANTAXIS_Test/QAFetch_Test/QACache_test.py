@@ -0,0 +1,168 @@
+import threading
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from QUANTAXIS.QAFetch.QACache import QA_DataCache
+
+
+class FakeCollection():
+    full_name = 'quantaxis.stock_day'
+
+
+def make_stock_day(codes=('000001', '000002', '600000'), days=100, seed=0):
+    rng = np.random.RandomState(seed)
+    data = pd.DataFrame(
+        [(day, code) for day in pd.date_range('2019-01-01', periods=days)
+         for code in codes if rng.rand() < 0.9],
+        columns=['date', 'code']
+    )
+    data['close'] = rng.rand(len(data))
+    return data
+
+
+class QACache_test(unittest.TestCase):
+
+    def setUp(self):
+        self.data = make_stock_day()
+        self.queries = []
+
+    def select(self, code, start, end):
+        return self.data[self.data['code'].isin(code)
+                         & (self.data['date'] >= start)
+                         & (self.data['date'] <= end)]
+
+    def fetch(self, code, start, end):
+        self.queries.append((sorted(code), start, end))
+        res = self.select(code, start, end)
+        return res if len(res) > 0 else None
+
+    def expect(self, code, start, end):
+        return self.select(code, start, end).sort_values(['code', 'date'])
+
+    def cached(self, cache, code, start, end):
+        res = cache.fetch('stock_day', FakeCollection(), 'day', code, start, end, self.fetch)
+        return res.sort_values(['code', 'date'])
+
+    def test_sub_range(self):
+        cache = QA_DataCache()
+        codes = ['000001', '600000']
+        pd.testing.assert_frame_equal(
+            self.cached(cache, codes, '2019-01-01', '2019-03-01'),
+            self.expect(codes, '2019-01-01', '2019-03-01')
+        )
+        self.queries = []
+        pd.testing.assert_frame_equal(
+            self.cached(cache, '000001', '2019-01-10', '2019-02-10'),
+            self.expect(['000001'], '2019-01-10', '2019-02-10')
+        )
+        self.assertEqual(self.queries, [])
+        stats = cache.stats()
+        self.assertEqual((stats['hits'], stats['misses']), (1, 2))
+
+    def test_coalesce(self):
+        cache = QA_DataCache()
+        self.cached(cache, '000002', '2019-01-01', '2019-01-31')
+        self.cached(cache, '000002', '2019-03-01', '2019-03-31')
+        self.queries = []
+        pd.testing.assert_frame_equal(
+            self.cached(cache, '000002', '2019-01-15', '2019-03-15'),
+            self.expect(['000002'], '2019-01-15', '2019-03-15')
+        )
+        # 只查中间的空档, 之后三段合并成一段
+        self.assertEqual(self.queries, [(['000002'], '2019-02-01', '2019-02-28')])
+        self.assertEqual(cache.stats()['segments'], 1)
+
+    def test_evict(self):
+        cache = QA_DataCache()
+        self.cached(cache, '000001', '2019-01-01', '2019-04-10')
+        self.cached(cache, '600000', '2019-01-01', '2019-04-10')
+        size = cache.stats()['bytes']
+        cache.resize(size - 1)
+        stats = cache.stats()
+        self.assertEqual(stats['evictions'], 1)
+        self.assertEqual(stats['segments'], 1)
+        self.assertLess(stats['bytes'], size)
+        cache.resize(0)
+        self.assertEqual(cache.stats()['bytes'], 0)
+
+    def test_empty(self):
+        cache = QA_DataCache()
+        # 000003 没有数据, 空档也记录为已覆盖, 再查不会访问数据库
+        self.assertIsNone(cache.fetch(
+            'stock_day', FakeCollection(), 'day', '000003', '2019-01-01', '2019-01-31', self.fetch))
+        self.assertEqual(cache.stats()['segments'], 1)
+        self.queries = []
+        self.assertIsNone(cache.fetch(
+            'stock_day', FakeCollection(), 'day', '000003', '2019-01-10', '2019-01-20', self.fetch))
+        self.assertEqual(self.queries, [])
+        # 补存数据之后 invalidate 才能查到
+        self.data = pd.concat([self.data, make_stock_day(codes=('000003',), days=31)])
+        cache.invalidate(FakeCollection(), '000003')
+        pd.testing.assert_frame_equal(
+            self.cached(cache, '000003', '2019-01-01', '2019-01-31'),
+            self.expect(['000003'], '2019-01-01', '2019-01-31')
+        )
+        # 向后扩展到没有数据的区间, 已缓存的部分照样返回, 没有数据的部分也合并进来
+        self.queries = []
+        pd.testing.assert_frame_equal(
+            self.cached(cache, '000003', '2019-01-15', '2019-06-30'),
+            self.expect(['000003'], '2019-01-15', '2019-01-31')
+        )
+        self.assertEqual(self.queries, [(['000003'], '2019-02-01', '2019-06-30')])
+        self.assertEqual(cache.stats()['segments'], 1)
+        self.queries = []
+        pd.testing.assert_frame_equal(
+            self.cached(cache, '000003', '2019-01-01', '2019-06-30'),
+            self.expect(['000003'], '2019-01-01', '2019-01-31')
+        )
+        self.assertEqual(self.queries, [])
+
+    def test_concurrent(self):
+        cache = QA_DataCache()
+        barrier = threading.Barrier(2)
+
+        def fetch(code, start, end):
+            # 两个线程都算完空档之后才返回, 两份重叠的数据都会插入
+            barrier.wait(timeout=5)
+            return self.fetch(code, start, end)
+
+        def run(start, end):
+            cache.fetch('stock_day', FakeCollection(), 'day', ['000001', '000002'],
+                        start, end, fetch)
+
+        threads = [threading.Thread(target=run, args=args) for args in
+                   [('2019-01-01', '2019-02-28'), ('2019-02-01', '2019-03-31')]]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(self.queries), 2)
+        self.assertEqual(cache.stats()['segments'], 2)
+        self.queries = []
+        res = cache.fetch('stock_day', FakeCollection(), 'day', ['000001', '000002'],
+                          '2019-01-01', '2019-03-31', self.fetch)
+        self.assertEqual(self.queries, [])
+        self.assertFalse(res.duplicated(['code', 'date']).any())
+        for _, group in res.groupby('code'):
+            self.assertTrue(group['date'].is_monotonic_increasing)
+        pd.testing.assert_frame_equal(
+            res.sort_values(['code', 'date']),
+            self.expect(['000001', '000002'], '2019-01-01', '2019-03-31')
+        )
+
+    def test_invalidate(self):
+        cache = QA_DataCache()
+        self.cached(cache, ['000001', '600000'], '2019-01-01', '2019-03-01')
+        cache.invalidate(FakeCollection(), '000001')
+        self.assertEqual(cache.stats()['segments'], 1)
+        self.queries = []
+        self.cached(cache, ['000001', '600000'], '2019-01-01', '2019-03-01')
+        self.assertEqual(self.queries, [(['000001'], '2019-01-01', '2019-03-01')])
+        cache.invalidate()
+        self.assertEqual(cache.stats()['bytes'], 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,122 @@
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from QUANTAXIS.QAData import QA_DataStruct_Stock_day, QA_DataStruct_Stock_min
+from QUANTAXIS.QAFetch.QALocal import (QA_fetch_local_adv,
+                                       QA_fetch_local_codes,
+                                       QA_fetch_local_last_datetime)
+from QUANTAXIS.QASU.save_local import QA_SU_save_local_data
+
+
+def make_stock_day(codes=('000001', '300439', '600000'), start='2019-01-01', days=60, seed=0):
+    rng = np.random.RandomState(seed)
+    index = pd.MultiIndex.from_product(
+        [pd.date_range(start, periods=days), list(codes)],
+        names=['date', 'code']
+    )
+    data = pd.DataFrame(index=index)
+    for field in ['open', 'high', 'low', 'close', 'volume', 'amount']:
+        data[field] = rng.rand(len(data))
+    return data
+
+
+class QALocal_test(unittest.TestCase):
+
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def test_round_trip(self):
+        data = make_stock_day()
+        QA_SU_save_local_data(QA_DataStruct_Stock_day(data), 'stock', 'day', self.path)
+        self.assertEqual(
+            QA_fetch_local_codes('stock', 'day', self.path),
+            ['000001', '300439', '600000']
+        )
+        res = QA_fetch_local_adv(
+            ['600000', '000001'],
+            '2019-01-10',
+            '2019-02-01',
+            path=self.path
+        )
+        self.assertEqual(res.storage, 'columnar')
+        self.assertEqual(res.type, 'stock_day')
+        pd.testing.assert_frame_equal(
+            res.data,
+            data.loc[(slice('2019-01-10', '2019-02-01'), ['000001', '600000']), :]
+        )
+        single = QA_fetch_local_adv('300439', path=self.path)
+        pd.testing.assert_frame_equal(
+            single.data,
+            data.loc[(slice(None), ['300439']), :]
+        )
+        self.assertIsNone(QA_fetch_local_adv('999999', path=self.path))
+        self.assertIsNone(QA_fetch_local_adv('000001', '2030-01-01', path=self.path))
+
+    def test_incremental(self):
+        first = make_stock_day(days=40)
+        # 最后 5 天重叠, 以新数据为准
+        second = make_stock_day(start='2019-02-05', days=20, seed=1)
+        QA_SU_save_local_data(first, 'stock', 'day', self.path)
+        QA_SU_save_local_data(second, 'stock', 'day', self.path)
+        self.assertEqual(
+            QA_fetch_local_last_datetime('000001', 'stock', 'day', self.path),
+            pd.Timestamp('2019-02-24')
+        )
+        expect = pd.concat([first.loc[:'2019-02-04'], second]).sort_index()
+        pd.testing.assert_frame_equal(
+            QA_fetch_local_adv(['000001', '300439', '600000'], path=self.path).data,
+            expect
+        )
+
+    def test_min(self):
+        index = pd.MultiIndex.from_product(
+            [pd.date_range('2019-01-02 09:31', periods=240, freq='min'), ['000001']],
+            names=['datetime', 'code']
+        )
+        data = pd.DataFrame(
+            {
+                'open': np.arange(240.0),
+                'high': np.arange(240.0),
+                'low': np.arange(240.0),
+                'close': np.arange(240.0),
+                'volume': np.arange(240.0),
+                'amount': np.arange(240.0),
+                'type': '1min'
+            },
+            index=index
+        )
+        QA_SU_save_local_data(QA_DataStruct_Stock_min(data), 'stock', '1min', self.path)
+        res = QA_fetch_local_adv('000001', '2019-01-02', '2019-01-02', 'stock', '1min', self.path)
+        self.assertEqual(res.type, 'stock_min')
+        self.assertEqual(len(res), 240)
+        self.assertEqual(list(res.data['type'].unique()), ['1min'])
+
+    def test_mixed_meta(self):
+        'codes saved with different fields/dtypes are each read with their own meta'
+        first = make_stock_day(codes=('000001',), days=10).assign(type='day')
+        second = make_stock_day(codes=('600000',), days=10, seed=1).assign(type='daily')
+        second['volume'] = np.arange(10)
+        second = second.drop('amount', axis=1)
+        QA_SU_save_local_data(first, 'stock', 'day', self.path)
+        QA_SU_save_local_data(second, 'stock', 'day', self.path)
+        res = QA_fetch_local_adv(['000001', '600000'], path=self.path).data
+        self.assertEqual(len(res), 20)
+        self.assertEqual(
+            res.xs('600000', level=1)['type'].tolist(), ['daily'] * 10)
+        self.assertEqual(res.xs('000001', level=1)['type'].tolist(), ['day'] * 10)
+        np.testing.assert_array_equal(
+            res.xs('600000', level=1)['volume'].values, np.arange(10.0))
+        np.testing.assert_array_equal(
+            res.xs('000001', level=1)['amount'].values, first['amount'].values)
+        self.assertTrue(res.xs('600000', level=1)['amount'].isnull().all())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,41 @@
+"""
+_QA_fetch_sharded 的扩展性 benchmark
+
+用 QAQuery_Advance_shard_test 里的 FakeMinCollection 代替 mongodb,
+每返回 10000 条记录 sleep latency 秒模拟一个 batch 的网络往返(和真实的 cursor 一样会释放 GIL)
+
+python QAQuery_Advance_shard_benchmark.py [codes] [days]
+"""
+
+import sys
+import time
+
+from QUANTAXIS.QAFetch.QAQuery import QA_fetch_stock_min
+from QUANTAXIS.QAFetch.QAQuery_Advance import _QA_fetch_sharded
+from QUANTAXIS_Test.QAFetch_Test.QAQuery_Advance_shard_test import FakeMinCollection
+
+
+def run(codes=400, days=250, latency=0.05):
+    code_list = ['{:06d}'.format(i) for i in range(codes)]
+    coll = FakeMinCollection(code_list, days, latency)
+    start, end = '2019-01-01 09:30:00', '2019-12-31 15:00:00'
+
+    begin = time.time()
+    rows = len(QA_fetch_stock_min(code_list, start, end, format='pd',
+                                  collections=coll, streaming=True))
+    print('{:<16}{:>8.2f}s  rows {}'.format('single query', time.time() - begin, rows))
+    for max_workers in [1, 2, 4, 8]:
+        begin = time.time()
+        rows = len(
+            _QA_fetch_sharded(
+                QA_fetch_stock_min, code_list, start, end, coll,
+                max_workers=max_workers, shard_size=max(codes // 16, 1),
+                streaming=True
+            )
+        )
+        print('{:<16}{:>8.2f}s  rows {}'.format(
+            'workers {}'.format(max_workers), time.time() - begin, rows))
+
+
+if __name__ == '__main__':
+    run(*[int(item) for item in sys.argv[1:3]])
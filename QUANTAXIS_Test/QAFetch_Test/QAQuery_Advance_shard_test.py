@@ -0,0 +1,84 @@
+import time
+import unittest
+
+import pandas as pd
+
+from QUANTAXIS.QAFetch.QAQuery import QA_fetch_stock_min
+from QUANTAXIS.QAFetch.QAQuery_Advance import (_QA_fetch_sharded,
+                                               _QA_split_date_range)
+from QUANTAXIS.QAUtil import QA_util_time_stamp
+
+
+class FakeMinCollection():
+    """只支持 code/$in + time_stamp 范围 + type 查询的 stock_min 替身
+
+    latency: 每返回 batch_size 条记录 sleep 一次, 模拟网络往返
+    """
+
+    def __init__(self, codes, days, latency=0):
+        self.latency = latency
+        self.items = {}
+        for code in codes:
+            items = self.items.setdefault(code, [])
+            for day in pd.bdate_range('2019-01-02', periods=days).strftime('%Y-%m-%d'):
+                for minute in ['09:31:00', '10:30:00', '14:00:00', '15:00:00']:
+                    items.append({
+                        'code': code,
+                        'open': 10.0,
+                        'high': 10.5,
+                        'low': 9.5,
+                        'close': 10.0 + len(items) % 7,
+                        'vol': 100.0,
+                        'amount': 1000.0,
+                        'datetime': '{} {}'.format(day, minute),
+                        'time_stamp': QA_util_time_stamp('{} {}'.format(day, minute)),
+                        'type': '1min'
+                    })
+
+    def find(self, filter, projection=None, batch_size=10000):
+        lo, hi = filter['time_stamp']['$gte'], filter['time_stamp']['$lte']
+        count = 0
+        for code in filter['code']['$in']:
+            for item in self.items.get(code, []):
+                if lo <= item['time_stamp'] <= hi:
+                    count += 1
+                    if self.latency and count % batch_size == 0:
+                        time.sleep(self.latency)
+                    yield dict(item)
+
+
+class QAQuery_Advance_shard_test(unittest.TestCase):
+
+    def test_split_date_range(self):
+        self.assertEqual(
+            _QA_split_date_range('2019-01-01', '2019-01-10', 3),
+            [('2019-01-01', '2019-01-04'),
+             ('2019-01-05', '2019-01-08'),
+             ('2019-01-09', '2019-01-10')]
+        )
+        self.assertEqual(
+            _QA_split_date_range('2019-01-01 09:30:00', '2019-01-02 15:00:00', 4),
+            [('2019-01-01 09:30:00', '2019-01-01 23:59:59'),
+             ('2019-01-02 00:00:00', '2019-01-02 15:00:00')]
+        )
+
+    def test_sharded(self):
+        codes = ['{:06d}'.format(i) for i in range(7)]
+        coll = FakeMinCollection(codes, 12)
+        start, end = '2019-01-03 09:30:00', '2019-01-15 15:00:00'
+        res = QA_fetch_stock_min(codes, start, end, format='pd', collections=coll, streaming=True)
+        sharded = _QA_fetch_sharded(
+            QA_fetch_stock_min, codes, start, end, coll,
+            max_workers=3, shard_size=2, date_shards=4, streaming=True
+        )
+        pd.testing.assert_frame_equal(
+            res.set_index('code', append=True).sort_index(),
+            sharded.set_index('code', append=True).sort_index()
+        )
+        self.assertIsNone(
+            _QA_fetch_sharded(QA_fetch_stock_min, codes, '2020-01-01', '2020-01-05', coll)
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,121 @@
+import asyncio
+import threading
+import unittest
+
+import pandas as pd
+
+from QUANTAXIS.QAFetch import QAQuery, QAQuery_Async
+
+
+class FakeCollection():
+    '返回固定文档的同步表, 记录查询参数'
+
+    def __init__(self, items):
+        self.items = items
+        self.queries = []
+
+    def find(self, *args, **kwargs):
+        self.queries.append(('find', args, kwargs))
+        return [dict(item) for item in self.items]
+
+    def find_one(self, *args, **kwargs):
+        self.queries.append(('find_one', args, kwargs))
+        return dict(self.items[0])
+
+
+class FakeAsyncCursor():
+
+    def __init__(self, items, collection):
+        self.items = items
+        self.collection = collection
+
+    async def to_list(self, length=None):
+        self.collection.running += 1
+        self.collection.max_running = max(self.collection.running, self.collection.max_running)
+        await asyncio.sleep(0.01)
+        self.collection.running -= 1
+        return [dict(item) for item in self.items]
+
+
+class FakeAsyncCollection(FakeCollection):
+    '模拟 motor 的表'
+
+    running = 0
+    max_running = 0
+
+    def find(self, *args, **kwargs):
+        self.queries.append(('find', args, kwargs))
+        return FakeAsyncCursor(self.items, self)
+
+    async def find_one(self, *args, **kwargs):
+        self.queries.append(('find_one', args, kwargs))
+        return dict(self.items[0])
+
+
+class QAQuery_Async_test(unittest.TestCase):
+
+    def setUp(self):
+        self.items = [
+            {'code': code, 'open': 10.0 + i, 'high': 11.0 + i, 'low': 9.0 + i,
+             'close': 10.5 + i, 'vol': 1000.0 + i, 'amount': 1e6 + i,
+             'date': day, 'date_stamp': 0.0, 'name': 'name' + code}
+            for i, day in enumerate(['2019-01-02', '2019-01-03', '2019-01-04'])
+            for code in ['000001', '000002']
+        ]
+        self.loop = asyncio.new_event_loop()
+
+    def tearDown(self):
+        self.loop.close()
+
+    def run_async(self, coroutine):
+        return self.loop.run_until_complete(coroutine)
+
+    def test_mirror(self):
+        sync_coll, async_coll = FakeCollection(self.items), FakeAsyncCollection(self.items)
+        for streaming in [False, True]:
+            pd.testing.assert_frame_equal(
+                QAQuery.QA_fetch_stock_day(
+                    ['000001', '000002'], '2019-01-01', '2019-01-05', 'pd',
+                    collections=sync_coll, streaming=streaming),
+                self.run_async(QAQuery_Async.QA_fetch_stock_day(
+                    ['000001', '000002'], '2019-01-01', '2019-01-05', 'pd',
+                    collections=async_coll, streaming=streaming))
+            )
+        self.assertEqual(sync_coll.queries, async_coll.queries)
+        self.assertEqual(
+            self.run_async(QAQuery_Async.QA_fetch_stock_name('000001', collections=async_coll)),
+            QAQuery.QA_fetch_stock_name('000001', collections=sync_coll)
+        )
+
+    def test_gather(self):
+        async_coll = FakeAsyncCollection(self.items)
+        codes = ['{:06d}'.format(i) for i in range(20)]
+        res = self.run_async(QAQuery_Async.QA_fetch_async_multi(
+            QAQuery_Async.QA_fetch_stock_day, codes, '2019-01-01', '2019-01-05', 'pd',
+            collections=async_coll, concurrency=3
+        ))
+        self.assertEqual(len(res), 20)
+        self.assertEqual([query[1][0]['code']['$in'] for query in async_coll.queries],
+                         [[code] for code in codes])
+        self.assertEqual(async_coll.max_running, 3)
+
+    def test_replay_in_executor(self):
+        async_coll = FakeAsyncCollection(self.items)
+        threads = []
+
+        def fetch(code, collections):
+            threads.append(threading.get_ident())
+            data = collections.find({'code': code})
+            threads.append(threading.get_ident())
+            return pd.DataFrame(data)
+
+        res = self.run_async(QAQuery_Async._QA_fetch_async(
+            fetch, '000001', collections=async_coll))
+        self.assertEqual(len(res), len(self.items))
+        # 查到文档之后的数据处理不在事件循环的线程里
+        self.assertEqual(threads[0], threading.get_ident())
+        self.assertNotEqual(threads[-1], threading.get_ident())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,90 @@
+"""
+QA_fetch_stock_min 两种解码方式的 benchmark (不需要 mongodb)
+
+    dicts     : pd.DataFrame([item for item in cursor]) 原来的方式
+    streaming : QA_fetch_stock_min(..., streaming=True), cursor 分批解码成 numpy 列
+
+用一个假的 collection 模拟 pymongo 的 cursor(逐条生成新的 dict), 记录耗时和 tracemalloc 的峰值内存
+
+python QAQuery_streaming_benchmark.py [codes] [days]
+
+一年全市场的 1min 大约是 codes=3600 days=244, 可以先用小一点的参数看比例
+"""
+
+import sys
+import time
+import tracemalloc
+
+import pandas as pd
+
+from QUANTAXIS.QAFetch.QAQuery import QA_fetch_stock_min
+
+
+class FakeCollection():
+    '按 stock_min 的文档格式逐条生成数据, 支持 projection'
+
+    def __init__(self, codes, days):
+        self.codes = ['{:06d}'.format(i) for i in range(codes)]
+        self.days = pd.bdate_range('2019-01-02', periods=days)
+        self.minutes = pd.date_range('09:31', periods=240, freq='min').strftime('%H:%M:00')
+
+    def find(self, filter=None, projection=None, batch_size=None):
+        fields = ['open', 'close', 'high', 'low', 'vol', 'amount', 'datetime',
+                  'code', 'date', 'date_stamp', 'time_stamp', 'type']
+        keys = fields if projection is None else [
+            key for key in fields if projection.get(key)
+        ]
+        keys = keys if len(keys) > 0 else fields
+        for code in self.codes:
+            for day in self.days.strftime('%Y-%m-%d'):
+                for i, minute in enumerate(self.minutes):
+                    price = 10 + i * 0.01
+                    item = {
+                        'open': price,
+                        'close': price,
+                        'high': price,
+                        'low': price,
+                        'vol': 100.0 + i,
+                        'amount': price * (100.0 + i),
+                        'datetime': day + ' ' + minute,
+                        'code': code,
+                        'date': day,
+                        'date_stamp': 1546358400.0,
+                        'time_stamp': 1546392660.0,
+                        'type': '1min'
+                    }
+                    # pymongo 带 projection 时只解码需要的字段
+                    yield {key: item[key] for key in keys}
+
+
+def run(codes=100, days=20):
+    coll = FakeCollection(codes, days)
+    print('rows: {}'.format(codes * days * 240))
+    # 假 cursor 本身生成 dict 的耗时, 两种方式都包含这一部分
+    start = time.time()
+    for _ in coll.find():
+        pass
+    print('{:<12}{:>10.2f}s'.format('cursor', time.time() - start))
+    for name, streaming in [('dicts', False), ('streaming', True)]:
+        def fetch():
+            return QA_fetch_stock_min(
+                coll.codes,
+                '2019-01-01 09:30:00',
+                '2019-12-31 15:00:00',
+                format='pd',
+                collections=coll,
+                streaming=streaming
+            )
+
+        start = time.time()
+        rows = len(fetch())
+        cost = time.time() - start
+        # tracemalloc 会拖慢分配, 内存单独跑一次
+        tracemalloc.start()
+        fetch()
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        print('{:<12}{:>10.2f}s{:>10.1f}MB  rows {}'.format(name, cost, peak / 2**20, rows))
+
+if __name__ == '__main__':
+    run(*[int(item) for item in sys.argv[1:3]])
@@ -0,0 +1,105 @@
+import asyncio
+import unittest
+
+import pandas as pd
+
+from QUANTAXIS.QAFetch import QAQuery, QAQuery_Async
+from QUANTAXIS.QAFetch.QAQuery_Advance import QA_fetch_index_transaction_adv
+from QUANTAXIS.QAUtil import QA_util_time_stamp
+
+
+class FakeCollection():
+    '按 index_transaction 的文档格式返回数据, 支持 projection 和 time_stamp 条件'
+
+    def __init__(self, items):
+        self.items = items
+        self.queries = []
+
+    def find(self, filter=None, projection=None, batch_size=None):
+        self.queries.append((filter, projection))
+        keys = [key for key, value in (projection or {}).items() if value]
+        for item in self.items:
+            if item['code'] not in filter['code']['$in']:
+                continue
+            if not filter['time_stamp']['$gte'] <= item['time_stamp'] <= filter['time_stamp']['$lte']:
+                continue
+            yield {key: item[key] for key in keys} if keys else {
+                key: value for key, value in item.items() if key != '_id'
+            }
+
+
+class FakeAsyncCursor():
+
+    def __init__(self, items):
+        self.items = items
+
+    async def to_list(self, length=None):
+        return list(self.items)
+
+
+class FakeAsyncCollection(FakeCollection):
+
+    def find(self, *args, **kwargs):
+        return FakeAsyncCursor(FakeCollection.find(self, *args, **kwargs))
+
+
+class QAQuery_streaming_test(unittest.TestCase):
+
+    def setUp(self):
+        times = pd.date_range('2019-01-02 09:30:00', periods=30, freq='3s')
+        self.items = [
+            {'_id': i, 'code': code, 'open': 10.0 + i, 'high': 11.0 + i, 'low': 9.0 + i,
+             'close': 10.5 + i, 'vol': float(i % 5), 'amount': 1e4 + i,
+             'datetime': str(time), 'date': str(time)[:10], 'type': 'tick',
+             'time_stamp': QA_util_time_stamp(str(time)), 'buyorsell': i % 2}
+            for i, time in enumerate(times)
+            for code in ['000001', '399001']
+        ]
+        self.start, self.end = '2019-01-02 09:30:00', '2019-01-02 09:31:00'
+
+    def test_index_transaction(self):
+        coll = FakeCollection(self.items)
+        fields = ['code', 'open', 'high', 'low', 'close', 'volume', 'amount', 'datetime']
+        res = QAQuery.QA_fetch_index_transaction(
+            ['000001', '399001'], self.start, self.end, 'pd', collections=coll)
+        streamed = QAQuery.QA_fetch_index_transaction(
+            ['000001', '399001'], self.start, self.end, 'pd',
+            collections=coll, streaming=True)
+        # vol 小于等于 1 的行被过滤
+        self.assertEqual(len(res), 2 * 12)
+        pd.testing.assert_frame_equal(res[fields], streamed[fields], check_dtype=False)
+        # streaming 只取需要的字段
+        self.assertNotIn('buyorsell', streamed.columns)
+        self.assertEqual(coll.queries[0][1], {'_id': 0})
+        self.assertEqual(coll.queries[1][1]['_id'], 0)
+        self.assertEqual(coll.queries[1][1]['type'], 1)
+
+        self.assertIsNone(QAQuery.QA_fetch_index_transaction(
+            '000300', self.start, self.end, 'pd', collections=coll, streaming=True))
+        self.assertEqual(len(QAQuery.QA_fetch_index_transaction(
+            '000001', self.start, self.end, 'numpy', collections=coll)), 12)
+
+    def test_index_transaction_adv(self):
+        res = QA_fetch_index_transaction_adv(
+            '399001', self.start, self.end, collections=FakeCollection(self.items))
+        self.assertEqual(len(res.data), 12)
+        self.assertEqual(res.data.index.names, ['datetime', 'code'])
+
+    def test_async(self):
+        loop = asyncio.new_event_loop()
+        try:
+            for streaming in [False, True]:
+                pd.testing.assert_frame_equal(
+                    QAQuery.QA_fetch_index_transaction(
+                        '000001', self.start, self.end, 'pd',
+                        collections=FakeCollection(self.items), streaming=streaming),
+                    loop.run_until_complete(QAQuery_Async.QA_fetch_index_transaction(
+                        '000001', self.start, self.end, 'pd',
+                        collections=FakeAsyncCollection(self.items), streaming=streaming))
+                )
+        finally:
+            loop.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
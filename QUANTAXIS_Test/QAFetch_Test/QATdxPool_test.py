@@ -0,0 +1,154 @@
+import threading
+import time
+import unittest
+
+from QUANTAXIS.QAFetch.QATdxPool import QA_TdxPool
+
+
+class FakeTdxServer():
+    """本地的假通达信服务器, 记录连接数和同时在用的连接数"""
+
+    def __init__(self, latency=0.0, down=False, broken=False):
+        self.latency = latency
+        self.down = down
+        self.broken = broken
+        self.connects = 0
+        self.using = 0
+        self.max_using = 0
+        self.overlap = 0
+        self.lock = threading.Lock()
+
+
+def make_api(servers):
+
+    class FakeTdxApi():
+
+        def __init__(self, raise_exception=False):
+            self.server = None
+            self.in_use = False
+
+        def connect(self, ip, port, time_out=0.7):
+            server = servers[(ip, port)]
+            if server.down:
+                raise ConnectionError('{}:{} down'.format(ip, port))
+            with server.lock:
+                server.connects += 1
+            self.server = server
+            return self
+
+        def disconnect(self):
+            self.server = None
+
+        def get_security_bars(self, category, market, code, start, count):
+            server = self.server
+            with server.lock:
+                # 同一个连接不能同时被两个线程使用
+                server.overlap += self.in_use
+                self.in_use = True
+                server.using += 1
+                server.max_using = max(server.max_using, server.using)
+            try:
+                time.sleep(server.latency)
+                if server.broken:
+                    raise ConnectionError('broken')
+                return [{'code': code, 'close': 1.0}]
+            finally:
+                with server.lock:
+                    self.in_use = False
+                    server.using -= 1
+
+    return FakeTdxApi
+
+
+class QATdxPool_test(unittest.TestCase):
+
+    def make_pool(self, servers, **kwargs):
+        return QA_TdxPool(
+            make_api(servers),
+            servers=[{'ip': ip, 'port': port} for ip, port in servers],
+            **kwargs
+        )
+
+    def test_reuse(self):
+        servers = {('127.0.0.1', 7709): FakeTdxServer()}
+        pool = self.make_pool(servers)
+        for _ in range(10):
+            with pool.connect() as api:
+                self.assertEqual(len(api.get_security_bars(9, 0, '000001', 0, 800)), 1)
+        self.assertEqual(servers[('127.0.0.1', 7709)].connects, 1)
+        self.assertEqual(pool.stats()['reuses'], 9)
+
+    def test_score(self):
+        slow, fast = ('127.0.0.1', 7709), ('127.0.0.2', 7709)
+        servers = {slow: FakeTdxServer(latency=0.02), fast: FakeTdxServer()}
+        pool = self.make_pool(servers, size=1)
+        # 第一个服务器被占用时才会用到第二个, 之后都按分数选快的
+        first = pool.acquire()
+        second = pool.acquire()
+        self.assertEqual(first.server.ip, '127.0.0.1')
+        self.assertEqual(second.server.ip, '127.0.0.2')
+        for session in [first, second]:
+            session.get_security_bars(9, 0, '000001', 0, 800)
+            pool.release(session)
+        with pool.connect() as api:
+            self.assertEqual(api.server.ip, '127.0.0.2')
+
+    def test_evict(self):
+        bad, good = ('127.0.0.1', 7709), ('127.0.0.2', 7709)
+        servers = {bad: FakeTdxServer(broken=True), good: FakeTdxServer()}
+        pool = self.make_pool(servers, min_samples=3)
+        # 出错一次分数就比没用过的服务器差
+        with self.assertRaises(ConnectionError):
+            with pool.connect() as api:
+                api.get_security_bars(9, 0, '000001', 0, 800)
+        with pool.connect() as api:
+            self.assertEqual(api.server.ip, '127.0.0.2')
+        for _ in range(2):
+            with self.assertRaises(ConnectionError):
+                with pool.connect(*bad) as api:
+                    api.get_security_bars(9, 0, '000001', 0, 800)
+        self.assertEqual(servers[bad].connects, 3)
+        stats = pool.stats()
+        self.assertEqual(stats['evictions'], 1)
+        self.assertEqual(
+            [item['disabled'] for item in stats['servers']],
+            [True, False]
+        )
+
+    def test_connect_fallback(self):
+        servers = {
+            ('127.0.0.1', 7709): FakeTdxServer(down=True),
+            ('127.0.0.2', 7709): FakeTdxServer()
+        }
+        pool = self.make_pool(servers)
+        with pool.connect() as api:
+            self.assertEqual(api.server.ip, '127.0.0.2')
+        with self.assertRaises(ConnectionError):
+            pool.acquire('127.0.0.1', 7709)
+
+    def test_threads(self):
+        servers = {
+            ('127.0.0.1', 7709): FakeTdxServer(latency=0.001),
+            ('127.0.0.2', 7709): FakeTdxServer(latency=0.001)
+        }
+        pool = self.make_pool(servers, size=2)
+
+        def job():
+            for _ in range(20):
+                with pool.connect() as api:
+                    api.get_security_bars(9, 0, '000001', 0, 800)
+
+        threads = [threading.Thread(target=job) for _ in range(8)]
+        for item in threads:
+            item.start()
+        for item in threads:
+            item.join()
+        for server in servers.values():
+            self.assertEqual(server.overlap, 0)
+            self.assertLessEqual(server.max_using, 2)
+            self.assertLessEqual(server.connects, 2)
+        self.assertEqual(pool.idle_count, sum(s.connects for s in servers.values()))
+
+
+if __name__ == '__main__':
+    unittest.main()
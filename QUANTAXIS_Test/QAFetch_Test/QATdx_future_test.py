@@ -0,0 +1,78 @@
+import datetime
+import unittest
+from contextlib import contextmanager
+from unittest import mock
+
+import pandas as pd
+
+from QUANTAXIS.QAFetch import QATdx
+
+
+class FakeExtensionApi():
+    '按 pytdx get_instrument_bars 的格式返回日线, start 从最新一根往前数'
+
+    def __init__(self, days):
+        self.bars = [
+            {'open': 3500.0 + i, 'close': 3510.0 + i, 'high': 3520.0 + i,
+             'low': 3490.0 + i, 'position': 1000 + i, 'trade': 100 + i,
+             'price': 0.0, 'year': day.year, 'month': day.month, 'day': day.day,
+             'hour': 15, 'minute': 0, 'datetime': day.strftime('%Y-%m-%d 15:00'),
+             'amount': 1e6 + i}
+            for i, day in enumerate(days)
+        ]
+        self.calls = []
+
+    def get_instrument_bars(self, category, market, code, start, count):
+        self.calls.append((start, count))
+        end = max(len(self.bars) - start, 0)
+        return self.bars[max(end - count, 0):end]
+
+    def to_df(self, bars):
+        return pd.DataFrame(bars)
+
+
+class FakePool():
+
+    def __init__(self, api):
+        self.api = api
+
+    @contextmanager
+    def connect(self, ip=None, port=None):
+        yield self.api
+
+
+class QATdx_future_test(unittest.TestCase):
+
+    def setUp(self):
+        self.days = pd.bdate_range('2018-01-01', datetime.date.today())
+        self.api = FakeExtensionApi(self.days)
+        self.patches = [
+            mock.patch.object(QATdx, 'QA_tdx_future_pool', FakePool(self.api)),
+            mock.patch.object(QATdx, 'extension_market_list', pd.DataFrame(
+                {'code': ['RBL8'], 'market': [30]})),
+            # 取多少根 bar 按假的日线算, 不依赖交易日历的长度
+            mock.patch.object(QATdx, 'QA_util_get_trade_gap',
+                              lambda start, end: int((self.days >= start).sum()))
+        ]
+        for patch in self.patches:
+            patch.start()
+
+    def tearDown(self):
+        for patch in self.patches:
+            patch.stop()
+
+    def test_future_day_window(self):
+        res = QATdx.QA_fetch_get_future_day('RBL8', '2019-01-01', '2019-03-31')
+        # 取回来的 bar 比窗口多, 切片之后日期和每一行对应
+        self.assertGreater(len(self.api.calls), 1)
+        expect = self.days[(self.days >= '2019-01-01') & (self.days <= '2019-03-31')]
+        self.assertEqual(res['date'].tolist(), list(expect.strftime('%Y-%m-%d')))
+        self.assertEqual(res.index.tolist(), res['date'].tolist())
+        self.assertTrue((res['code'] == 'RBL8').all())
+        self.assertNotIn('datetime', res.columns)
+        first = self.days.get_loc(expect[0])
+        self.assertEqual(res['open'].iloc[0], 3500.0 + first)
+
+
+if __name__ == '__main__':
+    unittest.main()
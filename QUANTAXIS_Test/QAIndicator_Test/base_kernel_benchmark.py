@@ -0,0 +1,54 @@
+"""
+QAIndicator 递推/滑动窗口计算核的 benchmark
+
+每个函数对比原来的实现 (legacy) 和现在的实现, 按 codes 个股票逐个计算 (和 add_func 一样),
+同时检查结果是否一致
+
+python base_kernel_benchmark.py [codes] [bars]
+"""
+
+import sys
+import timeit
+
+import numpy as np
+
+from QUANTAXIS.QAIndicator import base
+from QUANTAXIS.QAIndicator.base import AVEDEV, BARLAST, SMA
+from QUANTAXIS.QAIndicator.indicators import QA_indicator_ASI
+
+from base_kernel_test import (legacy_ASI, legacy_AVEDEV, legacy_BARLAST,
+                              legacy_SMA, make_bars)
+
+
+def run(codes=400, bars=1000, number=3):
+    frames = [make_bars(bars, '{:06d}'.format(i), seed=i) for i in range(codes)]
+    closes = [item.close for item in frames]
+    conds = [item.close > item.close.rolling(5).mean() for item in frames]
+
+    cases = [
+        ('SMA', lambda: [legacy_SMA(item, 3) for item in closes],
+         lambda: [SMA(item, 3) for item in closes]),
+        ('AVEDEV', lambda: [legacy_AVEDEV(item, 14) for item in closes],
+         lambda: [AVEDEV(item, 14) for item in closes]),
+        ('BARLAST', lambda: [legacy_BARLAST(item) for item in conds],
+         lambda: [BARLAST(item) for item in conds]),
+        ('ASI', lambda: [legacy_ASI(item) for item in frames],
+         lambda: [QA_indicator_ASI(item) for item in frames]),
+    ]
+
+    print('codes: {} bars: {} numba: {}'.format(codes, bars, base._njit is not None))
+    for name, legacy, func in cases:
+        expected, res = legacy(), func()
+        same = all(
+            np.allclose(np.asarray(a, dtype=float), np.asarray(b, dtype=float),
+                        rtol=1e-10, equal_nan=True)
+            for a, b in zip(res, expected)
+        )
+        legacy_cost = min(timeit.repeat(legacy, number=1, repeat=number))
+        cost = min(timeit.repeat(func, number=1, repeat=number))
+        print('{:<10}legacy {:>9.4f}s  new {:>9.4f}s  x{:>7.1f}  same: {}'.format(
+            name, legacy_cost, cost, legacy_cost / cost, same))
+
+
+if __name__ == '__main__':
+    run(*[int(item) for item in sys.argv[1:3]])
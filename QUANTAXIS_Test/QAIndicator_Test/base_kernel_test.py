@@ -0,0 +1,138 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from QUANTAXIS.QAIndicator import base
+from QUANTAXIS.QAIndicator.base import AVEDEV, BARLAST, SMA
+from QUANTAXIS.QAIndicator.indicators import QA_indicator_ASI
+
+
+"""
+原来的实现, 新的计算核要和它们的结果一致
+"""
+
+
+def legacy_SMA(Series, N, M=1):
+    ret = []
+    i = 1
+    length = len(Series)
+    while i < length:
+        if np.isnan(Series.iloc[i]):
+            i += 1
+        else:
+            break
+    preY = Series.iloc[i]
+    ret.append(preY)
+    while i < length:
+        Y = (M * Series.iloc[i] + (N - M) * preY) / float(N)
+        ret.append(Y)
+        preY = Y
+        i += 1
+    return pd.Series(ret, index=Series.tail(len(ret)).index)
+
+
+def legacy_AVEDEV(Series, N):
+    return Series.rolling(N).apply(lambda x: (np.abs(x - x.mean())).mean(), raw=True)
+
+
+def legacy_BARLAST(cond, yes=True):
+    if isinstance(cond.index, pd.MultiIndex):
+        return len(cond) - cond.index.levels[0].tolist().index(cond[cond != yes].index[-1][0]) - 1
+    elif isinstance(cond.index, pd.DatetimeIndex):
+        return len(cond) - cond.index.tolist().index(cond[cond != yes].index[-1]) - 1
+
+
+def legacy_ASI(DataFrame, M1=26, M2=10):
+    CLOSE = DataFrame['close']
+    HIGH = DataFrame['high']
+    LOW = DataFrame['low']
+    OPEN = DataFrame['open']
+    LC = base.REF(CLOSE, 1)
+    AA = base.ABS(HIGH - LC)
+    BB = base.ABS(LOW - LC)
+    CC = base.ABS(HIGH - base.REF(LOW, 1))
+    DD = base.ABS(LC - base.REF(OPEN, 1))
+    R = base.IFAND(AA > BB, AA > CC, AA + BB / 2 + DD / 4,
+                   base.IFAND(BB > CC, BB > AA, BB + AA / 2 + DD / 4, CC + DD / 4))
+    X = (CLOSE - LC + (CLOSE - OPEN) / 2 + LC - base.REF(OPEN, 1))
+    SI = 16 * X / R * base.MAX(AA, BB)
+    ASI = base.SUM(SI, M1)
+    ASIT = base.MA(ASI, M2)
+    return pd.DataFrame({'ASI': ASI, 'ASIT': ASIT})
+
+
+def make_bars(bars=300, code='000001', seed=0):
+    rng = np.random.RandomState(seed)
+    close = 10 + rng.randn(bars).cumsum() * 0.1
+    index = pd.MultiIndex.from_product(
+        [pd.date_range('2018-01-01', periods=bars, freq='B'), [code]],
+        names=['date', 'code']
+    )
+    return pd.DataFrame({
+        'open': close + rng.randn(bars) * 0.05,
+        'high': close + rng.rand(bars) * 0.2,
+        'low': close - rng.rand(bars) * 0.2,
+        'close': close
+    }, index=index)
+
+
+class base_kernel_test(unittest.TestCase):
+
+    def assertSeriesClose(self, res, expected):
+        self.assertTrue(res.index.equals(expected.index))
+        np.testing.assert_allclose(res.values, expected.values, rtol=1e-10, atol=1e-12)
+
+    def test_sma(self):
+        close = make_bars().close
+        rsv = close.rolling(9).max() - close
+        gap = close.copy()
+        gap.iloc[100] = np.nan
+        for series, N, M in [(close, 3, 1), (rsv, 3, 1), (gap, 6, 1), (close, 5, 2), (close, 3, 3)]:
+            self.assertSeriesClose(SMA(series, N, M), legacy_SMA(series, N, M))
+            # 两种计算核都要和原来一致
+            values = series.values.astype(float)
+            start = int(np.isnan(values[1:]).argmin()) + 1
+            np.testing.assert_allclose(
+                base._sma_ewm(values, start, float(N), M),
+                base._sma_loop(values, start, float(N), M),
+                rtol=1e-10
+            )
+        self.assertTrue(SMA(pd.Series([1.0]), 3).isnull().all())
+
+    def test_avedev(self):
+        close = make_bars().close
+        gap = close.copy()
+        gap.iloc[50] = np.nan
+        for series, N in [(close, 14), (gap, 14), (close.iloc[:5], 14), (close, 1)]:
+            self.assertSeriesClose(AVEDEV(series, N), legacy_AVEDEV(series, N))
+            values = series.values.astype(float)
+            np.testing.assert_allclose(
+                base._avedev_strided(values, N),
+                base._avedev_loop(values, N),
+                rtol=1e-10
+            )
+
+    def test_barlast(self):
+        data = make_bars(50)
+        cond = data.close > data.close.iloc[-10]
+        cond.iloc[-3:] = True
+        cond.iloc[-4] = False
+        self.assertEqual(BARLAST(cond), 3)
+        self.assertEqual(BARLAST(cond), legacy_BARLAST(cond))
+        cond = cond.reset_index(level=1, drop=True)
+        self.assertEqual(BARLAST(cond), legacy_BARLAST(cond))
+        self.assertEqual(BARLAST(cond.astype(int), 1), legacy_BARLAST(cond.astype(int), 1))
+
+    def test_asi(self):
+        data = make_bars()
+        # 一字板: R 为 0
+        data.iloc[20, :] = data.iloc[19].close
+        res = QA_indicator_ASI(data)
+        expected = legacy_ASI(data)
+        for column in ['ASI', 'ASIT']:
+            self.assertSeriesClose(res[column], expected[column])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from QUANTAXIS.QAData import QA_DataStruct_Stock_day, base_datastruct
+from QUANTAXIS.QAIndicator.base import (MA, SMA, QA_indicator_panel,
+                                        QA_indicator_panel_support)
+from QUANTAXIS.QAIndicator.indicators import (QA_indicator_ASI,
+                                              QA_indicator_CCI,
+                                              QA_indicator_KDJ,
+                                              QA_indicator_MACD,
+                                              QA_indicator_MA,
+                                              QA_indicator_OBV,
+                                              QA_indicator_RSI,
+                                              QA_indicator_SMA)
+
+
+def make_panel(codes=20, bars=200, seed=0):
+    """多个代码的日线, 上市日期不同, 中间有停牌"""
+    rng = np.random.RandomState(seed)
+    dates = pd.date_range('2018-01-01', periods=bars, freq='B')
+    frames = []
+    for i in range(codes):
+        close = 10 + rng.randn(bars).cumsum() * 0.1
+        data = pd.DataFrame({
+            'open': close + rng.randn(bars) * 0.05,
+            'high': close + rng.rand(bars) * 0.2,
+            'low': close - rng.rand(bars) * 0.2,
+            'close': close,
+            'volume': rng.randint(100, 1000, bars).astype(float)
+        }, index=pd.MultiIndex.from_arrays(
+            [dates, ['{:06d}'.format(i)] * bars], names=['date', 'code']))
+        keep = np.ones(bars, dtype=bool)
+        keep[:rng.randint(0, 60)] = False
+        keep[rng.rand(bars) < 0.05] = False
+        frames.append(data[keep])
+    return pd.concat(frames).sort_index()
+
+
+class panel_test(unittest.TestCase):
+
+    def assertSameResult(self, data, func, *args):
+        expected = data.groupby(level=1, sort=False, group_keys=False).apply(func, *args)
+        res = QA_indicator_panel(data, func, *args)
+        self.assertTrue(res.index.equals(expected.index))
+        self.assertEqual(list(res.columns), list(expected.columns))
+        for column in expected.columns:
+            self.assertEqual(res[column].dtype, expected[column].dtype)
+            np.testing.assert_allclose(
+                res[column].values.astype(float),
+                expected[column].values.astype(float),
+                rtol=1e-10
+            )
+
+    def test_support(self):
+        for func in [QA_indicator_KDJ, QA_indicator_CCI, QA_indicator_MA, QA_indicator_RSI]:
+            self.assertTrue(QA_indicator_panel_support(func))
+        # cumsum/numpy 数组上的计算不能在面板上算
+        self.assertFalse(QA_indicator_panel_support(QA_indicator_OBV))
+        self.assertFalse(QA_indicator_panel_support(QA_indicator_ASI))
+        self.assertFalse(QA_indicator_panel_support(lambda data: data.close.rolling(5).mean()))
+
+    def test_indicators(self):
+        data = make_panel()
+        for func in [QA_indicator_KDJ, QA_indicator_CCI, QA_indicator_RSI, QA_indicator_MACD]:
+            self.assertSameResult(data, func)
+        self.assertSameResult(data, QA_indicator_MA, 5, 10)
+        self.assertSameResult(data, QA_indicator_SMA, 5)
+
+    def test_sma_start(self):
+        # SMA 的结果比输入短, 再算一次 SMA 时每个代码从自己的第一个结果开始
+        data = make_panel()
+
+        def func(data):
+            return pd.DataFrame({'SMA': SMA(MA(data.close, 5), 3)})
+
+        self.assertTrue(QA_indicator_panel_support(func))
+        self.assertSameResult(data, func)
+
+    def test_add_func(self):
+        data = QA_DataStruct_Stock_day(make_panel(codes=5))
+        expected = data.data.groupby(level=1, sort=False).apply(QA_indicator_MA, 5)
+        pd.testing.assert_frame_equal(data.add_func(QA_indicator_MA, 5), expected)
+
+        # 面板上算不了的时候记下原因, 按 code 分组计算
+        with mock.patch.object(base_datastruct, 'QA_indicator_panel',
+                               side_effect=ValueError('panel')), \
+                mock.patch.object(base_datastruct, 'QA_util_log_info') as log:
+            res = data.add_func(QA_indicator_MA, 5)
+        pd.testing.assert_frame_equal(res, expected)
+        self.assertEqual(log.call_count, 1)
+        self.assertIn('QA_indicator_MA', log.call_args[0][0])
+        self.assertIn('panel', log.call_args[0][0])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,56 @@
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from QUANTAXIS.QAData import QA_DataStruct_Stock_day
+from QUANTAXIS.QAEngine.QAEvent import QA_Event
+from QUANTAXIS.QAMarket.QABacktestBroker import QA_BacktestBroker
+from QUANTAXIS.QAUtil.QAParameter import BROKER_EVENT, ENGINE_EVENT
+
+
+def make_stock_day(day, codes=('000001', '600000')):
+    data = pd.DataFrame(
+        [(pd.Timestamp(day), code) for code in codes],
+        columns=['date', 'code']
+    )
+    for field in ['open', 'high', 'low', 'close', 'volume', 'amount']:
+        data[field] = np.arange(len(data)) + 1.0
+    return QA_DataStruct_Stock_day(data.set_index(['date', 'code']))
+
+
+class QA_BacktestBroker_Test(unittest.TestCase):
+
+    def setUp(self):
+        self.broker = QA_BacktestBroker()
+
+    def upcoming(self, market_data):
+        self.broker.run(
+            QA_Event(event_type=ENGINE_EVENT.UPCOMING_DATA,
+                     market_data=market_data)
+        )
+
+    def test_quotation_data(self):
+        first = make_stock_day('2019-01-02')
+        # 同一个 DataStruct 重复推送只记一次
+        self.upcoming(first)
+        self.upcoming(first)
+        self.assertEqual(
+            list(self.broker._quotation_data[pd.Timestamp('2019-01-02')].values()),
+            [first]
+        )
+
+        second = make_stock_day('2019-01-03')
+        self.upcoming(second)
+        self.broker.run(QA_Event(event_type=BROKER_EVENT.SETTLE))
+        # 结算后只留下当前bar
+        self.assertEqual(list(self.broker._quotation_data.keys()),
+                         [pd.Timestamp('2019-01-03')])
+        self.assertEqual(
+            list(self.broker._quotation_data[pd.Timestamp('2019-01-03')].values()),
+            [second]
+        )
+
+
+if __name__ == '__main__':
+    unittest.main()
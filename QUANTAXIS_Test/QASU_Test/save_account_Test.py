@@ -0,0 +1,38 @@
+import unittest
+from unittest import mock
+
+from pymongo.errors import OperationFailure, ServerSelectionTimeoutError
+
+from QUANTAXIS.QASU.save_account import save_riskanalysis_many
+
+
+class save_account_Test(unittest.TestCase):
+
+    def test_riskanalysis_many(self):
+        messages = [
+            {'account_cookie': 'acc{}'.format(i), 'portfolio_cookie': 'p',
+             'user_cookie': 'u', 'profit': 0.1 * i} for i in range(3)
+        ]
+        coll = mock.MagicMock()
+        save_riskanalysis_many(messages, collection=coll)
+        requests = coll.bulk_write.call_args[0][0]
+        self.assertEqual(len(requests), 3)
+        self.assertEqual(requests[1]._filter,
+                         {'account_cookie': 'acc1', 'portfolio_cookie': 'p', 'user_cookie': 'u'})
+
+        # 索引冲突不影响写入
+        coll = mock.MagicMock()
+        coll.create_index.side_effect = OperationFailure('IndexOptionsConflict')
+        save_riskanalysis_many(messages, collection=coll)
+        self.assertEqual(coll.bulk_write.call_count, 1)
+
+        # 连不上数据库之类的错误不能吞掉
+        coll = mock.MagicMock()
+        coll.create_index.side_effect = ServerSelectionTimeoutError('down')
+        with self.assertRaises(ServerSelectionTimeoutError):
+            save_riskanalysis_many(messages, collection=coll)
+        coll.bulk_write.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
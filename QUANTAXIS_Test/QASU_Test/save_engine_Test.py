@@ -0,0 +1,304 @@
+import threading
+import unittest
+from unittest import mock
+
+import pandas as pd
+from pymongo.errors import AutoReconnect, BulkWriteError
+
+from QUANTAXIS.QASU.save_engine import QA_SaveEngine
+
+
+class FakeCollection():
+    '保存流程用到的 pymongo 表的方法, 记录按写入的顺序保存'
+
+    def __init__(self, name, database=None):
+        self.full_name = 'quantaxis.{}'.format(name)
+        self.database = database
+        self.docs = []
+        self.indexes = []
+        self.reject = set()  # 这些代码的记录写入出错
+        self.down = False    # 整批写入失败
+        self._lock = threading.Lock()
+
+    def _match(self, doc, filter):
+        return all(doc.get(key) == value for key, value in (filter or {}).items())
+
+    def create_index(self, keys, unique=False, **kwargs):
+        self.indexes.append((keys, unique))
+
+    def bulk_write(self, requests, ordered=True):
+        if self.down:
+            raise AutoReconnect('connection closed')
+        errors = []
+        with self._lock:
+            for i, request in enumerate(requests):
+                doc = dict(request._doc)
+                if doc.get('code') in self.reject:
+                    errors.append({'index': i, 'code': 2, 'errmsg': 'rejected'})
+                    continue
+                if hasattr(request, '_filter'):
+                    self.docs = [item for item in self.docs
+                                 if not self._match(item, request._filter)]
+                self.docs.append(doc)
+        if errors:
+            raise BulkWriteError({'writeErrors': errors, 'nUpserted': len(requests) - len(errors)})
+        return type('BulkWriteResult', (), {'bulk_api_result': {'nUpserted': len(requests)}})()
+
+    def find(self, filter=None, projection=None):
+        return [dict(doc) for doc in self.docs if self._match(doc, filter)]
+
+    def find_one(self, filter=None, sort=None):
+        docs = self.find(filter)
+        for key, direction in reversed(sort or []):
+            docs.sort(key=lambda doc: doc[key], reverse=direction < 0)
+        return docs[0] if docs else None
+
+    def replace_one(self, filter, doc, upsert=False):
+        self.docs = [item for item in self.docs if not self._match(item, filter)]
+        self.docs.append(dict(doc))
+
+    def update_one(self, filter, update):
+        for doc in self.docs:
+            if self._match(doc, filter):
+                doc.update(update['$set'])
+                return
+
+    def delete_many(self, filter):
+        self.docs = [item for item in self.docs if not self._match(item, filter)]
+
+
+class FakeDatabase():
+
+    def __init__(self):
+        self.save_job = FakeCollection('save_job', self)
+        self.save_progress = FakeCollection('save_progress', self)
+        self.stock_day = FakeCollection('stock_day', self)
+
+
+def make_day(code, start, end, frequence='day'):
+    date = pd.date_range(start, end).strftime('%Y-%m-%d')
+    return pd.DataFrame({'code': code, 'date': date, 'close': float(int(code))})
+
+
+def plan_fixed(engine, code, frequence):
+    return '2019-01-01', '2019-01-05', {'code': code}
+
+
+def transform_double(data, context):
+    '进程池里执行, 必须是模块级的函数'
+    return data.assign(close=data['close'] * 2)
+
+
+class QA_SaveEngine_Test(unittest.TestCase):
+
+    def setUp(self):
+        self.db = FakeDatabase()
+        self.codes = ['{:06d}'.format(i) for i in range(1, 8)]
+        self.fetched = []
+
+    def fetcher(self, code, start, end, frequence):
+        self.fetched.append(code)
+        if code in getattr(self, 'broken', []):
+            raise ConnectionError('tdx down')
+        return make_day(code, start, end)
+
+    def engine(self, **kwargs):
+        kwargs.setdefault('plan', plan_fixed)
+        return QA_SaveEngine('stock_day', self.db.stock_day, self.fetcher, **kwargs)
+
+    def test_run(self):
+        engine = self.engine(batch_size=7)
+        self.assertEqual(engine.run(self.codes), [])
+        self.assertEqual(len(self.db.stock_day.docs), 7 * 5)
+        self.assertEqual(self.db.stock_day.indexes, [([('code', 1), ('date', 1)], True)])
+        self.assertEqual(self.db.save_job.docs[0]['status'], 'done')
+        self.assertEqual(
+            sorted(item['code'] for item in self.db.save_progress.docs), self.codes)
+        self.assertTrue(all(item['rows'] == 5 for item in self.db.save_progress.docs))
+        stats = engine.stats()
+        self.assertEqual(stats['download']['items'], 7)
+        self.assertEqual(stats['write']['rows'], 35)
+        # 再保存一次按 (code, date) 覆盖, 不会重复
+        self.engine(resume=False).run(self.codes)
+        self.assertEqual(len(self.db.stock_day.docs), 7 * 5)
+
+    def test_errors_resume(self):
+        self.broken = ['000003', '000005']
+        engine = self.engine(download_workers=3, batch_size=1)
+        self.assertEqual(sorted(engine.run(self.codes)), self.broken)
+        self.assertEqual(engine.stats()['download']['errors'], 2)
+        self.assertEqual(
+            sorted({doc['code'] for doc in self.db.stock_day.docs}),
+            sorted(set(self.codes) - set(self.broken))
+        )
+        # 有代码出错, 这次运行没有结束; 下一次只重新下载出错的代码
+        self.assertEqual(self.db.save_job.docs[0]['status'], 'running')
+        self.broken = []
+        self.fetched = []
+        engine = self.engine()
+        self.assertEqual(engine.run(self.codes), [])
+        self.assertEqual(sorted(self.fetched), ['000003', '000005'])
+        self.assertEqual(engine.skipped, 5)
+        self.assertEqual(self.db.save_job.docs[0]['status'], 'done')
+        self.assertEqual(len(self.db.stock_day.docs), 7 * 5)
+        # 正常结束之后的运行从头开始
+        self.fetched = []
+        self.engine().run(self.codes)
+        self.assertEqual(sorted(self.fetched), self.codes)
+
+    def test_write_errors(self):
+        # 写入出错的代码不记进度, 这次运行也不算结束
+        self.db.stock_day.reject = {'000002', '000006'}
+        engine = self.engine(batch_size=10)
+        self.assertEqual(sorted(engine.run(self.codes)), ['000002', '000006'])
+        self.assertEqual(self.db.save_job.docs[0]['status'], 'running')
+        self.assertEqual(
+            sorted(item['code'] for item in self.db.save_progress.docs),
+            sorted(set(self.codes) - {'000002', '000006'}))
+        # 下一次只重新保存没有写进去的代码
+        self.db.stock_day.reject = set()
+        self.fetched = []
+        self.assertEqual(self.engine().run(self.codes), [])
+        self.assertEqual(sorted(self.fetched), ['000002', '000006'])
+        self.assertEqual(self.db.save_job.docs[0]['status'], 'done')
+        self.assertEqual(len(self.db.stock_day.docs), 7 * 5)
+
+        # 整批写入失败时这一批的代码都算出错
+        self.db.stock_day.down = True
+        engine = self.engine(resume=False)
+        self.assertEqual(sorted(engine.run(self.codes)), self.codes)
+
+    def test_start_fallback(self):
+        def plan(engine, code, frequence):
+            return engine.start[0], '2019-01-05', None
+
+        def fetcher(code, start, end, frequence):
+            if start == '1990-01-01':
+                raise ValueError('too early')
+            return make_day(code, start, end)
+
+        QA_SaveEngine('stock_day', self.db.stock_day, fetcher, plan=plan,
+                      start=['1990-01-01', '2019-01-03'], resume=False).run(['000001'])
+        self.assertEqual([doc['date'] for doc in self.db.stock_day.docs],
+                         ['2019-01-03', '2019-01-04', '2019-01-05'])
+
+    def test_order(self):
+        # 一个下载线程时, 进程池转换之后还是按代码的顺序写入
+        engine = self.engine(download_workers=1, transform=transform_double,
+                             transform_workers=2, batch_size=1)
+        self.assertEqual(engine.run(self.codes), [])
+        written = [doc['code'] for doc in self.db.stock_day.docs]
+        self.assertEqual(written, [code for code in self.codes for _ in range(5)])
+        self.assertEqual(self.db.stock_day.docs[0]['close'], 2.0)
+        self.assertEqual(
+            [doc['code'] for doc in self.db.save_progress.docs], self.codes)
+
+    def test_transform_batch(self):
+        calls = []
+
+        def transform(data, context):
+            calls.append(sorted(context))
+            return data
+
+        self.broken = ['000004']
+        engine = self.engine(download_workers=1, transform=transform, transform_batch=3)
+        self.assertEqual(engine.run(self.codes), ['000004'])
+        # 出错的代码不进入合并转换, 最后不满一批的也会转换
+        self.assertEqual(calls, [['000001', '000002', '000003'],
+                                 ['000005', '000006', '000007']])
+        self.assertEqual(len(self.db.stock_day.docs), 6 * 5)
+        # 进度按代码拆开记录
+        rows = {item['code']: item['rows'] for item in self.db.save_progress.docs}
+        self.assertEqual(rows, {code: 5 for code in self.codes if code != '000004'})
+
+
+class QA_SU_min_derived_Test(unittest.TestCase):
+
+    def test_batch(self):
+        from QUANTAXIS.QASU.save_tdx import _QA_SU_transform_min_derived
+
+        def make_min(code):
+            datetime = pd.date_range('2019-01-02 09:31', '2019-01-02 11:30', freq='min')
+            datetime = datetime.append(
+                pd.date_range('2019-01-02 13:01', '2019-01-02 15:00', freq='min'))
+            return pd.DataFrame({
+                'open': 10.0, 'close': 10.0, 'high': 10.0, 'low': 10.0,
+                'vol': 100.0, 'amount': 1000.0, 'code': code, 'type': '1min',
+                'datetime': datetime.strftime('%Y-%m-%d %H:%M:%S'),
+                'date': '2019-01-02'
+            })
+
+        context = {
+            '000001': {'market': 'stock', 'last': dict.fromkeys(
+                ['1min', '5min', '15min', '30min', '60min'], '')},
+            '000002': {'market': 'stock', 'last': {
+                '1min': '2019-01-02 14:00:00', '5min': '2019-01-02 10:00:00',
+                '15min': '', '30min': '2019-01-02 15:00:00', '60min': ''}}
+        }
+        batch = _QA_SU_transform_min_derived(
+            pd.concat([make_min('000001'), make_min('000002')]), context)
+        for code in context:
+            single = _QA_SU_transform_min_derived(make_min(code), {code: context[code]})
+            part = batch[batch['code'] == code]
+            self.assertEqual(part['datetime'].tolist(), single['datetime'].tolist())
+            self.assertEqual(part['type'].tolist(), single['type'].tolist())
+        part = batch[batch['code'] == '000002']
+        self.assertEqual((part['type'] == '1min').sum(), 60)
+        self.assertEqual((part['type'] == '30min').sum(), 0)
+
+
+class QA_SU_option_day_Test(unittest.TestCase):
+
+    def test_option_day_all(self):
+        from QUANTAXIS.QASU import save_tdx
+
+        db = FakeDatabase()
+        db.option_day_all = FakeCollection('option_day_all', db)
+        contracts = [pd.Series({'code': code, 'name': code})
+                     for code in ['10001234', '10001235']]
+
+        def fetcher(code, start, end, frequence='day'):
+            data = make_day(code, '2019-01-02', '2019-01-04')
+            return data.assign(date_stamp=range(len(data)))
+
+        with mock.patch.object(save_tdx, 'QA_fetch_get_option_all_contract_time_to_market',
+                               lambda: contracts), \
+                mock.patch.object(save_tdx, 'QA_fetch_get_option_day', fetcher):
+            save_tdx.QA_SU_save_option_day_all(client=db)
+            # 再保存一次按 (code, date) 覆盖, 不会重复
+            db.save_job.docs = []
+            save_tdx.QA_SU_save_option_day_all(client=db)
+        self.assertEqual(len(db.option_day_all.docs), 2 * 3)
+        self.assertEqual(db.option_day_all.indexes[-1], ([('code', 1), ('date', 1)], True))
+        self.assertEqual(sorted({doc['code'] for doc in db.option_day_all.docs}),
+                         ['10001234', '10001235'])
+
+
+class QA_SU_transaction_Test(unittest.TestCase):
+
+    def test_stock_transaction(self):
+        from QUANTAXIS.QASU import save_tdx
+
+        db = FakeDatabase()
+        db.stock_transaction = FakeCollection('stock_transaction', db)
+
+        def fetcher(code, start, end):
+            # 同一分钟里有两笔成交
+            return pd.DataFrame({
+                'code': code, 'price': [10.0, 10.1, 10.2], 'vol': [1, 2, 3],
+                'datetime': ['2019-01-02 09:30:00', '2019-01-02 09:30:00',
+                             '2019-01-02 09:31:00'],
+                'date': '2019-01-02', 'type': 'tick', 'order': [0, 1, 2]})
+
+        with mock.patch.object(save_tdx, 'QA_fetch_get_stock_list',
+                               lambda: pd.DataFrame({'code': ['000001', '000002']})), \
+                mock.patch.object(save_tdx, 'QA_fetch_get_stock_transaction', fetcher):
+            save_tdx.QA_SU_save_stock_transaction(client=db)
+            save_tdx.QA_SU_save_stock_transaction(client=db)
+        self.assertEqual(len(db.stock_transaction.docs), 2 * 3)
+        self.assertIn(([('code', 1), ('datetime', 1), ('order', 1)], True),
+                      db.stock_transaction.indexes)
+
+
+if __name__ == '__main__':
+    unittest.main()
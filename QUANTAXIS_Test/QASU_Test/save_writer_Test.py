@@ -0,0 +1,163 @@
+import threading
+import unittest
+
+import pandas as pd
+from pymongo.errors import BulkWriteError, OperationFailure
+
+from QUANTAXIS.QAFetch.QACache import QA_fetch_cache
+from QUANTAXIS.QASU.save_writer import QA_BulkWriter
+
+
+class FakeCollection():
+    """按 unique 索引的 keys 存放记录, 实现 bulk_write(ReplaceOne/InsertOne)/create_index/find_one"""
+
+    def __init__(self, name='quantaxis.stock_min', duplicated=False):
+        self.full_name = name
+        self.docs = {}
+        self.rows = []
+        self.indexes = []
+        self.bulk_calls = []
+        # 模拟库里已经有重复记录, 建不了唯一索引
+        self.duplicated = duplicated
+        self.unique = None
+        self._lock = threading.Lock()
+
+    def create_index(self, keys, unique=False, **kwargs):
+        if unique and self.duplicated:
+            raise OperationFailure('E11000 duplicate key error', 11000)
+        self.indexes.append((keys, unique))
+        if unique:
+            self.unique = tuple(key for key, _ in keys)
+
+    def _key(self, doc, keys):
+        return tuple(doc.get(key) for key in keys)
+
+    def bulk_write(self, requests, ordered=True):
+        with self._lock:
+            self.bulk_calls.append(len(requests))
+            result = {'nInserted': 0, 'nUpserted': 0, 'nModified': 0, 'writeErrors': []}
+            for i, request in enumerate(requests):
+                doc = dict(request._doc)
+                if hasattr(request, '_filter'):
+                    key = tuple(request._filter.values())
+                    if key in self.docs:
+                        result['nModified'] += 1
+                    else:
+                        result['nUpserted'] += 1
+                    self.docs[key] = doc
+                    continue
+                key = self._key(doc, self.unique) if self.unique else i
+                if self.unique and key in self.docs:
+                    result['writeErrors'].append(
+                        {'index': i, 'code': 11000, 'errmsg': 'E11000 duplicate key'})
+                    continue
+                result['nInserted'] += 1
+                self.docs[key if self.unique else len(self.rows)] = doc
+                self.rows.append(doc)
+            if len(result['writeErrors']) > 0:
+                raise BulkWriteError(result)
+            return type('BulkWriteResult', (), {'bulk_api_result': result})()
+
+
+def make_min(code, start, count, close=1.0):
+    datetime = pd.date_range(start, periods=count, freq='min')
+    return pd.DataFrame({
+        'code': code,
+        'close': close,
+        'datetime': datetime.strftime('%Y-%m-%d %H:%M:%S'),
+        'type': '1min'
+    })
+
+
+class QA_BulkWriter_Test(unittest.TestCase):
+
+    def test_upsert(self):
+        coll = FakeCollection()
+        writer = QA_BulkWriter(coll, batch_size=100)
+        # 两次重叠的保存, 重叠的部分以后写入的为准
+        writer.write(make_min('000001', '2019-01-02 09:31', 60))
+        writer.write(make_min('000001', '2019-01-02 10:01', 60, close=2.0))
+        writer.write(make_min('000002', '2019-01-02 09:31', 30))
+        writer.close()
+        self.assertEqual(len(coll.docs), 90 + 30)
+        # 攒够 batch_size 之后整个缓冲区一起写
+        self.assertEqual(coll.bulk_calls, [120])
+        self.assertEqual(
+            coll.docs[('000001', '2019-01-02 10:01:00', '1min')]['close'], 2.0)
+        self.assertEqual(
+            coll.docs[('000001', '2019-01-02 09:31:00', '1min')]['close'], 1.0)
+        stats = writer.stats()
+        self.assertEqual(stats['written'], 120)
+        self.assertEqual(stats['upserted'], 120)
+        self.assertEqual(stats['buffered'], 0)
+        # 再保存一次只会覆盖
+        with QA_BulkWriter(coll, batch_size=100) as writer:
+            writer.write(make_min('000002', '2019-01-02 09:31', 30, close=3.0))
+        self.assertEqual(len(coll.docs), 120)
+        self.assertEqual(writer.stats()['modified'], 30)
+
+    def test_index(self):
+        coll = FakeCollection()
+        QA_BulkWriter(coll).write(make_min('000001', '2019-01-02 09:31', 10))
+        # 默认不建索引
+        self.assertEqual(coll.indexes, [])
+        QA_BulkWriter(coll, keys=('code', 'date'), ensure_index=True)
+        self.assertEqual(coll.indexes, [([('code', 1), ('date', 1)], True)])
+        # 已经有重复记录时改建普通索引
+        coll = FakeCollection(duplicated=True)
+        QA_BulkWriter(coll, ensure_index=True)
+        self.assertEqual(coll.indexes, [([('code', 1), ('datetime', 1), ('type', 1)], False)])
+
+    def test_insert_duplicates(self):
+        coll = FakeCollection()
+        writer = QA_BulkWriter(coll, upsert=False, batch_size=25, ensure_index=True)
+        writer.write(make_min('000001', '2019-01-02 09:31', 40))
+        writer.write(make_min('000001', '2019-01-02 09:51', 40))
+        writer.close()
+        stats = writer.stats()
+        # upsert=False 时重复的记录被唯一索引挡住, 记为 duplicates 而不是 errors
+        self.assertEqual(len(coll.rows), 60)
+        self.assertEqual(stats['duplicates'], 20)
+        self.assertEqual(stats['errors'], 0)
+        self.assertEqual(stats['written'], 60)
+        self.assertEqual(coll.bulk_calls, [40, 40])
+
+    def test_threads(self):
+        coll = FakeCollection()
+        writer = QA_BulkWriter(coll, batch_size=500)
+        threads = [
+            threading.Thread(target=lambda code=code: [
+                writer.write(make_min(code, '2019-01-02 09:31', 240).iloc[i:i + 40])
+                for i in range(0, 240, 40)
+            ]) for code in ['{:06d}'.format(i) for i in range(8)]
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        writer.close()
+        self.assertEqual(len(coll.docs), 8 * 240)
+        self.assertEqual(sum(coll.bulk_calls), 8 * 240)
+        self.assertTrue(all(size >= 500 for size in coll.bulk_calls[:-1]))
+
+    def test_invalidate_cache(self):
+        coll = FakeCollection('quantaxis.stock_day')
+        data = pd.DataFrame({'code': ['000001', '000002'], 'date': ['2019-01-02'] * 2,
+                             'close': [1.0, 2.0]})
+
+        def fetch(code, start, end):
+            return data[data['code'].isin(code)]
+
+        QA_fetch_cache.clear()
+        QA_fetch_cache.fetch('stock_day', coll, 'day', ['000001', '000002'],
+                             '2019-01-01', '2019-01-10', fetch)
+        self.assertEqual(QA_fetch_cache.stats()['keys'], 2)
+        with QA_BulkWriter(coll, keys=('code', 'date')) as writer:
+            writer.write(data.iloc[:1])
+        # 写入的代码的缓存作废, 其他代码不受影响
+        self.assertEqual(QA_fetch_cache.stats()['keys'], 1)
+        QA_fetch_cache.clear()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -13,3 +13,34 @@ class Test_QA_Date(unittest.TestCase):
         self.assertEquals(today.day, now.day)
 
 
+
+
+class Test_QA_Date_array(unittest.TestCase):
+
+    def setUp(self):
+        import pandas as pd
+        self.times = pd.Series(
+            pd.date_range('2019-01-02 09:31', periods=500, freq='7min').strftime('%Y-%m-%d %H:%M')
+        )
+        self.datetimes = pd.to_datetime(self.times)
+
+    def test_stamp(self):
+        for data in [self.times, self.datetimes]:
+            self.assertEqual(
+                list(QADate.QA_util_date_stamp_array(data)),
+                list(data.apply(QADate.QA_util_date_stamp))
+            )
+            self.assertEqual(
+                list(QADate.QA_util_time_stamp_array(data)),
+                list(data.apply(QADate.QA_util_time_stamp))
+            )
+
+    def test_str(self):
+        self.assertEqual(
+            list(QADate.QA_util_date_str_array(self.times)),
+            list(self.times.apply(lambda x: str(x)[0:10]))
+        )
+        self.assertEqual(
+            list(QADate.QA_util_datetime_str_array(self.datetimes)),
+            list(self.datetimes.apply(lambda x: str(x)))
+        )
@@ -0,0 +1,60 @@
+"""
+date_stamp/time_stamp 生成方式的 benchmark
+
+对比 TDX 取数里的逐行 apply 和 QADate 里的向量化版本:
+
+    apply   : .apply(lambda x: QA_util_date_stamp(x)) 等, 每行一次 strptime/mktime
+    array   : QA_util_date_stamp_array 等, 每个不同的日期/小时只调用一次 mktime
+
+python QADate_stamp_benchmark.py [days]
+"""
+
+import sys
+import timeit
+
+import pandas as pd
+
+from QUANTAXIS.QAUtil.QADate import (QA_util_date_stamp,
+                                     QA_util_date_stamp_array,
+                                     QA_util_date_str_array,
+                                     QA_util_datetime_str_array,
+                                     QA_util_time_stamp,
+                                     QA_util_time_stamp_array)
+
+
+def make_tdx_datetime(days=250):
+    '和 pytdx 返回的 datetime 列格式一致: YYYY-MM-DD HH:MM, 每天 240 根 1min bar'
+    morning = pd.date_range('09:31', '11:30', freq='min').strftime('%H:%M')
+    afternoon = pd.date_range('13:01', '15:00', freq='min').strftime('%H:%M')
+    return pd.Series(
+        [
+            '{} {}'.format(day, minute)
+            for day in pd.bdate_range('2019-01-02', periods=days).strftime('%Y-%m-%d')
+            for minute in list(morning) + list(afternoon)
+        ]
+    )
+
+
+def run(days=250, number=3):
+    data = make_tdx_datetime(days)
+    datetime = pd.to_datetime(data)
+
+    cases = {
+        'date str apply': lambda: data.apply(lambda x: str(x)[0:10]),
+        'date str array': lambda: QA_util_date_str_array(data),
+        'date_stamp apply': lambda: data.apply(lambda x: QA_util_date_stamp(x)),
+        'date_stamp array': lambda: QA_util_date_stamp_array(data),
+        'time_stamp apply': lambda: data.apply(lambda x: QA_util_time_stamp(x)),
+        'time_stamp array': lambda: QA_util_time_stamp_array(data),
+        'datetime str apply': lambda: datetime.apply(lambda x: str(x)),
+        'datetime str array': lambda: QA_util_datetime_str_array(datetime),
+    }
+
+    print('rows: {}'.format(len(data)))
+    for name, func in cases.items():
+        cost = min(timeit.repeat(func, number=1, repeat=number))
+        print('{:<24}{:>10.4f}s'.format(name, cost))
+
+
+if __name__ == '__main__':
+    run(*[int(item) for item in sys.argv[1:2]])
@@ -31,3 +31,60 @@ class Test_QA_Date_trade(unittest.TestCase):
             nDayLeft = nDayLeft - 1
 
         print("okok")
+
+
+class Test_QA_TradeCalendar(unittest.TestCase):
+
+    def setUp(self):
+        self.calendar = QADate_trade.trade_calendar
+
+    def test_real_date(self):
+        # 2019-02-04 ~ 2019-02-10 春节休市
+        self.assertEqual(QADate_trade.QA_util_get_real_date('2019-02-06'), '2019-02-01')
+        self.assertEqual(
+            QADate_trade.QA_util_get_real_date('2019-02-06', towards=1),
+            '2019-02-11'
+        )
+        self.assertEqual(
+            QADate_trade.QA_util_get_real_datelist('2019-02-02', '2019-02-10'),
+            (None, None)
+        )
+        self.assertEqual(
+            QADate_trade.QA_util_get_trade_range('2019-02-01', '2019-02-12'),
+            ['2019-02-01', '2019-02-11', '2019-02-12']
+        )
+        self.assertEqual(QADate_trade.QA_util_get_trade_gap('2019-02-01', '2019-02-12'), 3)
+        self.assertEqual(QADate_trade.QA_util_date_gap('2019-02-01', 1, 'gt'), '2019-02-11')
+        self.assertEqual(QADate_trade.QA_util_date_gap('2019-02-06', 1, 'gt'), 'wrong date')
+        self.assertIsNone(self.calendar.real_date('2030-01-01', towards=1))
+
+    def test_array(self):
+        dates = ['2019-02-01', '2019-02-06', '2019-02-11', '1990-01-01']
+        self.assertEqual(
+            list(self.calendar.real_date_array(dates, -1)),
+            ['2019-02-01', '2019-02-01', '2019-02-11', None]
+        )
+        self.assertEqual(
+            list(self.calendar.if_trade_array(dates)),
+            [True, False, True, False]
+        )
+        self.assertEqual(
+            list(self.calendar.date_gap_array(dates, 1, 'gt')),
+            ['2019-02-11', None, '2019-02-12', None]
+        )
+        self.assertEqual(
+            list(self.calendar.trade_gap_array(['2019-02-01', '2019-02-02'], ['2019-02-12', '2019-02-10'])),
+            [3, 0]
+        )
+
+    def test_custom_trade_list(self):
+        trade_list = ['2019-01-02', '2019-01-03', '2019-01-07']
+        calendar = QADate_trade._QA_util_calendar(trade_list)
+        self.assertIs(QADate_trade._QA_util_calendar(list(trade_list)), calendar)
+        self.assertEqual(
+            QADate_trade.QA_util_get_real_date('2019-01-05', trade_list), '2019-01-03')
+        # 列表被修改之后重新建立
+        trade_list.append('2019-01-08')
+        self.assertIsNot(QADate_trade._QA_util_calendar(trade_list), calendar)
+        self.assertEqual(
+            QADate_trade.QA_util_get_real_date('2019-01-09', trade_list), '2019-01-08')
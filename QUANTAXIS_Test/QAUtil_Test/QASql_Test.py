@@ -0,0 +1,49 @@
+import random
+import unittest
+
+import pymongo
+
+from QUANTAXIS.QAUtil.QASql import QA_util_sql_mongo_last
+
+
+class FakeCollection():
+    '按 pymongo 的语义实现 find_one(filter, sort=...), 记录调用参数'
+
+    def __init__(self, docs):
+        self.docs = docs
+        self.calls = []
+
+    def find_one(self, filter=None, sort=None):
+        self.calls.append((filter, sort))
+        docs = [
+            doc for doc in self.docs
+            if all(doc.get(key) == value for key, value in (filter or {}).items())
+        ]
+        for key, direction in reversed(sort or []):
+            docs.sort(key=lambda doc: doc[key], reverse=direction == pymongo.DESCENDING)
+        return dict(docs[0]) if docs else None
+
+
+class QASql_Test(unittest.TestCase):
+
+    def test_mongo_last(self):
+        docs = [
+            {'code': code, 'type': type_, 'time_stamp': float(i), 'close': i}
+            for i in range(100)
+            for code in ['000001', '000002']
+            for type_ in ['1min', '5min']
+        ]
+        # 插入的顺序和时间无关, 不能取 find 的最后一条
+        random.Random(0).shuffle(docs)
+        coll = FakeCollection(docs)
+        res = QA_util_sql_mongo_last(coll, {'code': '000002', 'type': '5min'}, 'time_stamp')
+        self.assertEqual(res, {'code': '000002', 'type': '5min', 'time_stamp': 99.0, 'close': 99})
+        self.assertEqual(
+            coll.calls[-1],
+            ({'code': '000002', 'type': '5min'}, [('time_stamp', pymongo.DESCENDING)])
+        )
+        self.assertIsNone(QA_util_sql_mongo_last(coll, {'code': '600000'}, 'time_stamp'))
+
+
+if __name__ == '__main__':
+    unittest.main()
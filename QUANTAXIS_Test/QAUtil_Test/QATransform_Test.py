@@ -0,0 +1,93 @@
+import datetime
+import json
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from QUANTAXIS.QAUtil.QATransform import (QA_util_cursor_to_columns,
+                                          QA_util_to_json_from_pandas,
+                                          QA_util_to_records_from_pandas)
+
+
+class QATransform_Test(unittest.TestCase):
+
+    def setUp(self):
+        self.items = [
+            {'code': '00000{}'.format(i % 3), 'close': float(i), 'vol': i,
+             'datetime': '2019-01-02 09:{:02d}:00'.format(30 + i)}
+            for i in range(25)
+        ]
+
+    def test_cursor_to_columns(self):
+        res = QA_util_cursor_to_columns(
+            iter(self.items),
+            ['code', 'close', 'vol', 'datetime'],
+            {'close': 'float64', 'vol': 'float64', 'datetime': 'datetime64[ns]'},
+            batch_size=7
+        )
+        self.assertEqual(res['close'].dtype, np.float64)
+        self.assertEqual(res['datetime'].dtype, np.dtype('datetime64[ns]'))
+        self.assertEqual(list(res['code']), [item['code'] for item in self.items])
+        self.assertEqual(list(res['vol']), [item['vol'] for item in self.items])
+        # 相同的代码共用一个字符串对象
+        self.assertIs(res['code'][0], res['code'][3])
+
+    def test_missing_field(self):
+        del self.items[4]['close']
+        res = QA_util_cursor_to_columns(iter(self.items), ['code', 'close'], {'close': 'float64'})
+        self.assertTrue(np.isnan(res['close'][4]))
+
+    def test_empty(self):
+        res = QA_util_cursor_to_columns(iter([]), ['code', 'close'], {'close': 'float64'})
+        self.assertEqual(len(res['code']), 0)
+        self.assertEqual(res['close'].dtype, np.float64)
+
+    def test_records_from_pandas(self):
+        data = pd.DataFrame(self.items)
+        data['datetime'] = pd.to_datetime(data['datetime'])
+        data['date'] = data['datetime'].dt.normalize()
+        data['close'] = data['close'] / 4
+        data.loc[3, 'close'] = np.nan
+        data['stamp'] = data['datetime']
+        data['type'] = '1min'
+        data = data.set_index('datetime', drop=False)
+        res = QA_util_to_records_from_pandas(data)
+        expect = data.assign(
+            datetime=data['datetime'].apply(str),
+            date=data['date'].apply(str)
+        )
+        self.assertEqual(res, json.loads(expect.to_json(orient='records')))
+        self.assertIsNone(res[3]['close'])
+        self.assertIs(type(res[0]['vol']), int)
+        # 不修改原来的 DataFrame
+        self.assertEqual(data['datetime'].dtype, np.dtype('datetime64[ns]'))
+        self.assertEqual(QA_util_to_records_from_pandas(data.iloc[0:0]), [])
+
+    def test_records_types(self):
+        'to_json 会转换的类型 (object 列里的日期/时间, inf, NaT) 结果都一样'
+        data = pd.DataFrame({
+            'float': [1.5, np.inf, -np.inf, np.nan, 0.25],
+            'int': [1, 2, 3, 4, 5],
+            'bool': [True, False, True, False, True],
+            'str': ['a', None, 'c', 'd', 'e'],
+            'day': [datetime.date(2019, 1, 2), None, datetime.date(2019, 1, 3),
+                    datetime.date(1960, 1, 1), datetime.date(2019, 1, 4)],
+            'stamp': [pd.Timestamp('2019-01-02 09:31:00.123'), pd.NaT, None,
+                      pd.Timestamp('2019-01-02'), datetime.datetime(2019, 1, 2, 9, 31)],
+            'mixed': [np.float64(1.5), np.inf, np.nan, np.int64(3), 'x'],
+            'delta': pd.to_timedelta(['1s', None, '-2ms', '1d', '-3d']),
+            'time': pd.to_datetime(['2019-01-02 09:31:00.5', None, '1960-01-01',
+                                    '2019-01-03', '2019-01-04']),
+            'category': pd.Categorical(['x', 'y', None, 'x', 'y']),
+        })
+        res = QA_util_to_records_from_pandas(data)
+        self.assertEqual(res, json.loads(data.to_json(orient='records')))
+        self.assertEqual(res, QA_util_to_json_from_pandas(data.copy()))
+        self.assertIsNone(res[1]['float'])
+        self.assertIsNone(res[1]['delta'])
+        self.assertEqual(res[0]['day'], 1546387200000)
+
+
+if __name__ == '__main__':
+    unittest.main()